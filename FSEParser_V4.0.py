@@ -1,1548 +1,2929 @@
-#!/usr/bin/python
-
-# FSEvents Parser Python Script
-# ------------------------------------------------------
-# Parse FSEvent records from allocated fsevent files and carved gzip files.
-# Outputs parsed information to a tab delimited txt file and SQLite database.
-# Errors and exceptions are recorded in the exceptions logfile.
-
-# Copyright 2019 G-C Partners, LLC
-# Nicole Ibrahim
-#
-# G-C Partners licenses this file to you under the Apache License, Version
-# 2.0 (the "License"); you may not use this file except in compliance with the
-# License.  You may obtain a copy of the License at:
-#
-#        http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
-# implied.  See the License for the specific language governing
-# permissions and limitations under the License.
-
-import sys
-import os
-import struct
-import binascii
-import gzip
-import re
-import datetime
-import sqlite3
-import json
-import StringIO
-from time import (gmtime, strftime)
-from optparse import OptionParser
-import contextlib
-
-try:
-    from dfvfs.analyzer import analyzer
-    from dfvfs.lib import definitions
-    from dfvfs.path import factory as path_spec_factory
-    from dfvfs.volume import tsk_volume_system
-    from dfvfs.resolver import resolver
-    from dfvfs.lib import raw
-    from dfvfs.helpers import source_scanner
-    DFVFS_IMPORT = True
-    IMPORT_ERROR = None
-except ImportError as exp:
-    DFVFS_IMPORT = False
-    IMPORT_ERROR =("\n%s\n\
-        You have specified the source type as image but DFVFS \n\
-        is not installed and is required for image support. \n\
-        To install DFVFS please refer to \n\
-        http://www.hecfblog.com/2015/12/how-to-install-dfvfs-on-windows-without.html" % (exp))
-
-VERSION = '4.0'
-
-EVENTMASK = {
-    0x00000000: 'None;',
-    0x00000001: 'FolderEvent;',
-    0x00000002: 'Mount;',
-    0x00000004: 'Unmount;',
-    0x00000020: 'EndOfTransaction;',
-    0x00000800: 'LastHardLinkRemoved;',
-    0x00001000: 'HardLink;',
-    0x00004000: 'SymbolicLink;',
-    0x00008000: 'FileEvent;',
-    0x00010000: 'PermissionChange;',
-    0x00020000: 'ExtendedAttrModified;',
-    0x00040000: 'ExtendedAttrRemoved;',
-    0x00100000: 'DocumentRevisioning;',
-    0x00400000: 'ItemCloned;',  # macOS HighSierra
-    0x01000000: 'Created;',
-    0x02000000: 'Removed;',
-    0x04000000: 'InodeMetaMod;',
-    0x08000000: 'Renamed;',
-    0x10000000: 'Modified;',
-    0x20000000: 'Exchange;',
-    0x40000000: 'FinderInfoMod;',
-    0x80000000: 'FolderCreated;',
-    0x00000008: 'NOT_USED-0x00000008;',
-    0x00000010: 'NOT_USED-0x00000010;',
-    0x00000040: 'NOT_USED-0x00000040;',
-    0x00000080: 'NOT_USED-0x00000080;',
-    0x00000100: 'NOT_USED-0x00000100;',
-    0x00000200: 'NOT_USED-0x00000200;',
-    0x00000400: 'NOT_USED-0x00000400;',
-    0x00002000: 'NOT_USED-0x00002000;',
-    0x00080000: 'NOT_USED-0x00080000;',
-    0x00200000: 'NOT_USED-0x00200000;',
-    0x00800000: 'NOT_USED-0x00800000;'
-}
-
-print('\n==========================================================================')
-print('FSEParser v {} -- provided by G-C Partners, LLC'.format(VERSION))
-print('==========================================================================')
-
-
-def get_options():
-    """
-    Get needed options for processing
-    """
-    usage = "usage: %prog -s SOURCE -o OUTDIR -t SOURCETYPE [folder|image] [-c CASENAME -q REPORT_QUERIES]"
-    options = OptionParser(usage=usage)
-    options.add_option("-s",
-                       action="store",
-                       type="string",
-                       dest="source",
-                       default=False,
-                       help="REQUIRED. The source directory or image containing fsevent files to be parsed")
-    options.add_option("-o",
-                       action="store",
-                       type="string",
-                       dest="outdir",
-                       default=False,
-                       help="REQUIRED. The destination directory used to store parsed reports")
-    options.add_option("-t",
-                       action="store",
-                       type="string",
-                       dest="sourcetype",
-                       default=False,
-                       help="REQUIRED. The source type to be parsed. Available options are 'folder' or 'image'")
-    options.add_option("-c",
-                       action="store",
-                       type="string",
-                       dest="casename",
-                       default=False,
-                       help="OPTIONAL. The name of the current session, \
-                       used for naming standards. Defaults to 'FSE_Reports'")
-    options.add_option("-q",
-                       action="store",
-                       type="string",
-                       dest="report_queries",
-                       default=False,
-                       help="OPTIONAL. The location of the report_queries.json file \
-                       containing custom report queries to generate targeted reports."
-                       )
-
-    # Return options to caller #
-    return options
-
-
-def parse_options():
-    """
-    Capture and return command line arguments.
-    """
-    # Get options
-    options = get_options()
-    (opts, args) = options.parse_args()
-
-    # The meta will store all information about the arguments passed #
-    meta = {
-        'casename': opts.casename,
-        'reportqueries': opts.report_queries,
-        'sourcetype': opts.sourcetype,
-        'source': opts.source,
-        'outdir': opts.outdir
-    }
-
-    # Print help if no options are provided
-    if len(sys.argv[1:]) == 0:
-        options.print_help()
-        sys.exit(1)
-    # Test required arguments
-    if meta['source'] is False or meta['outdir'] is False or meta['sourcetype'] is False:
-        options.error('Unable to proceed. The following parameters '
-            'are required:\n-s SOURCE\n-o OUTDIR\n-t SOURCETYPE')
-
-    if not os.path.exists(meta['source']):
-        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['source'])
-
-    if not os.path.exists(meta['outdir']):
-        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
-        
-    if meta['reportqueries'] and not os.path.exists(meta['reportqueries']):
-        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['reportqueries'])
-
-    if meta['sourcetype'].lower() != 'folder' and meta['sourcetype'].lower() != 'image':
-        options.error(
-            'Unable to proceed. \n\nIncorrect source type provided: "%s". The following are valid options:\
-            \n -t folder\n -t image\n' % (meta['sourcetype']))
-
-    if meta['sourcetype'] == 'image' and DFVFS_IMPORT is False:
-        options.error(IMPORT_ERROR)
-
-    if meta['reportqueries'] ==False:
-        print '[Info]: Report queries file not specified using the -q option. Custom reports will not be generated.'
-        
-    if meta['casename'] is False:
-        print('[Info]: No casename specified using -c. Defaulting to "FSE_Reports".')
-        meta['casename'] = 'FSE_Reports'
-
-    # Return meta to caller #
-    return meta
-
-
-def main():
-    """
-    Call the main processes.
-    """
-    # Process fsevents
-    FSEventHandler()
-
-    # Commit transaction
-    SQL_CON.commit()
-
-    # Close database connection
-    SQL_CON.close()
-
-
-def enumerate_flags(flag, f_map):
-    """
-    Iterate through record flag mappings and enumerate.
-    """
-    # Reset string based flags to null
-    f_type = ''
-    f_flag = ''
-    # Iterate through flags
-    for i in f_map:
-        if i & flag:
-            if f_map[i] == 'FolderEvent;' or \
-                    f_map[i] == 'FileEvent;' or \
-                    f_map[i] == 'SymbolicLink;' or \
-                    f_map[i] == 'HardLink;':
-                f_type = ''.join([f_type, f_map[i]])
-            else:
-                f_flag = ''.join([f_flag, f_map[i]])
-    return f_type, f_flag
-
-
-def progress(count, total):
-    """
-    Handles the progress bar in the console.
-    """
-    bar_len = 45
-    filled_len = int(round(bar_len * count / float(total)))
-
-    percents = round(100 * count / float(total), 1)
-    p_bar = '=' * filled_len + '.' * (bar_len - filled_len)
-    try:
-        sys.stdout.write('  File {} of {}  [{}] {}{}\r'.format(count, total, p_bar, percents, '%'))
-    except:
-        pass
-    sys.stdout.flush()
-
-
-class FSEventHandler():
-    """
-    FSEventHandler iterates through and parses fsevents.
-    """
-
-    def __init__(self):
-        """
-        """
-        self.meta = parse_options()
-        if self.meta['reportqueries']:
-            # Check json file
-            try:
-                # Basic json syntax
-                self.r_queries = json.load(open(self.meta['reportqueries']))
-                # Check to see if required keys are present
-                for i in self.r_queries['process_list']:
-                    i['report_name']
-                    i['query']
-            except Exception as exp:
-                print('An error occurred while reading the json file. \n{}'.format(str(exp)))
-                sys.exit(0)
-        else:
-            # if report queries option was not specified
-            self.r_queries = False
-
-        self.path = self.meta['source']
-
-        create_sqlite_db(self)
-
-        self.files = []
-        self.pages = []
-        self.src_fullpath = ''
-        self.dls_version = 0
-
-        # Initialize statistic counters
-        self.all_records_count = 0
-        self.all_files_count = 0
-        self.parsed_file_count = 0
-        self.error_file_count = 0
-
-        # Try to open the output files
-        try:
-            # Try to open ouput files
-            self.l_all_fsevents = open(
-                os.path.join(self.meta['outdir'], self.meta['casename'], 'All_FSEVENTS.tsv'),
-                'wb'
-            )
-            # Process report queries output files
-            # if option was specified.
-            if self.r_queries:
-                # Try to open custom report query output files
-                for i in self.r_queries['process_list']:
-                    r_file = os.path.join(self.meta['outdir'], self.meta['casename'], i['report_name'] + '.tsv')
-                    if os.path.exists(r_file):
-                        os.remove(r_file)
-                    setattr(self, 'l_' + i['report_name'], open(r_file, 'wb'))
-
-            # Output log file for exceptions
-            l_file = os.path.join(self.meta['outdir'], self.meta['casename'], 'EXCEPTIONS_LOG.txt')
-            self.logfile = open(l_file, 'w')
-        except Exception as exp:
-            # Print error to command prompt if unable to open files
-            if 'Permission denied' in str(exp):
-                print('{}\nEnsure that you have permissions to write to file '
-                      '\nand output file is not in use by another application.\n'.format(str(exp)))
-            else:
-                print(exp)
-            sys.exit(0)
-
-        # Begin FSEvent processing
-
-        print('\n[STARTED] {} UTC Parsing files.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-
-        if self.meta['sourcetype'] == 'image':
-            self._get_fsevent_image_files()
-        elif self.meta['sourcetype'] == 'folder':
-            self._get_fsevent_files()
-            print('\n  All Files Attempted: {}\n  All Parsed Files: {}\n  Files '
-                  'with Errors: {}\n  All Records Parsed: {}'.format(
-                self.all_files_count,
-                self.parsed_file_count,
-                self.error_file_count,
-                self.all_records_count))
-
-        print('[FINISHED] {} UTC Parsing files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-
-        print('[STARTED] {} UTC Sorting fsevents table in Database.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-
-        row_count = reorder_sqlite_db(self)
-        if row_count != 0:
-            print('[FINISHED] {} UTC Sorting fsevents table in Database.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-    
-            print('[STARTED] {} UTC Exporting fsevents table from Database.'.format(
-                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-    
-            self.export_fsevent_report(self.l_all_fsevents, row_count)
-    
-            print('[FINISHED] {} UTC Exporting fsevents table from Database.\n'.format(
-                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-    
-            if self.r_queries:
-                print('[STARTED] {} UTC Exporting views from database '
-                      'to TSV files.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-                for i in self.r_queries['process_list']:
-                    Output.print_columns(getattr(self, 'l_' + i['report_name']))
-                # Export report views to output files
-                self.export_sqlite_views()
-                print('[FINISHED] {} UTC Exporting views from database '
-                      'to TSV files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-    
-            print("  Exception log and Reports exported to:\n  '{}'\n".format(os.path.join(self.meta['outdir'], self.meta['casename'])))
-    
-            # Close output files
-            self.l_all_fsevents.close()
-            self.logfile.close()
-        else:
-            print('[FINISHED] {} UTC No records were parsed.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
-            print('Nothing to export.\n')
-
-
-    @contextlib.contextmanager
-    def skip_gzip_check(self):
-        """
-        Context manager that replaces gzip.GzipFile._read_eof with a no-op.
-        This is useful when decompressing partial files, something that won't
-        work if GzipFile does it's checksum comparison.
-        stackoverflow.com/questions/1732709/unzipping-part-of-a-gz-file-using-python/18602286
-        """
-        _read_eof = gzip.GzipFile._read_eof
-        gzip.GzipFile._read_eof = lambda *args, **kwargs: None
-        yield
-        gzip.GzipFile._read_eof = _read_eof
-
-
-    def _get_fsevent_files(self):
-        """
-        get_fsevent_files will iterate through each file in the fsevents dir provided,
-        and attempt to decompress the gzip. If it is unable to decompress,
-        it will write an entry in the logfile. If successful, the script will
-        check for a DLS header signature in the decompress gzip. If found, the contents of
-        the gzip will be placed into a buffer and passed to the next phase of processing.
-        """
-        # Print the header columns to the output files
-        Output.print_columns(self.l_all_fsevents)
-
-        # Total number of files in events dir #
-        t_files = len(os.listdir(self.path))
-        for filename in os.listdir(self.path):
-            if filename == 'fseventsd-uuid':
-                t_files -= 1
-        self.time_range_src_mod = []
-        prev_mod_date = "Unknown"
-        prev_last_wd = 0
-        c_last_wd = 0
-
-        # Uses file mod dates to generate time ranges by default unless
-        # files are carved or mod dates lost due to exporting
-        self.use_file_mod_dates = True
-
-        # Run simple test to see if file mod dates
-        # should be used to generate time ranges
-        # In some instances fsevent files may not have
-        # their original mod times preserved on export
-        # This code will flag true when the same date and hour
-        # exists for the first file and the last file
-        # in the provided source fsevents folder
-        first = os.path.join(self.path, os.listdir(self.path)[0])
-        last = os.path.join(self.path, os.listdir(self.path)[len(os.listdir(self.path)) - 1])
-        first = os.path.getmtime(first)
-        last = os.path.getmtime(last)
-        first = str(datetime.datetime.utcfromtimestamp(first))[:14]
-        last = str(datetime.datetime.utcfromtimestamp(last))[:14]
-
-        if first == last:
-            self.use_file_mod_dates = False
-
-        # Iterate through each file in supplied fsevents dir
-        for filename in os.listdir(self.path):
-            if filename == 'fseventsd-uuid':
-                continue
-            # Variables
-            self.all_files_count += 1
-
-            # Call the progress bar which shows parsing stats
-            progress(self.all_files_count, t_files)
-
-            buf = ""
-
-            # Full path to source fsevent file
-            self.src_fullpath = os.path.join(self.path, filename)
-            # Name of source fsevent file
-            self.src_filename = filename
-            # UTC mod date of source fsevent file
-            self.m_time = os.path.getmtime(self.src_fullpath)
-            self.m_time = str(datetime.datetime.utcfromtimestamp((self.m_time))) + " [UTC]"
-
-            # Regex to match against source fsevent log filename
-            regexp = re.compile(r'^.*[\][0-9a-fA-F]{16}$')
-
-            # Test to see if fsevent file name matches naming standard
-            # if not, assume this is a carved gzip
-            if len(self.src_filename) == 16 and regexp.search(filename) is not None:
-                c_last_wd = int(self.src_filename, 16)
-                self.time_range_src_mod = prev_last_wd, c_last_wd, prev_mod_date, self.m_time
-                self.is_carved_gzip = False
-            else:
-                self.is_carved_gzip = True
-
-            # Attempt to decompress the fsevent archive
-            try:
-                with self.skip_gzip_check():
-                    self.files = gzip.GzipFile(self.src_fullpath, "rb")
-                    buf = self.files.read()
-
-            except Exception as exp:
-                # When permission denied is encountered
-                if "Permission denied" in str(exp) and not os.path.isdir(self.src_fullpath):
-                    print('\nEnsure that you have permissions to read '
-                          'from {}\n{}\n'.format(self.path, str(exp)))
-                    sys.exit(0)
-                # Otherwise write error to log file
-                else:
-                    self.logfile.write(
-                        "%s\tError: Error while decompressing FSEvents file.%s\n" % (
-                            self.src_filename,
-                            str(exp)
-                        )
-                    )
-                self.error_file_count += 1
-                continue
-
-            # If decompress is success, check for DLS headers in the current file
-            dls_chk = FSEventHandler.dls_header_search(self, buf, self.src_fullpath)
-
-            # If check for DLS returns false, write information to logfile
-            if dls_chk is False:
-                self.logfile.write('%s\tInfo: DLS Header Check Failed. Unable to find a '
-                                   'DLS header. Unable to parse File.\n' % (self.src_filename))
-                # Continue to the next file in the fsevents directory
-                self.error_file_count += 1
-                continue
-
-            self.parsed_file_count += 1
-
-            # Accounts for fsevent files that get flushed to disk
-            # at the same time. Usually the result of a shutdown
-            # or unmount
-            if not self.is_carved_gzip and self.use_file_mod_dates:
-                prev_mod_date = self.m_time
-                prev_last_wd = int(self.src_filename, 16)
-
-            # If DLSs were found, pass the decompressed file to be parsed
-            FSEventHandler.parse(self, buf)
-
-
-    def _get_fsevent_image_files(self):
-        """
-        get_fsevent_files will iterate through each file in the fsevents dir
-        and attempt to decompress the gzip. If it is unable to decompress,
-        it will write an entry in the logfile. If successful, the script will
-        check for a DLS header signature in the decompress gzip. If found, the contents of
-        the gzip will be placed into a buffer and passed to the next phase of processing.
-        """
-        # Print the header columns to the output file
-        Output.print_columns(self.l_all_fsevents)
-                
-        scan_path_spec = None
-        scanner = source_scanner.SourceScanner()
-        scan_context = source_scanner.SourceScannerContext()
-        scan_context.OpenSourcePath(self.meta['source'])
-
-        scanner.Scan(
-            scan_context,
-            scan_path_spec=scan_path_spec
-        )
-
-        for file_system_path_spec, file_system_scan_node in scan_context._file_system_scan_nodes.items():
-            t_files = 0
-            self.all_files_count = 0
-            self.error_file_count = 0
-            self.all_records_count = 0
-            self.parsed_file_count = 0
-            
-            try:
-                location = file_system_path_spec.parent.location
-            except:
-                location = file_system_path_spec.location
-                
-            print "  Processing Volume {}.\n".format(location)
-
-            fs_event_path_spec = path_spec_factory.Factory.NewPathSpec(
-                file_system_path_spec.type_indicator,
-                parent=file_system_path_spec.parent,
-                location="/.fseventsd"
-            )
-
-            file_entry = resolver.Resolver.OpenFileEntry(
-                fs_event_path_spec
-            )
-            
-            if file_entry != None:
-
-                t_files = file_entry.number_of_sub_file_entries
-                for sub_file_entry in file_entry.sub_file_entries:
-                    if sub_file_entry.name == 'fseventsd-uuid':
-                        t_files -= 1
-
-                self.time_range_src_mod = []
-                prev_mod_date = "Unknown"
-                prev_last_wd = 0
-                c_last_wd = 0
-                counter = 0
-
-                # Uses file mod dates to generate time ranges by default unless
-                # files are carved or mod dates lost due to exporting
-                self.use_file_mod_dates = True
-
-                # Iterate through each file in supplied fsevents dir
-                for sub_file_entry in file_entry.sub_file_entries:
-                    if sub_file_entry.name == 'fseventsd-uuid':
-                        continue
-                    # Variables
-                    counter += 1
-                    self.all_files_count += 1
-
-                    # Call the progress bar which shows parsing stats
-                    progress(counter, t_files)
-
-                    buf = ""
-
-                    # Name of source fsevent file
-                    self.src_filename = sub_file_entry.name
-                    self.src_fullpath = self.meta['source'] + ": " + location + sub_file_entry.path_spec.location
-
-                    stat_object = sub_file_entry.GetStat()
-
-                    # UTC mod date of source fsevent file
-                    self.m_time = datetime.datetime.fromtimestamp(
-                        stat_object.mtime).strftime(
-                        '%Y-%m-%d %H:%M:%S') + " [UTC]"
-
-                    # Regex to match against source fsevent log filename
-                    regexp = re.compile(r'^.*[\][0-9a-fA-F]{16}$')
-
-                    # Test to see if fsevent file name matches naming standard
-                    # if not, assume this is a carved gzip
-                    if len(self.src_filename) == 16 and regexp.search(self.src_filename) is not None:
-                        c_last_wd = int(self.src_filename, 16)
-                        self.time_range_src_mod = prev_last_wd, c_last_wd, prev_mod_date, self.m_time
-                        self.is_carved_gzip = False
-                    else:
-                        self.is_carved_gzip = True
-                    file_object = sub_file_entry.GetFileObject()
-
-                    compressedFile = StringIO.StringIO()
-                    compressedFile.write(file_object.read())
-                    compressedFile.seek(0)
-                    # Attempt to decompress the fsevent archive
-                    try:
-                        with self.skip_gzip_check():
-                            self.files = gzip.GzipFile(fileobj=compressedFile, mode='rb')
-                            buf = self.files.read()
-
-                    except Exception as exp:
-                        self.logfile.write(
-                            "%s\tError: Error while decompressing FSEvents file.%s\n" % (
-                                self.src_filename,
-                                str(exp)
-                            )
-                        )
-                        self.error_file_count += 1
-                        continue
-
-                    # If decompress is success, check for DLS headers in the current file
-                    dls_chk = FSEventHandler.dls_header_search(self, buf, self.src_filename)
-
-                    # If check for DLS returns false, write information to logfile
-                    if dls_chk is False:
-                        self.logfile.write('%s\tInfo: DLS Header Check Failed. Unable to find a '
-                                           'DLS header. Unable to parse File.\n' % (self.src_filename))
-                        # Continue to the next file in the fsevents directory
-                        self.error_file_count += 1
-                        continue
-
-                    self.parsed_file_count += 1
-
-                    # Accounts for fsevent files that get flushed to disk
-                    # at the same time. Usually the result of a shutdown
-                    # or unmount
-                    if not self.is_carved_gzip and self.use_file_mod_dates:
-                        prev_mod_date = self.m_time
-                        prev_last_wd = int(self.src_filename, 16)
-
-                    # If DLSs were found, pass the decompressed file to be parsed
-                    FSEventHandler.parse(self, buf)
-            
-            else:
-                print('Unable to process volume or no fsevent files found')
-                continue
-
-            print('\n\n  All Files Attempted: {}\n  All Parsed Files: {}\n  Files '
-                  'with Errors: {}\n  All Records Parsed: {}'.format(
-                self.all_files_count,
-                self.parsed_file_count,
-                self.error_file_count,
-                self.all_records_count))
-
-
-    def dls_header_search(self, buf, f_name):
-        """
-        Search within the unzipped file
-        for all occurrences of the DLS magic header.
-        There can be more than one DLS header in an fsevents file.
-        The start and end offsets are stored and used for parsing
-        the records contained within each DLS page.
-        """
-        self.file_size = len(buf)
-        self.my_dls = []
-
-        raw_file = buf
-        dls_count = 0
-        start_offset = 0
-        end_offset = 0
-
-        while end_offset != self.file_size:
-            try:
-                start_offset = end_offset
-                page_len = struct.unpack("<I", raw_file[start_offset + 8:start_offset + 12])[0]
-                end_offset = start_offset + page_len
-
-                if raw_file[start_offset:start_offset + 4] == '1SLD' or raw_file[start_offset:start_offset + 4] == '2SLD':
-                    self.my_dls.append({'Start Offset': start_offset, 'End Offset': end_offset})
-                    dls_count += 1
-                else:
-                    self.logfile.write("%s: Error in length of page when finding page headers." % (f_name))
-                    break
-            except:
-                self.logfile.write("%s: Error in length of page when finding page headers." % (f_name))
-                break
-
-        if dls_count == 0:
-            # Return false to caller so that the next file will be searched
-            return False
-        else:
-            # Return true so that the DLSs found can be parsed
-            return True
-
-
-    def parse(self, buf):
-        """
-        Parse the decompressed fsevent log. First
-        finding other dates, then iterating through
-        eash DLS page found. Then parse records within
-        each page.
-        """
-        # Initialize variables
-        pg_count = 0
-
-        # Call the date finder for current fsevent file
-        FSEventHandler.find_date(self, buf)
-        self.valid_record_check = True
-
-        # Iterate through DLS pages found in current fsevent file
-        for i in self.my_dls:
-            # Assign current DLS offsets
-            start_offset = self.my_dls[pg_count]['Start Offset']
-            end_offset = self.my_dls[pg_count]['End Offset']
-
-            # Extract the raw DLS page from the fsevents file
-            raw_page = buf[start_offset:end_offset]
-
-            self.page_offset = start_offset
-
-            # Reverse byte stream to match byte order little-endian
-            m_dls_chk = raw_page[3] + raw_page[2] + raw_page[1] + raw_page[0]
-            # Assign DLS version based off magic header in page
-            if m_dls_chk == "DLS1":
-                self.dls_version = 1
-            elif m_dls_chk == "DLS2":
-                self.dls_version = 2
-            else:
-                self.logfile.write("%s: Unknown DLS Version." % (self.src_filename))
-                break
-
-            # Pass the raw page + a start offset to find records within page
-            FSEventHandler.find_page_records(
-                self,
-                raw_page,
-                start_offset
-            )
-            # Increment the DLS page count by 1
-            pg_count += 1
-
-
-    def find_date(self, raw_file):
-        """
-        Search within current file for names of log files that are created
-        that store the date as a part of its naming
-        standard.
-        """
-        # Reset variables
-        self.time_range = []
-
-        # Add previous file's mod timestamp, wd and current file's timestamp, wd
-        # to time range
-        if not self.is_carved_gzip and self.use_file_mod_dates:
-            c_time_1 = str(self.time_range_src_mod[2])[:10].replace("-", ".")
-            c_time_2 = str(self.time_range_src_mod[3])[:10].replace("-", ".")
-
-            self.time_range.append([self.time_range_src_mod[0], c_time_1])
-            self.time_range.append([self.time_range_src_mod[1], c_time_2])
-
-        # Regex's for logs with dates in name
-        regex_1 = ("private/var/log/asl/[\x30-\x39]{4}[.][\x30-\x39]{2}" +
-                   "[.][\x30-\x39]{2}[.][\x30-\x7a]{2,8}[.]asl")
-        regex_2 = ("mobile/Library/Logs/CrashReporter/DiagnosticLogs/security[.]log" +
-                   "[.][\x30-\x39]{8}T[\x30-\x39]{6}Z")
-        regex_3 = ("private/var/log/asl/Logs/aslmanager[.][\x30-\x39]{8}T[\x30-\x39]" +
-                   "{6}[-][\x30-\x39]{2}")
-        regex_4 = ("private/var/log/DiagnosticMessages/[\x30-\x39]{4}[.][\x30-\x39]{2}" +
-                   "[.][\x30-\x39]{2}[.]asl")
-        regex_5 = ("private/var/log/com[.]apple[.]clouddocs[.]asl/[\x30-\x39]{4}[.]" +
-                   "[\x30-\x39]{2}[.][\x30-\x39]{2}[.]asl")
-        regex_6 = ("private/var/log/powermanagement/[\x30-\x39]{4}[.][\x30-\x39]{2}[.]" +
-                   "[\x30-\x39]{2}[.]asl")
-        regex_7 = ("private/var/log/asl/AUX[.][\x30-\x39]{4}[.][\x30-\x39]{2}[.]" +
-                   "[\x30-\x39]{2}/[0-9]{9}")
-        regex_8 = "private/var/audit/[\x30-\x39]{14}[.]not_terminated"
-
-        # Regex that matches only events with created flag
-        flag_regex = ("[\x00-\xFF]{9}[\x01|\x11|\x21|\x31|\x41|\x51|\x61|\x05|\x15|" +
-                      "\x25|\x35|\x45|\x55|\x65]")
-
-        # Concatenating date, flag matching regexes
-        # Also grabs working descriptor for record
-        m_regex = "(" + regex_1 + "|" + regex_2 + "|" + regex_3 + "|" + regex_4 + "|" + regex_5
-        m_regex = m_regex + "|" + regex_6 + "|" + regex_7 + "|" + regex_8 + ")" + flag_regex
-
-        # Start searching within fsevent file for events that match dates regex
-        # As the length of each log location is different, create if statements for each
-        # so that the date can be pulled from the correct location within the fullpath
-        for match in re.finditer(m_regex, raw_file):
-            if raw_file[match.regs[0][0]:match.regs[0][0] + 35] == "private/var/log/asl/Logs/aslmanager":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 36
-                # The date is 8 chars long in the format of yyyymmdd
-                t_end = t_start + 8
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                # Format the date
-                t_temp = t_temp[:4] + "." + t_temp[4:6] + "." + t_temp[6:8]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 23] == "private/var/log/asl/AUX":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 24
-                # The date is 10 chars long in the format of yyyy.mm.dd
-                t_end = t_start + 10
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 19] == "private/var/log/asl":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 20
-                # The date is 10 chars long in the format of yyyy.mm.dd
-                t_end = t_start + 10
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 4] == "mobi":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 62
-                # The date is 8 chars long in the format of yyyymmdd
-                t_end = t_start + 8
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                # Format the date
-                t_temp = t_temp[:4] + "." + t_temp[4:6] + "." + t_temp[6:8]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 34] == "private/var/log/DiagnosticMessages":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 35
-                # The date is 10 chars long in the format of yyyy.mm.dd
-                t_end = t_start + 10
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 39] == "private/var/log/com.apple.clouddocs.asl":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 40
-                # The date is 10 chars long in the format of yyyy.mm.dd
-                t_end = t_start + 10
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 31] == "private/var/log/powermanagement":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 32
-                # The date is 10 chars long in the format of yyyy.mm.dd
-                t_end = t_start + 10
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            elif raw_file[match.regs[0][0]:match.regs[0][0] + 17] == "private/var/audit":
-                # Clear timestamp temp variable
-                t_temp = ''
-                # t_start uses the start offset of the match
-                t_start = match.regs[0][0] + 18
-                # The date is 8 chars long in the format of yyyymmdd
-                t_end = t_start + 8
-                # Strip the date from the fsevent file
-                t_temp = raw_file[t_start:t_end]
-                # Format the date
-                t_temp = t_temp[:4] + "." + t_temp[4:6] + "." + t_temp[6:8]
-                wd_temp = struct.unpack("<Q", raw_file[match.regs[0][1] - 9:match.regs[0][1] - 1])[0]
-            else:
-                t_temp = ''
-                wd_temp = ''
-            # Append date, wd to time range list
-            self.time_range.append([wd_temp, t_temp])
-        # Sort the time range list by wd
-        self.time_range = sorted(self.time_range, key=self.get_key)
-
-        # Call the time range builder to rebuild time range
-        self.build_time_range()
-
-
-    def get_key(self, item):
-        """
-        Return the key in the time range item provided.
-        """
-        return item[0]
-
-    def build_time_range(self):
-        """
-        Rebuilds the time range list to
-        include the previous and current working descriptor
-        as well as the previous and current date found
-        """
-        prev_date = '0'
-        prev_wd = 0
-        temp = []
-
-        # Iterate through each in time range list
-        for i in self.time_range:
-            # Len is 7 when prev_date is 'Unknown'
-            if len(prev_date) == 7:
-                p_date = 0
-                c_date = i[1][:10].replace(".", "")
-            # When current date is 'Unknown'
-            if len(i[1]) == 7:
-                p_date = prev_date[:10].replace(".", "")
-                c_date = 0
-            # When both dates are known
-            if len(prev_date) != 7 and len(i[1]) != 7:
-                p_date = prev_date[:10].replace(".", "")
-                c_date = i[1][:10].replace(".", "")
-            # Bypass a date when current date is less than prev date
-            if int(c_date) < int(p_date):
-                prev_wd = prev_wd
-                prev_date = prev_date
-            else:
-                # Reassign prev_date to 'Unknown'
-                if prev_date == '0':
-                    prev_date = 'Unknown'
-                # Add previous, current wd and previous, current date to temp
-                temp.append([prev_wd, i[0], prev_date, i[1]])
-                prev_wd = i[0]
-                prev_date = i[1]
-        # Assign temp list to time range list
-        self.time_range = temp
-
-
-    def find_page_records(self, page_buf, page_start_off):
-        """
-        Input values are starting offset of current page and
-        end offset of current page within the current fsevent file
-        find_page_records will identify all records within a given page.
-        """
-
-        # Initialize variables
-        fullpath = ''
-        char = ''
-
-        # Start, end offset of first record to be parsed within current DLS page
-        start_offset = 12
-        end_offset = 13
-
-        len_buf = len(page_buf)
-
-        # Call the file header parser for current DLS page
-        try:
-            FsEventFileHeader(
-                page_buf[:13],
-                self.src_fullpath
-            )
-        except:
-            self.logfile.write(
-                "%s\tError: Unable to parse file header at offset %d\n" % (
-                    self.src_filename,
-                    page_start_off
-                )
-            )
-
-        # Account for length of record for different DLS versions
-        # Prior to HighSierra
-        if self.dls_version == 1:
-            bin_len = 13
-            rbin_len = 12
-        # HighSierra
-        elif self.dls_version == 2:
-            bin_len = 21
-            rbin_len = 20
-        else:
-            pass
-
-        # Iterate through the page.
-        # Valid record check should be true while parsing.
-        # If an invalid record is encounted (occurs in carved gzips)
-        # parsing stops for the current file
-        while len_buf > start_offset and self.valid_record_check:
-            # Grab the first char
-            char = page_buf[start_offset:end_offset].encode('hex')
-
-            if char != '00':
-                # Replace non-printable char with nothing
-                if str(char).lower() == '0d' or str(char).lower() == '0a':
-                    self.logfile.write('%s\tInfo: Non-printable char %s in record fullpath at '
-                                       'page offset %d. Parser removed char for reporting '
-                                       'purposes.\n' % \
-                                       (self.src_filename, char, page_start_off + start_offset))
-                    char = ''
-                # Append the current char to the full path for current record
-                fullpath = fullpath + char
-                # Increment the offsets by one
-                start_offset += 1
-                end_offset += 1
-                # Continue the while loop
-                continue
-            elif char == '00':
-                # When 00 is found, then it is the end of fullpath
-                # Increment the offsets by bin_len, this will be the start of next full path
-                start_offset += bin_len
-                end_offset += bin_len
-
-            # Decode fullpath that was stored as hex
-            fullpath = fullpath.decode('hex').replace('\t', '')
-            # Store the record length
-            record_len = len(fullpath) + bin_len
-
-            # Account for records that do not have a fullpath
-            if record_len == bin_len:
-                # Assign NULL as the path
-                fullpath = "NULL"
-
-            # Assign raw record offsets #
-            r_start = start_offset - rbin_len
-            r_end = start_offset
-
-            # Strip raw record from page buffer #
-            raw_record = page_buf[r_start:r_end]
-
-            # Strip mask from buffer and encode as hex #
-            mask_hex = "0x" + raw_record[8:12].encode('hex')
-
-            # Account for carved files when record end offset
-            # occurs after the length of the buffer
-            if r_end > len_buf:
-                continue
-
-            # Set fs_node_id to empty for DLS version 1
-            # Prior to HighSierra
-            if self.dls_version == 1:
-                fs_node_id = ""
-            # Assign file system node id if DLS version is 2
-            # Introduced with HighSierra
-            if self.dls_version == 2:
-                fs_node_id = struct.unpack("<q", raw_record[12:])[0]
-
-            record_off = start_offset + page_start_off
-
-            record = FSEventRecord(raw_record, record_off, mask_hex)
-
-            # Check record to see if is valid. Identifies invalid/corrupted
-            # that sometimes occur in carved gzip files
-            self.valid_record_check = self.check_record(record.mask, fullpath)
-
-            # If record is not valid, stop parsing records in page
-            if self.valid_record_check is False or record.wd == 0:
-                self.logfile.write('%s\tInfo: First invalid record found in carved '
-                                   'gzip at offset %d. The remainder of this buffer '
-                                   'will not be parsed.\n' % \
-                                   (self.src_filename, page_start_off + start_offset))
-                fullpath = ''
-                break
-            # Otherwise assign attributes and add to outpur reports
-            else:
-                f_path, f_name = os.path.split(fullpath)
-                dates = self.apply_date(record.wd)
-                # Assign our current records attributes
-                attributes = {
-                    'id': record.wd,
-                    'id_hex': record.wd_hex + " (" + str(record.wd) + ")",
-                    'fullpath': fullpath,
-                    'filename': f_name,
-                    'type': record.mask[0],
-                    'flags': record.mask[1],
-                    'approx_dates_plus_minus_one_day': dates,
-                    'mask': mask_hex,
-                    'node_id': fs_node_id,
-                    'record_end_offset': record_off,
-                    'source': self.src_fullpath,
-                    'source_modified_time': self.m_time
-                }
-
-                output = Output(attributes)
-
-                # Print the parsed record to output file
-                output.append_row()
-
-                fullpath = ''
-            # Increment the current record count by 1
-            self.all_records_count += 1
-
-
-    def check_record(self, mask, fullpath):
-        """
-        Checks for conflicts in the record's flags
-        to determine if the record is valid to limit the
-        number of invalid records in parsed output.
-        Applies only to carved gzip
-        """
-        if self.is_carved_gzip:
-            decode_error = False
-            # Flag conflicts
-            # These flag combinations can not exist together
-            type_err = "FolderEvent" in mask[0] and "FileEvent" in mask[0]
-            fol_cr_err = "FolderEvent" in mask[0] and "Created" in mask[1] and \
-                         "FolderCreated" not in mask[1]
-            fil_cr_err = "FileEvent" in mask[0] and "FolderCreated" in mask[1]
-            lnk_err = "SymbolicLink" in mask[0] and "HardLink" in mask[0]
-            h_lnk_err = "HardLink" not in mask[0] and "LastHardLink" in mask[1]
-            h_lnk_err_2 = "LastHardLink" in mask[1] and ";Removed" not in mask[1]
-            n_used_err = "NOT_USED-0x0" in mask[1]
-            ver_error = "ItemCloned" in mask[1] and self.dls_version == 1
-
-            # Check for decode errors
-            try:
-                fullpath.decode('utf-8')
-            except:
-                decode_error = True
-
-            # If any error exists return false to caller
-            if type_err or \
-                    fol_cr_err or \
-                    fil_cr_err or \
-                    lnk_err or \
-                    h_lnk_err or \
-                    h_lnk_err_2 or \
-                    n_used_err or \
-                    decode_error or \
-                    ver_error:
-                return False
-            else:
-                # Record passed tests and may be valid
-                # return true so that record is included in output reports
-                return True
-        else:
-            # Return true. fsevent file was not identified as being carved
-            return True
-
-
-    def apply_date(self, wd):
-        """
-        Applies the approximate date to
-        the current record by comparing thewd
-        to what is stored in the time range list.
-        """
-        t_range_count = len(self.time_range)
-        count = 1
-        c_mod_date = str(self.m_time)[:10].replace("-", ".")
-
-        # No dates were found. Return source mod date
-        if len(self.time_range) == 0 and not self.is_carved_gzip and self.use_file_mod_dates:
-            return c_mod_date
-        # If dates were found
-        elif len(self.time_range) != 0 and not self.is_carved_gzip:
-
-            # Iterate through the time range list
-            # and assign the time range based off the
-            # wd/record event id.
-            for i in self.time_range:
-                # When record id falls between the previous
-                # id and the current id within the time range list
-                if wd > i[0] and wd < i[1]:
-                    # When the previous date is the same as current
-                    if i[2] == i[3]:
-                        return i[2]
-                    # Otherwise return the date range
-                    else:
-                        return i[2] + " - " + i[3]
-                # When event id matches previous wd in list
-                # assign previous date
-                elif wd == i[0]:
-                    return str(i[2])
-                # When event id matches current wd in list
-                # assign current date
-                elif wd == i[1]:
-                    return str(i[3])
-                # When the event id is greater than the last in list
-                # assign return source mod date
-                elif count == t_range_count and wd >= i[1] and self.use_file_mod_dates:
-                    return c_mod_date
-                else:
-                    count = count + 1
-                    continue
-        else:
-            return "Unknown"
-
-
-    def export_fsevent_report(self, outfile, row_count):
-        """
-        Export rows from fsevents table in DB to tab delimited report.
-        """
-        counter = 0
-
-        query = 'SELECT \
-                id_hex, \
-                node_id, \
-                fullpath, \
-                type, \
-                flags, \
-                approx_dates_plus_minus_one_day, \
-                source, \
-                source_modified_time \
-                FROM fsevents_sorted_by_event_id'
-
-        SQL_TRAN.execute(query)
-
-        while row_count > counter:
-            row = SQL_TRAN.fetchone()
-            values = []
-            for cell in row:
-                if type(cell) is str or type(cell) is unicode:
-                    try:
-                        values.append(cell)
-                    except:
-                        print row_count
-                        print type(cell)
-                        print cell
-                        print row
-                        values.append("ERROR_IN_VALUE")
-                else:
-                    try:
-                        values.append(unicode(cell))
-                    except:
-                        print row_count
-                        print type(cell)
-                        print cell
-                        print row
-                        values.append("ERROR_IN_VALUE")
-            m_row = u'\t'.join(values)
-            m_row = m_row + u'\n'
-            outfile.write(m_row.encode("utf-8"))
-            counter = counter + 1
-
-
-    def export_sqlite_views(self):
-        """
-        Exports sqlite views from database if -q is set.
-        """
-        # Gather the names of report views in the db
-        SQL_TRAN.execute("SELECT name FROM sqlite_master WHERE type='view'")
-        view_names = SQL_TRAN.fetchall()
-
-        # Export report views to tsv files
-        for i in view_names:
-
-            query = "SELECT * FROM %s" % (i[0])
-            SQL_TRAN.execute(query)
-            row = ' '
-            # Get outfile to write to
-            outfile = getattr(self, "l_" + i[0])
-            row = SQL_TRAN.fetchone()
-            if row is None:
-                print("  No records found in view {}. Nothing to export".format(i[0]))
-                outfile.close()
-                os.remove(outfile.name)
-            else:
-                print("  Exporting view {} from database".format(i[0]))
-                # For each row join using tab and output to file
-                while row is not None:
-                    values = []
-                    try:
-                        for cell in row:
-                            if type(cell) is str or type(cell) is unicode:
-                                values.append(cell)
-                            else:
-                                values.append(unicode(cell))
-                    except:
-                        values.append("ERROR_IN_VALUE")
-                        print "ERROR: ", row
-                    m_row = u'\t'.join(values)
-                    m_row = m_row + u'\n'
-                    outfile.write(m_row.encode("utf-8"))
-                    row = SQL_TRAN.fetchone()
-
-
-class FsEventFileHeader():
-    """
-    FSEvent file header structure.
-        Each page within the decompressed begins with DLS1 or DLS2
-        It is stored using a byte order of little-endian.
-    """
-
-    def __init__(self, buf, filename):
-        """
-        """
-        # Name and path of current source fsevent file
-        self.src_fullpath = filename
-        # Page header 'DLS1' or 'DLS2'
-        # Was written to disk using little-endian
-        # Byte stream contains either "1SLD" or "2SLD", reversing order
-        self.signature = buf[4] + buf[3] + buf[2] + buf[1]
-        # Unknown raw values in DLS header
-        # self.unknown_raw = buf[4:8]
-        # Unknown hex version
-        # self.unknown_hex = buf[4:8].encode("hex")
-        # Unknown integer version
-        # self.unknown_int = struct.unpack("<I", self.unknown_raw)[0]
-        # Size of current DLS page
-        self.filesize = struct.unpack("<I", buf[8:12])[0]
-
-
-class FSEventRecord(dict):
-    """
-    FSEvent record structure.
-    """
-    def __init__(self, buf, offset, mask_hex):
-        """
-        """
-        # Offset of the record within the fsevent file
-        self.file_offset = offset
-        # Raw record hex version
-        self.header_hex = binascii.b2a_hex(buf)
-        # Record wd or event id
-        self.wd = struct.unpack("<Q", buf[0:8])[0]
-        # Record wd_hex
-        wd_buf = buf[7] + buf[6] + buf[5] + buf[4] + buf[3] + buf[2] + buf[1] + buf[0]
-        self.wd_hex = binascii.b2a_hex(wd_buf)
-        # Enumerate mask flags, string version
-        self.mask = enumerate_flags(
-            struct.unpack(">I", buf[8:12])[0],
-            EVENTMASK
-        )
-
-
-class Output(dict):
-    """
-    Output class handles outputting parsed
-    fsevent records to report files.
-    """
-    COLUMNS = [
-                u'id',
-                u'id_hex',
-                u'fullpath',
-                u'filename',
-                u'type',
-                u'flags',
-                u'approx_dates_plus_minus_one_day',
-                u'mask',
-                u'node_id',
-                u'record_end_offset',
-                u'source',
-                u'source_modified_time'
-    ]
-    R_COLUMNS = [
-                u'event_id',
-                u'node_id',
-                u'fullpath',
-                u'type',
-                u'flags',
-                u'approx_dates_plus_minus_one_day',
-                u'source',
-                u'source_modified_time'
-    ]
-
-
-    def __init__(self, attribs):
-        """
-        Update column values.
-        """
-        self.update(attribs)
-
-
-    @staticmethod
-    def print_columns(outfile):
-        """
-        Output column header to report files.
-        """
-        values = []
-        for key in Output.R_COLUMNS:
-            values.append(str(key))
-        row = '\t'.join(values)
-        row = row + '\n'
-        outfile.write(row)
-
-
-    def append_row(self):
-        """
-        Output parsed fsevents row to database.
-        """
-        values = []
-        vals_to_insert = ''
-
-        for key in Output.COLUMNS:
-            values.append(str(self[key]))
-
-        # Replace any Quotes in parsed record with double quotes
-        for i in values:
-            vals_to_insert += i.replace('"', '""') + '","'
-
-        vals_to_insert = '"' + vals_to_insert[:-3] + '"'
-        insert_sqlite_db(vals_to_insert)
-
-
-def create_sqlite_db(self):
-    """
-    Creates our output database for parsed records
-    and connects to it.
-    """
-    db_filename = os.path.join(self.meta['outdir'], self.meta['casename'], 'FSEvents.sqlite')
-    table_schema = "CREATE TABLE [fsevents](\
-                  [id] [BLOB] NULL, \
-                  [id_hex] [TEXT] NULL, \
-                  [fullpath] [TEXT] NULL, \
-                  [filename] [TEXT] NULL, \
-                  [type] [TEXT] NULL, \
-                  [flags] [TEXT] NULL, \
-                  [approx_dates_plus_minus_one_day] [TEXT] NULL, \
-                  [mask] [TEXT] NULL, \
-                  [node_id] [TEXT] NULL, \
-                  [record_end_offset] [TEXT] NULL, \
-                  [source] [TEXT] NULL, \
-                  [source_modified_time] [TEXT] NULL)"
-    if not os.path.isdir(os.path.join(self.meta['outdir'], self.meta['casename'])):
-        os.makedirs(os.path.join(self.meta['outdir'], self.meta['casename']))
-
-    # If database already exists delete it
-    try:
-        if os.path.isfile(db_filename):
-            os.remove(db_filename)
-        # Create database file if it doesn't exist
-        db_is_new = not os.path.exists(db_filename)
-    except:
-        print("\nThe following output file is currently in use by "
-              "another program.\n -{}\nPlease ensure that the file is closed."
-              " Then rerun the parser.".format(db_filename))
-        sys.exit(0)
-
-    # Setup global
-    global SQL_CON
-
-    SQL_CON = sqlite3.connect(os.path.join("", db_filename))
-
-    if db_is_new:
-        # Create table if it's a new database
-        SQL_CON.execute(table_schema)
-        if self.r_queries:
-            # Run queries in report queries list
-            # to add report database views
-            for i in self.r_queries['process_list']:
-                # Try to execute the query
-                cols = 'id_hex, \
-                    node_id, \
-                    fullpath, \
-                    type, \
-                    flags, \
-                    approx_dates_plus_minus_one_day, \
-                    source, \
-                    source_modified_time'
-
-                query = i['query'].split("*")
-                query = query[0] + cols + query[1]
-
-                try:
-                    SQL_CON.execute(query)
-                except Exception as exp:
-                    print("SQLite error when executing query in json file. {}".format(str(exp)))
-                    sys.exit(0)
-
-    # Setup global
-    global SQL_TRAN
-
-    # Setup transaction cursor and return it
-    SQL_TRAN = SQL_CON.cursor()
-
-
-def insert_sqlite_db(vals_to_insert):
-    """
-    Insert parsed fsevent record values into database.
-    """
-    insert_statement = "\
-        insert into fsevents (\
-        [id], \
-        [id_hex], \
-        [fullpath], \
-        [filename], \
-        [type], \
-        [flags], \
-        [approx_dates_plus_minus_one_day], \
-        [mask], \
-        [node_id], \
-        [record_end_offset], \
-        [source], \
-        [source_modified_time]\
-        ) values (" + vals_to_insert + ")"
-
-    try:
-        SQL_TRAN.execute(insert_statement)
-    except Exception as exp:
-        print("insert failed!: {}".format(exp))
-
-
-def reorder_sqlite_db(self):
-    """
-    Order database table rows by id.
-    Returns
-        count: The number of rows in the table
-    """
-    query = "CREATE TABLE [fsevents_sorted_by_event_id](\
-                  [id] [BLOB] NULL, \
-                  [id_hex] [TEXT] NULL, \
-                  [fullpath] [TEXT] NULL, \
-                  [filename] [TEXT] NULL, \
-                  [type] [TEXT] NULL, \
-                  [flags] [TEXT] NULL, \
-                  [approx_dates_plus_minus_one_day] [TEXT] NULL, \
-                  [mask] [TEXT] NULL, \
-                  [node_id] [TEXT] NULL, \
-                  [record_end_offset] [TEXT] NULL, \
-                  [source] [TEXT] NULL, \
-                  [source_modified_time] [TEXT] NULL)"
-
-    SQL_TRAN.execute(query)
-
-    query = "INSERT INTO fsevents_sorted_by_event_id ( \
-                  id, \
-                  id_hex, \
-                  fullpath, \
-                  filename, \
-                  type, \
-                  flags, \
-                  approx_dates_plus_minus_one_day, \
-                  mask, \
-                  node_id, \
-                  record_end_offset, \
-                  source, \
-                  source_modified_time) \
-                  SELECT id,\
-                  id_hex,\
-                  fullpath,\
-                  filename,\
-                  type,flags,\
-                  approx_dates_plus_minus_one_day,\
-                  mask,\
-                  node_id,\
-                  record_end_offset,\
-                  source,\
-                  source_modified_time \
-                  FROM fsevents ORDER BY id_hex;"
-
-    SQL_TRAN.execute(query)
-
-    count = SQL_TRAN.lastrowid
-
-    return count
-
-
-if __name__ == '__main__':
-    """
-    Init checks to see if running appropriate python version.
-    If it is, start the parser.
-    """
-    if sys.version_info > (3, 0):
-        print('\nError: FSEventsParser does not currently support running under Python 3.x'
-              '. Python 2.7 recommended.\n')
-    else:
-        main()
+#!/usr/bin/python
+
+# FSEvents Parser Python Script
+# ------------------------------------------------------
+# Parse FSEvent records from allocated fsevent files and carved gzip files.
+# Outputs parsed information to a tab delimited txt file and SQLite database.
+# Errors and exceptions are recorded in the exceptions logfile.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import sys
+import os
+import json
+import re
+import hashlib
+import sqlite3
+import tempfile
+import cProfile
+import pstats
+import time
+from time import (gmtime, strftime)
+from itertools import islice
+from optparse import OptionParser
+import multiprocessing
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+from fsevents_coalesce import (
+    COALESCED_COLUMNS,
+    Coalescer
+)
+from fsevents_lifecycle import (
+    DEFAULT_LIFECYCLE_PATHS,
+    LifecycleEngine
+)
+from fsevents_metrics import (
+    Metrics,
+    TimedCursor
+)
+from fsevents_sort import (
+    DEFAULT_MEMORY_MB,
+    ExternalSorter
+)
+from fsevents_batch import (
+    BatchScheduler,
+    Host,
+    SeedTracker,
+    chain_units,
+    decode_unit,
+    read_manifest
+)
+from fsevents_dates import build_date_index
+from fsevents_diagnostics import (
+    DIAGNOSTICS,
+    Diagnostics
+)
+from fsevents_dedup import (
+    DEFAULT_DEDUP_MEMORY_MB,
+    RecordDeduper,
+    authoritative_order
+)
+from fsevents_filters import (
+    RecordFilter,
+    parse_date_range
+)
+from fsevents_nodes import (
+    NODE_INDEX,
+    NodeIndex,
+    lookup_node,
+    node_paths
+)
+from fsevents_pages import (
+    PAGE_INDEX,
+    PageIndex,
+    lookup
+)
+from fsevents_pipeline import (
+    DEFAULT_PIPELINE_DEPTH,
+    Pipeline
+)
+from fsevents_prefetch import (
+    DEFAULT_PREFETCH,
+    DEFAULT_PREFETCH_MEMORY_MB,
+    MAX_PREFETCH_THREADS,
+    Prefetcher
+)
+from fsevents_preview import (
+    DEFAULT_SAMPLE_PAGES,
+    PREVIEW,
+    preview_source,
+    print_summary,
+    write_summary
+)
+from fsevents_queue import (
+    JobQueue,
+    read_shard,
+    work
+)
+from fsevents_sinks import (
+    DEFAULT_ACTIVITY_DEPTH,
+    DEFAULT_ACTIVITY_NODES,
+    DEFAULT_SINKS,
+    RECORD_SINKS,
+    parse_sinks,
+    sink_names
+)
+
+from fsevents_storage import (
+    DEFAULT_STORAGE,
+    TABLE_SCHEMA,
+    STORAGE_BACKENDS,
+    database_fingerprint,
+    parse_storage
+)
+
+from fsevents_reader import (
+    COLUMNS,
+    DFVFS_IMPORT,
+    IMPORT_ERROR,
+    FSEventDecoder,
+    check_file_mod_dates,
+    folder_file,
+    folder_files,
+    image_volumes
+)
+from fsevents_watch import (
+    DEFAULT_WATCH_INTERVAL,
+    FolderWatcher
+)
+
+VERSION = '4.0'
+
+# Columns substituted for * in the report queries
+REPORT_COLUMNS = 'id_hex, \
+                    node_id, \
+                    fullpath, \
+                    type, \
+                    flags, \
+                    approx_dates_plus_minus_one_day, \
+                    source, \
+                    source_modified_time'
+
+# Pulls the select statement from a report query's CREATE VIEW statement
+VIEW_SELECT = re.compile(
+    r'^\s*CREATE\s+(?:TEMP\s+|TEMPORARY\s+)?VIEW\s+(?:IF\s+NOT\s+EXISTS\s+)?\S+\s+AS\s+(.*?)[\s;]*$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Report query hashes of the last export, kept in the case folder
+REPORT_HASHES = 'REPORT_HASHES.json'
+
+# Rows merged from the external sort per report query pass
+REPORT_CHUNK_SIZE = 10000
+
+# Records the pipeline decoder hands to the writer at a time
+PIPELINE_ROWS = 500
+
+# Report queries that can not be run over chunks of rows
+# and are run against all rows at once instead
+NON_STREAMABLE_QUERY = re.compile(
+    r'\b(GROUP\s+BY|ORDER\s+BY|DISTINCT|LIMIT|JOIN|UNION|count|min|max|sum|avg|total|group_concat)\b',
+    re.IGNORECASE
+)
+
+
+def get_options():
+    """
+    Get needed options for processing
+    """
+    usage = "usage: %prog -s SOURCE -o OUTDIR -t SOURCETYPE [folder|image] [-c CASENAME -q REPORT_QUERIES]\n" \
+            "       %prog --requery DATABASE -o OUTDIR -q REPORT_QUERIES [-c CASENAME]\n" \
+            "       %prog --batch MANIFEST -o OUTDIR [-q REPORT_QUERIES]\n" \
+            "       %prog --queue-submit QUEUE_DIR [-s SOURCE -t SOURCETYPE -c CASENAME | --batch MANIFEST]\n" \
+            "       %prog --queue-work QUEUE_DIR [--workers WORKERS]\n" \
+            "       %prog --queue-merge QUEUE_DIR -o OUTDIR [-q REPORT_QUERIES]\n" \
+            "       %prog --lookup PAGE_INDEX --event-id-range FIRST[-LAST] -o OUTDIR\n" \
+            "       %prog --node-lookup NODE_INDEX --node-id NODE_ID -o OUTDIR\n" \
+            "       %prog --preview -s SOURCE -t SOURCETYPE -o OUTDIR [--sample-pages PAGES]"
+    options = OptionParser(usage=usage)
+    options.add_option("-s",
+                       action="store",
+                       type="string",
+                       dest="source",
+                       default=False,
+                       help="REQUIRED. The source directory or image containing fsevent files to be parsed")
+    options.add_option("-o",
+                       action="store",
+                       type="string",
+                       dest="outdir",
+                       default=False,
+                       help="REQUIRED. The destination directory used to store parsed reports")
+    options.add_option("-t",
+                       action="store",
+                       type="string",
+                       dest="sourcetype",
+                       default=False,
+                       help="REQUIRED. The source type to be parsed. Available options are 'folder' or 'image'")
+    options.add_option("-c",
+                       action="store",
+                       type="string",
+                       dest="casename",
+                       default=False,
+                       help="OPTIONAL. The name of the current session, \
+                       used for naming standards. Defaults to 'FSE_Reports'")
+    options.add_option("-q",
+                       action="store",
+                       type="string",
+                       dest="report_queries",
+                       default=False,
+                       help="OPTIONAL. The location of the report_queries.json file \
+                       containing custom report queries to generate targeted reports."
+                       )
+    options.add_option("--sinks",
+                       action="store",
+                       type="string",
+                       dest="sinks",
+                       default=False,
+                       help="OPTIONAL. Comma separated list of outputs to produce. \
+                       Available options are %s. Only the work needed by the \
+                       selected outputs is done. Defaults to '%s'" % (
+                           ', '.join(sink_names()), ','.join(DEFAULT_SINKS))
+                       )
+    options.add_option("--storage",
+                       action="store",
+                       type="string",
+                       dest="storage",
+                       default=DEFAULT_STORAGE,
+                       help="OPTIONAL. Database the records and report views of the \
+                       sqlite output are kept in. Available options are %s. duckdb \
+                       writes FSEvents.duckdb, a columnar database that can be queried \
+                       with DuckDB, and needs the duckdb module. The duckdb release \
+                       that installs under Python 2 reads All_FSEVENTS.tsv and each \
+                       report into memory at once. \
+                       Defaults to '%s'" % (', '.join(sorted(STORAGE_BACKENDS)), DEFAULT_STORAGE)
+                       )
+    options.add_option("--activity-depth",
+                       action="store",
+                       type="int",
+                       dest="activity_depth",
+                       default=DEFAULT_ACTIVITY_DEPTH,
+                       help="OPTIONAL. Folder levels kept in ACTIVITY_TREE.json by the \
+                       activity sink. Deeper folders are counted for the folder above \
+                       them. Defaults to %d" % (DEFAULT_ACTIVITY_DEPTH)
+                       )
+    options.add_option("--activity-nodes",
+                       action="store",
+                       type="int",
+                       dest="activity_nodes",
+                       default=DEFAULT_ACTIVITY_NODES,
+                       help="OPTIONAL. Folders kept in memory by the activity sink. The \
+                       folders with the fewest records are pruned beyond it. Defaults to %d" % (
+                           DEFAULT_ACTIVITY_NODES)
+                       )
+    options.add_option("--lifecycle-paths",
+                       action="store",
+                       type="int",
+                       dest="lifecycle_paths",
+                       default=DEFAULT_LIFECYCLE_PATHS,
+                       help="OPTIONAL. Paths followed at the same time by the lifecycle \
+                       sink. Past it the least recently seen path is written out and a \
+                       later record of it starts a new lifecycle. Defaults to %d" % (
+                           DEFAULT_LIFECYCLE_PATHS)
+                       )
+    options.add_option("--tsv-only",
+                       action="store_true",
+                       dest="tsv_only",
+                       default=False,
+                       help="OPTIONAL. Do not create FSEvents.sqlite. Records are sorted \
+                       by event id with an external merge sort and written straight \
+                       to All_FSEVENTS.tsv and the report files. Same as --sinks tsv,reports"
+                       )
+    options.add_option("--coalesce",
+                       action="store_true",
+                       dest="coalesce",
+                       default=False,
+                       help="OPTIONAL. Write each run of consecutive records with the \
+                       same path, type, flags and node id to All_FSEVENTS.tsv and the \
+                       report files as one row with its first and last event id, record \
+                       count and date span. FSEvents.sqlite keeps every record"
+                       )
+    options.add_option("--sort-memory",
+                       action="store",
+                       type="int",
+                       dest="sort_memory",
+                       default=DEFAULT_MEMORY_MB,
+                       help="OPTIONAL. Memory budget in MB for the external merge sort \
+                       used by --tsv-only. Defaults to %d" % (DEFAULT_MEMORY_MB)
+                       )
+    options.add_option("--pipeline-depth",
+                       action="store",
+                       type="int",
+                       dest="pipeline_depth",
+                       default=DEFAULT_PIPELINE_DEPTH,
+                       help="OPTIONAL. Files are read, decompressed, decoded and written \
+                       to the outputs by separate threads joined by queues of this many \
+                       items. A full queue holds back the stage feeding it. 0 parses on \
+                       one thread. Defaults to %d" % (DEFAULT_PIPELINE_DEPTH)
+                       )
+    options.add_option("--prefetch",
+                       action="store",
+                       type="int",
+                       dest="prefetch",
+                       default=DEFAULT_PREFETCH,
+                       help="OPTIONAL. Number of source files read ahead in the background \
+                       while earlier ones are decoded, for evidence on network shares or \
+                       images with slow reads. Up to %d files of a folder are read at the \
+                       same time and files of an image one at a time. 0 reads each file \
+                       when it is reached. Defaults to %d" % (MAX_PREFETCH_THREADS, DEFAULT_PREFETCH)
+                       )
+    options.add_option("--prefetch-memory",
+                       action="store",
+                       type="int",
+                       dest="prefetch_memory",
+                       default=DEFAULT_PREFETCH_MEMORY_MB,
+                       help="OPTIONAL. Memory budget in MB for the files read ahead by \
+                       --prefetch. The next file to decode is read even when it is larger. \
+                       Defaults to %d" % (DEFAULT_PREFETCH_MEMORY_MB)
+                       )
+    options.add_option("--dedup",
+                       action="store_true",
+                       dest="dedup",
+                       default=False,
+                       help="OPTIONAL. Drop records whose event id, node id, path and mask \
+                       were already parsed from another file. Allocated fsevent files are \
+                       parsed before carved gzips so their records are the ones kept."
+                       )
+    options.add_option("--dedup-memory",
+                       action="store",
+                       type="int",
+                       dest="dedup_memory",
+                       default=DEFAULT_DEDUP_MEMORY_MB,
+                       help="OPTIONAL. Memory budget in MB for the record keys held by \
+                       --dedup before they are spilled to disk. Defaults to %d" % (DEFAULT_DEDUP_MEMORY_MB)
+                       )
+    options.add_option("--global-dates",
+                       action="store_true",
+                       dest="global_dates",
+                       default=False,
+                       help="OPTIONAL. Read every file of a volume for date markers before \
+                       parsing and date each record from the nearest markers and file mod \
+                       dates of the whole volume rather than of its own file. Carved gzips \
+                       are dated too."
+                       )
+    options.add_option("--page-index",
+                       action="store_true",
+                       dest="page_index",
+                       default=False,
+                       help="OPTIONAL. Write PAGE_INDEX.json listing the offset and first \
+                       and last event id of every DLS page of every source file, for use \
+                       with --lookup."
+                       )
+    options.add_option("--lookup",
+                       action="store",
+                       type="string",
+                       dest="lookup",
+                       default=False,
+                       help="OPTIONAL. Read the records of --event-id-range from the source \
+                       files listed in a PAGE_INDEX.json, decoding only the pages that \
+                       hold them, and write them to OUTDIR/LOOKUP_FIRST-LAST.tsv."
+                       )
+    options.add_option("--node-index",
+                       action="store_true",
+                       dest="node_index",
+                       default=False,
+                       help="OPTIONAL. Write NODE_INDEX.sqlite referencing every DLS2 record \
+                       by node id while parsing, for use with --node-lookup."
+                       )
+    options.add_option("--node-lookup",
+                       action="store",
+                       type="string",
+                       dest="node_lookup",
+                       default=False,
+                       help="OPTIONAL. Read every record of --node-id from a NODE_INDEX.sqlite, \
+                       ordered by event id, and write them to OUTDIR/NODE_ID.tsv. Lists \
+                       every path the file or folder had."
+                       )
+    options.add_option("--node-id",
+                       action="store",
+                       type="string",
+                       dest="node_id",
+                       default=False,
+                       help="OPTIONAL. The node id to read with --node-lookup."
+                       )
+    options.add_option("--event-id-range",
+                       action="store",
+                       type="string",
+                       dest="event_id_range",
+                       default=False,
+                       help="OPTIONAL. An event id or a FIRST-LAST range of event ids, \
+                       given as decimal, 0x prefixed hex or 16 digit hex. Used with --lookup, \
+                       or when parsing to only keep the records in the range. Files and DLS \
+                       pages outside the range are not parsed."
+                       )
+    options.add_option("--path-prefix",
+                       action="store",
+                       type="string",
+                       dest="path_prefix",
+                       default=False,
+                       help="OPTIONAL. Comma separated list of path prefixes. Only records \
+                       whose fullpath starts with one of them are kept."
+                       )
+    options.add_option("--flags",
+                       action="store",
+                       type="string",
+                       dest="flags",
+                       default=False,
+                       help="OPTIONAL. Comma separated list of flag names, such as \
+                       Created,Renamed. Only records with any of the flags are kept."
+                       )
+    options.add_option("--date-range",
+                       action="store",
+                       type="string",
+                       dest="date_range",
+                       default=False,
+                       help="OPTIONAL. A date or a FIRST..LAST range of dates given as \
+                       YYYY-MM-DD. Only records whose approximate dates overlap the range \
+                       are kept."
+                       )
+    options.add_option("--watch",
+                       action="store_true",
+                       dest="watch",
+                       default=False,
+                       help="OPTIONAL. Keep watching a folder source after it is parsed and \
+                       append the records of each new fsevents file to the database, TSV \
+                       and report outputs as it lands, until stopped with Ctrl-C. Needs \
+                       the sqlite output."
+                       )
+    options.add_option("--watch-interval",
+                       action="store",
+                       type="float",
+                       dest="watch_interval",
+                       default=DEFAULT_WATCH_INTERVAL,
+                       help="OPTIONAL. Seconds between checks of the folder when polling. \
+                       Defaults to %s" % (DEFAULT_WATCH_INTERVAL)
+                       )
+    options.add_option("--watch-poll",
+                       action="store_true",
+                       dest="watch_poll",
+                       default=False,
+                       help="OPTIONAL. Poll the folder rather than use inotify, for network \
+                       shares whose changes inotify does not see."
+                       )
+    options.add_option("--preview",
+                       action="store_true",
+                       dest="preview",
+                       default=False,
+                       help="OPTIONAL. Estimate the records, event id span, date span and \
+                       busiest folders of the source from its page headers and a sample of \
+                       pages without parsing it, and suggest how to run the full parse. \
+                       The estimates are written to OUTDIR/PREVIEW.json."
+                       )
+    options.add_option("--sample-pages",
+                       action="store",
+                       type="int",
+                       dest="sample_pages",
+                       default=DEFAULT_SAMPLE_PAGES,
+                       help="OPTIONAL. Number of DLS pages decoded by --preview. \
+                       Defaults to %d" % (DEFAULT_SAMPLE_PAGES)
+                       )
+    options.add_option("--requery",
+                       action="store",
+                       type="string",
+                       dest="requery",
+                       default=False,
+                       help="OPTIONAL. Export the reports in -q from an existing FSEvents.sqlite \
+                       without parsing. The database is opened read-only and reports \
+                       whose query and database are unchanged since their last export are skipped."
+                       )
+    options.add_option("--batch",
+                       action="store",
+                       type="string",
+                       dest="batch",
+                       default=False,
+                       help="OPTIONAL. Parse every host listed in the manifest file on one \
+                       shared pool of --workers processes. Each line holds a casename, \
+                       source and source type separated by a comma or tab. Each host's \
+                       outputs are written to OUTDIR/casename."
+                       )
+    options.add_option("--queue-submit",
+                       action="store",
+                       type="string",
+                       dest="queue_submit",
+                       default=False,
+                       help="OPTIONAL. Add one work unit per fsevents file of the -s source \
+                       or --batch hosts to the job queue folder, which is created if needed. \
+                       The folder can be on storage shared by several servers."
+                       )
+    options.add_option("--queue-work",
+                       action="store",
+                       type="string",
+                       dest="queue_work",
+                       default=False,
+                       help="OPTIONAL. Run --workers worker processes that decode units \
+                       from the job queue folder until none are left."
+                       )
+    options.add_option("--queue-merge",
+                       action="store",
+                       type="string",
+                       dest="queue_merge",
+                       default=False,
+                       help="OPTIONAL. Write the outputs of every host in the job queue \
+                       folder to OUTDIR/casename from the decoded units."
+                       )
+    options.add_option("--workers",
+                       action="store",
+                       type="int",
+                       dest="workers",
+                       default=cpu_count(),
+                       help="OPTIONAL. Number of reports exported at the same time, \
+                       each over its own read-only database connection, and number \
+                       of parsing processes used by --batch. Defaults to the number of CPUs"
+                       )
+    options.add_option("--profile",
+                       action="store_true",
+                       dest="profile",
+                       default=False,
+                       help="OPTIONAL. Profile the run with cProfile. Statistics are written \
+                       to PROFILE.pstats and PROFILE.txt in the output folder."
+                       )
+
+    # Return options to caller #
+    return options
+
+
+def parse_options():
+    """
+    Capture and return command line arguments.
+    """
+    # Get options
+    options = get_options()
+    (opts, args) = options.parse_args()
+
+    # The meta will store all information about the arguments passed #
+    meta = {
+        'casename': opts.casename,
+        'reportqueries': opts.report_queries,
+        'sourcetype': opts.sourcetype,
+        'source': opts.source,
+        'outdir': opts.outdir,
+        'profile': opts.profile,
+        'sinks': opts.sinks,
+        'storage': opts.storage,
+        'activity_depth': max(1, opts.activity_depth),
+        'activity_nodes': opts.activity_nodes,
+        'lifecycle_paths': opts.lifecycle_paths,
+        'tsv_only': opts.tsv_only,
+        'coalesce': opts.coalesce,
+        'sort_memory': opts.sort_memory,
+        'pipeline_depth': max(0, opts.pipeline_depth),
+        'prefetch': max(0, opts.prefetch),
+        'prefetch_memory': max(1, opts.prefetch_memory),
+        'dedup': opts.dedup,
+        'dedup_memory': opts.dedup_memory,
+        'global_dates': opts.global_dates,
+        'page_index': opts.page_index,
+        'lookup': opts.lookup,
+        'node_index': opts.node_index,
+        'node_lookup': opts.node_lookup,
+        'node_id': opts.node_id,
+        'event_id_range': opts.event_id_range,
+        'path_prefix': opts.path_prefix,
+        'flags': opts.flags,
+        'date_range': opts.date_range,
+        'watch': opts.watch,
+        'watch_interval': opts.watch_interval,
+        'watch_poll': opts.watch_poll,
+        'preview': opts.preview,
+        'sample_pages': opts.sample_pages,
+        'requery': opts.requery,
+        'batch': opts.batch,
+        'queue_submit': opts.queue_submit,
+        'queue_work': opts.queue_work,
+        'queue_merge': opts.queue_merge,
+        'workers': max(1, opts.workers)
+    }
+
+    # Print help if no options are provided
+    if len(sys.argv[1:]) == 0:
+        options.print_help()
+        sys.exit(1)
+    if meta['requery']:
+        return parse_requery_options(options, meta)
+
+    if meta['lookup']:
+        return parse_lookup_options(options, meta)
+    if meta['node_lookup']:
+        return parse_node_lookup_options(options, meta)
+
+    if meta['preview']:
+        return parse_preview_options(options, meta)
+
+    if meta['queue_submit'] or meta['queue_work'] or meta['queue_merge']:
+        return parse_queue_options(options, meta)
+
+    if meta['batch']:
+        return parse_batch_options(options, meta)
+
+    # Test required arguments
+    if meta['source'] is False or meta['outdir'] is False or meta['sourcetype'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required:\n-s SOURCE\n-o OUTDIR\n-t SOURCETYPE')
+
+    if not os.path.exists(meta['source']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['source'])
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+        
+    if meta['reportqueries'] and not os.path.exists(meta['reportqueries']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['reportqueries'])
+
+    if meta['sourcetype'].lower() != 'folder' and meta['sourcetype'].lower() != 'image':
+        options.error(
+            'Unable to proceed. \n\nIncorrect source type provided: "%s". The following are valid options:\
+            \n -t folder\n -t image\n' % (meta['sourcetype']))
+
+    if meta['sourcetype'] == 'image' and DFVFS_IMPORT is False:
+        options.error(IMPORT_ERROR)
+
+    select_sinks(options, meta)
+    select_filters(options, meta)
+
+    if meta['watch']:
+        if meta['sourcetype'].lower() != 'folder':
+            options.error('Unable to proceed. \n\n--watch can only be used with -t folder.\n')
+        if 'sqlite' not in meta['sinks']:
+            options.error('Unable to proceed. \n\n--watch needs the sqlite output.\n')
+        if meta['storage'] != 'sqlite':
+            options.error('Unable to proceed. \n\n--watch can only be used with --storage sqlite.\n')
+        if meta['global_dates']:
+            options.error('Unable to proceed. \n\n--global-dates can not be used with --watch.\n')
+        if 'lifecycle' in meta['sinks']:
+            options.error('Unable to proceed. \n\nThe lifecycle output can not be used with --watch.\n')
+        if meta['coalesce']:
+            options.error('Unable to proceed. \n\n--coalesce can not be used with --watch.\n')
+
+    if meta['reportqueries'] ==False:
+        print '[Info]: Report queries file not specified using the -q option. Custom reports will not be generated.'
+        
+    if meta['casename'] is False:
+        print('[Info]: No casename specified using -c. Defaulting to "FSE_Reports".')
+        meta['casename'] = 'FSE_Reports'
+
+    # Return meta to caller #
+    return meta
+
+
+def sink_options(meta, name):
+    """
+    Return the keyword arguments of a record sink.
+    """
+    if name == 'activity':
+        return {'depth': meta['activity_depth'], 'max_nodes': meta['activity_nodes']}
+    return {}
+
+
+def select_sinks(options, meta):
+    """
+    Replace the --sinks and --tsv-only arguments
+    with the list of outputs to produce.
+    """
+    if meta['sinks'] and meta['tsv_only']:
+        options.error('Unable to proceed. \n\n--tsv-only can not be used with --sinks.\n')
+
+    if meta['tsv_only']:
+        meta['sinks'] = ['tsv', 'reports']
+    elif meta['sinks']:
+        try:
+            meta['sinks'] = parse_sinks(meta['sinks'])
+        except ValueError as exp:
+            options.error('Unable to proceed. \n\n%s\n' % (str(exp)))
+        if 'reports' in meta['sinks'] and meta['reportqueries'] is False:
+            options.error('Unable to proceed. \n\nThe reports output requires -q REPORT_QUERIES.\n')
+    else:
+        meta['sinks'] = list(DEFAULT_SINKS)
+
+    # Reports are only produced from a report queries file
+    if meta['reportqueries'] is False and 'reports' in meta['sinks']:
+        meta['sinks'].remove('reports')
+
+    if 'sqlite' in meta['sinks']:
+        try:
+            meta['storage'] = parse_storage(meta['storage']).name
+        except ValueError as exp:
+            options.error('Unable to proceed. \n\n%s\n' % (str(exp)))
+
+
+def select_filters(options, meta):
+    """
+    Build the RecordFilter of the --event-id-range, --path-prefix,
+    --flags and --date-range arguments, or None when none are given.
+    """
+    meta['record_filter'] = None
+    if not (meta['event_id_range'] or meta['path_prefix'] or meta['flags'] or meta['date_range']):
+        return
+
+    kwargs = {}
+    if meta['event_id_range']:
+        try:
+            kwargs['first_id'], kwargs['last_id'] = parse_event_id_range(meta['event_id_range'])
+        except ValueError as exp:
+            options.error("Unable to proceed. \n\nIncorrect event id range %s\n%s\n" % (
+                meta['event_id_range'], str(exp)))
+    if meta['path_prefix']:
+        kwargs['path_prefixes'] = [prefix.strip() for prefix in meta['path_prefix'].split(',') if prefix.strip()]
+    if meta['flags']:
+        kwargs['flags'] = [flag.strip() for flag in meta['flags'].split(',') if flag.strip()]
+    if meta['date_range']:
+        try:
+            kwargs['first_date'], kwargs['last_date'] = parse_date_range(meta['date_range'])
+        except ValueError as exp:
+            options.error("Unable to proceed. \n\nIncorrect date range %s\n%s\n" % (
+                meta['date_range'], str(exp)))
+
+    try:
+        meta['record_filter'] = RecordFilter(**kwargs)
+    except ValueError as exp:
+        options.error("Unable to proceed. \n\n%s\n" % (str(exp)))
+
+
+def parse_requery_options(options, meta):
+    """
+    Check the arguments of a --requery run.
+    """
+    if meta['outdir'] is False or meta['reportqueries'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required with --requery:\n-o OUTDIR\n-q REPORT_QUERIES')
+
+    if not os.path.isfile(meta['requery']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['requery'])
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+
+    if not os.path.exists(meta['reportqueries']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['reportqueries'])
+
+    if meta['casename'] is False:
+        print('[Info]: No casename specified using -c. Defaulting to "FSE_Reports".')
+        meta['casename'] = 'FSE_Reports'
+
+    return meta
+
+
+def parse_event_id_range(value):
+    """
+    Return the (first, last) event ids of an --event-id-range value.
+    Raises ValueError when it can not be read.
+    """
+    ids = []
+    for text in value.split('-', 1):
+        text = text.strip()
+        if len(text) == 16 and not text.lower().startswith('0x'):
+            # As shown in the event_id column
+            ids.append(int(text, 16))
+        else:
+            ids.append(int(text, 0))
+    if len(ids) == 1:
+        ids.append(ids[0])
+    if ids[0] > ids[1]:
+        raise ValueError('The first event id of the range is greater than the last.')
+    return ids[0], ids[1]
+
+
+def parse_lookup_options(options, meta):
+    """
+    Check the arguments of a --lookup run.
+    """
+    if meta['event_id_range'] is False or meta['outdir'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required with --lookup:\n--event-id-range FIRST[-LAST]\n-o OUTDIR')
+
+    if not os.path.isfile(meta['lookup']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['lookup'])
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+
+    try:
+        meta['event_ids'] = parse_event_id_range(meta['event_id_range'])
+    except ValueError as exp:
+        options.error("Unable to proceed. \n\nIncorrect event id range %s\n%s\n" % (
+            meta['event_id_range'], str(exp)))
+
+    return meta
+
+
+def lookup_records(meta):
+    """
+    Write the records of an event id range read through a page index
+    to a TSV file with the All_FSEVENTS.tsv columns.
+    """
+    first_id, last_id = meta['event_ids']
+    started = time.time()
+    try:
+        records = lookup(meta['lookup'], first_id, last_id)
+    except (IOError, OSError) as exp:
+        print('Unable to read the indexed source files.\n{}\n'.format(str(exp)))
+        sys.exit(0)
+
+    r_file = os.path.join(meta['outdir'], 'LOOKUP_{:016x}-{:016x}.tsv'.format(first_id, last_id))
+    with open(r_file, 'wb') as l_file:
+        Output.print_columns(l_file)
+        for record in records:
+            l_file.write('\t'.join([str(record[key]) for key in Output.TSV_COLUMNS]) + '\n')
+
+    print('  {} records found in {:.1f} ms.\n  Written to:\n  \'{}\'\n'.format(
+        len(records), (time.time() - started) * 1000, r_file))
+
+
+def parse_node_lookup_options(options, meta):
+    """
+    Check the arguments of a --node-lookup run.
+    """
+    if meta['node_id'] is False or meta['outdir'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required with --node-lookup:\n--node-id NODE_ID\n-o OUTDIR')
+
+    if not os.path.isfile(meta['node_lookup']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['node_lookup'])
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+
+    try:
+        meta['node_id'] = int(meta['node_id'], 0)
+    except ValueError:
+        options.error("Unable to proceed. \n\nIncorrect node id %s\n" % meta['node_id'])
+
+    return meta
+
+
+def lookup_node_records(meta):
+    """
+    Write every record of a node id read through a node index
+    to a TSV file with the All_FSEVENTS.tsv columns, and print
+    the paths it had.
+    """
+    started = time.time()
+    try:
+        records = lookup_node(meta['node_lookup'], meta['node_id'])
+    except sqlite3.Error as exp:
+        print('Unable to read the node index.\n{}\n'.format(str(exp)))
+        sys.exit(0)
+    elapsed = (time.time() - started) * 1000
+
+    r_file = os.path.join(meta['outdir'], 'NODE_{}.tsv'.format(meta['node_id']))
+    with open(r_file, 'wb') as l_file:
+        Output.print_columns(l_file)
+        for record in records:
+            l_file.write('\t'.join([str(record[key]) for key in Output.TSV_COLUMNS]) + '\n')
+
+    print('  {} records found in {:.1f} ms.'.format(len(records), elapsed))
+    for fullpath in node_paths(records):
+        print('    {}'.format(fullpath))
+    print('  Written to:\n  \'{}\'\n'.format(r_file))
+
+
+def parse_preview_options(options, meta):
+    """
+    Check the arguments of a --preview run.
+    """
+    if meta['source'] is False or meta['outdir'] is False or meta['sourcetype'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required with --preview:\n-s SOURCE\n-o OUTDIR\n-t SOURCETYPE')
+
+    if not os.path.exists(meta['source']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['source'])
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+
+    meta['sourcetype'] = meta['sourcetype'].lower()
+    if meta['sourcetype'] not in ('folder', 'image'):
+        options.error(
+            'Unable to proceed. \n\nIncorrect source type provided: "%s". The following are valid options:\
+            \n -t folder\n -t image\n' % (meta['sourcetype']))
+
+    if meta['sourcetype'] == 'image' and DFVFS_IMPORT is False:
+        options.error(IMPORT_ERROR)
+
+    if meta['sample_pages'] < 1:
+        options.error('Unable to proceed. \n\n--sample-pages must be at least 1.\n')
+
+    return meta
+
+
+def preview(meta):
+    """
+    Print the estimates of a source and write them to OUTDIR/PREVIEW.json.
+    """
+    print('\n[STARTED] {} UTC Previewing {}.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime()), meta['source']))
+    started = time.time()
+    try:
+        summary = preview_source(meta['source'], meta['sourcetype'], meta['sample_pages'])
+    except (IOError, OSError) as exp:
+        print('\nEnsure that you have permissions to read '
+              'from {}\n{}\n'.format(meta['source'], str(exp)))
+        sys.exit(0)
+    summary['source'] = meta['source']
+    summary['sourcetype'] = meta['sourcetype']
+    summary['seconds'] = round(time.time() - started, 3)
+
+    print_summary(summary)
+    p_file = os.path.join(meta['outdir'], PREVIEW)
+    write_summary(summary, p_file)
+    print('[FINISHED] {} UTC Preview written to:\n  \'{}\'\n'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), p_file))
+
+
+def parse_batch_options(options, meta):
+    """
+    Check the arguments of a --batch run.
+    """
+    if meta['outdir'] is False:
+        options.error('Unable to proceed. The following parameters '
+            'are required with --batch:\n-o OUTDIR')
+
+    if meta['source'] or meta['sourcetype'] or meta['casename']:
+        options.error('Unable to proceed. \n\n-s, -t and -c are read from the manifest with --batch.\n')
+
+    if meta['profile']:
+        options.error('Unable to proceed. \n\n--profile can not be used with --batch.\n')
+
+    if meta['global_dates']:
+        # Workers decode each file on its own
+        options.error('Unable to proceed. \n\n--global-dates can not be used with --batch.\n')
+
+    if meta['page_index']:
+        options.error('Unable to proceed. \n\n--page-index can not be used with --batch.\n')
+
+    if meta['watch']:
+        options.error('Unable to proceed. \n\n--watch can not be used with --batch.\n')
+
+    if not os.path.exists(meta['outdir']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+
+    if meta['reportqueries'] and not os.path.exists(meta['reportqueries']):
+        options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['reportqueries'])
+
+    try:
+        meta['hosts'] = read_manifest(meta['batch'])
+    except (IOError, ValueError) as exp:
+        options.error("Unable to proceed. \n\n%s\n" % (str(exp)))
+
+    if any(host.sourcetype == 'image' for host in meta['hosts']) and DFVFS_IMPORT is False:
+        options.error(IMPORT_ERROR)
+
+    select_sinks(options, meta)
+    select_filters(options, meta)
+
+    if meta['reportqueries'] is False:
+        print '[Info]: Report queries file not specified using the -q option. Custom reports will not be generated.'
+
+    return meta
+
+
+def open_host(meta, casename, source, sourcetype):
+    """
+    Return a handler with the outputs of a host open,
+    ready for decoded records to be added.
+    """
+    h_meta = dict(meta, casename=casename, source=source,
+                  sourcetype=sourcetype, sinks=list(meta['sinks']))
+    handler = FSEventHandler(h_meta, run=False)
+    handler.started = time.time()
+    handler.volumes = []
+    if handler.l_all_fsevents is not None:
+        Output.print_columns(handler.l_all_fsevents, meta['coalesce'])
+    return handler
+
+
+def host_units(handler, host_id):
+    """
+    Return the work units of every volume of the host's source.
+    """
+    units = []
+    if handler.meta['sourcetype'] == 'folder':
+        # Uses file mod dates to generate time ranges by default unless
+        # files are carved or mod dates lost due to exporting
+        source = handler.meta['source']
+        files = folder_files(source)
+        if handler.meta['dedup']:
+            files = authoritative_order(files)
+        units.append(chain_units(host_id, source, files, check_file_mod_dates(source), False,
+                                 handler.record_filter))
+        handler.volumes.append(source)
+    else:
+        for location, files in image_volumes(handler.meta['source']):
+            if files is None:
+                print('  {}: Unable to process volume {} or no fsevent files found'.format(
+                    handler.meta['casename'], location))
+                continue
+            if handler.meta['dedup']:
+                files = authoritative_order(files)
+            # Image files are read by this process and handed over with the unit
+            units.append(chain_units(host_id, location, files, True, True, handler.record_filter))
+            handler.volumes.append(location)
+    return units
+
+
+def finish_hosts(meta, handlers, summary, started):
+    """
+    Export the outputs of each host and write BATCH_SUMMARY.json
+    with the counts and run time of every host to the output folder.
+    """
+    summary['hosts'] = []
+    for handler in handlers:
+        print('[STARTED] {} UTC Exporting {}.'.format(
+            strftime("%m/%d/%Y %H:%M:%S", gmtime()), handler.meta['casename']))
+        print('\n  All Files Attempted: {}\n  All Parsed Files: {}\n  Files '
+              'with Errors: {}\n  All Records Parsed: {}'.format(
+            handler.all_files_count,
+            handler.parsed_file_count,
+            handler.error_file_count,
+            handler.all_records_count))
+        if 'sqlite' in handler.sinks:
+            use_database(handler)
+        row_count = handler.finish()
+        handler.write_metrics()
+        if 'sqlite' in handler.sinks:
+            STORAGE.commit()
+            STORAGE.close()
+        summary['hosts'].append({
+            'casename': handler.meta['casename'],
+            'source': handler.meta['source'],
+            'sourcetype': handler.meta['sourcetype'],
+            'volumes': handler.volumes,
+            'output': os.path.join(handler.meta['outdir'], handler.meta['casename']),
+            'all_files_count': handler.all_files_count,
+            'parsed_file_count': handler.parsed_file_count,
+            'error_file_count': handler.error_file_count,
+            'all_records_count': handler.all_records_count,
+            'duplicate_records': handler.deduper.duplicates if handler.deduper is not None else 0,
+            'exported_records': row_count,
+            'seconds': round(time.time() - handler.started, 3)
+        })
+
+    summary.update({
+        'finished': strftime("%Y-%m-%d %H:%M:%S", gmtime()),
+        'total_seconds': round(time.time() - started, 3),
+        'all_files_count': sum(h['all_files_count'] for h in summary['hosts']),
+        'all_records_count': sum(h['all_records_count'] for h in summary['hosts'])
+    })
+    with open(os.path.join(meta['outdir'], 'BATCH_SUMMARY.json'), 'w') as s_file:
+        json.dump(summary, s_file, indent=2, sort_keys=True)
+
+    print('  {:<24} {:>8} {:>8} {:>8} {:>10}'.format('Casename', 'Files', 'Parsed', 'Errors', 'Records'))
+    for host in summary['hosts']:
+        print('  {:<24} {:>8} {:>8} {:>8} {:>10}'.format(
+            host['casename'],
+            host['all_files_count'],
+            host['parsed_file_count'],
+            host['error_file_count'],
+            host['all_records_count']))
+    print("\n  Batch summary written to:\n  '{}'\n".format(os.path.join(meta['outdir'], 'BATCH_SUMMARY.json')))
+
+
+def parse_queue_options(options, meta):
+    """
+    Check the arguments of a job queue step.
+    """
+    if len([step for step in ('queue_submit', 'queue_work', 'queue_merge') if meta[step]]) != 1:
+        options.error('Unable to proceed. \n\nOnly one of --queue-submit, --queue-work '
+                      'and --queue-merge can be used at a time.\n')
+
+    if meta['profile']:
+        options.error('Unable to proceed. \n\n--profile can not be used with the job queue.\n')
+
+    if meta['global_dates']:
+        options.error('Unable to proceed. \n\n--global-dates can not be used with the job queue.\n')
+
+    if meta['page_index']:
+        options.error('Unable to proceed. \n\n--page-index can not be used with the job queue.\n')
+
+    if meta['watch']:
+        options.error('Unable to proceed. \n\n--watch can not be used with the job queue.\n')
+
+    if meta['event_id_range'] or meta['path_prefix'] or meta['flags'] or meta['date_range']:
+        # Work units are stored in the queue without the filters
+        options.error('Unable to proceed. \n\n--event-id-range, --path-prefix, --flags and '
+                      '--date-range can not be used with the job queue.\n')
+
+    if meta['queue_submit']:
+        if meta['batch']:
+            try:
+                meta['hosts'] = read_manifest(meta['batch'])
+            except (IOError, ValueError) as exp:
+                options.error("Unable to proceed. \n\n%s\n" % (str(exp)))
+        else:
+            if meta['source'] is False or meta['sourcetype'] is False:
+                options.error('Unable to proceed. The following parameters '
+                    'are required with --queue-submit:\n-s SOURCE\n-t SOURCETYPE\nor --batch MANIFEST')
+            if not os.path.exists(meta['source']):
+                options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['source'])
+            if meta['sourcetype'].lower() not in ('folder', 'image'):
+                options.error(
+                    'Unable to proceed. \n\nIncorrect source type provided: "%s". The following are valid options:\
+                    \n -t folder\n -t image\n' % (meta['sourcetype']))
+            if meta['casename'] is False:
+                print('[Info]: No casename specified using -c. Defaulting to "FSE_Reports".')
+                meta['casename'] = 'FSE_Reports'
+            meta['hosts'] = [Host(meta['casename'], meta['source'], meta['sourcetype'].lower())]
+        if any(host.sourcetype == 'image' for host in meta['hosts']) and DFVFS_IMPORT is False:
+            options.error(IMPORT_ERROR)
+
+    for step in ('queue_work', 'queue_merge'):
+        if meta[step] and not os.path.isfile(os.path.join(meta[step], 'QUEUE.sqlite')):
+            options.error("Unable to proceed. \n\n%s is not a job queue folder.\n" % meta[step])
+
+    if meta['queue_merge']:
+        if meta['outdir'] is False:
+            options.error('Unable to proceed. The following parameters '
+                'are required with --queue-merge:\n-o OUTDIR')
+        if not os.path.exists(meta['outdir']):
+            options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['outdir'])
+        if meta['reportqueries'] and not os.path.exists(meta['reportqueries']):
+            options.error("Unable to proceed. \n\n%s does not exist.\n" % meta['reportqueries'])
+        select_sinks(options, meta)
+
+    return meta
+
+
+def run_batch(meta):
+    """
+    Parse every host in the batch manifest. The files of all hosts
+    are decoded on one shared pool of worker processes and each
+    host's records are added to its own outputs, which are the same
+    as those of a separate run for the host. A summary of the run is
+    written to BATCH_SUMMARY.json in the output folder.
+    """
+    started = time.time()
+    scheduler = BatchScheduler(meta['workers'])
+    handlers = []
+    summary = {
+        'version': VERSION,
+        'manifest': meta['batch'],
+        'workers': meta['workers'],
+        'started': strftime("%Y-%m-%d %H:%M:%S", gmtime())
+    }
+
+    print('\n[STARTED] {} UTC Listing files of {} hosts.'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), len(meta['hosts'])))
+
+    for host_index, host in enumerate(meta['hosts']):
+        handler = open_host(meta, host.casename, host.source, host.sourcetype)
+        handlers.append(handler)
+        for units in host_units(handler, host_index):
+            scheduler.add(units)
+
+    print('[FINISHED] {} UTC Listing files of {} hosts.\n'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), len(meta['hosts'])))
+
+    print('[STARTED] {} UTC Parsing {} files on {} workers.'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), scheduler.total, meta['workers']))
+
+    done = 0
+    for unit, result in scheduler.results():
+        done += 1
+        progress(done, scheduler.total)
+        handler = handlers[unit['host']]
+        if result['error']:
+            print('\n  {}: Unable to read {}\n  {}'.format(
+                handler.meta['casename'], unit['fullpath'], result['error']))
+        handler.add_decoded(result)
+
+    print('\n[FINISHED] {} UTC Parsing files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+    summary['files_decoded_again'] = scheduler.redecoded
+    finish_hosts(meta, handlers, summary, started)
+
+
+def queue_submit(meta):
+    """
+    Split the sources into one work unit per fsevents file and add
+    them to the job queue folder. Files inside images are copied to
+    the queue folder so that any worker can read them.
+    """
+    try:
+        queue = JobQueue(meta['queue_submit'], create=True)
+    except (IOError, OSError, sqlite3.Error) as exp:
+        print('Unable to create the job queue in {}.\n{}'.format(meta['queue_submit'], str(exp)))
+        sys.exit(0)
+
+    print('\n[STARTED] {} UTC Adding {} hosts to the job queue.'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), len(meta['hosts'])))
+
+    for host in meta['hosts']:
+        try:
+            host_id = queue.add_host(host.casename, host.source, host.sourcetype)
+        except sqlite3.IntegrityError:
+            print('  Casename {} is already in the job queue. Skipping'.format(host.casename))
+            continue
+        # Only the file listing is needed from the handler
+        listing = HostListing(host.source, host.sourcetype, host.casename)
+        count = 0
+        for units in host_units(listing, host_id):
+            queue.add_units(units)
+            count += len(units)
+        print('  {}: {} files in {} volumes'.format(host.casename, count, len(listing.volumes)))
+
+    counts = queue.counts()
+    queue.close()
+    print('[FINISHED] {} UTC Adding hosts to the job queue. {} units pending.\n'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), counts['pending']))
+
+
+def queue_work(meta):
+    """
+    Start --workers local worker processes that decode units
+    from the job queue until none are left.
+    """
+    print('\n[STARTED] {} UTC Working on job queue {} with {} workers.'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()), meta['queue_work'], meta['workers']))
+
+    workers = []
+    for i in range(meta['workers']):
+        worker = multiprocessing.Process(target=queue_worker, args=(meta['queue_work'],))
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        worker.join()
+
+    queue = JobQueue(meta['queue_work'])
+    counts = queue.counts()
+    queue.close()
+    print('[FINISHED] {} UTC Working on job queue. {} done, {} failed, {} pending, {} leased.\n'.format(
+        strftime("%m/%d/%Y %H:%M:%S", gmtime()),
+        counts['done'], counts['failed'], counts['pending'], counts['leased']))
+
+
+def queue_worker(queue_dir):
+    """
+    Worker process of queue_work.
+    """
+    try:
+        work(queue_dir, log=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+
+
+def queue_merge(meta):
+    """
+    Assemble the outputs of every host in the job queue from the
+    result shards. Units without a shard, such as those that failed
+    on every worker, are decoded here. The outputs are the same as
+    those of a separate run for each host.
+    """
+    started = time.time()
+    queue = JobQueue(meta['queue_merge'])
+    counts = queue.counts()
+    if counts['pending'] or counts['leased']:
+        print('{} units of the job queue are not finished. Run --queue-work '
+              'or wait for the workers to finish.'.format(counts['pending'] + counts['leased']))
+        sys.exit(0)
+
+    summary = {
+        'version': VERSION,
+        'queue': meta['queue_merge'],
+        'started': strftime("%Y-%m-%d %H:%M:%S", gmtime())
+    }
+    handlers = []
+    tracker = SeedTracker()
+    decoded_here = 0
+
+    print('\n[STARTED] {} UTC Merging result shards.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+    for host_id, casename, source, sourcetype in queue.hosts():
+        handler = open_host(meta, casename, source, sourcetype)
+        handlers.append(handler)
+        units = queue.units(host_id)
+        if handler.deduper is not None:
+            units = authoritative_order(units, lambda unit: unit['name'])
+        for unit in units:
+            if unit['chain'] not in handler.volumes:
+                handler.volumes.append(unit['chain'])
+            shard = queue.shard_path(unit['id'])
+            if unit['state'] == 'done' and os.path.isfile(shard):
+                result = read_shard(shard)
+            else:
+                result = decode_unit(unit)
+                decoded_here += 1
+            result = tracker.check(unit, result)
+            if result['error']:
+                print('  {}: Unable to read {}\n  {}'.format(casename, unit['fullpath'], result['error']))
+            handler.add_decoded(result)
+
+    queue.close()
+
+    print('[FINISHED] {} UTC Merging result shards.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+    summary.update({
+        'files_decoded_again': tracker.redecoded,
+        'files_decoded_by_merge': decoded_here,
+        'queue_counts': counts
+    })
+    finish_hosts(meta, handlers, summary, started)
+
+
+class HostListing(object):
+    """
+    Holds what host_units reads from a handler
+    when only the files of a host are listed.
+    """
+
+    def __init__(self, source, sourcetype, casename):
+        """
+        """
+        # Units are put in --dedup order by --queue-merge
+        self.meta = {'source': source, 'sourcetype': sourcetype, 'casename': casename, 'dedup': False}
+        self.record_filter = None
+        self.volumes = []
+
+
+def main():
+    """
+    Call the main processes.
+    """
+    print('\n==========================================================================')
+    print('FSEParser v {} -- provided by G-C Partners, LLC'.format(VERSION))
+    print('==========================================================================')
+
+    meta = parse_options()
+
+    if meta['requery']:
+        # Export reports from an existing database
+        requery_reports(meta)
+        return
+
+    if meta['lookup']:
+        # Read an event id range through a page index
+        lookup_records(meta)
+        return
+
+    if meta['node_lookup']:
+        # Read the records of a node id through a node index
+        lookup_node_records(meta)
+        return
+
+    if meta['preview']:
+        # Estimate the source without parsing it
+        preview(meta)
+        return
+
+    if meta['queue_submit']:
+        queue_submit(meta)
+        return
+
+    if meta['queue_work']:
+        queue_work(meta)
+        return
+
+    if meta['queue_merge']:
+        queue_merge(meta)
+        return
+
+    if meta['batch']:
+        # Parse every host in the manifest
+        run_batch(meta)
+        return
+
+    # Process fsevents
+    handler = FSEventHandler(meta)
+
+    if 'sqlite' in handler.meta['sinks']:
+        # Commit transaction
+        STORAGE.commit()
+
+        # Close database connection
+        STORAGE.close()
+
+
+def progress(count, total):
+    """
+    Handles the progress bar in the console.
+    """
+    bar_len = 45
+    filled_len = int(round(bar_len * count / float(total)))
+
+    percents = round(100 * count / float(total), 1)
+    p_bar = '=' * filled_len + '.' * (bar_len - filled_len)
+    try:
+        sys.stdout.write('  File {} of {}  [{}] {}{}\r'.format(count, total, p_bar, percents, '%'))
+    except:
+        pass
+    sys.stdout.flush()
+
+
+class FSEventHandler():
+    """
+    FSEventHandler iterates through and parses fsevents.
+    """
+
+    def __init__(self, meta, run=True):
+        """
+        meta: The parsed command line arguments.
+        run: Parse the source and export the outputs. Otherwise only the
+             outputs are opened and records are added by the caller.
+        """
+        self.meta = meta
+        if self.meta['reportqueries']:
+            # Check json file
+            try:
+                # Basic json syntax
+                self.r_queries = json.load(open(self.meta['reportqueries']))
+                # Check to see if required keys are present
+                for i in self.r_queries['process_list']:
+                    i['report_name']
+                    i['query']
+            except Exception as exp:
+                print('An error occurred while reading the json file. \n{}'.format(str(exp)))
+                sys.exit(0)
+        else:
+            # if report queries option was not specified
+            self.r_queries = False
+
+        self.path = self.meta['source']
+
+        # Stage timings and statistics written to METRICS.json
+        self.metrics = Metrics()
+        self.metrics.info.update({
+            'version': VERSION,
+            'source': self.meta['source'],
+            'sourcetype': self.meta['sourcetype'],
+            'casename': self.meta['casename'],
+            'started': strftime("%Y-%m-%d %H:%M:%S", gmtime())
+        })
+
+        if not os.path.isdir(os.path.join(self.meta['outdir'], self.meta['casename'])):
+            os.makedirs(os.path.join(self.meta['outdir'], self.meta['casename']))
+
+        self.sinks = self.meta['sinks']
+        self.metrics.info['sinks'] = self.sinks
+
+        if 'sqlite' in self.sinks:
+            with self.metrics.timer('create_sqlite_db'):
+                create_sqlite_db(self)
+
+        # Initialize statistic counters
+        self.all_records_count = 0
+        self.all_files_count = 0
+        self.parsed_file_count = 0
+        self.error_file_count = 0
+
+        # Try to open the output files
+        try:
+            # Try to open ouput files
+            self.l_all_fsevents = None
+            if 'tsv' in self.sinks:
+                self.l_all_fsevents = open(
+                    os.path.join(self.meta['outdir'], self.meta['casename'], 'All_FSEVENTS.tsv'),
+                    'wb'
+                )
+            # Process report queries output files
+            # if option was specified.
+            if 'reports' in self.sinks:
+                # Try to open custom report query output files
+                for i in self.r_queries['process_list']:
+                    r_file = os.path.join(self.meta['outdir'], self.meta['casename'], i['report_name'] + '.tsv')
+                    if os.path.exists(r_file):
+                        os.remove(r_file)
+                    setattr(self, 'l_' + i['report_name'], open(r_file, 'wb'))
+
+            # Output log file for exceptions, written from
+            # the diagnostics once every record has been added
+            l_file = os.path.join(self.meta['outdir'], self.meta['casename'], 'EXCEPTIONS_LOG.txt')
+            self.logfile = open(l_file, 'w')
+            self.diagnostics = Diagnostics()
+
+            # Sinks handed each record as it is parsed
+            self.record_sinks = []
+            for name in self.sinks:
+                if name in RECORD_SINKS:
+                    self.record_sinks.append(RECORD_SINKS[name](
+                        os.path.join(self.meta['outdir'], self.meta['casename']),
+                        self.metrics,
+                        **sink_options(self.meta, name)
+                    ))
+        except Exception as exp:
+            # Print error to command prompt if unable to open files
+            if 'Permission denied' in str(exp):
+                print('{}\nEnsure that you have permissions to write to file '
+                      '\nand output file is not in use by another application.\n'.format(str(exp)))
+            else:
+                print(exp)
+            sys.exit(0)
+
+        # Without the database, the tsv, reports and lifecycle
+        # outputs need the records sorted by event id on disk
+        self.sorter = None
+        self.reports = None
+        if 'sqlite' not in self.sinks and ('tsv' in self.sinks or 'reports' in self.sinks or
+                                           'lifecycle' in self.sinks):
+            # Report queries are checked before parsing
+            if 'reports' in self.sinks:
+                self.reports = StreamReports(self)
+            self.sorter = ExternalSorter(
+                self.meta['sort_memory'],
+                os.path.join(self.meta['outdir'], self.meta['casename']),
+                self.metrics
+            )
+
+        # Pages of each source file for --lookup
+        self.page_index = None
+        if self.meta['page_index']:
+            self.page_index = PageIndex(self.meta['source'], self.meta['sourcetype'])
+
+        # DLS2 records by node id for --node-lookup
+        self.node_index = None
+        if self.meta['node_index']:
+            self.node_index = NodeIndex(os.path.join(self.meta['outdir'], self.meta['casename'], NODE_INDEX))
+
+        # Records kept by --event-id-range, --path-prefix, --flags and --date-range
+        self.record_filter = self.meta.get('record_filter')
+        self.skipped_file_count = 0
+        self.skipped_page_count = 0
+        self.filtered_record_count = 0
+
+        # Records exported before and during --watch
+        self.watched_rows = None
+
+        # Drops records already added from another file
+        self.deduper = None
+        self.dedup = None
+        if self.meta['dedup']:
+            self.deduper = RecordDeduper(
+                self.meta['dedup_memory'],
+                os.path.join(self.meta['outdir'], self.meta['casename']),
+                self.metrics
+            )
+            self.dedup = self.metrics.wrap('dedup', self.deduper.seen)
+
+        # Functions each parsed record is handed to
+        self.writers = []
+        if 'sqlite' in self.sinks:
+            self.writers.append(self.metrics.wrap('sqlite_ingest', Output.append_row))
+        elif self.sorter is not None:
+            self.writers.append(self.metrics.wrap('external_sort_add', self.sort_row))
+        for sink in self.record_sinks:
+            self.writers.append(self.metrics.wrap(sink.name + '_sink', sink.add))
+        if self.node_index is not None:
+            self.writers.append(self.metrics.wrap('node_index', self.node_index.add))
+
+        if run:
+            self.run()
+
+    def run(self):
+        """
+        Parse the source and export the outputs.
+        """
+        if self.meta['profile']:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        watcher = None
+        if self.meta['watch']:
+            # Started before the folder is listed so that
+            # no file landing while it is parsed is missed
+            watcher = FolderWatcher(self.path, self.meta['watch_interval'], self.meta['watch_poll'])
+
+        # Begin FSEvent processing
+
+        print('\n[STARTED] {} UTC Parsing files.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        if self.meta['sourcetype'] == 'image':
+            self._get_fsevent_image_files()
+        elif self.meta['sourcetype'] == 'folder':
+            self._get_fsevent_files()
+            print('\n  All Files Attempted: {}\n  All Parsed Files: {}\n  Files '
+                  'with Errors: {}\n  All Records Parsed: {}'.format(
+                self.all_files_count,
+                self.parsed_file_count,
+                self.error_file_count,
+                self.all_records_count))
+
+        print('[FINISHED] {} UTC Parsing files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        if watcher is not None:
+            self.watch(watcher)
+
+        self.finish()
+
+        if self.meta['profile']:
+            profiler.disable()
+            self.write_profile(profiler)
+
+        self.write_metrics()
+
+    def watch(self, watcher):
+        """
+        Export the records parsed so far, then parse each file that
+        lands in the source folder and append its records to the
+        outputs until stopped with Ctrl-C or SIGTERM. The time range
+        of each new file is seeded from the file parsed before it.
+        """
+        self.watched_rows = self.export_database()
+        STORAGE.commit()
+
+        watcher.add_known(self.source_names)
+        watcher.stop_on_signals()
+        reports = WatchReports(self) if 'reports' in self.sinks else None
+        self.table_rowid = SQL_TRAN.execute("SELECT max(rowid) FROM fsevents").fetchone()[0] or 0
+        self.sorted_rowid = SQL_TRAN.execute(
+            "SELECT max(rowid) FROM fsevents_sorted_by_event_id").fetchone()[0] or 0
+
+        watched = {'backend': watcher.backend, 'files': 0, 'records': 0, 'latency_ms': []}
+        print('[STARTED] {} UTC Watching {} for new files using {}. Press Ctrl-C to stop.\n'.format(
+            strftime("%m/%d/%Y %H:%M:%S", gmtime()), self.path, watcher.backend))
+
+        while True:
+            found = watcher.wait()
+            if watcher.stopped:
+                # Files that landed before the stop are still added
+                found += watcher.drain()
+            if not found:
+                if watcher.stopped:
+                    break
+                continue
+            started = time.time()
+            with self.metrics.timer('watch_add') as counts:
+                count = self.add_watched_files([folder_file(self.path, name) for name, seen in found], reports)
+                counts['records'] = count
+            finished = time.time()
+
+            # From the file being found to its records being committed and written
+            watched['latency_ms'].extend([(finished - seen) * 1000 for name, seen in found])
+            watched['files'] += len(found)
+            watched['records'] += count
+            print('  {} UTC Added {} records from {} in {:.0f} ms.'.format(
+                strftime("%m/%d/%Y %H:%M:%S", gmtime()), count,
+                ', '.join(name for name, seen in found), (finished - started) * 1000))
+
+        watcher.close()
+        if reports is not None:
+            reports.close()
+
+        latency = watched.pop('latency_ms')
+        if latency:
+            watched['latency_ms_mean'] = round(sum(latency) / len(latency), 1)
+            watched['latency_ms_max'] = round(max(latency), 1)
+        self.metrics.info['watch'] = watched
+        print('\n[FINISHED] {} UTC Watching {}. {} new files, {} records added.\n'.format(
+            strftime("%m/%d/%Y %H:%M:%S", gmtime()), self.path, watched['files'], watched['records']))
+
+    def add_watched_files(self, files, reports):
+        """
+        Parse new files with the decoder of the first pass and append
+        their records to the database, TSV and report outputs. The
+        records are committed before the files are written.
+        Returns
+            count: The number of records added
+        """
+        decoder = self.decoder
+        writers = self.writers
+        dedup = self.dedup
+        for src in files:
+            try:
+                for attributes in decoder.decode(src):
+                    output = Output(attributes)
+                    if dedup is not None and dedup(output):
+                        continue
+                    for append_row in writers:
+                        append_row(output)
+            except (IOError, OSError) as exp:
+                # The file was removed or can not be read
+                self.diagnostics.add('watch_read_error', src.name, value=str(exp))
+
+        self.all_files_count = decoder.all_files_count
+        self.parsed_file_count = decoder.parsed_file_count
+        self.error_file_count = decoder.error_file_count
+        self.all_records_count = decoder.all_records_count
+        self.skipped_file_count = decoder.skipped_file_count
+        self.skipped_page_count = decoder.skipped_page_count
+        self.filtered_record_count = decoder.filtered_record_count
+
+        # Sorted by event id within the new records
+        count = STORAGE.append_sorted(self.table_rowid)
+        self.table_rowid = SQL_TRAN.execute("SELECT max(rowid) FROM fsevents").fetchone()[0] or 0
+        STORAGE.commit()
+        self.watched_rows += count
+
+        if count:
+            if self.l_all_fsevents is not None:
+                self.export_fsevent_report(self.l_all_fsevents, count, self.sorted_rowid)
+                self.l_all_fsevents.flush()
+            if reports is not None:
+                reports.add_rows(self.sorted_rowid)
+            self.sorted_rowid += count
+        self.logfile.flush()
+        return count
+
+    def finish(self):
+        """
+        Export the outputs once every record has been added.
+        Returns
+            row_count: The number of records exported
+        """
+        if self.record_filter is not None:
+            self.metrics.info['filters'] = dict(
+                self.record_filter.describe(),
+                skipped_file_count=self.skipped_file_count,
+                skipped_page_count=self.skipped_page_count,
+                filtered_record_count=self.filtered_record_count
+            )
+            print('  Files Skipped by Filters: {}\n  Pages Skipped by Filters: {}\n  '
+                  'Records Removed by Filters: {}\n'.format(
+                self.skipped_file_count,
+                self.skipped_page_count,
+                self.filtered_record_count))
+
+        if self.deduper is not None:
+            self.deduper.close()
+            self.metrics.info['dedup'] = self.deduper.summary()
+            print('  Duplicate Records Removed: {}\n'.format(self.deduper.duplicates))
+
+        if self.watched_rows is not None:
+            # Exported while watching
+            row_count = self.watched_rows
+        elif 'sqlite' in self.sinks:
+            row_count = self.export_database()
+        elif self.sorter is not None:
+            row_count = self.export_sorted_records()
+        else:
+            row_count = self.all_records_count
+            if self.deduper is not None:
+                row_count -= self.deduper.duplicates
+
+        for sink in self.record_sinks:
+            with self.metrics.timer(sink.name + '_sink_close'):
+                sink.close()
+
+        if self.page_index is not None:
+            with self.metrics.timer('page_index_write'):
+                self.page_index.write(os.path.join(self.meta['outdir'], self.meta['casename'], PAGE_INDEX))
+
+        if self.node_index is not None:
+            with self.metrics.timer('node_index_write'):
+                self.metrics.info['node_index_records'] = self.node_index.close()
+
+        self.write_diagnostics()
+
+        if row_count != 0:
+            print("  Exception log and Reports exported to:\n  '{}'\n".format(os.path.join(self.meta['outdir'], self.meta['casename'])))
+
+            # Close output files
+            if self.l_all_fsevents is not None:
+                self.l_all_fsevents.close()
+            self.logfile.close()
+        else:
+            print('[FINISHED] {} UTC No records were parsed.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+            print('Nothing to export.\n')
+
+        return row_count
+
+    def write_diagnostics(self):
+        """
+        Write the entries kept by the diagnostics to EXCEPTIONS_LOG.txt
+        and their counts to DIAGNOSTICS.json.
+        """
+        with self.metrics.timer('diagnostics_write'):
+            self.diagnostics.write_log(self.logfile)
+            self.diagnostics.write(os.path.join(self.meta['outdir'], self.meta['casename'], DIAGNOSTICS))
+        self.metrics.info['diagnostics'] = dict(
+            (code, self.diagnostics.total(code)) for code in self.diagnostics.counts)
+
+    def write_metrics(self):
+        """
+        Write the run's METRICS.json to the case folder.
+        """
+        self.metrics.info.update({
+            'finished': strftime("%Y-%m-%d %H:%M:%S", gmtime()),
+            'all_files_count': self.all_files_count,
+            'parsed_file_count': self.parsed_file_count,
+            'error_file_count': self.error_file_count,
+            'all_records_count': self.all_records_count
+        })
+        self.metrics.write(os.path.join(self.meta['outdir'], self.meta['casename'], 'METRICS.json'))
+
+    def export_database(self):
+        """
+        Sort the fsevents table in the database and export it
+        and the report views to TSV files.
+        Returns
+            row_count: The number of rows in the table
+        """
+        print('[STARTED] {} UTC Sorting fsevents table in Database.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        with self.metrics.timer('reorder_sqlite_db') as counts:
+            row_count = reorder_sqlite_db(self)
+            counts['records'] = row_count
+        if row_count == 0:
+            return row_count
+
+        print('[FINISHED] {} UTC Sorting fsevents table in Database.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        if 'tsv' in self.sinks:
+            print('[STARTED] {} UTC Exporting fsevents table from Database.'.format(
+                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+            with self.metrics.timer('export_fsevent_report') as counts:
+                self.export_fsevent_report(self.l_all_fsevents, row_count)
+                counts['records'] = row_count
+                counts['bytes_out'] = self.l_all_fsevents.tell()
+
+            print('[FINISHED] {} UTC Exporting fsevents table from Database.\n'.format(
+                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        if 'reports' in self.sinks:
+            print('[STARTED] {} UTC Exporting views from database '
+                  'to TSV files.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+            # Export report views to output files
+            with self.metrics.timer('export_sqlite_views'):
+                if self.meta['workers'] > 1 and STORAGE.concurrent_exports:
+                    self.export_sqlite_views_parallel()
+                else:
+                    for i in self.r_queries['process_list']:
+                        Output.print_columns(getattr(self, 'l_' + i['report_name']), self.meta['coalesce'])
+                    self.export_sqlite_views()
+            # Let --requery skip these reports until they change
+            write_report_hashes(
+                os.path.join(self.meta['outdir'], self.meta['casename']),
+                self.r_queries,
+                reports_fingerprint(STORAGE.fingerprint(), self.meta['coalesce'])
+            )
+            print('[FINISHED] {} UTC Exporting views from database '
+                  'to TSV files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        if 'lifecycle' in self.sinks:
+            print('[STARTED] {} UTC Following paths from database.'.format(
+                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+            lifecycle = self.lifecycle_engine()
+            with self.metrics.timer('lifecycle') as counts:
+                for row in STORAGE.scan(Output.COLUMNS):
+                    lifecycle.add(row)
+                counts['records'] = row_count
+            self.close_lifecycle(lifecycle)
+            print('[FINISHED] {} UTC Following paths from database.\n'.format(
+                strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        return row_count
+
+    def lifecycle_engine(self):
+        """
+        Return the LifecycleEngine the sorted records are handed to.
+        """
+        return LifecycleEngine(
+            os.path.join(self.meta['outdir'], self.meta['casename']),
+            Output.COLUMNS,
+            self.meta['lifecycle_paths']
+        )
+
+    def close_lifecycle(self, lifecycle):
+        """
+        """
+        summary = self.metrics.info['lifecycle'] = lifecycle.close()
+        print('  Lifecycles: {}\n  Rename Pairs: {}\n  Unpaired Renames: {}'.format(
+            summary['lifecycles'], summary['rename_pairs'], summary['unpaired_renames']))
+
+    def coalesced(self, coalescer):
+        """
+        Record how far All_FSEVENTS.tsv was coalesced.
+        """
+        summary = self.metrics.info['coalesce'] = coalescer.stats()
+        print('  Coalesced {} records into {} rows.'.format(summary['records'], summary['rows']))
+
+    def export_sorted_records(self):
+        """
+        Merge the externally sorted records in event id order
+        straight into All_FSEVENTS.tsv and the report files.
+        Returns
+            row_count: The number of records
+        """
+        row_count = len(self.sorter)
+        if row_count == 0:
+            self.sorter.close()
+            if self.reports is not None:
+                self.reports.close()
+            return row_count
+
+        print('[STARTED] {} UTC Merging sorted records to TSV files.'.format(
+            strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        reports = self.reports
+        lifecycle = self.lifecycle_engine() if 'lifecycle' in self.sinks else None
+        # Positions of the report columns within a record row
+        r_index = [Output.COLUMNS.index(key) for key in Output.TSV_COLUMNS]
+
+        tsv_file = self.l_all_fsevents
+        coalescer = Coalescer() if self.meta['coalesce'] and tsv_file is not None else None
+
+        with self.metrics.timer('external_sort_merge') as counts:
+            for key, row in self.sorter:
+                if coalescer is not None:
+                    c_row = coalescer.add([row[i] for i in r_index])
+                    if c_row is not None:
+                        tsv_file.write('\t'.join([str(value) for value in c_row]) + '\n')
+                elif tsv_file is not None:
+                    tsv_file.write('\t'.join([row[i] for i in r_index]) + '\n')
+                if reports is not None:
+                    reports.add(row)
+                if lifecycle is not None:
+                    lifecycle.add(row)
+            if coalescer is not None:
+                c_row = coalescer.close()
+                if c_row is not None:
+                    tsv_file.write('\t'.join([str(value) for value in c_row]) + '\n')
+                self.coalesced(coalescer)
+            if reports is not None:
+                reports.finish()
+            if lifecycle is not None:
+                self.close_lifecycle(lifecycle)
+            counts['records'] = row_count
+            if tsv_file is not None:
+                counts['bytes_out'] = tsv_file.tell()
+
+        self.sorter.close()
+
+        print('[FINISHED] {} UTC Merging sorted records to TSV files.\n'.format(
+            strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+
+        return row_count
+
+    def write_profile(self, profiler):
+        """
+        Write the cProfile statistics of the run, raw for use with pstats
+        and as text sorted by cumulative time.
+        """
+        out_dir = os.path.join(self.meta['outdir'], self.meta['casename'])
+        profiler.dump_stats(os.path.join(out_dir, 'PROFILE.pstats'))
+        with open(os.path.join(out_dir, 'PROFILE.txt'), 'w') as p_file:
+            stats = pstats.Stats(profiler, stream=p_file)
+            stats.sort_stats('cumulative').print_stats(50)
+
+
+    def _get_fsevent_files(self):
+        """
+        get_fsevent_files will iterate through each file in the fsevents dir provided
+        and pass it to the decoder, which will attempt to decompress the gzip,
+        check for DLS headers and parse the records within each DLS page.
+        Files that can not be parsed are recorded in the logfile.
+        """
+        # Print the header columns to the output files
+        if self.l_all_fsevents is not None:
+            Output.print_columns(self.l_all_fsevents, self.meta['coalesce'])
+
+        # Uses file mod dates to generate time ranges by default unless
+        # files are carved or mod dates lost due to exporting
+        use_file_mod_dates = check_file_mod_dates(self.path)
+        decoder = FSEventDecoder(use_file_mod_dates, self.diagnostics, self.metrics)
+
+        files = folder_files(self.path)
+        if self.deduper is not None:
+            files = authoritative_order(files)
+        if self.meta['global_dates']:
+            decoder.date_index = build_date_index(files, use_file_mod_dates, self.metrics)
+        decoder.record_filter = self.record_filter
+        if self.page_index is not None:
+            self.page_index.start_volume(self.path, decoder)
+        self.decode_files(decoder, files)
+
+        # Carried on by --watch
+        self.decoder = decoder
+        self.source_names = [src.name for src in files]
+
+    def _get_fsevent_image_files(self):
+        """
+        get_fsevent_image_files will iterate through each file in the fsevents dir
+        of each volume found in the image and pass it to the decoder.
+        """
+        # Print the header columns to the output file
+        if self.l_all_fsevents is not None:
+            Output.print_columns(self.l_all_fsevents, self.meta['coalesce'])
+
+        for location, files in image_volumes(self.meta['source']):
+            print "  Processing Volume {}.\n".format(location)
+
+            if files is None:
+                print('Unable to process volume or no fsevent files found')
+                continue
+
+            if self.deduper is not None:
+                files = authoritative_order(files)
+            decoder = FSEventDecoder(True, self.diagnostics, self.metrics)
+            if self.meta['global_dates']:
+                decoder.date_index = build_date_index(files, True, self.metrics)
+            decoder.record_filter = self.record_filter
+            if self.page_index is not None:
+                self.page_index.start_volume(location, decoder)
+            self.decode_files(decoder, files)
+
+            print('\n\n  All Files Attempted: {}\n  All Parsed Files: {}\n  Files '
+                  'with Errors: {}\n  All Records Parsed: {}'.format(
+                self.all_files_count,
+                self.parsed_file_count,
+                self.error_file_count,
+                self.all_records_count))
+
+    def decode_files(self, decoder, files):
+        """
+        Decode each source file in order and add its
+        records to the selected outputs.
+        """
+        if self.meta['pipeline_depth'] and not self.meta['profile']:
+            # cProfile only sees the main thread
+            return self.decode_files_pipelined(decoder, files)
+
+        t_files = len(files)
+        writers = self.writers
+        dedup = self.dedup
+        prefetcher = self.prefetcher(files)
+        if prefetcher is None:
+            items = ((src, None) for src in files)
+        else:
+            items = ((src, self.unpack_file(decoder, src, data)) for src, data in prefetcher)
+        for src, unpacked in items:
+            # Call the progress bar which shows parsing stats
+            progress(decoder.all_files_count + 1, t_files)
+            try:
+                for attributes in decoder.decode(src, unpacked):
+                    output = Output(attributes)
+                    if dedup is not None and dedup(output):
+                        continue
+                    # Print the parsed record to the outputs
+                    for append_row in writers:
+                        append_row(output)
+            except (IOError, OSError) as exp:
+                # When permission denied is encountered
+                print('\nEnsure that you have permissions to read '
+                      'from {}\n{}\n'.format(self.path, str(exp)))
+                sys.exit(0)
+
+        if prefetcher is not None:
+            print('')
+            self.add_prefetch_stats(prefetcher)
+        self.add_counts(decoder)
+
+    def decode_files_pipelined(self, decoder, files):
+        """
+        Decode each source file in order on a pipeline of reader,
+        decompressor, decoder and writer threads. The writer thread
+        is the only one adding to the outputs and the database while
+        it runs. Records reach the outputs in the same order as when
+        parsed on one thread.
+        """
+        t_files = len(files)
+        writers = self.writers
+        dedup = self.dedup
+        prefetcher = self.prefetcher(files)
+
+        def read(emit):
+            if prefetcher is not None:
+                for item in prefetcher:
+                    emit(item)
+                return
+            for src in files:
+                try:
+                    with self.metrics.timer('read') as counts:
+                        data = src.reader()
+                        counts['bytes_out'] = len(data)
+                except Exception as exp:
+                    # Handled by the decoder as when it reads the file
+                    data = exp
+                emit((src, data))
+
+        def decompress(item, emit):
+            src, data = item
+            emit((src, self.unpack_file(decoder, src, data)))
+
+        def decode(item, emit):
+            src, unpacked = item
+            progress(decoder.all_files_count + 1, t_files)
+            rows = []
+            for attributes in decoder.decode(src, unpacked):
+                output = Output(attributes)
+                if dedup is not None and dedup(output):
+                    continue
+                rows.append(output)
+                if len(rows) == PIPELINE_ROWS:
+                    emit(rows)
+                    rows = []
+            if rows:
+                emit(rows)
+
+        def write(rows, emit):
+            for output in rows:
+                # Print the parsed record to the outputs
+                for append_row in writers:
+                    append_row(output)
+
+        pipeline = Pipeline(self.meta['pipeline_depth'])
+        try:
+            pipeline.run([('read', read), ('decompress', decompress), ('decode', decode), ('write', write)])
+        except (IOError, OSError) as exp:
+            # When permission denied is encountered
+            print('\nEnsure that you have permissions to read '
+                  'from {}\n{}\n'.format(self.path, str(exp)))
+            sys.exit(0)
+
+        stats = pipeline.stats()
+        self.metrics.info.setdefault('pipeline', []).append(stats)
+        print('')
+        for stage in stats:
+            depth = 'None'
+            if stage['queue_depth_max'] is not None:
+                depth = 'Max {} Mean {}'.format(stage['queue_depth_max'], stage['queue_depth_mean'])
+            print('  Pipeline {}: Queue Depth {}, Waited {:.2f}s, Stalled {:.2f}s'.format(
+                stage['stage'].title(), depth, stage['wait_seconds'], stage['stall_seconds']))
+
+        self.add_prefetch_stats(prefetcher)
+        self.add_counts(decoder)
+
+    def prefetcher(self, files):
+        """
+        Return a Prefetcher reading ahead the files of the volume,
+        or None when --prefetch is 0.
+        """
+        if not self.meta['prefetch']:
+            return None
+        # The file objects of an image share its handle
+        threads = MAX_PREFETCH_THREADS if self.meta['sourcetype'] == 'folder' else 1
+        return Prefetcher(files, self.meta['prefetch'], self.meta['prefetch_memory'], threads,
+                          metrics=self.metrics)
+
+    def unpack_file(self, decoder, src, data):
+        """
+        Decompress raw file data read ahead. Returns the unpacked
+        argument of decoder.decode: the data, or the exception
+        raised reading or decompressing it.
+        """
+        if isinstance(data, Exception):
+            return data
+        members = [] if decoder.page_index is not None else None
+        try:
+            with self.metrics.timer('decompression', len(data)) as counts:
+                buf = src.unpack(data, members)
+                counts['bytes_out'] = len(buf)
+        except Exception as exp:
+            # Handled by the decoder as when it decompresses the file
+            return exp
+        return len(data), buf, members
+
+    def add_prefetch_stats(self, prefetcher):
+        """
+        Print how long decoding waited on reads and
+        keep the prefetch statistics of the volume.
+        """
+        if prefetcher is None:
+            return
+        stats = prefetcher.stats()
+        self.metrics.info.setdefault('prefetch', []).append(stats)
+        print('  Prefetch: {} Files Read Ahead, Waited {:.2f}s on Reads'.format(
+            stats['files_read'], stats['wait_seconds']))
+
+    def add_counts(self, decoder):
+        """
+        Statistic counters for the current volume.
+        """
+        self.all_files_count = decoder.all_files_count
+        self.parsed_file_count = decoder.parsed_file_count
+        self.error_file_count = decoder.error_file_count
+        self.all_records_count = decoder.all_records_count
+        self.skipped_file_count = decoder.skipped_file_count
+        self.skipped_page_count = decoder.skipped_page_count
+        self.filtered_record_count = decoder.filtered_record_count
+
+
+    def add_decoded(self, result):
+        """
+        Add the records, log entries and statistics of a file
+        decoded by a batch worker.
+        """
+        if 'sqlite' in self.sinks:
+            use_database(self)
+        self.diagnostics.merge(result['diagnostics'])
+        for attributes in result['records']:
+            output = Output(attributes)
+            if self.dedup is not None and self.dedup(output):
+                continue
+            for append_row in self.writers:
+                append_row(output)
+
+        self.all_files_count += result['all_files_count']
+        self.parsed_file_count += result['parsed_file_count']
+        self.error_file_count += result['error_file_count']
+        self.all_records_count += result['all_records_count']
+        self.skipped_file_count += result['skipped_file_count']
+        self.skipped_page_count += result['skipped_page_count']
+        self.filtered_record_count += result['filtered_record_count']
+
+        for name, stage in result['stages'].items():
+            self.metrics.add(name, stage['wall_seconds'], stage['cpu_seconds'], stage['bytes_in'],
+                             stage['bytes_out'], stage['records'], stage['calls'])
+        for f_metrics in result['files']:
+            self.metrics.file(**f_metrics)
+        for name, c_stats in result['caches'].items():
+            self.metrics.cache(name, c_stats['hits'], c_stats['misses'])
+
+    def sort_row(self, output):
+        """
+        Add the parsed record to the external sort.
+        """
+        self.sorter.add(output['id'], tuple([str(output[key]) for key in Output.COLUMNS]))
+
+    def export_fsevent_report(self, outfile, row_count, first_rowid=0):
+        """
+        Export rows from fsevents table in DB to tab delimited report.
+        first_rowid: Only export the rows after it.
+        """
+        counter = 0
+
+        columns = [
+            'id_hex',
+            'node_id',
+            'fullpath',
+            'type',
+            'flags',
+            'approx_dates_plus_minus_one_day',
+            'source',
+            'source_modified_time'
+        ]
+        rows = islice(STORAGE.scan(columns, first_rowid), row_count)
+        coalescer = None
+        if self.meta['coalesce']:
+            coalescer = Coalescer()
+            rows = coalescer.coalesce(rows)
+
+        for row in rows:
+            values = []
+            for cell in row:
+                if type(cell) is str or type(cell) is unicode:
+                    try:
+                        values.append(cell)
+                    except:
+                        print row_count
+                        print type(cell)
+                        print cell
+                        print row
+                        values.append("ERROR_IN_VALUE")
+                else:
+                    try:
+                        values.append(unicode(cell))
+                    except:
+                        print row_count
+                        print type(cell)
+                        print cell
+                        print row
+                        values.append("ERROR_IN_VALUE")
+            m_row = u'\t'.join(values)
+            m_row = m_row + u'\n'
+            outfile.write(m_row.encode("utf-8"))
+            counter = counter + 1
+
+        if coalescer is not None:
+            self.coalesced(coalescer)
+
+    def export_sqlite_views(self):
+        """
+        Exports sqlite views from database if -q is set.
+        """
+        # Gather the names of report views in the db
+        view_names = STORAGE.view_names()
+
+        # Export report views to tsv files
+        for view in view_names:
+
+            rows = STORAGE.view_rows(view)
+            if self.meta['coalesce']:
+                rows = Coalescer().coalesce(rows)
+            row = ' '
+            # Get outfile to write to
+            outfile = getattr(self, "l_" + view)
+            row = next(rows, None)
+            if row is None:
+                print("  No records found in view {}. Nothing to export".format(view))
+                outfile.close()
+                os.remove(outfile.name)
+            else:
+                print("  Exporting view {} from database".format(view))
+                # For each row join using tab and output to file
+                while row is not None:
+                    values = []
+                    try:
+                        for cell in row:
+                            if type(cell) is str or type(cell) is unicode:
+                                values.append(cell)
+                            else:
+                                values.append(unicode(cell))
+                    except:
+                        values.append("ERROR_IN_VALUE")
+                        print "ERROR: ", row
+                    m_row = u'\t'.join(values)
+                    m_row = m_row + u'\n'
+                    outfile.write(m_row.encode("utf-8"))
+                    row = next(rows, None)
+
+
+    def export_sqlite_views_parallel(self):
+        """
+        Exports the report views on a pool of worker threads, each
+        reading the committed database over its own read-only
+        connection. The output files are the same as export_sqlite_views.
+        """
+        # Readers only see committed rows. WAL lets them read
+        # while the database is still open for writing.
+        STORAGE.commit()
+        SQL_CON.execute('PRAGMA journal_mode = WAL')
+        db_filename = STORAGE.db_filename
+
+        views = []
+        for i in self.r_queries['process_list']:
+            # The workers write the report files themselves
+            outfile = getattr(self, 'l_' + i['report_name'])
+            outfile.close()
+            views.append((i['report_name'], outfile.name))
+
+        def export(item):
+            view, r_file = item
+            try:
+                return export_report_file(db_filename, "SELECT * FROM %s" % (view), r_file,
+                                          self.meta['coalesce'])
+            except Exception as exp:
+                return exp
+
+        pool = ThreadPool(min(self.meta['workers'], len(views)))
+        try:
+            results = pool.map(export, views)
+        finally:
+            pool.close()
+            pool.join()
+
+        # Put the database back in its default journal mode
+        SQL_CON.execute('PRAGMA journal_mode = DELETE')
+
+        for (view, r_file), result in zip(views, results):
+            if isinstance(result, Exception):
+                print("  SQLite error when exporting view {}. {}".format(view, str(result)))
+            elif result == 0:
+                print("  No records found in view {}. Nothing to export".format(view))
+            else:
+                print("  Exporting view {} from database".format(view))
+
+
+class Output(dict):
+    """
+    Output class handles outputting parsed
+    fsevent records to report files.
+    """
+    COLUMNS = COLUMNS
+    # Record columns written to the TSV files, in R_COLUMNS order
+    TSV_COLUMNS = [
+                u'id_hex',
+                u'node_id',
+                u'fullpath',
+                u'type',
+                u'flags',
+                u'approx_dates_plus_minus_one_day',
+                u'source',
+                u'source_modified_time'
+    ]
+    R_COLUMNS = [
+                u'event_id',
+                u'node_id',
+                u'fullpath',
+                u'type',
+                u'flags',
+                u'approx_dates_plus_minus_one_day',
+                u'source',
+                u'source_modified_time'
+    ]
+
+
+    def __init__(self, attribs):
+        """
+        Update column values.
+        """
+        self.update(attribs)
+
+
+    @staticmethod
+    def print_columns(outfile, coalesce=False):
+        """
+        Output column header to report files.
+        coalesce: Write the header of coalesced rows.
+        """
+        values = []
+        for key in (COALESCED_COLUMNS if coalesce else Output.R_COLUMNS):
+            values.append(str(key))
+        row = '\t'.join(values)
+        row = row + '\n'
+        outfile.write(row)
+
+
+    def append_row(self):
+        """
+        Output parsed fsevents row to database.
+        """
+        values = []
+
+        for key in Output.COLUMNS:
+            values.append(str(self[key]))
+
+        STORAGE.append(values)
+
+
+class StreamReports(object):
+    """
+    StreamReports runs the report queries over records arriving in
+    event id order without building FSEvents.sqlite.
+
+    Records are loaded in chunks into an in-memory table named
+    fsevents_sorted_by_event_id, each report view is selected and
+    appended to its report file, and the chunk is deleted. Views
+    that need all rows at once (grouping, ordering, aggregates) are
+    instead run at the end against a temporary database holding
+    every record.
+    """
+
+    def __init__(self, handler):
+        """
+        """
+        self.handler = handler
+        self.rows = []
+        self.counts = {}
+        self.temp_db = None
+
+        self.views = []
+        self.full_views = []
+        for i in handler.r_queries['process_list']:
+            self.counts[i['report_name']] = 0
+            self.views.append(i['report_name'])
+            if NON_STREAMABLE_QUERY.search(i['query']):
+                self.full_views.append(i['report_name'])
+            Output.print_columns(getattr(handler, 'l_' + i['report_name']), handler.meta['coalesce'])
+
+        # Runs of a streamed view carry on into the next chunk
+        self.coalescers = {}
+        if handler.meta['coalesce']:
+            for view in self.views:
+                self.coalescers[view] = Coalescer()
+
+        self.insert = 'INSERT INTO fsevents_sorted_by_event_id ({}) VALUES ({})'.format(
+            ', '.join(Output.COLUMNS), ', '.join('?' * len(Output.COLUMNS)))
+
+        self.chunk_con = self.connect(':memory:', [v for v in self.views if v not in self.full_views])
+        self.chunk_tran = TimedCursor(self.chunk_con.cursor(), handler.metrics)
+
+        if self.full_views:
+            fd, self.temp_db = tempfile.mkstemp(
+                prefix='fse_reports_',
+                suffix='.sqlite',
+                dir=os.path.join(handler.meta['outdir'], handler.meta['casename'])
+            )
+            os.close(fd)
+            self.full_con = self.connect(self.temp_db, self.full_views)
+            self.full_tran = TimedCursor(self.full_con.cursor(), handler.metrics)
+
+    def connect(self, db_filename, views):
+        """
+        Return a connection with the sorted table
+        and the report views in views created.
+        """
+        con = sqlite3.connect(db_filename)
+        # Values are utf-8 encoded str as written to All_FSEVENTS.tsv
+        con.text_factory = str
+        con.execute(TABLE_SCHEMA.format('fsevents_sorted_by_event_id'))
+        for i in self.handler.r_queries['process_list']:
+            if i['report_name'] not in views:
+                continue
+            try:
+                con.execute(report_query(i))
+            except Exception as exp:
+                print("SQLite error when executing query in json file. {}".format(str(exp)))
+                sys.exit(0)
+        return con
+
+    def add(self, row):
+        """
+        Add the next record row in event id order.
+        """
+        self.rows.append(row)
+        if len(self.rows) >= REPORT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Run the streamed views over the buffered rows.
+        """
+        if not self.rows:
+            return
+        self.chunk_tran.executemany(self.insert, self.rows)
+        for view in self.views:
+            if view not in self.full_views:
+                self.export_view(self.chunk_tran, view)
+        self.chunk_tran.execute('DELETE FROM fsevents_sorted_by_event_id')
+        if self.full_views:
+            self.full_tran.executemany(self.insert, self.rows)
+        self.rows = []
+
+    def export_view(self, cursor, view):
+        """
+        Append the rows selected by the view to its report file.
+        """
+        cursor.execute('SELECT * FROM %s' % (view))
+        rows = cursor
+        if view in self.coalescers:
+            rows = self.coalescers[view].coalesce(cursor, last=False)
+        self.write_rows(view, rows)
+
+    def write_rows(self, view, rows):
+        """
+        Append rows to the report file of a view.
+        """
+        outfile = getattr(self.handler, 'l_' + view)
+        for row in rows:
+            values = []
+            for cell in row:
+                if type(cell) is str:
+                    values.append(cell)
+                else:
+                    values.append(unicode(cell).encode('utf-8'))
+            outfile.write('\t'.join(values) + '\n')
+            self.counts[view] += 1
+
+    def close(self):
+        """
+        Close the report databases and remove the temporary one.
+        """
+        self.chunk_con.close()
+        if self.full_views:
+            self.full_con.close()
+            os.remove(self.temp_db)
+
+    def finish(self):
+        """
+        Flush the last chunk, run the remaining views
+        and remove report files without records.
+        """
+        self.flush()
+        if self.full_views:
+            self.full_con.commit()
+            for view in self.full_views:
+                self.export_view(self.full_tran, view)
+        self.close()
+
+        for view, coalescer in self.coalescers.items():
+            row = coalescer.close()
+            if row is not None:
+                self.write_rows(view, [row])
+
+        for view in self.views:
+            outfile = getattr(self.handler, 'l_' + view)
+            if self.counts[view] == 0:
+                print("  No records found in view {}. Nothing to export".format(view))
+                outfile.close()
+                os.remove(outfile.name)
+            else:
+                print("  Exporting view {} from database".format(view))
+
+
+class WatchReports(StreamReports):
+    """
+    WatchReports appends the report rows of the records added by
+    --watch. Views that can run over the new records alone are run
+    over them in an in-memory table like StreamReports and their rows
+    appended to the report file. The other views are exported again
+    from the committed database.
+    """
+
+    def __init__(self, handler):
+        """
+        """
+        self.handler = handler
+        self.counts = {}
+        self.views = []
+        self.full_views = []
+        # --coalesce can not be used with --watch
+        self.coalescers = {}
+        self.db_filename = handler.storage.db_filename
+        for i in handler.r_queries['process_list']:
+            self.counts[i['report_name']] = 0
+            self.views.append(i['report_name'])
+            if NON_STREAMABLE_QUERY.search(i['query']):
+                self.full_views.append(i['report_name'])
+            # Report files are reopened to append to
+            outfile = getattr(handler, 'l_' + i['report_name'])
+            if not outfile.closed:
+                outfile.close()
+            if os.path.isfile(outfile.name) and os.path.getsize(outfile.name) == 0:
+                os.remove(outfile.name)
+
+        self.insert = 'INSERT INTO fsevents_sorted_by_event_id ({}) VALUES ({})'.format(
+            ', '.join(Output.COLUMNS), ', '.join('?' * len(Output.COLUMNS)))
+        self.chunk_con = self.connect(':memory:', [v for v in self.views if v not in self.full_views])
+        self.chunk_tran = TimedCursor(self.chunk_con.cursor(), handler.metrics)
+
+    def add_rows(self, first_rowid):
+        """
+        Run the views over the rows of the sorted table after first_rowid.
+        """
+        SQL_TRAN.execute('SELECT {} FROM fsevents_sorted_by_event_id WHERE rowid > ?'.format(
+            ', '.join(Output.COLUMNS)), (first_rowid,))
+        self.chunk_tran.executemany(self.insert, SQL_TRAN.fetchall())
+        for view in self.views:
+            if view in self.full_views:
+                continue
+            r_file = os.path.join(self.handler.meta['outdir'], self.handler.meta['casename'], view + '.tsv')
+            is_new = not os.path.isfile(r_file)
+            outfile = open(r_file, 'ab')
+            if is_new:
+                Output.print_columns(outfile)
+            setattr(self.handler, 'l_' + view, outfile)
+            count = self.counts[view]
+            self.export_view(self.chunk_tran, view)
+            outfile.close()
+            if is_new and self.counts[view] == count:
+                os.remove(r_file)
+        self.chunk_tran.execute('DELETE FROM fsevents_sorted_by_event_id')
+
+        for view in self.full_views:
+            r_file = os.path.join(self.handler.meta['outdir'], self.handler.meta['casename'], view + '.tsv')
+            export_report_file(self.db_filename, "SELECT * FROM %s" % (view), r_file)
+
+    def close(self):
+        """
+        Close the in-memory database and let --requery
+        skip the reports until they change.
+        """
+        self.chunk_con.close()
+        write_report_hashes(
+            os.path.join(self.handler.meta['outdir'], self.handler.meta['casename']),
+            self.handler.r_queries,
+            STORAGE.fingerprint()
+        )
+
+
+def report_query(report):
+    """
+    Return the report's CREATE VIEW statement with
+    * replaced by the report columns.
+    """
+    query = report['query'].split("*")
+    return query[0] + REPORT_COLUMNS + query[1]
+
+
+def reports_fingerprint(fingerprint, coalesce):
+    """
+    Return the fingerprint the report hashes are taken with. Coalesced
+    reports are not the same as full ones, so they are told apart.
+    """
+    if coalesce:
+        return fingerprint + ':coalesced'
+    return fingerprint
+
+
+def report_hash(report, fingerprint):
+    """
+    Return the hash of a report's view definition
+    and the database it was exported from.
+    """
+    return hashlib.sha1(
+        report_query(report).encode('utf-8') + b'\n' + fingerprint.encode('utf-8')
+    ).hexdigest()
+
+
+def read_report_hashes(out_dir):
+    """
+    Return the report hashes of the last export to out_dir.
+    """
+    h_file = os.path.join(out_dir, REPORT_HASHES)
+    try:
+        with open(h_file) as h_data:
+            return json.load(h_data)
+    except (IOError, ValueError):
+        return {}
+
+
+def write_report_hashes(out_dir, r_queries, fingerprint, hashes=None):
+    """
+    Record the hash of each report in r_queries and whether its
+    report file was written. Entries of other reports in hashes
+    are kept.
+    """
+    hashes = dict(hashes or {})
+    for i in r_queries['process_list']:
+        r_file = os.path.join(out_dir, i['report_name'] + '.tsv')
+        hashes[i['report_name']] = {
+            'hash': report_hash(i, fingerprint),
+            'exported': os.path.exists(r_file)
+        }
+    with open(os.path.join(out_dir, REPORT_HASHES), 'w') as h_file:
+        json.dump(hashes, h_file, indent=2, sort_keys=True)
+
+
+def connect_read_only(db_filename):
+    """
+    Open a connection to a parsed database that can not change it.
+    """
+    con = sqlite3.connect(db_filename)
+    con.execute('PRAGMA query_only = ON')
+    return con
+
+
+def view_select(report):
+    """
+    Return the select statement of a report's view.
+    """
+    match = VIEW_SELECT.match(report_query(report))
+    if match is None:
+        raise ValueError('Report query is not a CREATE VIEW statement.')
+    return match.group(1)
+
+
+def export_report_file(db_filename, select, r_file, coalesce=False):
+    """
+    Run a report's select statement over its own read-only connection
+    and write the rows to r_file the same way export_sqlite_views does.
+    The file is removed when there are no rows.
+    coalesce: Write runs of repeated records as one row.
+    Returns
+        count: The number of rows exported
+    """
+    con = connect_read_only(db_filename)
+    count = 0
+    try:
+        rows = con.execute(select)
+        if coalesce:
+            rows = Coalescer().coalesce(rows)
+        with open(r_file, 'wb') as outfile:
+            Output.print_columns(outfile, coalesce)
+            for row in rows:
+                values = []
+                try:
+                    for cell in row:
+                        if type(cell) is str or type(cell) is unicode:
+                            values.append(cell)
+                        else:
+                            values.append(unicode(cell))
+                except:
+                    values.append("ERROR_IN_VALUE")
+                    print "ERROR: ", row
+                m_row = u'\t'.join(values)
+                m_row = m_row + u'\n'
+                outfile.write(m_row.encode("utf-8"))
+                count += 1
+    finally:
+        con.close()
+
+    if count == 0:
+        os.remove(r_file)
+    return count
+
+
+def requery_reports(meta):
+    """
+    Export the reports in the report queries file from an existing
+    database without parsing. Reports whose view definition and
+    database are unchanged since their last export are skipped and
+    the rest are exported concurrently, each over its own read-only
+    connection.
+    """
+    try:
+        r_queries = json.load(open(meta['reportqueries']))
+        for i in r_queries['process_list']:
+            i['report_name']
+            i['query']
+    except Exception as exp:
+        print('An error occurred while reading the json file. \n{}'.format(str(exp)))
+        sys.exit(0)
+
+    out_dir = os.path.join(meta['outdir'], meta['casename'])
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    try:
+        con = connect_read_only(meta['requery'])
+        fingerprint = reports_fingerprint(database_fingerprint(con.cursor()), meta['coalesce'])
+        con.close()
+    except sqlite3.Error as exp:
+        print('Unable to read the fsevents tables from {}.\n{}'.format(meta['requery'], str(exp)))
+        sys.exit(0)
+
+    hashes = read_report_hashes(out_dir)
+
+    # Reports whose output is not current
+    pending = []
+    for i in r_queries['process_list']:
+        r_file = os.path.join(out_dir, i['report_name'] + '.tsv')
+        last = hashes.get(i['report_name'])
+        if last is not None and last['hash'] == report_hash(i, fingerprint) and \
+                last['exported'] == os.path.exists(r_file):
+            print("  Report {} is current. Skipping".format(i['report_name']))
+            continue
+        pending.append((i, r_file))
+
+    print('\n[STARTED] {} UTC Exporting {} reports from database '
+          'to TSV files.'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime()), len(pending)))
+
+    def export(item):
+        report, r_file = item
+        try:
+            # Views can not be created in a read-only database,
+            # so the select statement of the view is run instead
+            return export_report_file(meta['requery'], view_select(report), r_file, meta['coalesce'])
+        except Exception as exp:
+            return exp
+
+    pool = ThreadPool(min(meta['workers'], len(pending)) or 1)
+    try:
+        results = pool.map(export, pending)
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = []
+    for (report, r_file), result in zip(pending, results):
+        if isinstance(result, Exception):
+            print("  SQLite error when executing query for report {}. {}".format(report['report_name'], str(result)))
+            failed.append(report['report_name'])
+        elif result == 0:
+            print("  No records found in view {}. Nothing to export".format(report['report_name']))
+        else:
+            print("  Exported {} records from view {}".format(result, report['report_name']))
+
+    # Failed reports are left out so they are retried next time
+    current = dict(r_queries, process_list=[i for i in r_queries['process_list']
+                                            if i['report_name'] not in failed])
+    for name in failed:
+        hashes.pop(name, None)
+    write_report_hashes(out_dir, current, fingerprint, hashes)
+
+    print('[FINISHED] {} UTC Exporting reports from database '
+          'to TSV files.\n'.format(strftime("%m/%d/%Y %H:%M:%S", gmtime())))
+    print("  Reports exported to:\n  '{}'\n".format(out_dir))
+
+
+def create_sqlite_db(self):
+    """
+    Creates our output database for parsed records
+    and connects to it.
+    """
+    storage = STORAGE_BACKENDS[self.meta.get('storage', DEFAULT_STORAGE)]
+    db_filename = os.path.join(self.meta['outdir'], self.meta['casename'], storage.filename)
+    if not os.path.isdir(os.path.join(self.meta['outdir'], self.meta['casename'])):
+        os.makedirs(os.path.join(self.meta['outdir'], self.meta['casename']))
+
+    # If database already exists delete it
+    try:
+        if os.path.isfile(db_filename):
+            os.remove(db_filename)
+    except:
+        print("\nThe following output file is currently in use by "
+              "another program.\n -{}\nPlease ensure that the file is closed."
+              " Then rerun the parser.".format(db_filename))
+        sys.exit(0)
+
+    # Setup global
+    global STORAGE
+
+    STORAGE = storage(db_filename, self.metrics)
+
+    # Create the table and the report database views
+    views = []
+    if self.r_queries:
+        for i in self.r_queries['process_list']:
+            views.append((i['report_name'], report_query(i)))
+    try:
+        STORAGE.create(views)
+    except Exception as exp:
+        print("{} error when executing query in json file. {}".format(STORAGE.label, str(exp)))
+        sys.exit(0)
+
+    # Setup globals
+    global SQL_CON
+    global SQL_TRAN
+
+    # The connection and transaction cursor of the database
+    # Statement execution times are recorded in the run metrics
+    SQL_CON = STORAGE.con
+    SQL_TRAN = STORAGE.cursor
+
+    # Kept so that batch runs can switch between host databases
+    self.storage = STORAGE
+
+
+def use_database(handler):
+    """
+    Point the database globals at the handler's database.
+    """
+    global STORAGE
+    global SQL_CON
+    global SQL_TRAN
+
+    STORAGE = handler.storage
+    SQL_CON = STORAGE.con
+    SQL_TRAN = STORAGE.cursor
+
+
+def reorder_sqlite_db(self):
+    """
+    Order database table rows by id.
+    Returns
+        count: The number of rows in the table
+    """
+    return STORAGE.sort()
+
+
+if __name__ == '__main__':
+    """
+    Init checks to see if running appropriate python version.
+    If it is, start the parser.
+    """
+    if sys.version_info > (3, 0):
+        print('\nError: FSEventsParser does not currently support running under Python 3.x'
+              '. Python 2.7 recommended.\n')
+    else:
+        main()
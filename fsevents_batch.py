@@ -0,0 +1,280 @@
+#!/usr/bin/python
+
+# FSEvents Batch Python Module
+# ------------------------------------------------------
+# Reads a manifest of hosts and decodes the fsevents files of every
+# host on one shared pool of worker processes. Files of different
+# hosts are handed to the pool in turn so that a host with many files
+# does not hold up the others. Decoded records are returned to the
+# caller host by host in file order.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import csv
+import collections
+import multiprocessing
+
+from fsevents_reader import (
+    FSEventDecoder,
+    SourceFile,
+    _file_reader,
+    is_fsevent_filename
+)
+from fsevents_diagnostics import Diagnostics
+from fsevents_metrics import Metrics
+
+# Files decoded or waiting in the pool per worker
+IN_FLIGHT_PER_WORKER = 4
+
+# Seed of the first file of a volume
+FIRST_SEED = (0, "Unknown")
+
+
+class Host(object):
+    """
+    A host listed in the batch manifest.
+    """
+
+    def __init__(self, casename, source, sourcetype):
+        """
+        """
+        self.casename = casename
+        self.source = source
+        self.sourcetype = sourcetype
+
+
+def read_manifest(filename):
+    """
+    Read the batch manifest. Each line holds the casename, source
+    and source type of a host separated by a comma or a tab. Blank
+    lines, lines starting with # and a casename header are skipped.
+    Raises ValueError when a line can not be used.
+    """
+    hosts = []
+    with open(filename, 'rb') as m_file:
+        lines = [line for line in m_file.read().splitlines()
+                 if line.strip() and not line.strip().startswith('#')]
+    delimiter = '\t' if lines and '\t' in lines[0] else ','
+    for line_no, row in enumerate(csv.reader(lines, delimiter=delimiter)):
+        row = [value.strip() for value in row]
+        if line_no == 0 and row[0].lower() == 'casename':
+            continue
+        if len(row) != 3:
+            raise ValueError('Manifest line "{}" must have a casename, source and source type.'.format(
+                delimiter.join(row)))
+        casename, source, sourcetype = row
+        if sourcetype.lower() not in ('folder', 'image'):
+            raise ValueError('Incorrect source type "{}" for {}. The following are valid '
+                             'options: folder, image'.format(sourcetype, casename))
+        if not os.path.exists(source):
+            raise ValueError('{} of {} does not exist.'.format(source, casename))
+        if casename in [host.casename for host in hosts]:
+            raise ValueError('Casename {} is listed more than once.'.format(casename))
+        hosts.append(Host(casename, source, sourcetype.lower()))
+    if not hosts:
+        raise ValueError('No hosts found in the manifest.')
+    return hosts
+
+
+def chain_units(host_index, chain, files, use_file_mod_dates, raw, record_filter=None):
+    """
+    Return a work unit for each file of a volume. Each file's time
+    range is seeded from the last allocated fsevent file before it,
+    assuming that file parses. The caller decodes a file again when
+    that turns out to be wrong.
+    raw: Read the file data now instead of in the worker. Used for
+         image files that can only be opened in this process.
+    record_filter: Optional fsevents_filters.RecordFilter for the decoder.
+    """
+    units = []
+    seed = FIRST_SEED
+    for index, src in enumerate(files):
+        units.append({
+            'host': host_index,
+            'chain': chain,
+            'index': index,
+            'name': src.name,
+            'fullpath': src.fullpath,
+            'm_time': src.m_time,
+            'reader': src.reader if raw else None,
+            'seed': seed,
+            'use_file_mod_dates': use_file_mod_dates,
+            'record_filter': record_filter
+        })
+        if use_file_mod_dates and not src.is_carved_gzip:
+            seed = (int(src.name, 16), src.m_time)
+    return units
+
+
+def decode_unit(unit):
+    """
+    Decode one file of a work unit. Runs in a worker process.
+    Returns the records, diagnostics, statistic counters and metrics.
+    """
+    if unit.get('data') is not None:
+        data = unit['data']
+        reader = lambda: data
+    elif unit.get('blob'):
+        # Image file copied to a job queue folder
+        reader = _file_reader(unit['blob'])
+    else:
+        reader = _file_reader(unit['fullpath'])
+    src = SourceFile(unit['name'], unit['fullpath'], unit['m_time'], reader)
+
+    diagnostics = Diagnostics()
+    metrics = Metrics()
+    decoder = FSEventDecoder(unit['use_file_mod_dates'], diagnostics, metrics)
+    decoder.prev_last_wd, decoder.prev_mod_date = unit['seed']
+    decoder.record_filter = unit.get('record_filter')
+
+    result = {'error': None}
+    try:
+        result['records'] = list(decoder.decode(src))
+    except (IOError, OSError) as exp:
+        # Permission errors are reported by the caller
+        result['records'] = []
+        result['error'] = str(exp)
+
+    result.update({
+        'diagnostics': diagnostics.state(),
+        'parsed': decoder.parsed_file_count == 1,
+        # The file seeds the next one, also when skipped by the filters
+        'seeds_next': (decoder.prev_last_wd, decoder.prev_mod_date) != tuple(unit['seed']),
+        'is_carved_gzip': src.is_carved_gzip,
+        'all_files_count': decoder.all_files_count,
+        'parsed_file_count': decoder.parsed_file_count,
+        'error_file_count': decoder.error_file_count,
+        'all_records_count': decoder.all_records_count,
+        'skipped_file_count': decoder.skipped_file_count,
+        'skipped_page_count': decoder.skipped_page_count,
+        'filtered_record_count': decoder.filtered_record_count,
+        'stages': metrics.stages,
+        'files': metrics.files,
+        'caches': metrics.caches
+    })
+    return result
+
+
+class SeedTracker(object):
+    """
+    Tracks the last allocated file that parsed in each volume and
+    decodes a file again when it was seeded from a file that did not.
+    """
+
+    def __init__(self):
+        """
+        """
+        self.seeds = {}
+        self.redecoded = 0
+
+    def check(self, unit, result):
+        """
+        Return the result of the unit decoded with the correct seed.
+        Units of a volume must be checked in file order.
+        """
+        key = (unit['host'], unit['chain'])
+        seed = self.seeds.get(key, FIRST_SEED)
+        # Carved gzips do not use their seed
+        if tuple(unit['seed']) != seed and is_fsevent_filename(unit['name']):
+            # A file before this one did not parse
+            unit['seed'] = seed
+            result = decode_unit(unit)
+            self.redecoded += 1
+        if result['seeds_next']:
+            self.seeds[key] = (int(unit['name'], 16), unit['m_time'])
+        return result
+
+
+class BatchScheduler(object):
+    """
+    BatchScheduler runs the work units of all hosts on one pool of
+    worker processes.
+
+    Units are submitted one host at a time in turn, and at most
+    IN_FLIGHT_PER_WORKER units per worker are outstanding, so memory
+    is bounded and every host makes progress. Results are returned in
+    submission order, which keeps the files of each volume in order.
+    """
+
+    def __init__(self, workers):
+        """
+        workers: Number of worker processes.
+        """
+        self.workers = workers
+        self.queues = collections.OrderedDict()
+        self.total = 0
+        self.tracker = SeedTracker()
+
+    @property
+    def redecoded(self):
+        """
+        Number of files decoded again with a corrected seed.
+        """
+        return self.tracker.redecoded
+
+    def add(self, units):
+        """
+        Queue the work units of a host volume.
+        """
+        for unit in units:
+            self.queues.setdefault(unit['host'], collections.deque()).append(unit)
+            self.total += 1
+
+    def next_units(self):
+        """
+        Yield the queued units taking one from each host in turn.
+        """
+        while self.queues:
+            for host in list(self.queues):
+                queue = self.queues[host]
+                yield queue.popleft()
+                if not queue:
+                    del self.queues[host]
+
+    def results(self):
+        """
+        Yield (unit, result) for every unit. A unit whose seed does
+        not match the files that actually parsed before it is decoded
+        again with the correct seed.
+        """
+        pool = multiprocessing.Pool(self.workers)
+        limit = self.workers * IN_FLIGHT_PER_WORKER
+        in_flight = collections.deque()
+        units = self.next_units()
+        try:
+            while True:
+                while len(in_flight) < limit:
+                    unit = next(units, None)
+                    if unit is None:
+                        break
+                    if unit['reader'] is not None:
+                        # Image files are read here and sent with the unit
+                        unit['data'] = unit['reader']()
+                    unit['reader'] = None
+                    in_flight.append((unit, pool.apply_async(decode_unit, (unit,))))
+                if not in_flight:
+                    break
+
+                unit, async_result = in_flight.popleft()
+                result = self.tracker.check(unit, async_result.get())
+
+                unit.pop('data', None)
+                yield unit, result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,599 @@
+#!/usr/bin/python
+
+# FSEvents Parser Benchmark Python Script
+# ------------------------------------------------------
+# Measures the throughput of each parsing stage against a corpus
+# written by fsevents_corpus.py or any existing fsevents folder.
+# Results are written to a json baseline that can be compared
+# against the results of another version.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import sys
+import os
+import re
+import json
+import time
+import shutil
+import platform
+import tempfile
+import multiprocessing
+from optparse import OptionParser
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not reported
+    resource = None
+
+import fsevents_reader
+from fsevents_reader import FSEventDecoder
+from fsevents_metrics import NullMetrics
+from fsevents_corpus import CorpusGenerator
+from fsevents_sort import ExternalSorter
+
+PARSER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FSEParser_V4.0.py')
+
+# Stages in the order the parser runs them
+STAGES = [
+    'decompression',
+    'dls_header_search',
+    'find_date',
+    'record_decoding',
+    'apply_date',
+    'sqlite_ingest',
+    'reorder_sqlite_db',
+    'export_fsevent_report',
+    'export_sqlite_views',
+    'external_sort'
+]
+
+
+def get_options():
+    """
+    Get needed options for benchmarking
+    """
+    usage = "usage: %prog [-s SOURCE | -n FILES -p PAGES -r RECORDS] [-b BASELINE --compare OLD_BASELINE]"
+    options = OptionParser(usage=usage)
+    options.add_option("-s",
+                       action="store",
+                       type="string",
+                       dest="source",
+                       default=False,
+                       help="OPTIONAL. Existing fsevents folder to benchmark. "
+                            "A corpus is generated when not provided")
+    options.add_option("-n",
+                       action="store",
+                       type="int",
+                       dest="files",
+                       default=20,
+                       help="OPTIONAL. Number of generated fsevents files. Defaults to 20")
+    options.add_option("-p",
+                       action="store",
+                       type="int",
+                       dest="pages",
+                       default=4,
+                       help="OPTIONAL. DLS pages per generated file. Defaults to 4")
+    options.add_option("-r",
+                       action="store",
+                       type="int",
+                       dest="records",
+                       default=500,
+                       help="OPTIONAL. Records per generated DLS page. Defaults to 500")
+    options.add_option("-v",
+                       action="store",
+                       type="string",
+                       dest="version",
+                       default='mixed',
+                       help="OPTIONAL. DLS version of generated pages, '1', '2' or 'mixed'")
+    options.add_option("-q",
+                       action="store",
+                       type="string",
+                       dest="report_queries",
+                       default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_queries.json'),
+                       help="OPTIONAL. The report_queries.json file used for the "
+                            "export_sqlite_views stage")
+    options.add_option("--stages",
+                       action="store",
+                       type="string",
+                       dest="stages",
+                       default=','.join(STAGES),
+                       help="OPTIONAL. Comma separated stages to run. Defaults to all")
+    options.add_option("--repeat",
+                       action="store",
+                       type="int",
+                       dest="repeat",
+                       default=3,
+                       help="OPTIONAL. Runs per stage, the fastest is kept. Defaults to 3")
+    options.add_option("-b",
+                       action="store",
+                       type="string",
+                       dest="baseline",
+                       default=False,
+                       help="OPTIONAL. Write results to this json baseline file")
+    options.add_option("--compare",
+                       action="store",
+                       type="string",
+                       dest="compare",
+                       default=False,
+                       help="OPTIONAL. Compare results against this json baseline file")
+    options.add_option("--tolerance",
+                       action="store",
+                       type="float",
+                       dest="tolerance",
+                       default=10.0,
+                       help="OPTIONAL. Percent a stage may be slower than the compared "
+                            "baseline before it is reported as a regression. Defaults to 10")
+
+    # Return options to caller #
+    return options
+
+
+def load_parser():
+    """
+    Import the FSEParser script, whose file name is not a valid module name.
+    """
+    try:
+        import imp
+        return imp.load_source('fseparser', PARSER_SCRIPT)
+    except ImportError:
+        from importlib.machinery import SourceFileLoader
+        return SourceFileLoader('fseparser', PARSER_SCRIPT).load_module()
+
+
+def parser_version():
+    """
+    Return the VERSION of the FSEParser script. The script only runs
+    under Python 2, so under Python 3 it is read from the source and
+    only the stages of the decoder can be measured.
+    """
+    try:
+        return load_parser().VERSION
+    except SyntaxError:
+        with open(PARSER_SCRIPT) as p_file:
+            return re.search(r"^VERSION = '([^']*)'", p_file.read(), re.M).group(1)
+
+
+def unbound(method):
+    """
+    Return the plain function of an FSEventHandler method so it
+    can be called with a BenchHandler.
+    """
+    return getattr(method, 'im_func', getattr(method, '__func__', method))
+
+
+def peak_rss_kb():
+    """
+    Return the peak resident set size of the process in KB.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and KB elsewhere
+    if sys.platform == 'darwin':
+        rss = rss // 1024
+    return rss
+
+
+class Timer(object):
+    """
+    Context manager measuring wall and CPU seconds.
+    """
+
+    def __enter__(self):
+        """
+        """
+        self.start = time.time()
+        self.cpu_start = time.clock() if not hasattr(time, 'process_time') else time.process_time()
+        return self
+
+    def __exit__(self, *args):
+        """
+        """
+        cpu_end = time.clock() if not hasattr(time, 'process_time') else time.process_time()
+        self.seconds = time.time() - self.start
+        self.cpu_seconds = cpu_end - self.cpu_start
+
+
+class BenchHandler(object):
+    """
+    Minimal stand-in for FSEventHandler holding what the
+    database and export functions read.
+    """
+
+    def __init__(self, workdir, report_queries):
+        """
+        """
+        self.meta = {
+            'casename': 'bench',
+            'outdir': workdir,
+            'sourcetype': 'folder',
+            'source': '',
+            'reportqueries': report_queries,
+            'coalesce': False
+        }
+        self.r_queries = json.load(open(report_queries)) if report_queries else False
+        self.metrics = NullMetrics()
+
+
+class CaptureDecoder(FSEventDecoder):
+    """
+    Decoder that stores each decompressed file with its
+    per file state instead of parsing it.
+    """
+
+    STATE = ['src_fullpath', 'src_filename', 'm_time', 'is_carved_gzip', 'time_range_src_mod']
+
+    def __init__(self, *args, **kwargs):
+        """
+        """
+        FSEventDecoder.__init__(self, *args, **kwargs)
+        self.captured = []
+
+    def parse(self, buf):
+        """
+        Keep the file instead of parsing it.
+        """
+        state = dict((key, getattr(self, key)) for key in self.STATE)
+        self.captured.append((state, buf, list(self.my_dls)))
+        return iter(())
+
+
+class NoDateDecoder(FSEventDecoder):
+    """
+    Decoder with date application disabled,
+    measuring record decoding alone.
+    """
+
+    def apply_date(self, wd):
+        """
+        """
+        return ''
+
+
+def capture_files(corpus):
+    """
+    Decompress every file of the corpus and return the CaptureDecoder
+    holding them.
+    """
+    decoder = CaptureDecoder(fsevents_reader.check_file_mod_dates(corpus))
+    for src in fsevents_reader.folder_files(corpus):
+        for record in decoder.decode(src):
+            pass
+    return decoder
+
+
+def stage_decompression(ctx):
+    """
+    Decompress every file. Bytes are compressed input bytes.
+    """
+    files = fsevents_reader.folder_files(ctx['corpus'])
+    raw = []
+    for src in files:
+        raw.append(src.reader())
+    size = sum(len(data) for data in raw)
+    with Timer() as timer:
+        for data in raw:
+            try:
+                fsevents_reader.decompress(data)
+            except Exception:
+                pass
+    return timer, ctx['records'], size
+
+
+def stage_dls_header_search(ctx):
+    """
+    Find the DLS pages of every decompressed file.
+    """
+    captured = capture_files(ctx['corpus']).captured
+    decoder = FSEventDecoder()
+    with Timer() as timer:
+        for state, buf, my_dls in captured:
+            decoder.dls_header_search(buf, state['src_fullpath'])
+    return timer, ctx['records'], sum(len(buf) for state, buf, my_dls in captured)
+
+
+def stage_find_date(ctx):
+    """
+    Search every decompressed file for date markers.
+    """
+    captured_decoder = capture_files(ctx['corpus'])
+    decoder = FSEventDecoder(captured_decoder.use_file_mod_dates)
+    with Timer() as timer:
+        for state, buf, my_dls in captured_decoder.captured:
+            decoder.__dict__.update(state)
+            decoder.find_date(buf)
+    return timer, ctx['records'], sum(len(buf) for state, buf, my_dls in captured_decoder.captured)
+
+
+def stage_record_decoding(ctx):
+    """
+    Parse the records of every DLS page without dates.
+    """
+    captured_decoder = capture_files(ctx['corpus'])
+    decoder = NoDateDecoder(captured_decoder.use_file_mod_dates)
+    records = 0
+    with Timer() as timer:
+        for state, buf, my_dls in captured_decoder.captured:
+            decoder.__dict__.update(state)
+            decoder.my_dls = my_dls
+            for record in decoder.parse(buf):
+                records += 1
+    return timer, records, sum(len(buf) for state, buf, my_dls in captured_decoder.captured)
+
+
+def stage_apply_date(ctx):
+    """
+    Apply the approximate date to the event id of every record.
+    """
+    captured_decoder = capture_files(ctx['corpus'])
+    decoder = NoDateDecoder(captured_decoder.use_file_mod_dates)
+    files = []
+    for state, buf, my_dls in captured_decoder.captured:
+        decoder.__dict__.update(state)
+        decoder.my_dls = my_dls
+        wds = [record['id'] for record in decoder.parse(buf)]
+        FSEventDecoder.find_date(decoder, buf)
+        files.append((state, list(decoder.time_range), wds))
+
+    decoder = FSEventDecoder(captured_decoder.use_file_mod_dates)
+    records = 0
+    with Timer() as timer:
+        for state, time_range, wds in files:
+            decoder.__dict__.update(state)
+            decoder.time_range = time_range
+            for wd in wds:
+                decoder.apply_date(wd)
+            records += len(wds)
+    return timer, records, 0
+
+
+def ingest(ctx, parser, handler, records):
+    """
+    Create the database and insert the records.
+    """
+    parser.create_sqlite_db(handler)
+    for record in records:
+        parser.Output(record).append_row()
+    parser.STORAGE.commit()
+
+
+def db_size(handler):
+    """
+    Return the size of the output database.
+    """
+    return os.path.getsize(os.path.join(handler.meta['outdir'], 'bench', 'FSEvents.sqlite'))
+
+
+def stage_sqlite_ingest(ctx):
+    """
+    Insert every record into a new database. Bytes are database bytes.
+    """
+    parser = load_parser()
+    handler = BenchHandler(ctx['workdir'], ctx['report_queries'])
+    records = list(fsevents_reader.iter_records(ctx['corpus'], 'folder'))
+    with Timer() as timer:
+        ingest(ctx, parser, handler, records)
+    return timer, len(records), db_size(handler)
+
+
+def stage_reorder_sqlite_db(ctx):
+    """
+    Copy the fsevents table to the table sorted by event id.
+    """
+    parser = load_parser()
+    handler = BenchHandler(ctx['workdir'], ctx['report_queries'])
+    records = list(fsevents_reader.iter_records(ctx['corpus'], 'folder'))
+    ingest(ctx, parser, handler, records)
+    with Timer() as timer:
+        row_count = parser.reorder_sqlite_db(handler)
+        parser.STORAGE.commit()
+    return timer, row_count, db_size(handler)
+
+
+def stage_export_fsevent_report(ctx):
+    """
+    Export the sorted table to All_FSEVENTS.tsv. Bytes are TSV bytes.
+    """
+    parser = load_parser()
+    handler = BenchHandler(ctx['workdir'], ctx['report_queries'])
+    records = list(fsevents_reader.iter_records(ctx['corpus'], 'folder'))
+    ingest(ctx, parser, handler, records)
+    row_count = parser.reorder_sqlite_db(handler)
+    out_name = os.path.join(ctx['workdir'], 'bench', 'All_FSEVENTS.tsv')
+    with open(out_name, 'wb') as outfile:
+        with Timer() as timer:
+            unbound(parser.FSEventHandler.export_fsevent_report)(handler, outfile, row_count)
+    return timer, row_count, os.path.getsize(out_name)
+
+
+def stage_export_sqlite_views(ctx):
+    """
+    Export every report view to its TSV file. Bytes are TSV bytes.
+    """
+    parser = load_parser()
+    handler = BenchHandler(ctx['workdir'], ctx['report_queries'])
+    records = list(fsevents_reader.iter_records(ctx['corpus'], 'folder'))
+    ingest(ctx, parser, handler, records)
+    row_count = parser.reorder_sqlite_db(handler)
+    r_files = []
+    if handler.r_queries:
+        for i in handler.r_queries['process_list']:
+            r_file = os.path.join(ctx['workdir'], 'bench', i['report_name'] + '.tsv')
+            setattr(handler, 'l_' + i['report_name'], open(r_file, 'wb'))
+            r_files.append(r_file)
+    with Timer() as timer:
+        unbound(parser.FSEventHandler.export_sqlite_views)(handler)
+    size = 0
+    for r_file in r_files:
+        if os.path.exists(r_file):
+            size += os.path.getsize(r_file)
+    return timer, row_count, size
+
+
+def stage_external_sort(ctx):
+    """
+    Sort every record by event id with the --tsv-only external
+    sort and merge it back. Bytes are TSV bytes.
+    """
+    parser = load_parser()
+    records = list(fsevents_reader.iter_records(ctx['corpus'], 'folder'))
+    r_index = [parser.Output.COLUMNS.index(key) for key in parser.Output.TSV_COLUMNS]
+    out_name = os.path.join(ctx['workdir'], 'bench', 'All_FSEVENTS.tsv')
+    with open(out_name, 'wb') as outfile:
+        with Timer() as timer:
+            sorter = ExternalSorter(tmpdir=os.path.join(ctx['workdir'], 'bench'))
+            for record in records:
+                sorter.add(record['id'], tuple([str(record[key]) for key in parser.Output.COLUMNS]))
+            for key, row in sorter:
+                outfile.write('\t'.join([row[i] for i in r_index]) + '\n')
+            sorter.close()
+    return timer, len(records), os.path.getsize(out_name)
+
+
+def run_stage(name, ctx, queue):
+    """
+    Run a stage in the current process and put its result on the queue.
+    """
+    # Silence the console output of the export functions
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        timer, records, size = globals()['stage_' + name](ctx)
+        queue.put({
+            'seconds': timer.seconds,
+            'cpu_seconds': timer.cpu_seconds,
+            'records': records,
+            'bytes': size,
+            'peak_rss_kb': peak_rss_kb()
+        })
+    except Exception as exp:
+        queue.put({'error': '{}: {}'.format(type(exp).__name__, exp)})
+
+
+def measure(name, ctx, repeat):
+    """
+    Run the stage repeat times, each in a fresh process so that its
+    peak RSS is not inflated by earlier stages, and keep the fastest run.
+    """
+    best = None
+    for i in range(repeat):
+        workdir = tempfile.mkdtemp(prefix='fse_bench_')
+        os.makedirs(os.path.join(workdir, 'bench'))
+        ctx = dict(ctx, workdir=workdir)
+        queue = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=run_stage, args=(name, ctx, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        shutil.rmtree(workdir, ignore_errors=True)
+        if 'error' in result:
+            return result
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+
+    seconds = best['seconds'] or 1e-9
+    best['records_per_sec'] = round(best['records'] / seconds, 1) if best['records'] else None
+    best['mb_per_sec'] = round(best['bytes'] / 1048576.0 / seconds, 3) if best['bytes'] else None
+    return best
+
+
+def compare(results, old, tolerance):
+    """
+    Print the change in wall time of each stage against an older baseline.
+    Returns the names of stages slower than the tolerance.
+    """
+    regressions = []
+    print('\n  {:<24}{:>12}{:>12}{:>10}'.format('Stage', 'Old (s)', 'New (s)', 'Change'))
+    for name in STAGES:
+        new_stage = results['stages'].get(name)
+        old_stage = old.get('stages', {}).get(name)
+        if not new_stage or not old_stage or 'seconds' not in new_stage or 'seconds' not in old_stage:
+            continue
+        change = (new_stage['seconds'] - old_stage['seconds']) / (old_stage['seconds'] or 1e-9) * 100
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('  {:<24}{:>12.4f}{:>12.4f}{:>9.1f}%{}'.format(
+            name, old_stage['seconds'], new_stage['seconds'], change, flag))
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark from the command line options.
+    """
+    options = get_options()
+    (opts, args) = options.parse_args()
+
+    stages = opts.stages.split(',')
+    for name in stages:
+        if name not in STAGES:
+            options.error('Unable to proceed. \n\nUnknown stage "%s". Available stages:\n %s\n' % (
+                name, '\n '.join(STAGES)))
+
+    corpus_params = None
+    tmp_corpus = None
+    if opts.source:
+        corpus = opts.source
+    else:
+        tmp_corpus = tempfile.mkdtemp(prefix='fse_corpus_')
+        corpus = os.path.join(tmp_corpus, '.fseventsd')
+        generator = CorpusGenerator(corpus, files=opts.files, pages=opts.pages,
+                                    records=opts.records, version=opts.version)
+        corpus_params = generator.generate()['params']
+
+    # Stages that do not produce records report rates against the corpus record count
+    records = sum(1 for record in fsevents_reader.iter_records(corpus, 'folder'))
+    ctx = {'corpus': corpus, 'report_queries': opts.report_queries, 'records': records}
+
+    results = {
+        'parser_version': parser_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+        'corpus': corpus_params or {'source': os.path.abspath(corpus)},
+        'records': records,
+        'stages': {}
+    }
+
+    print('  {:<24}{:>10}{:>14}{:>10}{:>12}'.format('Stage', 'Seconds', 'Records/s', 'MB/s', 'Peak RSS KB'))
+    for name in stages:
+        result = measure(name, ctx, opts.repeat)
+        results['stages'][name] = result
+        if 'error' in result:
+            print('  {:<24}{}'.format(name, result['error']))
+            continue
+        print('  {:<24}{:>10.4f}{!s:>14}{!s:>10}{!s:>12}'.format(
+            name, result['seconds'], result['records_per_sec'], result['mb_per_sec'], result['peak_rss_kb']))
+
+    if tmp_corpus:
+        shutil.rmtree(tmp_corpus, ignore_errors=True)
+
+    if opts.baseline:
+        with open(opts.baseline, 'w') as b_file:
+            json.dump(results, b_file, indent=2, sort_keys=True)
+        print("\n  Baseline written to '{}'".format(opts.baseline))
+
+    if opts.compare:
+        regressions = compare(results, json.load(open(opts.compare)), opts.tolerance)
+        if regressions:
+            print('\n  Stages slower than the baseline: {}'.format(', '.join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
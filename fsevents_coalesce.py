@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+# FSEvents Coalesce Python Module
+# ------------------------------------------------------
+# Collapses runs of repeated records into one row for the TSV files.
+# Spotlight stores, caches and logs being appended to produce long
+# runs of records for the same path with the same flags, which make
+# up most of All_FSEVENTS.tsv on busy systems. Each run is written as
+# one row with its first and last event id and its record count.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+# Header of the coalesced TSV files
+COALESCED_COLUMNS = [
+    u'event_id',
+    u'last_event_id',
+    u'count',
+    u'node_id',
+    u'fullpath',
+    u'type',
+    u'flags',
+    u'approx_dates_plus_minus_one_day',
+    u'source',
+    u'source_modified_time'
+]
+
+UNKNOWN = 'Unknown'
+
+
+class Coalescer(object):
+    """
+    Coalescer is handed the rows of a TSV file in event id order, with
+    the values of event_id, node_id, fullpath, type, flags,
+    approx_dates_plus_minus_one_day, source and source_modified_time.
+    Consecutive rows with the same path, type, flags and node id are
+    merged into one row of COALESCED_COLUMNS. A change of node id ends
+    the run, as the path then belongs to another file.
+
+    The row of a run has the event id, node id, source and source mod
+    time of its first record, the event id of its last record and the
+    number of records. Its dates span the earliest start and latest
+    end of the dates of its records, an Unknown start or end being the
+    widest. A run of one record keeps its dates as they were.
+    """
+
+    def __init__(self):
+        """
+        """
+        # [key, first row, last event id, count, first date, last date]
+        self.run = None
+        self.records = 0
+        self.rows = 0
+
+    def add(self, row):
+        """
+        Add the next row in event id order.
+        Returns the coalesced row of the run it ends, or None.
+        """
+        self.records += 1
+        key = (row[2], row[3], row[4], row[1])
+        dates = row[5].split(' - ')
+        run = self.run
+        if run is not None and run[0] == key:
+            run[2] = row[0]
+            run[3] += 1
+            if run[4] != UNKNOWN and (dates[0] == UNKNOWN or dates[0] < run[4]):
+                run[4] = dates[0]
+            # Unknown sorts after the dates, so it is kept as the latest end
+            if dates[-1] > run[5]:
+                run[5] = dates[-1]
+            return None
+        self.run = [key, row, row[0], 1, dates[0], dates[-1]]
+        if run is None:
+            return None
+        return self.coalesced(run)
+
+    def close(self):
+        """
+        Returns the coalesced row of the last run, or None.
+        """
+        run = self.run
+        self.run = None
+        if run is None:
+            return None
+        return self.coalesced(run)
+
+    def coalesced(self, run):
+        """
+        """
+        self.rows += 1
+        key, first, last_id, count, first_date, last_date = run
+        if count == 1:
+            dates = first[5]
+        elif first_date == last_date:
+            dates = first_date
+        else:
+            dates = first_date + ' - ' + last_date
+        return (first[0], last_id, count, first[1], first[2], first[3], first[4],
+                dates, first[6], first[7])
+
+    def coalesce(self, rows, last=True):
+        """
+        Yield the coalesced rows of the rows.
+        last: Also yield the run still open at the end. Pass False when
+            more rows follow in a later call.
+        """
+        add = self.add
+        for row in rows:
+            row = add(row)
+            if row is not None:
+                yield row
+        if last:
+            row = self.close()
+            if row is not None:
+                yield row
+
+    def stats(self):
+        """
+        Return the counts for METRICS.json.
+        """
+        return {
+            'records': self.records,
+            'rows': self.rows
+        }
@@ -0,0 +1,404 @@
+#!/usr/bin/python
+
+# FSEvents Corpus Generator Python Script
+# ------------------------------------------------------
+# Writes synthetic '.fseventsd' folders for testing and benchmarking
+# the parser. Files can be DLS1 or DLS2 and can include date marker
+# records, carved and truncated gzips and corrupt page tails.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import gzip
+import json
+import random
+import struct
+import datetime
+import calendar
+from optparse import OptionParser
+
+# Top level folders paths are generated under, weighted by how often
+# they show up in live fsevents files
+PATH_PREFIXES = [
+    ('Users/{user}/Library/Caches', 20),
+    ('Users/{user}/Library/Application Support', 10),
+    ('Users/{user}/Documents', 6),
+    ('Users/{user}/Desktop', 4),
+    ('Users/{user}/Downloads', 4),
+    ('Users/{user}/Pictures', 2),
+    ('Users/{user}/.Trash', 1),
+    ('Users/{user}/Dropbox', 1),
+    ('private/var/folders/zz/zyxvpxvq6csfxvn_n0000000000000/T', 12),
+    ('private/var/db', 6),
+    ('private/var/log', 4),
+    ('System/Library/Caches', 3),
+    ('Library/Preferences', 3),
+    ('Applications', 2),
+    ('.Spotlight-V100/Store-V2', 8),
+    ('Volumes/USBDISK', 1)
+]
+
+EXTENSIONS = ['', '.plist', '.db', '.db-wal', '.txt', '.log', '.docx', '.pdf',
+              '.jpg', '.png', '.sqlite', '.tmp', '.DS_Store', '.sh_history']
+
+USERS = ['admin', 'jsmith', 'Guest']
+
+NAME_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-. '
+
+# (type bits, flag bits) combinations used for generated records
+MASKS = [
+    (0x00008000, 0x01000000),  # FileEvent; Created;
+    (0x00008000, 0x10000000),  # FileEvent; Modified;
+    (0x00008000, 0x14000000),  # FileEvent; Modified; InodeMetaMod;
+    (0x00008000, 0x02000000),  # FileEvent; Removed;
+    (0x00008000, 0x08000000),  # FileEvent; Renamed;
+    (0x00008000, 0x00020000),  # FileEvent; ExtendedAttrModified;
+    (0x00008000, 0x11000000),  # FileEvent; Created; Modified;
+    (0x00000001, 0x81000000),  # FolderEvent; Created; FolderCreated;
+    (0x00000001, 0x04000000),  # FolderEvent; InodeMetaMod;
+    (0x00000001, 0x08000000),  # FolderEvent; Renamed;
+    (0x00004000, 0x01000000),  # SymbolicLink; Created;
+    (0x00001000, 0x02000800),  # HardLink; Removed; LastHardLinkRemoved;
+]
+
+CREATED = 0x01000000
+FILE_EVENT = 0x00008000
+
+# Date marker path templates recognised by FSEventDecoder.find_date
+DATE_MARKERS = [
+    'private/var/log/asl/{d:%Y.%m.%d}.G80.asl',
+    'private/var/log/asl/Logs/aslmanager.{d:%Y%m%dT%H%M%S}-00',
+    'private/var/log/DiagnosticMessages/{d:%Y.%m.%d}.asl',
+    'private/var/log/powermanagement/{d:%Y.%m.%d}.asl',
+    'private/var/audit/{d:%Y%m%d%H%M%S}.not_terminated'
+]
+
+
+def get_options():
+    """
+    Get needed options for generating a corpus
+    """
+    usage = "usage: %prog -o OUTDIR [-n FILES -p PAGES -r RECORDS -v VERSION]"
+    options = OptionParser(usage=usage)
+    options.add_option("-o",
+                       action="store",
+                       type="string",
+                       dest="outdir",
+                       default=False,
+                       help="REQUIRED. The '.fseventsd' folder to create")
+    options.add_option("-n",
+                       action="store",
+                       type="int",
+                       dest="files",
+                       default=20,
+                       help="OPTIONAL. Number of fsevents files. Defaults to 20")
+    options.add_option("-p",
+                       action="store",
+                       type="int",
+                       dest="pages",
+                       default=4,
+                       help="OPTIONAL. DLS pages per file. Defaults to 4")
+    options.add_option("-r",
+                       action="store",
+                       type="int",
+                       dest="records",
+                       default=500,
+                       help="OPTIONAL. Records per DLS page. Defaults to 500")
+    options.add_option("-v",
+                       action="store",
+                       type="string",
+                       dest="version",
+                       default='mixed',
+                       help="OPTIONAL. DLS version of the pages, '1', '2' or 'mixed'. "
+                            "Defaults to 'mixed'")
+    options.add_option("--depth",
+                       action="store",
+                       type="string",
+                       dest="depth",
+                       default='1-6',
+                       help="OPTIONAL. MIN-MAX number of path components below the "
+                            "top level folder. Defaults to '1-6'")
+    options.add_option("--name-length",
+                       action="store",
+                       type="string",
+                       dest="name_length",
+                       default='3-24',
+                       help="OPTIONAL. MIN-MAX length of each generated path "
+                            "component. Defaults to '3-24'")
+    options.add_option("--date-markers",
+                       action="store",
+                       type="int",
+                       dest="date_markers",
+                       default=3,
+                       help="OPTIONAL. Asl/audit date marker records per file. Defaults to 3")
+    options.add_option("--carved",
+                       action="store",
+                       type="int",
+                       dest="carved",
+                       default=0,
+                       help="OPTIONAL. Number of carved gzips to write. Defaults to 0")
+    options.add_option("--truncated",
+                       action="store",
+                       type="int",
+                       dest="truncated",
+                       default=0,
+                       help="OPTIONAL. Number of fsevents files whose gzip is truncated. "
+                            "Defaults to 0")
+    options.add_option("--corrupt-tails",
+                       action="store",
+                       type="int",
+                       dest="corrupt_tails",
+                       default=0,
+                       help="OPTIONAL. Number of fsevents files with garbage after the "
+                            "last DLS page. Defaults to 0")
+    options.add_option("--start-date",
+                       action="store",
+                       type="string",
+                       dest="start_date",
+                       default='2019-01-01',
+                       help="OPTIONAL. Date of the first file, YYYY-MM-DD. Defaults to 2019-01-01")
+    options.add_option("--seed",
+                       action="store",
+                       type="int",
+                       dest="seed",
+                       default=0,
+                       help="OPTIONAL. Random seed. Defaults to 0")
+
+    # Return options to caller #
+    return options
+
+
+def parse_range(value):
+    """
+    Parse a 'MIN-MAX' option value into a tuple of ints.
+    """
+    low, high = value.split('-')
+    return int(low), int(high)
+
+
+class CorpusGenerator(object):
+    """
+    CorpusGenerator writes a synthetic fsevents folder.
+    """
+
+    def __init__(self, outdir, files=20, pages=4, records=500, version='mixed',
+                 depth=(1, 6), name_length=(3, 24), date_markers=3, carved=0,
+                 truncated=0, corrupt_tails=0, start_date='2019-01-01', seed=0):
+        """
+        """
+        self.outdir = outdir
+        self.files = files
+        self.pages = pages
+        self.records = records
+        self.version = version
+        self.depth = depth
+        self.name_length = name_length
+        self.date_markers = date_markers
+        self.carved = carved
+        self.truncated = truncated
+        self.corrupt_tails = corrupt_tails
+        self.start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d')
+        self.seed = seed
+
+        self.rand = random.Random(seed)
+        self.prefixes = []
+        for prefix, weight in PATH_PREFIXES:
+            self.prefixes.extend([prefix] * weight)
+
+        # Event ids are global and increasing across files
+        self.event_id = 0x1000000
+        self.node_id = 1000
+
+    def params(self):
+        """
+        Return the generation parameters, stored with the corpus.
+        """
+        return {
+            'files': self.files,
+            'pages': self.pages,
+            'records': self.records,
+            'version': self.version,
+            'depth': list(self.depth),
+            'name_length': list(self.name_length),
+            'date_markers': self.date_markers,
+            'carved': self.carved,
+            'truncated': self.truncated,
+            'corrupt_tails': self.corrupt_tails,
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'seed': self.seed
+        }
+
+    def random_path(self):
+        """
+        Return a random fullpath.
+        """
+        prefix = self.rand.choice(self.prefixes).format(user=self.rand.choice(USERS))
+        parts = [prefix]
+        for i in range(self.rand.randint(*self.depth)):
+            length = self.rand.randint(*self.name_length)
+            parts.append(''.join(self.rand.choice(NAME_CHARS) for c in range(length)).strip() or 'x')
+        return '/'.join(parts) + self.rand.choice(EXTENSIONS)
+
+    def record(self, fullpath, mask, dls_version):
+        """
+        Pack one record for the DLS version.
+        """
+        self.event_id += self.rand.randint(1, 40)
+        buf = fullpath.encode('utf-8') + b'\x00' + struct.pack("<Q", self.event_id) + struct.pack(">I", mask)
+        if dls_version == 2:
+            self.node_id += self.rand.randint(0, 3)
+            buf += struct.pack("<Q", self.node_id)
+        return buf
+
+    def page(self, dls_version, file_date, markers):
+        """
+        Pack one DLS page of records. markers is the number of date
+        marker records to place in the page.
+        """
+        marker_slots = set(self.rand.sample(range(self.records), min(markers, self.records)))
+        records = []
+        for i in range(self.records):
+            if i in marker_slots:
+                template = self.rand.choice(DATE_MARKERS)
+                fullpath = template.format(d=file_date)
+                mask = FILE_EVENT | CREATED
+            else:
+                fullpath = self.random_path()
+                m_type, m_flag = self.rand.choice(MASKS)
+                mask = m_type | m_flag
+            records.append(self.record(fullpath, mask, dls_version))
+        body = b''.join(records)
+        signature = b'1SLD' if dls_version == 1 else b'2SLD'
+        return signature + struct.pack("<I", 0) + struct.pack("<I", len(body) + 12) + body
+
+    def file_version(self, index):
+        """
+        Return the DLS version used for the file at index.
+        """
+        if self.version == 'mixed':
+            # Older files first, like a volume upgraded to High Sierra
+            return 1 if index < self.files // 2 else 2
+        return int(self.version)
+
+    def generate(self):
+        """
+        Write the corpus and return a summary of what was written.
+        """
+        if not os.path.isdir(self.outdir):
+            os.makedirs(self.outdir)
+
+        summary = {'params': self.params(), 'files': [], 'records': 0,
+                   'compressed_bytes': 0, 'decompressed_bytes': 0}
+
+        truncated = set(self.rand.sample(range(self.files), min(self.truncated, self.files)))
+        corrupt = set(self.rand.sample(range(self.files), min(self.corrupt_tails, self.files)))
+        carved_sources = []
+
+        for index in range(self.files):
+            dls_version = self.file_version(index)
+            file_date = self.start_date + datetime.timedelta(hours=index * 6)
+            # Spread the date markers over the pages of the file
+            markers = [self.date_markers // self.pages] * self.pages
+            for i in range(self.date_markers % self.pages):
+                markers[i] += 1
+            pages = [self.page(dls_version, file_date, markers[i]) for i in range(self.pages)]
+            raw = b''.join(pages)
+            if index in corrupt:
+                raw += bytes(bytearray(self.rand.randint(0, 255) for i in range(self.rand.randint(16, 512))))
+            # fsevents files are named after the last event id they contain
+            filename = '%016x' % (self.event_id)
+            fullpath = os.path.join(self.outdir, filename)
+            self.write_gzip(fullpath, raw, truncate=index in truncated)
+            m_time = calendar.timegm((file_date + datetime.timedelta(minutes=30)).timetuple())
+            os.utime(fullpath, (m_time, m_time))
+
+            carved_sources.append(raw)
+            summary['files'].append(filename)
+            summary['records'] += self.records * self.pages
+            summary['compressed_bytes'] += os.path.getsize(fullpath)
+            summary['decompressed_bytes'] += len(raw)
+
+        # Carved gzips hold a run of pages from a random file with a
+        # random amount of trailing data cut off
+        for index in range(self.carved):
+            raw = self.rand.choice(carved_sources)
+            fullpath = os.path.join(self.outdir, 'carved_%05d.gz' % (index))
+            self.write_gzip(fullpath, raw[:self.rand.randint(len(raw) // 2, len(raw))], truncate=True)
+            summary['files'].append(os.path.basename(fullpath))
+            summary['compressed_bytes'] += os.path.getsize(fullpath)
+
+        with open(os.path.join(self.outdir, 'fseventsd-uuid'), 'wb') as u_file:
+            u_file.write(b'00000000-0000-0000-0000-000000000000')
+
+        return summary
+
+    def write_gzip(self, fullpath, raw, truncate=False):
+        """
+        Compress raw to fullpath. When truncate is set a random part
+        of the end of the compressed stream is cut off.
+        """
+        with open(fullpath, 'wb') as out_file:
+            g_file = gzip.GzipFile(filename='', mode='wb', fileobj=out_file)
+            g_file.write(raw)
+            g_file.close()
+        if truncate:
+            size = os.path.getsize(fullpath)
+            with open(fullpath, 'r+b') as out_file:
+                out_file.truncate(self.rand.randint(size // 2, size - 9))
+
+
+def main():
+    """
+    Generate a corpus from the command line options.
+    """
+    options = get_options()
+    (opts, args) = options.parse_args()
+
+    if opts.outdir is False:
+        options.error('Unable to proceed. The following parameters are required:\n-o OUTDIR')
+    if opts.version not in ('1', '2', 'mixed'):
+        options.error('Unable to proceed. \n\nIncorrect version provided: "%s". '
+                      'The following are valid options:\n -v 1\n -v 2\n -v mixed\n' % (opts.version))
+
+    generator = CorpusGenerator(
+        opts.outdir,
+        files=opts.files,
+        pages=opts.pages,
+        records=opts.records,
+        version=opts.version,
+        depth=parse_range(opts.depth),
+        name_length=parse_range(opts.name_length),
+        date_markers=opts.date_markers,
+        carved=opts.carved,
+        truncated=opts.truncated,
+        corrupt_tails=opts.corrupt_tails,
+        start_date=opts.start_date,
+        seed=opts.seed
+    )
+    summary = generator.generate()
+
+    print('  Files Written: {}\n  Records Written: {}\n  Compressed Bytes: {}\n  '
+          'Decompressed Bytes: {}'.format(
+        len(summary['files']),
+        summary['records'],
+        summary['compressed_bytes'],
+        summary['decompressed_bytes']))
+
+    print(json.dumps(summary['params'], sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
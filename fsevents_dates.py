@@ -0,0 +1,154 @@
+#!/usr/bin/python
+
+# FSEvents Date Index Python Module
+# ------------------------------------------------------
+# Collects the date markers of every fsevents file of a volume into
+# one event id index. Each file's time range is otherwise built from
+# the markers in that file and the mod times of the file and the one
+# before it, so records of files without markers get wide ranges even
+# when another file holds a nearby date.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+from bisect import bisect_left
+
+from fsevents_metrics import NullMetrics
+from fsevents_reader import FSEventDecoder
+
+
+class DateIndex(object):
+    """
+    DateIndex holds (event id, date) anchors of a volume sorted by
+    event id. Anchors are the date markers found in the files and the
+    last event id and mod date of each allocated file.
+
+    Event ids only increase with time, so an anchor dated before an
+    earlier anchor is dropped, as build_time_range does for a file.
+    Date markers are taken from file names that hold the date, while
+    mod dates can be changed when files are exported, so a mod date is
+    only used when it agrees with the markers around it.
+    """
+
+    def __init__(self):
+        """
+        """
+        self.markers = []
+        self.mod_dates = []
+        self.wds = []
+        self.dates = []
+
+    def add(self, wd, date, marker=True):
+        """
+        Add an anchor. date is in the yyyy.mm.dd form.
+        marker: False for the mod date of a file.
+        """
+        if str(date)[:10].replace(".", "").isdigit():
+            if marker:
+                self.markers.append((wd, date[:10]))
+            else:
+                self.mod_dates.append((wd, date[:10]))
+
+    def build(self):
+        """
+        Sort the anchors and build the lookup lists.
+        """
+        self.wds, self.dates = increasing(sorted(self.markers))
+        keys = [int(date.replace(".", "")) for date in self.dates]
+        for wd, date in sorted(self.mod_dates):
+            c_date = int(date.replace(".", ""))
+            i = bisect_left(self.wds, wd)
+            # Bypass a mod date outside the markers around it
+            if (i > 0 and c_date < keys[i - 1]) or (i < len(keys) and c_date > keys[i]):
+                continue
+            self.wds.insert(i, wd)
+            self.dates.insert(i, date)
+            keys.insert(i, c_date)
+        self.markers = []
+        self.mod_dates = []
+        return self
+
+    def __len__(self):
+        """
+        Number of anchors.
+        """
+        return len(self.wds)
+
+    def lookup(self, wd, after_last="Unknown"):
+        """
+        Return the approximate date of an event id in the form used
+        by FSEventDecoder.apply_date.
+        after_last: Returned when the event id is above every anchor.
+        """
+        wds = self.wds
+        i = bisect_left(wds, wd)
+        if i == len(wds):
+            return after_last
+        if wds[i] == wd:
+            return self.dates[i]
+        if i == 0:
+            return "Unknown - " + self.dates[0]
+        # Between the anchors before and after the event id
+        p_date = self.dates[i - 1]
+        c_date = self.dates[i]
+        if p_date == c_date:
+            return p_date
+        return p_date + " - " + c_date
+
+
+def increasing(anchors):
+    """
+    Return lists of the event ids and dates of the sorted anchors,
+    bypassing a date when it is less than the date before it.
+    """
+    wds = []
+    dates = []
+    last_date = 0
+    for wd, date in anchors:
+        c_date = int(date.replace(".", ""))
+        if c_date < last_date:
+            continue
+        wds.append(wd)
+        dates.append(date)
+        last_date = c_date
+    return wds, dates
+
+
+def build_date_index(files, use_file_mod_dates=True, metrics=None):
+    """
+    Read each SourceFile of a volume and return the DateIndex of
+    its date markers and allocated file mod dates. Files that can
+    not be decompressed or hold no DLS page are skipped, as they
+    are when parsed.
+    """
+    metrics = metrics if metrics is not None else NullMetrics()
+    index = DateIndex()
+    decoder = FSEventDecoder(use_file_mod_dates)
+    with metrics.timer('date_index') as counts:
+        for src in files:
+            try:
+                buf = src.read()
+            except Exception:
+                continue
+            counts['bytes_in'] += len(buf)
+            if decoder.dls_header_search(buf, src.fullpath) is False:
+                continue
+            if not src.is_carved_gzip and use_file_mod_dates:
+                index.add(int(src.name, 16), str(src.m_time)[:10].replace("-", "."), marker=False)
+            for wd, date in decoder.date_markers(buf):
+                index.add(wd, date)
+        index.build()
+        counts['records'] = len(index)
+    return index
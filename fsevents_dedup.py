@@ -0,0 +1,221 @@
+#!/usr/bin/python
+
+# FSEvents Deduplication Python Module
+# ------------------------------------------------------
+# Drops records that were already added from another source file.
+# Live fsevents files, carved gzips and overlapping collections of
+# the same volume often hold the same events. A record is identified
+# by a compact hash of its event id, node id, path and mask.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import struct
+import hashlib
+import sqlite3
+import tempfile
+
+from fsevents_metrics import NullMetrics
+from fsevents_reader import is_fsevent_filename
+
+DEFAULT_DEDUP_MEMORY_MB = 64
+
+# Approximate bytes used by a key held in the in-memory set
+KEY_OVERHEAD = 100
+
+# Share of the memory budget given to the bloom filter
+# in front of the keys spilled to disk
+BLOOM_SHARE = 4
+
+# Bit positions set per key in the bloom filter
+BLOOM_HASHES = 7
+
+
+def record_key(record):
+    """
+    Return the 16 byte key of a record: the event id followed by
+    8 bytes of the md5 of its path, mask and node id.
+    """
+    digest = hashlib.md5('{}\x00{}\x00{}'.format(
+        record['fullpath'], record['mask'], record['node_id'])).digest()
+    return struct.pack('<Q', record['id']) + digest[:8]
+
+
+def authoritative_order(items, name=lambda src: src.name):
+    """
+    Return the SourceFiles, or the work units when name reads the
+    unit's name, with the allocated fsevent files first in their
+    listed order followed by carved gzips. Records of allocated files
+    are then kept over copies of them recovered by carving. Carved
+    files do not seed the time range of other files, so moving them
+    does not change any record.
+    """
+    return ([item for item in items if is_fsevent_filename(name(item))] +
+            [item for item in items if not is_fsevent_filename(name(item))])
+
+
+class BloomFilter(object):
+    """
+    Bit array answering whether a key may have been added.
+    """
+
+    def __init__(self, size_bytes):
+        """
+        """
+        self.bits = bytearray(size_bytes)
+        self.size = size_bytes * 8
+
+    def positions(self, key):
+        """
+        Return the bit positions of a key. The key is mostly an md5
+        digest so positions are taken from its bytes directly.
+        """
+        high, low = struct.unpack('<QQ', key)
+        low = low ^ high
+        return [(low + i * (high | 1)) % self.size for i in range(BLOOM_HASHES)]
+
+    def add(self, key):
+        """
+        """
+        bits = self.bits
+        for pos in self.positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        """
+        """
+        bits = self.bits
+        for pos in self.positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RecordDeduper(object):
+    """
+    RecordDeduper remembers the key of every record added and tells
+    the caller whether a record is a duplicate of an earlier one. The
+    first record added is the one kept, so files must be handed over
+    with the most trusted sources first.
+
+    Keys are held in a set until they use about memory_mb. The set is
+    then spilled to an on-disk SQLite table and its keys added to a
+    bloom filter, so that only keys the filter reports as possibly
+    seen are looked up on disk.
+    """
+
+    def __init__(self, memory_mb=DEFAULT_DEDUP_MEMORY_MB, tmpdir=None, metrics=None):
+        """
+        memory_mb: Budget for the keys held in memory and the bloom filter.
+        tmpdir: Folder for the temporary key database.
+        metrics: Optional fsevents_metrics.Metrics recording spills.
+        """
+        memory = memory_mb * 1048576
+        self.key_limit = max(1, (memory - memory // BLOOM_SHARE) // KEY_OVERHEAD)
+        self.bloom_bytes = max(1, memory // BLOOM_SHARE)
+        self.tmpdir = tmpdir
+        self.metrics = metrics if metrics is not None else NullMetrics()
+
+        self.keys = set()
+        self.bloom = None
+        self.db_filename = None
+        self.con = None
+
+        self.spilled = 0
+        self.disk_lookups = 0
+        # Records and duplicates by source file
+        self.sources = {}
+
+    def seen(self, record):
+        """
+        Add the record's key and return True when the
+        key was already added by an earlier record.
+        """
+        key = record_key(record)
+        counts = self.sources.get(record['source'])
+        if counts is None:
+            counts = self.sources[record['source']] = {'records': 0, 'duplicates': 0}
+        counts['records'] += 1
+
+        if key in self.keys or (self.bloom is not None and key in self.bloom and self.on_disk(key)):
+            counts['duplicates'] += 1
+            return True
+
+        self.keys.add(key)
+        if len(self.keys) >= self.key_limit:
+            self.spill()
+        return False
+
+    def on_disk(self, key):
+        """
+        Return True when the key was spilled to disk.
+        """
+        self.disk_lookups += 1
+        return self.con.execute("SELECT 1 FROM keys WHERE key = ?", (buffer(key),)).fetchone() is not None
+
+    def spill(self):
+        """
+        Move the keys held in memory to the on-disk table.
+        """
+        with self.metrics.timer('dedup_spill') as counts:
+            if self.con is None:
+                handle, self.db_filename = tempfile.mkstemp(prefix='fse_dedup_', suffix='.db', dir=self.tmpdir)
+                os.close(handle)
+                # Spilled by the pipeline thread while parsing, closed by the main thread
+                self.con = sqlite3.connect(self.db_filename, check_same_thread=False)
+                self.con.execute("PRAGMA journal_mode = OFF")
+                self.con.execute("PRAGMA synchronous = OFF")
+                self.con.execute("CREATE TABLE keys (key BLOB PRIMARY KEY) WITHOUT ROWID")
+                self.bloom = BloomFilter(self.bloom_bytes)
+            for key in self.keys:
+                self.bloom.add(key)
+            self.con.executemany("INSERT OR IGNORE INTO keys VALUES (?)",
+                                 ((buffer(key),) for key in sorted(self.keys)))
+            self.con.commit()
+            counts['records'] = len(self.keys)
+            self.spilled += len(self.keys)
+        self.keys = set()
+
+    @property
+    def duplicates(self):
+        """
+        Number of records dropped.
+        """
+        return sum(counts['duplicates'] for counts in self.sources.values())
+
+    def summary(self):
+        """
+        Return the duplicate counts for METRICS.json.
+        """
+        return {
+            'records': sum(counts['records'] for counts in self.sources.values()),
+            'duplicates': self.duplicates,
+            'keys_spilled': self.spilled,
+            'disk_lookups': self.disk_lookups,
+            'sources': dict((source, counts) for source, counts in self.sources.items()
+                            if counts['duplicates'])
+        }
+
+    def close(self):
+        """
+        Remove the temporary key database.
+        """
+        self.keys = set()
+        self.bloom = None
+        if self.con is not None:
+            self.con.close()
+            self.con = None
+            os.remove(self.db_filename)
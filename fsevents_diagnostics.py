@@ -0,0 +1,216 @@
+#!/usr/bin/python
+
+# FSEvents Diagnostics Python Module
+# ------------------------------------------------------
+# Collects the errors and info messages of a parse. Each entry is
+# counted by its code and source file, and only the first entries of
+# each code are kept. EXCEPTIONS_LOG.txt is written from them once
+# parsing is done, with DIAGNOSTICS.json holding the counts, so that a
+# noisy or corrupted source does not slow the parse down with writes
+# to the log or fill the disk with it.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+
+DIAGNOSTICS = 'DIAGNOSTICS.json'
+
+# Entries of each code written to EXCEPTIONS_LOG.txt
+DIAGNOSTIC_SAMPLES = 100
+
+# Level and log line of each code, formatted with the
+# source file name, the offset and the value of the entry
+MESSAGES = {
+    'decompression_error': (
+        'Error', '%(source)s\tError: Error while decompressing FSEvents file.%(value)s\n'),
+    'dls_header_missing': (
+        'Info', '%(source)s\tInfo: DLS Header Check Failed. Unable to find a '
+                'DLS header. Unable to parse File.\n'),
+    'page_length_error': (
+        'Error', '%(source)s\tError: Error in length of page when finding page headers '
+                 'at offset %(offset)d.\n'),
+    'unknown_dls_version': (
+        'Error', '%(source)s\tError: Unknown DLS Version at offset %(offset)d.\n'),
+    'file_header_error': (
+        'Error', '%(source)s\tError: Unable to parse file header at offset %(offset)d\n'),
+    'path_newline': (
+        'Info', '%(source)s\tInfo: Non-printable char %(value)02x in record fullpath at '
+                'page offset %(offset)d. Parser removed char for reporting purposes.\n'),
+    'carved_invalid_record': (
+        'Info', '%(source)s\tInfo: First invalid record found in carved gzip at offset '
+                '%(offset)d. The remainder of this buffer will not be parsed.\n'),
+    'watch_read_error': (
+        'Error', '%(source)s\tError: Unable to read watched file. %(value)s\n')
+}
+
+
+def log_line(code, source, offset, value):
+    """
+    Return the EXCEPTIONS_LOG.txt line of an entry.
+    """
+    return MESSAGES[code][1] % {'source': source, 'offset': offset, 'value': value}
+
+
+class Diagnostics(object):
+    """
+    Diagnostics counts each entry by its code and the source file it
+    was found in. The first max_samples entries of each code are kept
+    in the order they were added. Adding an entry only updates a
+    counter or appends to a list, so it costs next to nothing.
+    """
+
+    def __init__(self, max_samples=DIAGNOSTIC_SAMPLES):
+        """
+        """
+        self.max_samples = max_samples
+        # Entry counts by source file of each code
+        self.counts = {}
+        # Entries of each code kept
+        self.sampled = {}
+        # (code, source, offset, value) of the entries kept
+        self.samples = []
+
+    def add(self, code, source, offset=None, value=None):
+        """
+        Count an entry.
+        code: A key of MESSAGES.
+        source: The name of the source file.
+        offset: The offset in the decompressed file, when there is one.
+        value: The character, error text or other value of the entry.
+        """
+        files = self.counts.get(code)
+        if files is None:
+            files = self.counts[code] = {}
+            self.sampled[code] = 0
+        files[source] = files.get(source, 0) + 1
+        if self.sampled[code] < self.max_samples:
+            self.sampled[code] += 1
+            self.samples.append((code, source, offset, value))
+
+    def state(self):
+        """
+        Return the counts and entries kept, to be merged
+        into the diagnostics of another process.
+        """
+        return {'counts': self.counts, 'samples': self.samples}
+
+    def merge(self, state):
+        """
+        Add the counts and entries of a state. Entries are kept as
+        if they had been added here, so merging the states of the
+        files in file order gives the same entries as one parse.
+        """
+        for code, files in state['counts'].items():
+            counts = self.counts.get(code)
+            if counts is None:
+                counts = self.counts[code] = {}
+                self.sampled[code] = 0
+            for source, count in files.items():
+                counts[source] = counts.get(source, 0) + count
+        for sample in state['samples']:
+            code = sample[0]
+            if self.sampled[code] < self.max_samples:
+                self.sampled[code] += 1
+                self.samples.append(tuple(sample))
+
+    def total(self, code):
+        """
+        Return the number of entries of a code.
+        """
+        return sum(self.counts.get(code, {}).values())
+
+    def write_log(self, logfile):
+        """
+        Write the entries kept to the log, followed by a line for
+        each code that had more entries than were kept.
+        """
+        for code, source, offset, value in self.samples:
+            logfile.write(log_line(code, source, offset, value))
+        for code in sorted(self.counts):
+            total = self.total(code)
+            if total > self.sampled[code]:
+                logfile.write('Diagnostics\tInfo: {} {} entries in {} files. The first {} are listed. '
+                              'The count of each file is in {}.\n'.format(
+                                  total, code, len(self.counts[code]), self.sampled[code], DIAGNOSTICS))
+
+    def summary(self):
+        """
+        Return the DIAGNOSTICS.json contents.
+        """
+        codes = {}
+        for code in self.counts:
+            codes[code] = {
+                'level': MESSAGES[code][0],
+                'count': self.total(code),
+                'files': self.counts[code],
+                'samples': []
+            }
+        for code, source, offset, value in self.samples:
+            codes[code]['samples'].append({'source': source, 'offset': offset, 'value': value})
+        return {
+            'entries': sum(code['count'] for code in codes.values()),
+            'max_samples': self.max_samples,
+            'codes': codes
+        }
+
+    def write(self, filename):
+        """
+        Write DIAGNOSTICS.json.
+        """
+        with open(filename, 'w') as d_file:
+            json.dump(self.summary(), d_file, indent=2, sort_keys=True)
+
+
+class LogDiagnostics(Diagnostics):
+    """
+    Writes each entry to a logfile as it is added, for callers
+    of the decoder that hand it a file like object.
+    """
+
+    def __init__(self, logfile):
+        """
+        """
+        super(LogDiagnostics, self).__init__()
+        self.logfile = logfile
+
+    def add(self, code, source, offset=None, value=None):
+        """
+        """
+        self.logfile.write(log_line(code, source, offset, value))
+
+
+class NullDiagnostics(Diagnostics):
+    """
+    Stand-in used when the caller does not want a log.
+    """
+
+    def add(self, code, source, offset=None, value=None):
+        """
+        Discard the entry.
+        """
+        pass
+
+
+def as_diagnostics(logfile):
+    """
+    Return the Diagnostics of a decoder's logfile argument:
+    None, a Diagnostics or a file like object.
+    """
+    if logfile is None:
+        return NullDiagnostics()
+    if isinstance(logfile, Diagnostics):
+        return logfile
+    return LogDiagnostics(logfile)
@@ -0,0 +1,146 @@
+#!/usr/bin/python
+
+# FSEvents Record Filters Python Module
+# ------------------------------------------------------
+# Parse time filters on event id, path, flags and approximate date.
+# The decoder asks the filter before decoding a DLS page and before
+# building each record, so records outside the filters cost as little
+# as possible.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import re
+
+from fsevents_reader import EVENTMASK
+
+# Highest event id
+MAX_EVENT_ID = 0xFFFFFFFFFFFFFFFF
+
+DATE_FORMAT = re.compile(r'^[0-9]{4}[.-][0-9]{2}[.-][0-9]{2}$')
+
+
+class RecordFilter(object):
+    """
+    RecordFilter holds the filters of a run. A record is kept when it
+    passes every filter given.
+
+    first_id, last_id: Inclusive range of event ids.
+    path_prefixes: List of fullpath prefixes. A record is kept when
+        its path starts with any of them.
+    flags: List of flag names such as Created or Renamed. A record is
+        kept when it has any of them.
+    first_date, last_date: Inclusive range of yyyy.mm.dd dates. A
+        record is kept when its approximate date range overlaps it.
+        An Unknown end of the range is treated as open.
+    """
+
+    def __init__(self, first_id=0, last_id=MAX_EVENT_ID, path_prefixes=None, flags=None,
+                 first_date=None, last_date=None):
+        """
+        """
+        self.first_id = first_id
+        self.last_id = last_id
+        # The path of a record has no leading slash
+        self.path_prefixes = tuple([prefix.lstrip('/') for prefix in path_prefixes or []])
+        self.flag_mask = flag_mask(flags) if flags else None
+        self.first_date = first_date
+        self.last_date = last_date
+
+        self.by_id = first_id > 0 or last_id < MAX_EVENT_ID
+        self.by_date = first_date is not None or last_date is not None
+
+    def skip_page(self, first_wd, last_wd):
+        """
+        Return True when a page whose records have event ids from
+        first_wd to last_wd holds no record in the id range.
+        """
+        return self.by_id and (last_wd < self.first_id or first_wd > self.last_id)
+
+    def keep_raw(self, wd, mask, fullpath):
+        """
+        Return True when a record passes the id, path and flag
+        filters. mask is the integer event mask.
+        """
+        if wd < self.first_id or wd > self.last_id:
+            return False
+        if self.path_prefixes and not fullpath.startswith(self.path_prefixes):
+            return False
+        if self.flag_mask is not None and not mask & self.flag_mask:
+            return False
+        return True
+
+    def keep_dates(self, dates):
+        """
+        Return True when the approximate dates of a record overlap
+        the date range.
+        """
+        if not self.by_date:
+            return True
+        parts = dates.split(' - ')
+        r_first = parts[0]
+        r_last = parts[-1]
+        if self.last_date is not None and r_first != 'Unknown' and r_first > self.last_date:
+            return False
+        if self.first_date is not None and r_last != 'Unknown' and r_last < self.first_date:
+            return False
+        return True
+
+    def describe(self):
+        """
+        Return the filters for METRICS.json.
+        """
+        return {
+            'first_id': self.first_id,
+            'last_id': self.last_id,
+            'path_prefixes': list(self.path_prefixes),
+            'flag_mask': self.flag_mask,
+            'first_date': self.first_date,
+            'last_date': self.last_date
+        }
+
+
+def flag_mask(flags):
+    """
+    Return the event mask bits of a list of flag names.
+    Raises ValueError for unknown names.
+    """
+    names = dict((name.rstrip(';').lower(), bit) for bit, name in EVENTMASK.items() if bit)
+    mask = 0
+    for flag in flags:
+        if flag.lower() not in names:
+            raise ValueError('Unknown flag "{}". The following are valid options: {}'.format(
+                flag, ', '.join(sorted(name.rstrip(';') for bit, name in EVENTMASK.items()
+                                       if bit and not name.startswith('NOT_USED')))))
+        mask |= names[flag.lower()]
+    return mask
+
+
+def parse_date_range(value):
+    """
+    Return the (first, last) yyyy.mm.dd dates of a FIRST[..LAST]
+    date range. Dates may be written with dashes or dots.
+    Raises ValueError when it can not be read.
+    """
+    dates = [date.strip() for date in value.split('..', 1)]
+    for date in dates:
+        if not DATE_FORMAT.match(date):
+            raise ValueError('Dates must be written as YYYY-MM-DD.')
+    dates = [date.replace('-', '.') for date in dates]
+    if len(dates) == 1:
+        dates.append(dates[0])
+    if dates[0] > dates[1]:
+        raise ValueError('The first date of the range is after the last.')
+    return dates[0], dates[1]
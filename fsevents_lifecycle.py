@@ -0,0 +1,330 @@
+#!/usr/bin/python
+
+# FSEvents Lifecycle Python Module
+# ------------------------------------------------------
+# Follows each file and folder through its records in one pass over
+# the records in event id order: when it was created, renamed from
+# one path to another, modified and removed. The two records of a
+# rename, the old path and the new path, have adjacent event ids and
+# are paired so the history of an item carries on under its new path.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+from collections import OrderedDict
+
+LIFECYCLE_HISTORY = 'LIFECYCLE_HISTORY.tsv'
+LIFECYCLE_PATHS = 'LIFECYCLE_PATHS.tsv'
+
+# Paths followed at the same time before the least recently
+# seen one is written out
+DEFAULT_LIFECYCLE_PATHS = 100000
+
+# Event mask bits
+FOLDER_EVENT = 0x00000001
+CREATED = 0x01000000
+REMOVED = 0x02000000
+RENAMED = 0x08000000
+CHANGED = 0x10000000 | 0x04000000 | 0x00010000 | 0x00020000 | 0x00040000 | 0x40000000
+
+HISTORY_COLUMNS = [
+    'lifecycle_id',
+    'event_id',
+    'node_id',
+    'fullpath',
+    'type',
+    'flags',
+    'rename',
+    'renamed_path',
+    'renamed_event_id',
+    'approx_dates_plus_minus_one_day',
+    'source'
+]
+
+PATHS_COLUMNS = [
+    'lifecycle_id',
+    'first_path',
+    'last_path',
+    'state',
+    'first_event_id',
+    'last_event_id',
+    'created_event_id',
+    'removed_event_id',
+    'events',
+    'renames',
+    'changes',
+    'node_id'
+]
+
+
+class Lifecycle(object):
+    """
+    The history of one file or folder, under each path it had.
+    """
+
+    __slots__ = ['lid', 'first_path', 'path', 'first_id', 'last_id', 'created_id', 'removed_id',
+                 'events', 'renames', 'changes', 'node_id']
+
+    def __init__(self, lid, path, event_id):
+        """
+        """
+        self.lid = lid
+        self.first_path = path
+        self.path = path
+        self.first_id = event_id
+        self.last_id = event_id
+        self.created_id = ''
+        self.removed_id = ''
+        self.events = 0
+        self.renames = 0
+        self.changes = 0
+        self.node_id = ''
+
+
+class LifecycleEngine(object):
+    """
+    LifecycleEngine is handed the records in event id order and writes
+    LIFECYCLE_HISTORY.tsv, one line per record with the lifecycle it
+    belongs to, and LIFECYCLE_PATHS.tsv, one line per lifecycle.
+
+    A lifecycle starts at the first record of a path and ends when a
+    record of the path has the Removed flag, when another item is
+    renamed over the path, or at the end of the records. A Renamed
+    record is paired with the next record when that one is also
+    Renamed, has the next event id and, when both have one, the same
+    node id. The first is the old path and the second the new one, and
+    the lifecycle moves to the new path. A folder rename moves the
+    paths below the folder too. Renamed records left unpaired are
+    written with a rename of 'unpaired' and do not move the lifecycle.
+
+    Only max_paths paths are followed at once. Past it the least
+    recently seen lifecycle is written with a state of 'evicted' and a
+    later record of its path starts a new lifecycle.
+    """
+
+    def __init__(self, out_dir, columns, max_paths=DEFAULT_LIFECYCLE_PATHS):
+        """
+        out_dir: The case folder the outputs are written to.
+        columns: The names of the values of each row, in order.
+        max_paths: Paths followed at the same time.
+        """
+        self.max_paths = max(1, max_paths)
+        self.index = dict((name, i) for i, name in enumerate(columns))
+        self.h_file = open(os.path.join(out_dir, LIFECYCLE_HISTORY), 'wb')
+        self.p_file = open(os.path.join(out_dir, LIFECYCLE_PATHS), 'wb')
+        self.h_file.write('\t'.join(HISTORY_COLUMNS) + '\n')
+        self.p_file.write('\t'.join(PATHS_COLUMNS) + '\n')
+
+        # Lifecycles by current path, least recently seen first
+        self.live = OrderedDict()
+        # Renamed record waiting for the record after it
+        self.pending = None
+        self.next_lid = 1
+        self.records = 0
+        self.pairs = 0
+        self.unpaired = 0
+        self.evicted = 0
+
+    def record(self, row):
+        """
+        Return the values of a row the engine uses.
+        """
+        index = self.index
+        node_id = row[index['node_id']]
+        return {
+            'id': int(row[index['id']]),
+            'id_hex': row[index['id_hex']],
+            'node_id': '' if node_id in ('', None) else node_id,
+            'fullpath': row[index['fullpath']],
+            'type': row[index['type']],
+            'flags': row[index['flags']],
+            'mask': int(row[index['mask']], 16),
+            'dates': row[index['approx_dates_plus_minus_one_day']],
+            'source': row[index['source']]
+        }
+
+    def add(self, row):
+        """
+        Add the next row in event id order.
+        """
+        record = self.record(row)
+        self.records += 1
+        pending = self.pending
+        if pending is not None:
+            self.pending = None
+            if record['mask'] & RENAMED and record['id'] == pending['id'] + 1 and \
+                    (pending['node_id'] == '' or record['node_id'] == '' or
+                     str(pending['node_id']) == str(record['node_id'])):
+                self.rename(pending, record)
+                return
+            self.unpaired += 1
+            self.touch(pending, 'unpaired')
+
+        if record['mask'] & RENAMED:
+            self.pending = record
+        else:
+            self.touch(record)
+
+    def lifecycle(self, path, event_id):
+        """
+        Return the live lifecycle of a path, or start one.
+        """
+        life = self.live.pop(path, None)
+        if life is None:
+            life = Lifecycle(self.next_lid, path, event_id)
+            self.next_lid += 1
+        # Most recently seen last
+        self.live[path] = life
+        if len(self.live) > self.max_paths:
+            old_path, old = self.live.popitem(last=False)
+            self.evicted += 1
+            self.write_path(old, 'evicted')
+        return life
+
+    def count(self, life, record):
+        """
+        Count a record of a lifecycle.
+        """
+        life.events += 1
+        life.last_id = record['id_hex']
+        if record['node_id'] != '':
+            life.node_id = record['node_id']
+        if record['mask'] & CREATED and life.created_id == '':
+            life.created_id = record['id_hex']
+        if record['mask'] & CHANGED:
+            life.changes += 1
+
+    def touch(self, record, rename='', other=None):
+        """
+        Add a record that is not part of a rename pair.
+        """
+        life = self.lifecycle(record['fullpath'], record['id_hex'])
+        self.count(life, record)
+        self.write_history(life, record, rename, other)
+        if record['mask'] & REMOVED:
+            life.removed_id = record['id_hex']
+            del self.live[record['fullpath']]
+            self.write_path(life, 'removed')
+
+    def rename(self, old, new):
+        """
+        Move the lifecycle of the old path to the new path.
+        """
+        self.pairs += 1
+        life = self.lifecycle(old['fullpath'], old['id_hex'])
+        self.count(life, old)
+        self.write_history(life, old, 'from', new)
+        del self.live[old['fullpath']]
+
+        replaced = self.live.pop(new['fullpath'], None)
+        if replaced is not None:
+            self.write_path(replaced, 'replaced')
+
+        if old['mask'] & FOLDER_EVENT:
+            # Paths below the folder moved with it
+            prefix = old['fullpath'] + '/'
+            children = [(path, self.live.pop(path)) for path in list(self.live) if path.startswith(prefix)]
+            for path, child in children:
+                child.path = new['fullpath'] + path[len(old['fullpath']):]
+                replaced = self.live.pop(child.path, None)
+                if replaced is not None:
+                    self.write_path(replaced, 'replaced')
+                self.live[child.path] = child
+
+        life.path = new['fullpath']
+        life.renames += 1
+        self.live[life.path] = life
+        self.count(life, new)
+        self.write_history(life, new, 'to', old)
+        if new['mask'] & REMOVED:
+            life.removed_id = new['id_hex']
+            del self.live[life.path]
+            self.write_path(life, 'removed')
+
+    def write_history(self, life, record, rename, other):
+        """
+        """
+        values = [
+            life.lid,
+            record['id_hex'],
+            record['node_id'],
+            record['fullpath'],
+            record['type'],
+            record['flags'],
+            rename,
+            other['fullpath'] if other is not None else '',
+            other['id_hex'] if other is not None else '',
+            record['dates'],
+            record['source']
+        ]
+        self.h_file.write(tsv_row(values))
+
+    def write_path(self, life, state):
+        """
+        """
+        values = [
+            life.lid,
+            life.first_path,
+            life.path,
+            state,
+            life.first_id,
+            life.last_id,
+            life.created_id,
+            life.removed_id,
+            life.events,
+            life.renames,
+            life.changes,
+            life.node_id
+        ]
+        self.p_file.write(tsv_row(values))
+
+    def close(self):
+        """
+        Write the lifecycles still followed. Returns the counts of
+        the run for METRICS.json.
+        """
+        if self.pending is not None:
+            self.unpaired += 1
+            self.touch(self.pending, 'unpaired')
+            self.pending = None
+        for life in self.live.values():
+            self.write_path(life, 'live')
+        self.live.clear()
+        self.h_file.close()
+        self.p_file.close()
+        return {
+            'records': self.records,
+            'lifecycles': self.next_lid - 1,
+            'rename_pairs': self.pairs,
+            'unpaired_renames': self.unpaired,
+            'evicted': self.evicted,
+            'max_paths': self.max_paths
+        }
+
+
+def tsv_row(values):
+    """
+    Return the values as a line of tab separated text. Values
+    read from the database are unicode and written as utf-8.
+    """
+    cells = []
+    for value in values:
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+        elif not isinstance(value, str):
+            value = str(value)
+        cells.append(value)
+    return '\t'.join(cells) + '\n'
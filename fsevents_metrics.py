@@ -0,0 +1,312 @@
+#!/usr/bin/python
+
+# FSEvents Metrics Python Module
+# ------------------------------------------------------
+# Collects per stage timings, byte and record counts, per file
+# statistics, cache hit rates and SQLite statement timings for a
+# parser run and writes them to a json metrics file.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import re
+import json
+import time
+import contextlib
+
+# Number of files listed under slowest_files in the metrics report
+SLOWEST_FILES = 10
+
+# Stages that run inside another stage and are included in its timings
+NESTED_STAGES = {
+    'apply_date': 'record_decoding'
+}
+
+# Pulls the verb and table or view name from an SQL statement
+STATEMENT_REGEX = re.compile(r'^\s*(\w+)\b.*?\b(?:into|from|table|view)\s+\[?(\w+)',
+                             re.IGNORECASE | re.DOTALL)
+
+if hasattr(time, 'process_time'):
+    cpu_time = time.process_time
+else:
+    cpu_time = time.clock
+
+
+def statement_key(statement):
+    """
+    Return a short name for an SQL statement
+    such as 'INSERT fsevents' or 'SELECT DownloadsActivity'.
+    """
+    match = STATEMENT_REGEX.match(statement)
+    if match is None:
+        return ' '.join(statement.split()[:2]).upper()
+    return '{} {}'.format(match.group(1).upper(), match.group(2))
+
+
+class Metrics(object):
+    """
+    Metrics accumulates the measurements of a run.
+    """
+
+    def __init__(self):
+        """
+        """
+        self.started = time.time()
+        self.stages = {}
+        self.files = []
+        self.caches = {}
+        self.statements = {}
+        self.info = {}
+
+    def __nonzero__(self):
+        """
+        Metrics are being collected.
+        """
+        return True
+
+    __bool__ = __nonzero__
+
+    def add(self, name, wall, cpu, bytes_in=0, bytes_out=0, records=0, calls=1):
+        """
+        Add a measurement to the stage totals.
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {
+                'wall_seconds': 0.0,
+                'cpu_seconds': 0.0,
+                'calls': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+                'records': 0
+            }
+        stage['wall_seconds'] += wall
+        stage['cpu_seconds'] += cpu
+        stage['calls'] += calls
+        stage['bytes_in'] += bytes_in
+        stage['bytes_out'] += bytes_out
+        stage['records'] += records
+
+    @contextlib.contextmanager
+    def timer(self, name, bytes_in=0):
+        """
+        Time the enclosed block as one call of the stage. Bytes out and
+        records can be set on the yielded dict.
+        """
+        counts = {'bytes_in': bytes_in, 'bytes_out': 0, 'records': 0}
+        wall = time.time()
+        cpu = cpu_time()
+        try:
+            yield counts
+        finally:
+            self.add(name, time.time() - wall, cpu_time() - cpu, **counts)
+
+    def wrap(self, name, func):
+        """
+        Return func with every call timed as one call of the stage.
+        """
+        stage_add = self.add
+
+        def timed(*args, **kwargs):
+            wall = time.time()
+            cpu = cpu_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_add(name, time.time() - wall, cpu_time() - cpu)
+        return timed
+
+    def timed_iter(self, name, iterable):
+        """
+        Yield from iterable timing only the work done to produce
+        each item, not the work done by the consumer.
+        """
+        wall_total = 0.0
+        cpu_total = 0.0
+        records = 0
+        iterator = iter(iterable)
+        while True:
+            wall = time.time()
+            cpu = cpu_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                wall_total += time.time() - wall
+                cpu_total += cpu_time() - cpu
+            records += 1
+            yield item
+        self.add(name, wall_total, cpu_total, records=records)
+
+    def file(self, **values):
+        """
+        Record the statistics of one source file.
+        """
+        self.files.append(values)
+
+    def cache(self, name, hits, misses):
+        """
+        Add lookups to a cache's hit and miss counts.
+        """
+        c_stats = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+        c_stats['hits'] += hits
+        c_stats['misses'] += misses
+
+    def statement(self, key, seconds):
+        """
+        Add an SQL statement execution time.
+        """
+        s_stats = self.statements.get(key)
+        if s_stats is None:
+            s_stats = self.statements[key] = {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+        s_stats['count'] += 1
+        s_stats['total_seconds'] += seconds
+        if seconds > s_stats['max_seconds']:
+            s_stats['max_seconds'] = seconds
+
+    def report(self):
+        """
+        Return the metrics as a json serializable dict.
+        """
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            if stage['wall_seconds'] > 0:
+                if stage['records']:
+                    stage['records_per_sec'] = round(stage['records'] / stage['wall_seconds'], 1)
+                if stage['bytes_in']:
+                    stage['mb_in_per_sec'] = round(stage['bytes_in'] / 1048576.0 / stage['wall_seconds'], 3)
+            if name in NESTED_STAGES:
+                stage['included_in'] = NESTED_STAGES[name]
+            stages[name] = stage
+
+        caches = {}
+        for name, c_stats in self.caches.items():
+            lookups = c_stats['hits'] + c_stats['misses']
+            caches[name] = dict(c_stats, hit_rate=round(c_stats['hits'] / float(lookups), 4) if lookups else None)
+
+        slowest = sorted(self.files, key=lambda f: f.get('seconds', 0), reverse=True)[:SLOWEST_FILES]
+
+        return {
+            'info': self.info,
+            'total_wall_seconds': round(time.time() - self.started, 3),
+            'stages': stages,
+            'caches': caches,
+            'sqlite_statements': self.statements,
+            'slowest_files': slowest,
+            'files': self.files
+        }
+
+    def write(self, filename):
+        """
+        Write the metrics report to a json file.
+        """
+        with open(filename, 'w') as m_file:
+            json.dump(self.report(), m_file, indent=2, sort_keys=True)
+
+
+class NullMetrics(object):
+    """
+    Stand-in used when metrics are not collected. Evaluates
+    as False so callers can skip per record instrumentation.
+    """
+
+    def __nonzero__(self):
+        """
+        """
+        return False
+
+    __bool__ = __nonzero__
+
+    @contextlib.contextmanager
+    def timer(self, name, bytes_in=0):
+        """
+        """
+        yield {'bytes_in': bytes_in, 'bytes_out': 0, 'records': 0}
+
+    def wrap(self, name, func):
+        """
+        """
+        return func
+
+    def timed_iter(self, name, iterable):
+        """
+        """
+        return iterable
+
+    def add(self, *args, **kwargs):
+        """
+        """
+        pass
+
+    def file(self, **values):
+        """
+        """
+        pass
+
+    def cache(self, name, hits, misses):
+        """
+        """
+        pass
+
+    def statement(self, key, seconds):
+        """
+        """
+        pass
+
+
+class TimedCursor(object):
+    """
+    Wraps an sqlite3 cursor and records the
+    execution time of each statement in metrics.
+    """
+
+    def __init__(self, cursor, metrics):
+        """
+        """
+        self.cursor = cursor
+        self.metrics = metrics
+
+    def execute(self, statement, *args):
+        """
+        Execute the statement and record how long it took.
+        """
+        start = time.time()
+        try:
+            return self.cursor.execute(statement, *args)
+        finally:
+            self.metrics.statement(statement_key(statement), time.time() - start)
+
+    def executemany(self, statement, *args):
+        """
+        Execute the statement and record how long it took.
+        """
+        start = time.time()
+        try:
+            return self.cursor.executemany(statement, *args)
+        finally:
+            self.metrics.statement(statement_key(statement), time.time() - start)
+
+    def __getattr__(self, name):
+        """
+        Pass everything else to the cursor.
+        """
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        """
+        """
+        return iter(self.cursor)
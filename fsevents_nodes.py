@@ -0,0 +1,189 @@
+#!/usr/bin/python
+
+# FSEvents Node Index Python Module
+# ------------------------------------------------------
+# Indexes DLS2 records by node id while parsing. The node id of a
+# file stays the same when it is renamed or moved, so the index
+# answers which paths and events a file had without searching the
+# records of the whole volume.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import sqlite3
+
+from fsevents_reader import (
+    EVENTMASK,
+    enumerate_flags
+)
+
+NODE_INDEX = 'NODE_INDEX.sqlite'
+
+# Records inserted into the index at a time
+NODE_INDEX_BATCH = 10000
+
+# Distinct paths numbered in memory
+NODE_INDEX_PATHS = 1000000
+
+NODE_INDEX_SCHEMA = [
+    'CREATE TABLE sources (source_id INTEGER PRIMARY KEY, source TEXT, source_modified_time TEXT)',
+    'CREATE TABLE paths (path_id INTEGER PRIMARY KEY, fullpath TEXT)',
+    'CREATE TABLE dates (date_id INTEGER PRIMARY KEY, approx_dates_plus_minus_one_day TEXT)',
+    # One reference per record, found by node id and ordered by event id
+    'CREATE TABLE node_records (node_id INTEGER, id INTEGER, mask INTEGER, '
+    'path_id INTEGER, date_id INTEGER, source_id INTEGER, record_end_offset INTEGER)'
+]
+
+# Built once every record is in, which is faster than keeping it up to date
+NODE_INDEX_INDEX = 'CREATE INDEX node_records_by_node ON node_records (node_id, id)'
+
+
+class NodeIndex(object):
+    """
+    NodeIndex writes NODE_INDEX.sqlite with a reference to every DLS2
+    record: its node id, event id, mask, path, approximate dates, source
+    file and offset in the decompressed file. Paths, dates and source
+    files are stored once and referenced by number. DLS1 records have no node id and are
+    left out.
+
+    Paths are numbered in memory up to max_paths distinct paths and
+    then stored again for each record, which keeps memory bounded.
+    """
+
+    def __init__(self, filename, max_paths=NODE_INDEX_PATHS):
+        """
+        filename: The NODE_INDEX.sqlite file, replaced if it exists.
+        max_paths: Distinct paths numbered in memory.
+        """
+        if os.path.exists(filename):
+            os.remove(filename)
+        # Added to by the pipeline writer thread and closed by the main thread
+        self.con = sqlite3.connect(filename, check_same_thread=False)
+        self.con.text_factory = str
+        for statement in NODE_INDEX_SCHEMA:
+            self.con.execute(statement)
+        self.max_paths = max_paths
+        self.paths = {}
+        self.next_path = 1
+        self.sources = {}
+        self.dates = {}
+        self.rows = []
+        self.new_paths = []
+        self.count = 0
+
+    def add(self, record):
+        """
+        Add a reference to the record when it has a node id.
+        """
+        node_id = record['node_id']
+        if node_id == '':
+            return
+        fullpath = record['fullpath']
+        path_id = self.paths.get(fullpath)
+        if path_id is None:
+            path_id = self.next_path
+            self.next_path += 1
+            self.new_paths.append((path_id, fullpath))
+            if len(self.paths) < self.max_paths:
+                self.paths[fullpath] = path_id
+        source = record['source']
+        source_id = self.sources.get(source)
+        if source_id is None:
+            source_id = self.sources[source] = len(self.sources) + 1
+            self.con.execute('INSERT INTO sources VALUES (?, ?, ?)',
+                             (source_id, source, record['source_modified_time']))
+        dates = record['approx_dates_plus_minus_one_day']
+        date_id = self.dates.get(dates)
+        if date_id is None:
+            date_id = self.dates[dates] = len(self.dates) + 1
+            self.con.execute('INSERT INTO dates VALUES (?, ?)', (date_id, dates))
+        self.rows.append((int(node_id), record['id'], int(record['mask'], 16), path_id,
+                          date_id, source_id, record['record_end_offset']))
+        self.count += 1
+        if len(self.rows) >= NODE_INDEX_BATCH:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert the buffered references.
+        """
+        if self.new_paths:
+            self.con.executemany('INSERT INTO paths VALUES (?, ?)', self.new_paths)
+            self.new_paths = []
+        if self.rows:
+            self.con.executemany('INSERT INTO node_records VALUES (?, ?, ?, ?, ?, ?, ?)', self.rows)
+            self.rows = []
+
+    def close(self):
+        """
+        Insert the last references and build the index.
+        Returns the number of records indexed.
+        """
+        self.flush()
+        self.con.execute(NODE_INDEX_INDEX)
+        self.con.commit()
+        self.con.close()
+        self.paths = {}
+        return self.count
+
+
+def lookup_node(index_filename, node_id):
+    """
+    Return every record of a node id in a NODE_INDEX.sqlite, ordered
+    by event id, as dicts with the fields of the parsed records except
+    the file name.
+    """
+    con = sqlite3.connect(index_filename)
+    con.text_factory = str
+    try:
+        rows = con.execute(
+            'SELECT r.id, r.mask, p.fullpath, d.approx_dates_plus_minus_one_day, s.source, '
+            's.source_modified_time, r.record_end_offset '
+            'FROM node_records r JOIN paths p ON p.path_id = r.path_id '
+            'JOIN dates d ON d.date_id = r.date_id '
+            'JOIN sources s ON s.source_id = r.source_id '
+            'WHERE r.node_id = ? ORDER BY r.id, r.source_id, r.record_end_offset', (node_id,)).fetchall()
+    finally:
+        con.close()
+
+    records = []
+    for event_id, mask, fullpath, dates, source, m_time, offset in rows:
+        f_type, f_flags = enumerate_flags(mask, EVENTMASK)
+        records.append({
+            'id': event_id,
+            'id_hex': '{:016x} ({})'.format(event_id, event_id),
+            'node_id': node_id,
+            'fullpath': fullpath,
+            'type': f_type,
+            'flags': f_flags,
+            'mask': '0x{:08x}'.format(mask),
+            'approx_dates_plus_minus_one_day': dates,
+            'source': source,
+            'source_modified_time': m_time,
+            'record_end_offset': offset
+        })
+    return records
+
+
+def node_paths(records):
+    """
+    Return each path of the records in the order it was first seen.
+    """
+    paths = []
+    for record in records:
+        if record['fullpath'] not in paths:
+            paths.append(record['fullpath'])
+    return paths
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+
+# FSEvents Page Index Python Module
+# ------------------------------------------------------
+# Records where each DLS page of each source file is and the event
+# ids it holds, so the records of an event id range can be read back
+# from the original evidence by decompressing and decoding only the
+# pages that cover it.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+from bisect import bisect_right
+
+from fsevents_dates import DateIndex
+from fsevents_reader import (
+    DLS_MAGIC,
+    FSEventDecoder,
+    decompress,
+    image_volumes,
+    is_fsevent_filename
+)
+
+PAGE_INDEX = 'PAGE_INDEX.json'
+
+# Fields of each page entry
+PAGE_FIELDS = ['start_offset', 'end_offset', 'dls_version', 'first_id', 'last_id', 'records']
+
+
+class PageIndex(object):
+    """
+    PageIndex collects the pages of every file parsed by the decoders
+    it is attached to and writes them to PAGE_INDEX.json.
+
+    Each file entry holds the compressed offset and decompressed offset
+    of every gzip member, which are the points decompression can start
+    from, the time range used to date its records and its pages. Only
+    pages that produced records are listed.
+    """
+
+    def __init__(self, source, sourcetype):
+        """
+        source: The parsed source, reopened by lookups.
+        sourcetype: 'folder' or 'image'.
+        """
+        self.source = source
+        self.sourcetype = sourcetype
+        self.volumes = []
+
+    def start_volume(self, location, decoder):
+        """
+        Attach the decoder of a volume. Must be called
+        after the decoder's date index is set.
+        """
+        volume = {
+            'location': location,
+            'use_file_mod_dates': decoder.use_file_mod_dates,
+            'date_index': None,
+            'files': []
+        }
+        if decoder.date_index is not None:
+            volume['date_index'] = [decoder.date_index.wds, decoder.date_index.dates]
+        self.volumes.append(volume)
+        decoder.page_index = self
+
+    def add_file(self, decoder, src, compressed_bytes, members):
+        """
+        Add the pages of the file the decoder just parsed.
+        """
+        if not decoder.page_stats:
+            return
+        self.volumes[-1]['files'].append({
+            'name': src.name,
+            'fullpath': src.fullpath,
+            'm_time': src.m_time,
+            'compressed_bytes': compressed_bytes,
+            'members': members or [],
+            'time_range': decoder.time_range if decoder.date_index is None else [],
+            'pages': decoder.page_stats
+        })
+
+    def write(self, filename):
+        """
+        """
+        with open(filename, 'wb') as i_file:
+            json.dump({
+                'source': self.source,
+                'sourcetype': self.sourcetype,
+                'page_fields': PAGE_FIELDS,
+                'volumes': self.volumes
+            }, i_file, separators=(',', ':'))
+
+
+def _str(value):
+    """
+    Return json text as the byte strings the decoder produces.
+    """
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return [_str(item) for item in value]
+    if isinstance(value, dict):
+        return dict((_str(key), _str(item)) for key, item in value.items())
+    return value
+
+
+def read_source_file(index, entry, offset):
+    """
+    Return the raw contents of an indexed file from offset on.
+    """
+    if index['sourcetype'] == 'folder':
+        with open(entry['fullpath'], 'rb') as s_file:
+            s_file.seek(offset)
+            return s_file.read()
+    if 'readers' not in index:
+        # Scan the image once per lookup
+        index['readers'] = {}
+        for location, files in image_volumes(index['source']):
+            for src in files or []:
+                index['readers'][src.fullpath] = src.reader
+    if entry['fullpath'] in index['readers']:
+        return index['readers'][entry['fullpath']]()[offset:]
+    raise IOError('{} was not found in {}'.format(entry['fullpath'], index['source']))
+
+
+def read_pages(index, entry, pages):
+    """
+    Return the decompressed DLS pages of a file. Decompression starts
+    at the gzip member holding the start of the first page and stops
+    at the end of the last page.
+    """
+    start_offset = min(page[0] for page in pages)
+    end_offset = max(page[1] for page in pages)
+    members = entry['members']
+    if not members:
+        # The file was not compressed
+        d_offset = 0
+        buf = read_source_file(index, entry, 0)
+    else:
+        i = bisect_right([member[1] for member in members], start_offset) - 1
+        c_offset, d_offset = members[i]
+        buf = decompress(read_source_file(index, entry, c_offset), length=end_offset - d_offset)
+    return [buf[page[0] - d_offset:page[1] - d_offset] for page in pages]
+
+
+def lookup(index_filename, first_id, last_id, logfile=None):
+    """
+    Return the records with an event id from first_id to last_id,
+    sorted by event id, read from the pages of the source files
+    listed in the page index. Records are the same as when the
+    source was parsed.
+    """
+    with open(index_filename, 'rb') as i_file:
+        index = _str(json.load(i_file))
+
+    records = []
+    for volume in index['volumes']:
+        date_index = None
+        if volume['date_index'] is not None:
+            date_index = DateIndex()
+            date_index.wds, date_index.dates = volume['date_index']
+
+        for entry in volume['files']:
+            pages = [page for page in entry['pages'] if page[3] <= last_id and page[4] >= first_id]
+            if not pages:
+                continue
+
+            # Decoder set up as it was for the file
+            decoder = FSEventDecoder(volume['use_file_mod_dates'], logfile, date_index=date_index)
+            decoder.src_fullpath = entry['fullpath']
+            decoder.src_filename = entry['name']
+            decoder.m_time = entry['m_time']
+            decoder.is_carved_gzip = not is_fsevent_filename(entry['name'])
+            decoder.time_range = entry['time_range']
+
+            for page, raw_page in zip(pages, read_pages(index, entry, pages)):
+                if raw_page[:4] not in DLS_MAGIC:
+                    raise IOError('No DLS page at offset {} of {}. The file changed since '
+                                  'it was indexed.'.format(page[0], entry['fullpath']))
+                decoder.dls_version = page[2]
+                decoder.page_offset = page[0]
+                decoder.valid_record_check = True
+                for record in decoder.find_page_records(raw_page, page[0]):
+                    if first_id <= record['id'] <= last_id:
+                        records.append(record)
+
+    records.sort(key=lambda record: record['id'])
+    return records
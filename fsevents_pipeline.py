@@ -0,0 +1,212 @@
+#!/usr/bin/python
+
+# FSEvents Pipeline Python Module
+# ------------------------------------------------------
+# Runs the parse of a volume as stages on their own threads joined by
+# bounded queues. Files are read, decompressed, decoded and written to
+# the outputs at the same time. A full queue blocks the stage feeding
+# it, so a slow stage holds back the stages before it instead of
+# letting work pile up in memory.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import sys
+import time
+import threading
+import Queue
+
+# Items each queue between stages can hold
+DEFAULT_PIPELINE_DEPTH = 8
+
+# Seconds between checks of the stage threads for Ctrl-C
+POLL_SECONDS = 0.1
+
+# Put on a queue after the last item
+DONE = object()
+
+
+class PipelineAborted(Exception):
+    """
+    Raised in a stage when another stage failed.
+    """
+
+
+class Stage(threading.Thread):
+    """
+    Stage runs work on each item taken from its inbox. The first
+    stage has no inbox and its work is called once to produce every
+    item. work is given an emit function that puts an item on the
+    outbox of the stage, blocking while the outbox is full.
+
+    The time spent waiting for items and waiting for room in the
+    outbox is kept, along with the depth of the inbox each time the
+    stage asks it for an item.
+
+    When any stage fails, the others stop working on items but keep
+    taking them from their inbox until the end, so no stage is left
+    blocked on a full queue.
+    """
+
+    def __init__(self, pipeline, name, work, inbox, outbox):
+        """
+        """
+        threading.Thread.__init__(self, name=name)
+        self.daemon = True
+        self.pipeline = pipeline
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+
+        self.items_in = 0
+        self.items_out = 0
+        self.wait_seconds = 0.0
+        self.stall_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def get(self):
+        """
+        Return the next item of the inbox.
+        """
+        depth = self.inbox.qsize()
+        self.depth_total += depth
+        if depth > self.depth_max:
+            self.depth_max = depth
+        started = time.time()
+        item = self.inbox.get()
+        self.wait_seconds += time.time() - started
+        return item
+
+    def emit(self, item):
+        """
+        Put an item on the outbox.
+        """
+        if self.pipeline.failed:
+            raise PipelineAborted()
+        started = time.time()
+        self.outbox.put(item)
+        self.stall_seconds += time.time() - started
+        self.items_out += 1
+
+    def run(self):
+        """
+        """
+        started = time.time()
+        done = self.inbox is None
+        try:
+            if self.inbox is None:
+                self.work(self.emit)
+            else:
+                while True:
+                    item = self.get()
+                    if item is DONE:
+                        done = True
+                        break
+                    self.items_in += 1
+                    if not self.pipeline.failed:
+                        self.work(item, self.emit)
+        except PipelineAborted:
+            pass
+        except BaseException:
+            self.pipeline.fail(sys.exc_info())
+
+        # Drain the inbox so the stage before can finish
+        while not done:
+            done = self.inbox.get() is DONE
+        if self.outbox is not None:
+            self.outbox.put(DONE)
+        self.busy_seconds = time.time() - started - self.wait_seconds - self.stall_seconds
+
+    def stats(self):
+        """
+        Return the queue depth and stall times of the stage. The
+        first stage has no inbox, so its depth is None.
+        """
+        gets = self.items_in + 1
+        return {
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy_seconds, 4),
+            # Starved for input
+            'wait_seconds': round(self.wait_seconds, 4),
+            # Blocked by a full outbox
+            'stall_seconds': round(self.stall_seconds, 4),
+            'queue_depth_max': self.depth_max if self.inbox is not None else None,
+            'queue_depth_mean': round(float(self.depth_total) / gets, 2) if self.inbox is not None else None
+        }
+
+
+class Pipeline(object):
+    """
+    Pipeline runs a list of (name, work) stages, each on its own
+    thread, joined by queues of depth items. The first stage's work
+    is called as work(emit), the others as work(item, emit).
+
+    The first exception raised in a stage stops every stage and is
+    raised again by run().
+    """
+
+    def __init__(self, depth=DEFAULT_PIPELINE_DEPTH):
+        """
+        """
+        self.depth = depth
+        self.failed = False
+        self.exc_info = None
+        self.lock = threading.Lock()
+        self.stages = []
+
+    def fail(self, exc_info):
+        """
+        Keep the first exception and stop the stages.
+        """
+        with self.lock:
+            if self.exc_info is None:
+                self.exc_info = exc_info
+            self.failed = True
+
+    def run(self, stages):
+        """
+        Run the stages until the last one is done.
+        """
+        inbox = None
+        for i, (name, work) in enumerate(stages):
+            outbox = Queue.Queue(self.depth) if i < len(stages) - 1 else None
+            self.stages.append(Stage(self, name, work, inbox, outbox))
+            inbox = outbox
+
+        for stage in self.stages:
+            stage.start()
+        try:
+            for stage in self.stages:
+                # A timeout keeps Ctrl-C from waiting on the join
+                while stage.is_alive():
+                    stage.join(POLL_SECONDS)
+        except BaseException:
+            # Ctrl-C stops the stages at their next item
+            self.fail(sys.exc_info())
+            for stage in self.stages:
+                stage.join()
+
+        if self.exc_info is not None:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+
+    def stats(self):
+        """
+        Return the stats of each stage.
+        """
+        return [stage.stats() for stage in self.stages]
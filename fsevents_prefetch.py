@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+# FSEvents Prefetch Python Module
+# ------------------------------------------------------
+# Reads the next source files in the background while the current one
+# is decompressed and decoded, so evidence on network shares or in
+# mounted images with slow reads does not hold up the parse. Several
+# files are read at the same time under a memory cap.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import time
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+# Files read ahead of the one being decoded
+DEFAULT_PREFETCH = 8
+
+# Memory in MB the files read ahead may hold
+DEFAULT_PREFETCH_MEMORY_MB = 64
+
+# Most files read at the same time
+MAX_PREFETCH_THREADS = 4
+
+def _read(src):
+    """
+    Return the raw contents of a SourceFile, or the exception
+    raised reading it, and the seconds it took.
+    """
+    started = time.time()
+    try:
+        data = src.reader()
+    except Exception as exp:
+        data = exp
+    return data, time.time() - started
+
+
+class Prefetcher(object):
+    """
+    Prefetcher yields (src, data) for each SourceFile in order, where
+    data is the raw contents of the file or the exception raised
+    reading it.
+
+    Up to readahead files are read ahead on background threads. A file
+    is only started while the files read ahead and not yet taken hold
+    less than memory_mb, using the file size when it is known. The
+    next file is always started, however big, so the parse goes on.
+
+    threads: Files read at the same time. Use 1 when the readers share
+        a handle that is not safe to use from several threads, as the
+        file objects of a dfvfs image do.
+    """
+
+    def __init__(self, files, readahead=DEFAULT_PREFETCH, memory_mb=DEFAULT_PREFETCH_MEMORY_MB,
+                 threads=MAX_PREFETCH_THREADS, metrics=None):
+        """
+        """
+        self.files = files
+        self.readahead = max(1, readahead)
+        self.memory = memory_mb * 1024 * 1024
+        self.threads = max(1, min(threads, self.readahead))
+        self.metrics = metrics
+
+        # Bytes held by files started and not yet taken
+        self.held = 0
+        self.held_max = 0
+        # Seconds the caller waited for a file still being read
+        self.wait_seconds = 0.0
+        self.read_count = 0
+        self.read_bytes = 0
+
+    def _size(self, src):
+        """
+        Return the bytes a file is expected to hold.
+        """
+        if src.size is not None:
+            return src.size
+        # Unknown sizes take an equal share of the cap
+        return self.memory // self.readahead
+
+    def __iter__(self):
+        """
+        """
+        pool = ThreadPool(self.threads)
+        # [src, size, result] of the files in the window, in order
+        pending = deque()
+        files = iter(self.files)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.readahead:
+                    try:
+                        src = next(files)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.append([src, self._size(src), None])
+
+                # Start the files of the window in order while they fit
+                for entry in pending:
+                    if entry[2] is None:
+                        if entry is not pending[0] and self.held + entry[1] > self.memory:
+                            break
+                        entry[2] = pool.apply_async(_read, (entry[0],))
+                        self.held += entry[1]
+                        self.held_max = max(self.held_max, self.held)
+
+                if not pending:
+                    break
+                src, size, result = pending.popleft()
+                started = time.time()
+                data, seconds = result.get()
+                self.wait_seconds += time.time() - started
+                self.held -= size
+                if not isinstance(data, Exception):
+                    self.read_count += 1
+                    self.read_bytes += len(data)
+                    if self.metrics:
+                        # Read on another thread, so its CPU time is not known
+                        self.metrics.add('read', seconds, 0.0, bytes_out=len(data))
+                yield src, data
+        finally:
+            pool.terminate()
+
+    def stats(self):
+        """
+        Return the prefetch statistics for METRICS.json.
+        """
+        return {
+            'readahead': self.readahead,
+            'memory_mb': self.memory // (1024 * 1024),
+            'threads': self.threads,
+            'files_read': self.read_count,
+            'bytes_read': self.read_bytes,
+            'held_bytes_max': self.held_max,
+            'wait_seconds': round(self.wait_seconds, 4)
+        }
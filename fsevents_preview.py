@@ -0,0 +1,323 @@
+#!/usr/bin/python
+
+# FSEvents Preview Python Module
+# ------------------------------------------------------
+# Estimates what a full parse of a source holds and costs without
+# parsing it. Every file is decompressed and its DLS page headers and
+# date markers are read, which is fast, and only a random sample of
+# pages is decoded into records. Record counts are estimated from the
+# sample with error bounds.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+import math
+import time
+import random
+
+from fsevents_reader import (
+    FSEventDecoder,
+    check_file_mod_dates,
+    folder_files,
+    image_volumes,
+    page_event_ids
+)
+
+PREVIEW = 'PREVIEW.json'
+
+DEFAULT_SAMPLE_PAGES = 50
+
+# Normal quantile of the 95% error bounds
+Z_95 = 1.96
+
+# Estimated decode time under which a full run is suggested
+FULL_RUN_SECONDS = 600
+
+# Top level folders listed in the summary
+TOP_FOLDERS = 10
+
+
+class Preview(object):
+    """
+    Preview reads the files of a source once. Sizes, pages, event
+    ids and dates are counted for every file. A uniform sample of
+    DLS pages is kept with reservoir sampling and decoded at the end.
+    """
+
+    def __init__(self, sample_pages=DEFAULT_SAMPLE_PAGES, seed=0):
+        """
+        sample_pages: Number of DLS pages to decode.
+        seed: Seed of the page sample, so a preview can be repeated.
+        """
+        self.sample_pages = sample_pages
+        self.random = random.Random(seed)
+        self.sample = []
+
+        self.files = {'all': 0, 'allocated': 0, 'carved': 0, 'errors': 0}
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self.pages = 0
+        self.page_bytes = 0
+        self.dls_versions = {}
+        self.first_id = None
+        self.last_id = None
+        self.name_ids = []
+        self.marker_dates = []
+        self.mod_dates = []
+        self.scan_seconds = 0.0
+
+    def scan_volume(self, files, use_file_mod_dates):
+        """
+        Read each SourceFile of a volume.
+        """
+        decoder = FSEventDecoder(use_file_mod_dates)
+        started = time.time()
+        for src in files:
+            self.files['all'] += 1
+            self.files['carved' if src.is_carved_gzip else 'allocated'] += 1
+            try:
+                data = src.reader()
+                buf = src.unpack(data)
+            except Exception:
+                self.files['errors'] += 1
+                continue
+            if decoder.dls_header_search(buf, src.fullpath) is False:
+                self.files['errors'] += 1
+                continue
+            self.compressed_bytes += len(data)
+            self.decompressed_bytes += len(buf)
+
+            if not src.is_carved_gzip:
+                self.name_ids.append(int(src.name, 16))
+                if use_file_mod_dates:
+                    self.mod_dates.append(str(src.m_time)[:10].replace("-", "."))
+            for wd, date in decoder.date_markers(buf):
+                if str(date)[:10].replace(".", "").isdigit():
+                    self.marker_dates.append(date[:10])
+
+            for page in decoder.my_dls:
+                self.add_page(src, buf, page['Start Offset'], page['End Offset'], use_file_mod_dates)
+        self.scan_seconds += time.time() - started
+
+    def add_page(self, src, buf, start_offset, end_offset, use_file_mod_dates):
+        """
+        Count a page and offer it to the sample.
+        """
+        raw_page = buf[start_offset:end_offset]
+        dls_version = 1 if raw_page[:4] == '1SLD' else 2
+        self.pages += 1
+        self.page_bytes += len(raw_page)
+        self.dls_versions[dls_version] = self.dls_versions.get(dls_version, 0) + 1
+
+        bounds = page_event_ids(raw_page, end_offset - start_offset, dls_version)
+        if bounds is not None:
+            if self.first_id is None or bounds[0] < self.first_id:
+                self.first_id = bounds[0]
+            if self.last_id is None or bounds[1] > self.last_id:
+                self.last_id = bounds[1]
+
+        # Reservoir sampling keeps each page with the same chance
+        page = (src, raw_page, start_offset, dls_version, use_file_mod_dates)
+        if len(self.sample) < self.sample_pages:
+            self.sample.append(page)
+        else:
+            i = self.random.randint(0, self.pages - 1)
+            if i < self.sample_pages:
+                self.sample[i] = page
+
+    def decode_sample(self):
+        """
+        Decode the sampled pages. Returns the records, folder counts
+        and byte size of each page and the decode time in seconds.
+        """
+        sampled = []
+        started = time.time()
+        for src, raw_page, start_offset, dls_version, use_file_mod_dates in self.sample:
+            decoder = FSEventDecoder(use_file_mod_dates)
+            decoder.src_fullpath = src.fullpath
+            decoder.src_filename = src.name
+            decoder.m_time = src.m_time
+            decoder.is_carved_gzip = src.is_carved_gzip
+            decoder.dls_version = dls_version
+            decoder.page_offset = start_offset
+            decoder.valid_record_check = True
+            folders = {}
+            records = 0
+            for record in decoder.find_page_records(raw_page, start_offset):
+                records += 1
+                folder = record['fullpath'].split('/', 1)[0]
+                folders[folder] = folders.get(folder, 0) + 1
+            sampled.append((len(raw_page), records, folders))
+        return sampled, time.time() - started
+
+    def summary(self):
+        """
+        Return the counts, estimates and suggested run as a dict.
+        """
+        sampled, decode_seconds = self.decode_sample()
+        sizes = [size for size, records, folders in sampled]
+        records = ratio_estimate(sizes, [count for size, count, folders in sampled],
+                                 self.page_bytes, self.pages)
+
+        folder_names = set()
+        for size, count, folders in sampled:
+            folder_names.update(folders)
+        top_folders = []
+        for name in folder_names:
+            estimate, bound = ratio_estimate(sizes, [folders.get(name, 0) for size, count, folders in sampled],
+                                             self.page_bytes, self.pages)
+            top_folders.append({'folder': '/' + name, 'records': estimate, 'bound': bound})
+        top_folders.sort(key=lambda folder: -folder['records'])
+
+        sampled_records = sum(count for size, count, folders in sampled)
+        seconds = None
+        if sampled_records:
+            # Scanning is part of a full run too
+            seconds = self.scan_seconds + records[0] * decode_seconds / sampled_records
+
+        dates = self.marker_dates + self.mod_dates
+        summary = {
+            'files': self.files,
+            'compressed_bytes': self.compressed_bytes,
+            'decompressed_bytes': self.decompressed_bytes,
+            'pages': self.pages,
+            'dls_versions': self.dls_versions,
+            'sampled_pages': len(sampled),
+            'sampled_records': sampled_records,
+            'records': records[0],
+            'records_bound': records[1],
+            'first_id': self.first_id,
+            'last_id': self.last_id,
+            'first_file_id': min(self.name_ids) if self.name_ids else None,
+            'last_file_id': max(self.name_ids) if self.name_ids else None,
+            'first_date': min(dates) if dates else None,
+            'last_date': max(dates) if dates else None,
+            'date_markers': len(self.marker_dates),
+            'top_folders': top_folders[:TOP_FOLDERS],
+            'scan_seconds': round(self.scan_seconds, 3),
+            'decode_seconds': round(decode_seconds, 3),
+            'estimated_seconds': round(seconds, 1) if seconds is not None else None
+        }
+        summary['suggested'] = suggest_run(summary)
+        return summary
+
+
+def ratio_estimate(sizes, counts, total_size, population):
+    """
+    Return the estimated total of a count over every page and its
+    95% error bound, from the counts of a simple random sample of
+    pages. The count is taken as proportional to the page size, which
+    allows for pages of different sizes. The bound is None when fewer
+    than two pages were sampled, and 0 when every page was.
+    """
+    n = len(sizes)
+    if n == 0 or sum(sizes) == 0:
+        return 0, None
+    ratio = float(sum(counts)) / sum(sizes)
+    estimate = int(round(ratio * total_size))
+    if n >= population:
+        return estimate, 0
+    if n < 2:
+        return estimate, None
+    residuals = sum((count - ratio * size) ** 2 for size, count in zip(sizes, counts)) / (n - 1)
+    variance = population ** 2 * (1 - float(n) / population) * residuals / n
+    return estimate, int(math.ceil(Z_95 * math.sqrt(variance)))
+
+
+def suggest_run(summary):
+    """
+    Return the suggested kind of run and the reason for it.
+    """
+    seconds = summary['estimated_seconds']
+    if seconds is None:
+        return {'run': 'full', 'reason': 'No records were found in the sampled pages.'}
+    if seconds <= FULL_RUN_SECONDS:
+        return {'run': 'full', 'reason': 'A full parse should take about {}.'.format(duration(seconds))}
+    workers = int(math.ceil(seconds / FULL_RUN_SECONDS))
+    reason = ('A full parse should take about {} on one process. Split it over about {} workers '
+              'with --batch or the job queue'.format(duration(seconds), workers))
+    if summary['top_folders'] and summary['records']:
+        top = summary['top_folders'][0]
+        reason += (', or keep only the folders needed with --path-prefix. {} holds about {:.0%} '
+                   'of the records.'.format(top['folder'], float(top['records']) / summary['records']))
+    else:
+        reason += '.'
+    return {'run': 'distributed', 'reason': reason}
+
+
+def duration(seconds):
+    """
+    Return seconds as text for the summary.
+    """
+    if seconds < 120:
+        return '{:.0f} seconds'.format(seconds)
+    if seconds < 7200:
+        return '{:.0f} minutes'.format(seconds / 60)
+    return '{:.1f} hours'.format(seconds / 3600)
+
+
+def preview_source(source, sourcetype, sample_pages=DEFAULT_SAMPLE_PAGES, seed=0):
+    """
+    Return the preview summary of a folder or image source.
+    """
+    preview = Preview(sample_pages, seed)
+    if sourcetype == 'folder':
+        # Uses file mod dates unless files are carved or mod dates
+        # lost due to exporting, as a full parse does
+        preview.scan_volume(folder_files(source), check_file_mod_dates(source))
+    else:
+        for location, files in image_volumes(source):
+            if files is not None:
+                preview.scan_volume(files, True)
+    return preview.summary()
+
+
+def print_summary(summary):
+    """
+    Print the preview summary.
+    """
+    def event_id(wd):
+        return 'None' if wd is None else '{:016x}'.format(wd)
+
+    print('  Files: {} ({} allocated, {} carved, {} unreadable)'.format(
+        summary['files']['all'], summary['files']['allocated'],
+        summary['files']['carved'], summary['files']['errors']))
+    print('  Compressed Bytes: {}\n  Decompressed Bytes: {}'.format(
+        summary['compressed_bytes'], summary['decompressed_bytes']))
+    print('  DLS Pages: {} (sampled {})'.format(summary['pages'], summary['sampled_pages']))
+    if summary['records_bound'] is None:
+        print('  Estimated Records: {}'.format(summary['records']))
+    else:
+        print('  Estimated Records: {} +/- {}'.format(summary['records'], summary['records_bound']))
+    print('  Event ID Span: {} - {}'.format(event_id(summary['first_id']), event_id(summary['last_id'])))
+    print('  Date Span: {} - {} ({} date markers)'.format(
+        summary['first_date'] or 'Unknown', summary['last_date'] or 'Unknown', summary['date_markers']))
+    if summary['top_folders']:
+        print('  Busiest Top Level Folders:')
+        for folder in summary['top_folders']:
+            bound = '' if folder['bound'] is None else ' +/- {}'.format(folder['bound'])
+            print('    {}: {}{}'.format(folder['folder'], folder['records'], bound))
+    if summary['estimated_seconds'] is not None:
+        print('  Estimated Parse Time: {}'.format(duration(summary['estimated_seconds'])))
+    print('  Suggested Run: {}\n  {}'.format(summary['suggested']['run'], summary['suggested']['reason']))
+
+
+def write_summary(summary, filename):
+    """
+    Write the preview summary to PREVIEW.json.
+    """
+    with open(filename, 'wb') as p_file:
+        json.dump(summary, p_file, indent=2, sort_keys=True)
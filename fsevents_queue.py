@@ -0,0 +1,311 @@
+#!/usr/bin/python
+
+# FSEvents Job Queue Python Module
+# ------------------------------------------------------
+# A work queue kept as plain files in a folder on shared storage so
+# that several analysis servers can parse the same sources without a
+# broker. QUEUE.sqlite holds one work unit per fsevents file with its
+# lease and retry state, blobs/ holds the raw contents of files read
+# from images and shards/ holds the decoded result of each unit.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import json
+import time
+import socket
+import sqlite3
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from fsevents_batch import decode_unit
+
+QUEUE_DB = 'QUEUE.sqlite'
+
+# Seconds a worker holds a unit before another worker may take it over
+LEASE_SECONDS = 600
+
+# Times a unit is handed out before it is marked failed
+MAX_ATTEMPTS = 3
+
+# Seconds a worker waits for leased units to finish or expire
+POLL_SECONDS = 2
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS [hosts](\
+        [id] INTEGER PRIMARY KEY, \
+        [casename] TEXT UNIQUE, \
+        [source] TEXT, \
+        [sourcetype] TEXT)",
+    "CREATE TABLE IF NOT EXISTS [units](\
+        [id] INTEGER PRIMARY KEY, \
+        [host] INTEGER, \
+        [chain] TEXT, \
+        [idx] INTEGER, \
+        [name] TEXT, \
+        [fullpath] TEXT, \
+        [m_time] TEXT, \
+        [seed] TEXT, \
+        [use_file_mod_dates] INTEGER, \
+        [blob] TEXT, \
+        [state] TEXT DEFAULT 'pending', \
+        [worker] TEXT, \
+        [lease_expires] REAL, \
+        [attempts] INTEGER DEFAULT 0, \
+        [error] TEXT)",
+    "CREATE INDEX IF NOT EXISTS [units_state] ON [units] ([state], [idx], [host])"
+]
+
+# Columns of a unit handed to fsevents_batch.decode_unit
+UNIT_COLUMNS = ['id', 'host', 'chain', 'idx', 'name', 'fullpath', 'm_time',
+                'seed', 'use_file_mod_dates', 'blob', 'attempts']
+
+
+class JobQueue(object):
+    """
+    JobQueue adds, leases and completes the work units
+    stored in a queue folder.
+    """
+
+    def __init__(self, queue_dir, create=False):
+        """
+        queue_dir: The queue folder on shared storage.
+        create: Create the folder and queue database if needed.
+        """
+        self.queue_dir = queue_dir
+        self.db_filename = os.path.join(queue_dir, QUEUE_DB)
+        if create:
+            for folder in (queue_dir, self.blob_dir, self.shard_dir):
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+        elif not os.path.isfile(self.db_filename):
+            raise IOError('{} is not a job queue folder.'.format(queue_dir))
+
+        # Statements wait on locks held by other workers
+        self.con = sqlite3.connect(self.db_filename, timeout=60)
+        self.con.isolation_level = None
+        # File names and paths are stored as given
+        self.con.text_factory = str
+        if create:
+            for statement in SCHEMA:
+                self.con.execute(statement)
+
+    @property
+    def blob_dir(self):
+        """
+        """
+        return os.path.join(self.queue_dir, 'blobs')
+
+    @property
+    def shard_dir(self):
+        """
+        """
+        return os.path.join(self.queue_dir, 'shards')
+
+    def shard_path(self, unit_id):
+        """
+        Return the result shard file of a unit.
+        """
+        return os.path.join(self.shard_dir, '%08d.shard' % (unit_id))
+
+    def close(self):
+        """
+        """
+        self.con.close()
+
+    def add_host(self, casename, source, sourcetype):
+        """
+        Add a host and return its id.
+        """
+        cursor = self.con.execute(
+            "INSERT INTO hosts (casename, source, sourcetype) VALUES (?, ?, ?)",
+            (casename, source, sourcetype))
+        return cursor.lastrowid
+
+    def hosts(self):
+        """
+        Return (id, casename, source, sourcetype) of every host.
+        """
+        return self.con.execute("SELECT id, casename, source, sourcetype FROM hosts ORDER BY id").fetchall()
+
+    def add_units(self, units):
+        """
+        Add the work units of a volume made by fsevents_batch.chain_units.
+        Files read from images are stored as blobs in the queue folder.
+        """
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            for unit in units:
+                cursor = self.con.execute(
+                    "INSERT INTO units (host, chain, idx, name, fullpath, m_time, seed, use_file_mod_dates) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (unit['host'], unit['chain'], unit['index'], unit['name'], unit['fullpath'],
+                     unit['m_time'], json.dumps(unit['seed']), int(unit['use_file_mod_dates'])))
+                if unit['reader'] is not None:
+                    blob = os.path.join(self.blob_dir, '%08d.blob' % (cursor.lastrowid))
+                    with open(blob, 'wb') as b_file:
+                        b_file.write(unit['reader']())
+                    self.con.execute("UPDATE units SET blob = ? WHERE id = ?", (blob, cursor.lastrowid))
+            self.con.execute("COMMIT")
+        except:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def claim(self, worker):
+        """
+        Lease the next pending unit, or a unit whose lease expired,
+        to the worker. Hosts take turns by file index. Returns the
+        unit as a dict or None when there is nothing to claim.
+        """
+        now = time.time()
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            # Units abandoned too many times are given up on
+            self.con.execute(
+                "UPDATE units SET state = 'failed', error = 'Lease expired ' || attempts || ' times' "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, MAX_ATTEMPTS))
+            row = self.con.execute(
+                "SELECT {} FROM units WHERE state = 'pending' "
+                "OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY idx, host LIMIT 1".format(', '.join(UNIT_COLUMNS)),
+                (now,)).fetchone()
+            if row is not None:
+                self.con.execute(
+                    "UPDATE units SET state = 'leased', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + LEASE_SECONDS, row[0]))
+            self.con.execute("COMMIT")
+        except:
+            self.con.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return unit_dict(row)
+
+    def complete(self, unit_id, worker):
+        """
+        Mark a unit done once its shard is written.
+        """
+        self.con.execute(
+            "UPDATE units SET state = 'done', lease_expires = NULL, error = NULL "
+            "WHERE id = ? AND worker = ?",
+            (unit_id, worker))
+
+    def fail(self, unit_id, worker, error):
+        """
+        Return a unit to the queue after an error, or mark it
+        failed once it has been tried MAX_ATTEMPTS times.
+        """
+        self.con.execute(
+            "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_expires = NULL, error = ? WHERE id = ? AND worker = ?",
+            (MAX_ATTEMPTS, error, unit_id, worker))
+
+    def counts(self):
+        """
+        Return the number of units in each state.
+        """
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for state, count in self.con.execute("SELECT state, count(1) FROM units GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def units(self, host_id):
+        """
+        Return the units of a host in volume and file order with their
+        state and error.
+        """
+        rows = self.con.execute(
+            "SELECT {}, state, error FROM units WHERE host = ? ORDER BY id".format(', '.join(UNIT_COLUMNS)),
+            (host_id,)).fetchall()
+        units = []
+        for row in rows:
+            unit = unit_dict(row[:len(UNIT_COLUMNS)])
+            unit['state'], unit['error'] = row[len(UNIT_COLUMNS):]
+            units.append(unit)
+        return units
+
+
+def unit_dict(row):
+    """
+    Return a queue row as a unit for fsevents_batch.decode_unit.
+    """
+    unit = dict(zip(UNIT_COLUMNS, row))
+    unit['index'] = unit['idx']
+    seed = json.loads(unit['seed'])
+    unit['seed'] = (seed[0], str(seed[1]))
+    unit['use_file_mod_dates'] = bool(unit['use_file_mod_dates'])
+    return unit
+
+
+def write_shard(filename, result):
+    """
+    Write a decoded result so that readers never see a partial shard.
+    """
+    tmp_name = '{}.{}.{}.tmp'.format(filename, socket.gethostname(), os.getpid())
+    with open(tmp_name, 'wb') as s_file:
+        pickle.dump(result, s_file, 2)
+    if os.path.exists(filename):
+        # Written by a worker whose lease expired
+        os.remove(filename)
+    os.rename(tmp_name, filename)
+
+
+def read_shard(filename):
+    """
+    Read a decoded result.
+    """
+    with open(filename, 'rb') as s_file:
+        return pickle.load(s_file)
+
+
+def work(queue_dir, worker=None, log=None):
+    """
+    Claim and decode units until none are left. Each result is
+    written to its shard before the unit is marked done.
+    Returns the number of units decoded.
+    """
+    if worker is None:
+        worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+    queue = JobQueue(queue_dir)
+    decoded = 0
+    try:
+        while True:
+            unit = queue.claim(worker)
+            if unit is None:
+                counts = queue.counts()
+                if counts['pending'] == 0 and counts['leased'] == 0:
+                    break
+                # Units leased by other workers may still come back
+                time.sleep(POLL_SECONDS)
+                continue
+            try:
+                result = decode_unit(unit)
+                write_shard(queue.shard_path(unit['id']), result)
+            except Exception as exp:
+                queue.fail(unit['id'], worker, '{}: {}'.format(type(exp).__name__, exp))
+                if log is not None:
+                    log.write('{}\tError: {}\n'.format(unit['fullpath'], exp))
+                continue
+            queue.complete(unit['id'], worker)
+            decoded += 1
+    finally:
+        queue.close()
+    return decoded
@@ -0,0 +1,1414 @@
+#!/usr/bin/python
+
+# FSEvents Reader Python Module
+# ------------------------------------------------------
+# Importable decoder for FSEvent records. Yields parsed records from
+# a fsevents folder, an image, a single file, a file object or a buffer
+# without requiring any database or report output.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Usage:
+
+    import fsevents_reader
+
+    for record in fsevents_reader.iter_records('/Volumes/Evidence/.fseventsd'):
+        print(record['id'], record['fullpath'], record['flags'])
+
+    # Lists of records
+    for batch in fsevents_reader.iter_records(src, mode='batch', batch_size=5000):
+        ...
+
+    # Dicts of column name to list of values
+    for columns in fsevents_reader.iter_records(src, mode='columnar'):
+        ...
+
+Each record is a dict keyed by COLUMNS, the same fields that the
+FSEParser script stores in the fsevents table.
+"""
+
+import os
+import re
+import struct
+import datetime
+import time
+import zlib
+
+from fsevents_diagnostics import as_diagnostics
+from fsevents_metrics import NullMetrics
+
+try:
+    from dfvfs.path import factory as path_spec_factory
+    from dfvfs.resolver import resolver
+    from dfvfs.helpers import source_scanner
+    DFVFS_IMPORT = True
+    IMPORT_ERROR = None
+except ImportError as exp:
+    DFVFS_IMPORT = False
+    IMPORT_ERROR = ("\n%s\n\
+        You have specified the source type as image but DFVFS \n\
+        is not installed and is required for image support. \n\
+        To install DFVFS please refer to \n\
+        http://www.hecfblog.com/2015/12/how-to-install-dfvfs-on-windows-without.html" % (exp))
+
+EVENTMASK = {
+    0x00000000: 'None;',
+    0x00000001: 'FolderEvent;',
+    0x00000002: 'Mount;',
+    0x00000004: 'Unmount;',
+    0x00000020: 'EndOfTransaction;',
+    0x00000800: 'LastHardLinkRemoved;',
+    0x00001000: 'HardLink;',
+    0x00004000: 'SymbolicLink;',
+    0x00008000: 'FileEvent;',
+    0x00010000: 'PermissionChange;',
+    0x00020000: 'ExtendedAttrModified;',
+    0x00040000: 'ExtendedAttrRemoved;',
+    0x00100000: 'DocumentRevisioning;',
+    0x00400000: 'ItemCloned;',  # macOS HighSierra
+    0x01000000: 'Created;',
+    0x02000000: 'Removed;',
+    0x04000000: 'InodeMetaMod;',
+    0x08000000: 'Renamed;',
+    0x10000000: 'Modified;',
+    0x20000000: 'Exchange;',
+    0x40000000: 'FinderInfoMod;',
+    0x80000000: 'FolderCreated;',
+    0x00000008: 'NOT_USED-0x00000008;',
+    0x00000010: 'NOT_USED-0x00000010;',
+    0x00000040: 'NOT_USED-0x00000040;',
+    0x00000080: 'NOT_USED-0x00000080;',
+    0x00000100: 'NOT_USED-0x00000100;',
+    0x00000200: 'NOT_USED-0x00000200;',
+    0x00000400: 'NOT_USED-0x00000400;',
+    0x00002000: 'NOT_USED-0x00002000;',
+    0x00080000: 'NOT_USED-0x00080000;',
+    0x00200000: 'NOT_USED-0x00200000;',
+    0x00800000: 'NOT_USED-0x00800000;'
+}
+
+# Order the names of the EVENTMASK bits are listed in the type and
+# flags of a record. This is the order Python 2 iterates EVENTMASK in,
+# kept so the type and flags read the same under Python 3.
+FLAG_ORDER = (
+    0x00000000, 0x00000001, 0x00000002, 0x00000004, 0x00000800, 0x00000008,
+    0x10000000, 0x08000000, 0x04000000, 0x00000100, 0x00200000, 0x00000010,
+    0x20000000, 0x00800000, 0x00000200, 0x00400000, 0x01000000, 0x00010000,
+    0x00000020, 0x00020000, 0x40000000, 0x00001000, 0x00040000, 0x00000400,
+    0x00002000, 0x00000040, 0x00080000, 0x02000000, 0x00004000, 0x00000080,
+    0x80000000, 0x00100000, 0x00008000
+)
+
+# Fields of every record yielded by the reader
+COLUMNS = [
+    u'id',
+    u'id_hex',
+    u'fullpath',
+    u'filename',
+    u'type',
+    u'flags',
+    u'approx_dates_plus_minus_one_day',
+    u'mask',
+    u'node_id',
+    u'record_end_offset',
+    u'source',
+    u'source_modified_time'
+]
+
+# Available yield modes for iter_records
+MODES = ['record', 'batch', 'columnar']
+
+# Available source types for iter_records
+SOURCETYPES = ['folder', 'image', 'file', 'buffer']
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Regex to match against source fsevent log filename
+FSEVENT_FILENAME = re.compile(r'^.*[\][0-9a-fA-F]{16}$')
+
+GZIP_MAGIC = b'\x1f\x8b'
+DLS_MAGIC = [b'1SLD', b'2SLD']
+
+# Fixed fields of a DLS page header and of a record, read in place
+# from the decompressed file
+PAGE_LENGTH = struct.Struct("<I")
+RECORD_WD = struct.Struct("<Q")
+RECORD_MASK = struct.Struct(">I")
+RECORD_NODE_ID = struct.Struct("<q")
+
+# Characters removed from the fullpath of a record
+PATH_NEWLINES = (b'\r', b'\n')
+
+if bytes is str:
+    # Python 2, fullpaths and dates are kept as the bytes read
+    def native_str(data):
+        """
+        Return the bytes read from a fsevents file as a str.
+        """
+        return data
+
+    def data_from(data, offset):
+        """
+        Return the data from offset on without copying it.
+        """
+        return buffer(data, offset)
+
+    def is_utf8(text):
+        """
+        Return True when a fullpath is valid utf-8.
+        """
+        try:
+            text.decode('utf-8')
+        except UnicodeDecodeError:
+            return False
+        return True
+else:
+    def native_str(data):
+        """
+        Return the bytes read from a fsevents file as a str. Bytes that
+        are not valid utf-8 are kept as surrogates, so the path can be
+        encoded back to the same bytes with 'surrogateescape'.
+        """
+        return data.decode('utf-8', 'surrogateescape')
+
+    def data_from(data, offset):
+        """
+        Return the data from offset on without copying it.
+        """
+        return memoryview(data)[offset:]
+
+    def is_utf8(text):
+        """
+        Return True when a fullpath is valid utf-8.
+        """
+        try:
+            text.encode('utf-8')
+        except UnicodeEncodeError:
+            return False
+        return True
+
+
+def enumerate_flags(flag, f_map):
+    """
+    Iterate through record flag mappings and enumerate.
+    """
+    # Reset string based flags to null
+    f_type = ''
+    f_flag = ''
+    # Iterate through flags
+    for i in FLAG_ORDER if f_map is EVENTMASK else f_map:
+        if i & flag:
+            if f_map[i] == 'FolderEvent;' or \
+                    f_map[i] == 'FileEvent;' or \
+                    f_map[i] == 'SymbolicLink;' or \
+                    f_map[i] == 'HardLink;':
+                f_type = ''.join([f_type, f_map[i]])
+            else:
+                f_flag = ''.join([f_flag, f_map[i]])
+    return f_type, f_flag
+
+
+def decompress(data, members=None, length=None):
+    """
+    Decompress a gzip compressed fsevents file held in memory.
+    Like reading through gzip.GzipFile with the end of file checksum
+    comparison skipped, partial (carved or truncated) archives return
+    whatever could be decompressed. Uses zlib directly so that no
+    module state needs to be patched and it is safe to call from threads.
+    members: Optional list receiving the (compressed offset, decompressed
+        offset) of each gzip member, where decompression can be restarted.
+    length: Stop once at least length bytes are decompressed.
+    """
+    buf = []
+    offset = 0
+    d_size = 0
+
+    while length is None or d_size < length:
+        if data[offset:offset + 2] != GZIP_MAGIC:
+            raise IOError('Not a gzipped file')
+        if members is not None:
+            members.append((offset, d_size))
+        # Skip the gzip member header
+        offset = _skip_gzip_header(data, offset)
+        d_obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        if length is not None:
+            buf.append(d_obj.decompress(data_from(data, offset), length - d_size))
+            if d_obj.unconsumed_tail:
+                # The rest of the member is not needed
+                break
+        else:
+            buf.append(d_obj.decompress(data_from(data, offset)))
+        d_size += len(buf[-1])
+        if not d_obj.unused_data:
+            # Truncated member or end of file
+            buf.append(d_obj.flush())
+            break
+        # Skip the 8 byte crc32 and isize trailer of the member
+        offset = len(data) - len(d_obj.unused_data) + 8
+        if offset >= len(data):
+            break
+
+    return b''.join(buf)
+
+
+def _skip_gzip_header(data, offset):
+    """
+    Return the offset of the deflate stream that follows the
+    gzip member header found at offset.
+    """
+    method, flag = struct.unpack_from("<BB", data, offset + 2)
+    if method != 8:
+        raise IOError('Unknown compression method')
+    # Magic, method, flag, mtime, extra flags, os
+    offset += 10
+    # FEXTRA
+    if flag & 4:
+        xlen = struct.unpack_from("<H", data, offset)[0]
+        offset += 2 + xlen
+    # FNAME, FCOMMENT
+    for f_bit in (8, 16):
+        if flag & f_bit:
+            offset = data.index(b'\x00', offset) + 1
+    # FHCRC
+    if flag & 2:
+        offset += 2
+    return offset
+
+
+def page_event_ids(raw_page, page_len, dls_version, offset=0):
+    """
+    Return the lowest and highest event ids of the records of a DLS
+    page, or None when the page is truncated or holds no record.
+    The event id of each record is read from its header without
+    decoding its path. Carved, reused or corrupt pages do not always
+    hold their records in event id order, so the first and last
+    records do not bound the page.
+    offset: Start of the page when raw_page is the whole decompressed file.
+    """
+    if len(raw_page) - offset < page_len:
+        return None
+    rbin_len = 12 if dls_version == 1 else 20
+    page_end = offset + page_len
+    find = raw_page.find
+    unpack_wd = RECORD_WD.unpack_from
+    first_wd = None
+    last_wd = None
+    # Walks the records as FSEventDecoder.page_records does
+    path_start = offset + 12
+    while page_end > path_start:
+        path_end = find(b'\x00', path_start, page_end)
+        path_start = path_end + 1 + rbin_len
+        if path_end == -1 or path_start > page_end:
+            break
+        wd = unpack_wd(raw_page, path_end + 1)[0]
+        if first_wd is None or wd < first_wd:
+            first_wd = wd
+        if last_wd is None or wd > last_wd:
+            last_wd = wd
+    if first_wd is None:
+        return None
+    return first_wd, last_wd
+
+
+def is_fsevent_filename(filename):
+    """
+    Test to see if fsevent file name matches naming standard.
+    If not, assume this is a carved gzip.
+    """
+    return len(filename) == 16 and FSEVENT_FILENAME.search(filename) is not None
+
+
+def check_file_mod_dates(path):
+    """
+    Run simple test to see if file mod dates
+    should be used to generate time ranges.
+    In some instances fsevent files may not have
+    their original mod times preserved on export.
+    Returns False when the same date and hour
+    exists for the first file and the last file
+    in the provided source fsevents folder.
+    """
+    names = os.listdir(path)
+    if not names:
+        # Nothing to compare, as when --watch starts on an empty folder
+        return True
+    first = os.path.getmtime(os.path.join(path, names[0]))
+    last = os.path.getmtime(os.path.join(path, names[len(names) - 1]))
+    first = str(datetime.datetime.utcfromtimestamp(first))[:14]
+    last = str(datetime.datetime.utcfromtimestamp(last))[:14]
+
+    return first != last
+
+
+class SourceFile(object):
+    """
+    A single fsevents file or carved gzip to be decoded.
+    """
+
+    def __init__(self, name, fullpath, m_time, reader, raw_ok=False, size=None):
+        """
+        name: The file name, used to identify allocated fsevent files.
+        fullpath: The value reported in the source column.
+        m_time: The UTC modified time string of the file.
+        reader: Callable returning the file's raw contents.
+        raw_ok: Allow content that is already decompressed.
+        size: The size of the raw contents when known.
+        """
+        self.name = name
+        self.fullpath = fullpath
+        self.m_time = m_time
+        self.reader = reader
+        self.raw_ok = raw_ok
+        self.size = size
+        self.is_carved_gzip = not is_fsevent_filename(name)
+
+    def read(self):
+        """
+        Read and return the decompressed contents of the file.
+        """
+        return self.unpack(self.reader())
+
+    def unpack(self, data, members=None):
+        """
+        Return the decompressed contents of the raw file data.
+        members: Optional list receiving the gzip member offsets.
+        """
+        if self.raw_ok and data[:4] in DLS_MAGIC:
+            return data
+        return decompress(data, members)
+
+
+def folder_files(path):
+    """
+    Return a SourceFile for each file in the fsevents folder
+    in directory listing order.
+    """
+    files = []
+    for filename in os.listdir(path):
+        if filename == 'fseventsd-uuid':
+            continue
+        files.append(folder_file(path, filename))
+    return files
+
+
+def folder_file(path, filename):
+    """
+    Return a SourceFile for a file in the fsevents folder.
+    """
+    # Full path to source fsevent file
+    fullpath = os.path.join(path, filename)
+    # UTC mod date of source fsevent file
+    m_time = os.path.getmtime(fullpath)
+    m_time = str(datetime.datetime.utcfromtimestamp(m_time)) + " [UTC]"
+    return SourceFile(filename, fullpath, m_time, _file_reader(fullpath), size=os.path.getsize(fullpath))
+
+
+def _file_reader(fullpath):
+    """
+    Return a callable that reads the whole file at fullpath.
+    """
+    def read():
+        with open(fullpath, 'rb') as s_file:
+            return s_file.read()
+    return read
+
+
+def image_volumes(source):
+    """
+    Scan the image for file systems and yield the location of each
+    volume with a list of SourceFile for its '/.fseventsd' folder.
+    The list is None when the folder could not be opened.
+    """
+    scanner = source_scanner.SourceScanner()
+    scan_context = source_scanner.SourceScannerContext()
+    scan_context.OpenSourcePath(source)
+
+    scanner.Scan(
+        scan_context,
+        scan_path_spec=None
+    )
+
+    for file_system_path_spec, file_system_scan_node in scan_context._file_system_scan_nodes.items():
+        try:
+            location = file_system_path_spec.parent.location
+        except:
+            location = file_system_path_spec.location
+
+        fs_event_path_spec = path_spec_factory.Factory.NewPathSpec(
+            file_system_path_spec.type_indicator,
+            parent=file_system_path_spec.parent,
+            location="/.fseventsd"
+        )
+
+        file_entry = resolver.Resolver.OpenFileEntry(
+            fs_event_path_spec
+        )
+
+        if file_entry is None:
+            yield location, None
+            continue
+
+        files = []
+        for sub_file_entry in file_entry.sub_file_entries:
+            if sub_file_entry.name == 'fseventsd-uuid':
+                continue
+            stat_object = sub_file_entry.GetStat()
+            # UTC mod date of source fsevent file
+            m_time = datetime.datetime.fromtimestamp(
+                stat_object.mtime).strftime(
+                '%Y-%m-%d %H:%M:%S') + " [UTC]"
+            files.append(SourceFile(
+                sub_file_entry.name,
+                source + ": " + location + sub_file_entry.path_spec.location,
+                m_time,
+                _entry_reader(sub_file_entry),
+                size=stat_object.size
+            ))
+        yield location, files
+
+
+def _entry_reader(sub_file_entry):
+    """
+    Return a callable that reads the whole dfvfs file entry.
+    """
+    def read():
+        return sub_file_entry.GetFileObject().read()
+    return read
+
+
+class FsEventFileHeader():
+    """
+    FSEvent file header structure.
+        Each page within the decompressed begins with DLS1 or DLS2
+        It is stored using a byte order of little-endian.
+    """
+
+    def __init__(self, buf, filename):
+        """
+        """
+        # Name and path of current source fsevent file
+        self.src_fullpath = filename
+        # Page header 'DLS1' or 'DLS2'
+        # Was written to disk using little-endian
+        # Byte stream contains either "1SLD" or "2SLD", reversing order
+        self.signature = native_str(buf[4:0:-1])
+        # Unknown raw values in DLS header
+        # self.unknown_raw = buf[4:8]
+        # Unknown hex version
+        # self.unknown_hex = buf[4:8].encode("hex")
+        # Unknown integer version
+        # self.unknown_int = struct.unpack("<I", self.unknown_raw)[0]
+        # Size of current DLS page
+        self.filesize = PAGE_LENGTH.unpack_from(buf, 8)[0]
+
+
+class FSEventDecoder(object):
+    """
+    FSEventDecoder parses the records of a sequence of fsevent files
+    from one volume. The previous file's last event id and mod date are
+    carried forward to seed the time range of the next file, so files
+    must be decoded in the order they are listed.
+    """
+
+    def __init__(self, use_file_mod_dates=True, logfile=None, metrics=None, date_index=None):
+        """
+        use_file_mod_dates: Use file mod dates to generate time ranges.
+        logfile: fsevents_diagnostics.Diagnostics counting errors and info
+            messages, or a file like object each message is written to.
+        metrics: Optional fsevents_metrics.Metrics collecting stage timings.
+        date_index: Optional fsevents_dates.DateIndex of the whole volume.
+            Dates are looked up in it instead of the time range of each file.
+        """
+        self.use_file_mod_dates = use_file_mod_dates
+        self.date_index = date_index
+        # Optional fsevents_pages.PageIndex receiving the pages of each file
+        self.page_index = None
+        self.page_stats = []
+        # Optional fsevents_filters.RecordFilter of the records to keep
+        self.record_filter = None
+        self.diagnostics = as_diagnostics(logfile)
+        self.metrics = metrics if metrics is not None else NullMetrics()
+
+        # Enumerated flags by mask value
+        self.mask_cache = {}
+        self.mask_lookups = 0
+
+        if self.metrics:
+            self.apply_date = self.metrics.wrap('apply_date', self.apply_date)
+
+        self.src_fullpath = ''
+        self.src_filename = ''
+        self.m_time = ''
+        self.dls_version = 0
+        self.is_carved_gzip = False
+        self.time_range = []
+        self.time_range_src_mod = []
+        self.my_dls = []
+
+        self.prev_mod_date = "Unknown"
+        self.prev_last_wd = 0
+
+        # Initialize statistic counters
+        self.all_records_count = 0
+        self.all_files_count = 0
+        self.parsed_file_count = 0
+        self.error_file_count = 0
+        self.skipped_file_count = 0
+        self.skipped_page_count = 0
+        self.filtered_record_count = 0
+
+    def decode(self, src, unpacked=None):
+        """
+        Decompress the SourceFile, check for DLS headers and yield
+        each parsed record as a dict keyed by COLUMNS. Files that can
+        not be decompressed or contain no DLS header are logged and skipped.
+        Permission errors are raised to the caller.
+
+        unpacked: The (compressed bytes, decompressed data, gzip members)
+        of the file when a pipeline read and decompressed it ahead, or
+        the exception raised doing so.
+        """
+        self.all_files_count += 1
+
+        self.src_fullpath = src.fullpath
+        self.src_filename = src.name
+        self.m_time = src.m_time
+        self.is_carved_gzip = src.is_carved_gzip
+
+        if not self.is_carved_gzip:
+            c_last_wd = int(self.src_filename, 16)
+            self.time_range_src_mod = self.prev_last_wd, c_last_wd, self.prev_mod_date, self.m_time
+
+        f_metrics = {'name': self.src_filename, 'compressed_bytes': 0, 'decompressed_bytes': 0,
+                     'pages': 0, 'records': 0}
+        f_start = time.time()
+
+        # Attempt to decompress the fsevent archive
+        try:
+            if unpacked is None:
+                unpacked = self.unpack(src)
+            elif isinstance(unpacked, Exception):
+                raise unpacked
+            f_metrics['compressed_bytes'], buf, members = unpacked
+            f_metrics['decompressed_bytes'] = len(buf)
+        except Exception as exp:
+            # When permission denied is encountered
+            if "Permission denied" in str(exp) and not os.path.isdir(self.src_fullpath):
+                raise
+            # Otherwise record the error
+            self.diagnostics.add('decompression_error', self.src_filename, value=str(exp))
+            self.error_file_count += 1
+            f_metrics['error'] = 'decompression'
+            self.metrics.file(**f_metrics)
+            return
+
+        # If decompress is success, check for DLS headers in the current file
+        with self.metrics.timer('dls_header_search', len(buf)):
+            dls_chk = self.dls_header_search(buf, self.src_fullpath)
+
+        # If check for DLS returns false, record it
+        if dls_chk is False:
+            self.diagnostics.add('dls_header_missing', self.src_filename)
+            self.error_file_count += 1
+            f_metrics['error'] = 'dls_header_search'
+            self.metrics.file(**f_metrics)
+            return
+
+        # Pages of allocated files outside the event id filter are not parsed
+        page_skips = None
+        if self.record_filter is not None and not self.is_carved_gzip:
+            page_skips = self.page_skips(buf)
+
+        if page_skips is not None and all(page_skips):
+            # Still seeds the time range of the next file
+            if self.use_file_mod_dates:
+                self.prev_mod_date = self.m_time
+                self.prev_last_wd = c_last_wd
+            self.skipped_file_count += 1
+            f_metrics['skipped'] = True
+            self.metrics.file(**f_metrics)
+            return
+
+        self.parsed_file_count += 1
+
+        # Accounts for fsevent files that get flushed to disk
+        # at the same time. Usually the result of a shutdown
+        # or unmount
+        if not self.is_carved_gzip and self.use_file_mod_dates:
+            self.prev_mod_date = self.m_time
+            self.prev_last_wd = int(self.src_filename, 16)
+
+        # Call the date finder for current fsevent file
+        if self.date_index is None:
+            with self.metrics.timer('find_date', len(buf)):
+                self.find_date(buf)
+
+        # If DLSs were found, pass the decompressed file to be parsed
+        records_before = self.all_records_count
+        lookups_before = self.mask_lookups
+        cache_before = len(self.mask_cache)
+        for record in self.metrics.timed_iter('record_decoding', self.parse(buf, page_skips)):
+            yield record
+
+        if self.page_index is not None:
+            self.page_index.add_file(self, src, f_metrics['compressed_bytes'], members)
+
+        if self.metrics:
+            f_metrics['pages'] = len(self.my_dls)
+            f_metrics['records'] = self.all_records_count - records_before
+            f_metrics['dls_version'] = self.dls_version
+            # Includes the time the caller spent handling the records
+            f_metrics['seconds'] = round(time.time() - f_start, 4)
+            self.metrics.file(**f_metrics)
+            misses = len(self.mask_cache) - cache_before
+            self.metrics.cache('mask_cache', self.mask_lookups - lookups_before - misses, misses)
+
+    def unpack(self, src):
+        """
+        Read and decompress the SourceFile. Returns the compressed
+        bytes, the decompressed data and the offsets of its gzip
+        members when a page index is kept, otherwise None.
+        """
+        with self.metrics.timer('read') as counts:
+            data = src.reader()
+            counts['bytes_out'] = len(data)
+        members = [] if self.page_index is not None else None
+        with self.metrics.timer('decompression', len(data)) as counts:
+            buf = src.unpack(data, members)
+            counts['bytes_out'] = len(buf)
+        return len(data), buf, members
+
+    def dls_header_search(self, buf, f_name):
+        """
+        Search within the unzipped file
+        for all occurrences of the DLS magic header.
+        There can be more than one DLS header in an fsevents file.
+        The start and end offsets are stored and used for parsing
+        the records contained within each DLS page.
+        """
+        self.file_size = len(buf)
+        self.my_dls = []
+
+        raw_file = buf
+        dls_count = 0
+        start_offset = 0
+        end_offset = 0
+
+        while end_offset != self.file_size:
+            try:
+                start_offset = end_offset
+                page_len = PAGE_LENGTH.unpack_from(raw_file, start_offset + 8)[0]
+                end_offset = start_offset + page_len
+
+                if raw_file[start_offset:start_offset + 4] in DLS_MAGIC:
+                    self.my_dls.append({'Start Offset': start_offset, 'End Offset': end_offset})
+                    dls_count += 1
+                else:
+                    self.diagnostics.add('page_length_error', self.src_filename, start_offset)
+                    break
+            except:
+                self.diagnostics.add('page_length_error', self.src_filename, start_offset)
+                break
+
+        if dls_count == 0:
+            # Return false to caller so that the next file will be searched
+            return False
+        else:
+            # Return true so that the DLSs found can be parsed
+            return True
+
+    def page_skips(self, buf):
+        """
+        Return for each DLS page of the decompressed file
+        whether the event id filter removes all of its records.
+        """
+        skips = []
+        for page in self.my_dls:
+            start_offset = page['Start Offset']
+            end_offset = page['End Offset']
+            m_dls_chk = buf[start_offset:start_offset + 4]
+            bounds = None
+            if m_dls_chk in DLS_MAGIC:
+                dls_version = 1 if m_dls_chk == b"1SLD" else 2
+                bounds = page_event_ids(buf, end_offset - start_offset, dls_version, start_offset)
+            skips.append(bounds is not None and self.record_filter.skip_page(*bounds))
+        return skips
+
+    def parse(self, buf, page_skips=None):
+        """
+        Parse the decompressed fsevent log. Iterating through
+        eash DLS page found, then yield records within
+        each page. find_date must be called for the file first.
+        page_skips: The page_skips of the file when it is filtered.
+        """
+        # Initialize variables
+        pg_count = 0
+
+        self.valid_record_check = True
+        self.page_stats = []
+
+        # Iterate through DLS pages found in current fsevent file
+        for i in self.my_dls:
+            # Assign current DLS offsets
+            start_offset = self.my_dls[pg_count]['Start Offset']
+            end_offset = self.my_dls[pg_count]['End Offset']
+
+            # The page is parsed in place within the decompressed file
+            self.page_offset = start_offset
+
+            # Page magic is stored little-endian, "1SLD" is DLS1
+            m_dls_chk = buf[start_offset:start_offset + 4]
+            # Assign DLS version based off magic header in page
+            if m_dls_chk == b"1SLD":
+                self.dls_version = 1
+            elif m_dls_chk == b"2SLD":
+                self.dls_version = 2
+            else:
+                self.diagnostics.add('unknown_dls_version', self.src_filename, start_offset)
+                break
+
+            # Pages outside the event id filter are not parsed
+            if page_skips is not None and page_skips[pg_count]:
+                self.skipped_page_count += 1
+                pg_count += 1
+                continue
+
+            # Find the records between the page offsets
+            if self.page_index is None:
+                for record in self.page_records(buf, start_offset, end_offset):
+                    yield record
+            else:
+                # Lowest and highest event id and record count of the page
+                first_wd = None
+                last_wd = None
+                count = 0
+                for record in self.page_records(buf, start_offset, end_offset):
+                    wd = record['id']
+                    if first_wd is None or wd < first_wd:
+                        first_wd = wd
+                    if last_wd is None or wd > last_wd:
+                        last_wd = wd
+                    count += 1
+                    yield record
+                if count:
+                    self.page_stats.append([start_offset, end_offset, self.dls_version, first_wd, last_wd, count])
+            # Increment the DLS page count by 1
+            pg_count += 1
+
+    def find_date(self, raw_file):
+        """
+        Search within current file for names of log files that are created
+        that store the date as a part of its naming
+        standard.
+        """
+        # Reset variables
+        self.time_range = []
+
+        # Add previous file's mod timestamp, wd and current file's timestamp, wd
+        # to time range
+        if not self.is_carved_gzip and self.use_file_mod_dates:
+            c_time_1 = str(self.time_range_src_mod[2])[:10].replace("-", ".")
+            c_time_2 = str(self.time_range_src_mod[3])[:10].replace("-", ".")
+
+            self.time_range.append([self.time_range_src_mod[0], c_time_1])
+            self.time_range.append([self.time_range_src_mod[1], c_time_2])
+
+        self.time_range.extend(self.date_markers(raw_file))
+
+        # Sort the time range list by wd
+        self.time_range = sorted(self.time_range, key=self.get_key)
+
+        # Call the time range builder to rebuild time range
+        self.build_time_range()
+
+    def date_markers(self, raw_file):
+        """
+        Return [wd, date] for each created log file in the decompressed
+        fsevent file whose name holds the date it was created.
+        """
+        markers = []
+
+        # Regex's for logs with dates in name
+        regex_1 = (b"private/var/log/asl/[\x30-\x39]{4}[.][\x30-\x39]{2}" +
+                   b"[.][\x30-\x39]{2}[.][\x30-\x7a]{2,8}[.]asl")
+        regex_2 = (b"mobile/Library/Logs/CrashReporter/DiagnosticLogs/security[.]log" +
+                   b"[.][\x30-\x39]{8}T[\x30-\x39]{6}Z")
+        regex_3 = (b"private/var/log/asl/Logs/aslmanager[.][\x30-\x39]{8}T[\x30-\x39]" +
+                   b"{6}[-][\x30-\x39]{2}")
+        regex_4 = (b"private/var/log/DiagnosticMessages/[\x30-\x39]{4}[.][\x30-\x39]{2}" +
+                   b"[.][\x30-\x39]{2}[.]asl")
+        regex_5 = (b"private/var/log/com[.]apple[.]clouddocs[.]asl/[\x30-\x39]{4}[.]" +
+                   b"[\x30-\x39]{2}[.][\x30-\x39]{2}[.]asl")
+        regex_6 = (b"private/var/log/powermanagement/[\x30-\x39]{4}[.][\x30-\x39]{2}[.]" +
+                   b"[\x30-\x39]{2}[.]asl")
+        regex_7 = (b"private/var/log/asl/AUX[.][\x30-\x39]{4}[.][\x30-\x39]{2}[.]" +
+                   b"[\x30-\x39]{2}/[0-9]{9}")
+        regex_8 = b"private/var/audit/[\x30-\x39]{14}[.]not_terminated"
+
+        # Regex that matches only events with created flag
+        flag_regex = (b"[\x00-\xFF]{9}[\x01|\x11|\x21|\x31|\x41|\x51|\x61|\x05|\x15|" +
+                      b"\x25|\x35|\x45|\x55|\x65]")
+
+        # Concatenating date, flag matching regexes
+        # Also grabs working descriptor for record
+        m_regex = b"(" + regex_1 + b"|" + regex_2 + b"|" + regex_3 + b"|" + regex_4 + b"|" + regex_5
+        m_regex = m_regex + b"|" + regex_6 + b"|" + regex_7 + b"|" + regex_8 + b")" + flag_regex
+
+        # Start searching within fsevent file for events that match dates regex
+        # As the length of each log location is different, create if statements for each
+        # so that the date can be pulled from the correct location within the fullpath
+        for match in re.finditer(m_regex, raw_file):
+            if raw_file[match.regs[0][0]:match.regs[0][0] + 35] == b"private/var/log/asl/Logs/aslmanager":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 36
+                # The date is 8 chars long in the format of yyyymmdd
+                t_end = t_start + 8
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                # Format the date
+                t_temp = t_temp[:4] + b"." + t_temp[4:6] + b"." + t_temp[6:8]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 23] == b"private/var/log/asl/AUX":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 24
+                # The date is 10 chars long in the format of yyyy.mm.dd
+                t_end = t_start + 10
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 19] == b"private/var/log/asl":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 20
+                # The date is 10 chars long in the format of yyyy.mm.dd
+                t_end = t_start + 10
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 4] == b"mobi":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 62
+                # The date is 8 chars long in the format of yyyymmdd
+                t_end = t_start + 8
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                # Format the date
+                t_temp = t_temp[:4] + b"." + t_temp[4:6] + b"." + t_temp[6:8]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 34] == b"private/var/log/DiagnosticMessages":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 35
+                # The date is 10 chars long in the format of yyyy.mm.dd
+                t_end = t_start + 10
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 39] == b"private/var/log/com.apple.clouddocs.asl":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 40
+                # The date is 10 chars long in the format of yyyy.mm.dd
+                t_end = t_start + 10
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 31] == b"private/var/log/powermanagement":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 32
+                # The date is 10 chars long in the format of yyyy.mm.dd
+                t_end = t_start + 10
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            elif raw_file[match.regs[0][0]:match.regs[0][0] + 17] == b"private/var/audit":
+                # Clear timestamp temp variable
+                t_temp = ''
+                # t_start uses the start offset of the match
+                t_start = match.regs[0][0] + 18
+                # The date is 8 chars long in the format of yyyymmdd
+                t_end = t_start + 8
+                # Strip the date from the fsevent file
+                t_temp = raw_file[t_start:t_end]
+                # Format the date
+                t_temp = t_temp[:4] + b"." + t_temp[4:6] + b"." + t_temp[6:8]
+                wd_temp = RECORD_WD.unpack_from(raw_file, match.regs[0][1] - 9)[0]
+            else:
+                t_temp = b''
+                wd_temp = ''
+            # Append date, wd to time range list
+            markers.append([wd_temp, native_str(t_temp)])
+
+        return markers
+
+    def get_key(self, item):
+        """
+        Return the key in the time range item provided.
+        """
+        return item[0]
+
+    def build_time_range(self):
+        """
+        Rebuilds the time range list to
+        include the previous and current working descriptor
+        as well as the previous and current date found
+        """
+        prev_date = '0'
+        prev_wd = 0
+        temp = []
+
+        # Iterate through each in time range list
+        for i in self.time_range:
+            # Len is 7 when prev_date is 'Unknown'
+            if len(prev_date) == 7:
+                p_date = 0
+                c_date = i[1][:10].replace(".", "")
+            # When current date is 'Unknown'
+            if len(i[1]) == 7:
+                p_date = prev_date[:10].replace(".", "")
+                c_date = 0
+            # When both dates are known
+            if len(prev_date) != 7 and len(i[1]) != 7:
+                p_date = prev_date[:10].replace(".", "")
+                c_date = i[1][:10].replace(".", "")
+            # Bypass a date when current date is less than prev date
+            if int(c_date) < int(p_date):
+                prev_wd = prev_wd
+                prev_date = prev_date
+            else:
+                # Reassign prev_date to 'Unknown'
+                if prev_date == '0':
+                    prev_date = 'Unknown'
+                # Add previous, current wd and previous, current date to temp
+                temp.append([prev_wd, i[0], prev_date, i[1]])
+                prev_wd = i[0]
+                prev_date = i[1]
+        # Assign temp list to time range list
+        self.time_range = temp
+
+    def find_page_records(self, page_buf, page_start_off):
+        """
+        Yield the records of a DLS page held on its own, starting at
+        page_start_off within the current fsevent file.
+        """
+        return self.page_records(page_buf, 0, len(page_buf), page_start_off)
+
+    def page_records(self, buf, page_start, page_end, page_start_off=None):
+        """
+        Identify and yield all records of the DLS page between the
+        page_start and page_end offsets of buf. The records are read
+        in place, so the page and its records are not copied out of buf.
+        page_start_off: Offset of the page within the current fsevent
+            file when buf does not hold the whole file.
+        """
+        # Offset within the fsevent file of an offset within buf
+        shift = 0 if page_start_off is None else page_start_off - page_start
+        page_end = min(page_end, len(buf))
+        record_filter = self.record_filter
+        is_carved_gzip = self.is_carved_gzip
+        mask_cache = self.mask_cache
+        apply_date = self.apply_date
+
+        # Call the file header parser for current DLS page
+        try:
+            FsEventFileHeader(
+                buf[page_start:min(page_start + 13, page_end)],
+                self.src_fullpath
+            )
+        except:
+            self.diagnostics.add('file_header_error', self.src_filename, page_start + shift)
+
+        # Account for length of record for different DLS versions
+        # Prior to HighSierra
+        if self.dls_version == 1:
+            rbin_len = 12
+        # HighSierra
+        elif self.dls_version == 2:
+            rbin_len = 20
+        else:
+            return
+
+        # Start of the fullpath of the first record
+        path_start = page_start + 12
+
+        # Iterate through the page.
+        # Valid record check should be true while parsing.
+        # If an invalid record is encounted (occurs in carved gzips)
+        # parsing stops for the current file
+        while page_end > path_start and self.valid_record_check:
+            # The fullpath ends at the first null byte
+            path_end = buf.find(b'\x00', path_start, page_end)
+            raw_path = buf[path_start:path_end if path_end != -1 else page_end]
+            if b'\r' in raw_path or b'\n' in raw_path:
+                # Remove non-printable chars from the fullpath
+                for i, char in enumerate(bytearray(raw_path)):
+                    if char in (0x0d, 0x0a):
+                        self.diagnostics.add('path_newline', self.src_filename, path_start + i + shift, char)
+                for char in PATH_NEWLINES:
+                    raw_path = raw_path.replace(char, b'')
+            raw_path = raw_path.replace(b'\t', b'')
+
+            if path_end == -1:
+                # The last fullpath runs past the end of the page
+                break
+
+            # Assign raw record offsets #
+            r_start = path_end + 1
+            r_end = r_start + rbin_len
+
+            # Account for carved files when record end offset
+            # occurs after the length of the buffer
+            if r_end > page_end:
+                break
+
+            # Account for records that do not have a fullpath
+            if raw_path:
+                fullpath = native_str(raw_path)
+            else:
+                # Assign NULL as the path
+                fullpath = "NULL"
+
+            # The next fullpath starts after the record
+            path_start = r_end
+
+            wd = RECORD_WD.unpack_from(buf, r_start)[0]
+            mask = RECORD_MASK.unpack_from(buf, r_start + 8)[0]
+
+            # Records of allocated files are filtered before they are built.
+            # Carved files are filtered once the record is checked as valid.
+            if record_filter is not None and not is_carved_gzip:
+                if wd != 0 and not record_filter.keep_raw(wd, mask, fullpath):
+                    self.filtered_record_count += 1
+                    continue
+
+            # Set fs_node_id to empty for DLS version 1
+            # Prior to HighSierra
+            if rbin_len == 12:
+                fs_node_id = ""
+            # Assign file system node id if DLS version is 2
+            # Introduced with HighSierra
+            else:
+                fs_node_id = RECORD_NODE_ID.unpack_from(buf, r_start + 12)[0]
+
+            record_off = r_end + shift
+
+            # Few distinct masks occur in a file, reuse their enumeration
+            flags = mask_cache.get(mask)
+            if flags is None:
+                flags = mask_cache[mask] = enumerate_flags(mask, EVENTMASK)
+            self.mask_lookups += 1
+
+            # Check record to see if is valid. Identifies invalid/corrupted
+            # that sometimes occur in carved gzip files
+            if is_carved_gzip:
+                self.valid_record_check = self.check_record(flags, fullpath)
+
+            # If record is not valid, stop parsing records in page
+            if self.valid_record_check is False or wd == 0:
+                self.diagnostics.add('carved_invalid_record', self.src_filename, record_off)
+                break
+
+            if record_filter is not None and is_carved_gzip and not record_filter.keep_raw(wd, mask, fullpath):
+                self.filtered_record_count += 1
+                continue
+            f_path, f_name = os.path.split(fullpath)
+            dates = apply_date(wd)
+            if record_filter is not None and not record_filter.keep_dates(dates):
+                self.filtered_record_count += 1
+                continue
+
+            # Increment the current record count by 1
+            self.all_records_count += 1
+
+            # Assign our current records attributes
+            yield {
+                'id': wd,
+                'id_hex': '%016x (%d)' % (wd, wd),
+                'fullpath': fullpath,
+                'filename': f_name,
+                'type': flags[0],
+                'flags': flags[1],
+                'approx_dates_plus_minus_one_day': dates,
+                'mask': '0x%08x' % mask,
+                'node_id': fs_node_id,
+                'record_end_offset': record_off,
+                'source': self.src_fullpath,
+                'source_modified_time': self.m_time
+            }
+
+    def check_record(self, mask, fullpath):
+        """
+        Checks for conflicts in the record's flags
+        to determine if the record is valid to limit the
+        number of invalid records in parsed output.
+        Applies only to carved gzip
+        """
+        if self.is_carved_gzip:
+            decode_error = False
+            # Flag conflicts
+            # These flag combinations can not exist together
+            type_err = "FolderEvent" in mask[0] and "FileEvent" in mask[0]
+            fol_cr_err = "FolderEvent" in mask[0] and "Created" in mask[1] and \
+                         "FolderCreated" not in mask[1]
+            fil_cr_err = "FileEvent" in mask[0] and "FolderCreated" in mask[1]
+            lnk_err = "SymbolicLink" in mask[0] and "HardLink" in mask[0]
+            h_lnk_err = "HardLink" not in mask[0] and "LastHardLink" in mask[1]
+            h_lnk_err_2 = "LastHardLink" in mask[1] and ";Removed" not in mask[1]
+            n_used_err = "NOT_USED-0x0" in mask[1]
+            ver_error = "ItemCloned" in mask[1] and self.dls_version == 1
+
+            # Check for decode errors
+            decode_error = not is_utf8(fullpath)
+
+            # If any error exists return false to caller
+            if type_err or \
+                    fol_cr_err or \
+                    fil_cr_err or \
+                    lnk_err or \
+                    h_lnk_err or \
+                    h_lnk_err_2 or \
+                    n_used_err or \
+                    decode_error or \
+                    ver_error:
+                return False
+            else:
+                # Record passed tests and may be valid
+                # return true so that record is included in output reports
+                return True
+        else:
+            # Return true. fsevent file was not identified as being carved
+            return True
+
+    def apply_date(self, wd):
+        """
+        Applies the approximate date to
+        the current record by comparing thewd
+        to what is stored in the time range list.
+        """
+        t_range_count = len(self.time_range)
+        count = 1
+        c_mod_date = str(self.m_time)[:10].replace("-", ".")
+
+        # Dates of the whole volume
+        if self.date_index is not None:
+            if not self.is_carved_gzip and self.use_file_mod_dates:
+                return self.date_index.lookup(wd, c_mod_date)
+            return self.date_index.lookup(wd, "Unknown")
+
+        # No dates were found. Return source mod date
+        if len(self.time_range) == 0 and not self.is_carved_gzip and self.use_file_mod_dates:
+            return c_mod_date
+        # If dates were found
+        elif len(self.time_range) != 0 and not self.is_carved_gzip:
+
+            # Iterate through the time range list
+            # and assign the time range based off the
+            # wd/record event id.
+            for i in self.time_range:
+                # When record id falls between the previous
+                # id and the current id within the time range list
+                if wd > i[0] and wd < i[1]:
+                    # When the previous date is the same as current
+                    if i[2] == i[3]:
+                        return i[2]
+                    # Otherwise return the date range
+                    else:
+                        return i[2] + " - " + i[3]
+                # When event id matches previous wd in list
+                # assign previous date
+                elif wd == i[0]:
+                    return str(i[2])
+                # When event id matches current wd in list
+                # assign current date
+                elif wd == i[1]:
+                    return str(i[3])
+                # When the event id is greater than the last in list
+                # assign return source mod date
+                elif count == t_range_count and wd >= i[1] and self.use_file_mod_dates:
+                    return c_mod_date
+                else:
+                    count = count + 1
+                    continue
+        else:
+            return "Unknown"
+
+
+class FSEventsReader(object):
+    """
+    FSEventsReader iterates through the records of a source without
+    writing any output. Sources can be:
+        folder: Path to an fsevents folder such as '/.fseventsd'.
+        image: Path to a disk image. Requires DFVFS.
+        file: Path to a single fsevents file or an open file object.
+        buffer: A string holding a compressed or decompressed fsevents file.
+    """
+
+    def __init__(self, source, sourcetype=None, name=None, m_time=None, logfile=None):
+        """
+        source: The source to be parsed.
+        sourcetype: One of SOURCETYPES. Detected from source when not provided.
+        name: The fsevents file name of a file object or buffer source,
+            used to identify it as allocated rather than carved.
+        m_time: The modified time string of a file object or buffer source.
+        logfile: File like object receiving errors and info messages.
+        """
+        if sourcetype is None:
+            sourcetype = self.detect_sourcetype(source)
+        if sourcetype not in SOURCETYPES:
+            raise ValueError('Incorrect source type provided: "%s"' % (sourcetype))
+        if sourcetype == 'image' and DFVFS_IMPORT is False:
+            raise ImportError(IMPORT_ERROR)
+
+        self.source = source
+        self.sourcetype = sourcetype
+        self.name = name
+        self.m_time = m_time
+        self.logfile = logfile
+
+        # Decoders used for each volume, kept for their statistic counters
+        self.decoders = []
+
+    @staticmethod
+    def detect_sourcetype(source):
+        """
+        Return the source type for a source when none was given.
+        Strings are only treated as buffers when they are not a path.
+        """
+        if hasattr(source, 'read'):
+            return 'file'
+        if os.path.isdir(source):
+            return 'folder'
+        if os.path.isfile(source):
+            return 'file'
+        return 'buffer'
+
+    def volumes(self):
+        """
+        Yield a FSEventDecoder and list of SourceFile for each volume
+        in the source.
+        """
+        if self.sourcetype == 'folder':
+            decoder = FSEventDecoder(check_file_mod_dates(self.source), self.logfile)
+            yield decoder, folder_files(self.source)
+        elif self.sourcetype == 'image':
+            for location, files in image_volumes(self.source):
+                if files is None:
+                    continue
+                yield FSEventDecoder(True, self.logfile), files
+        else:
+            yield FSEventDecoder(self.m_time is not None, self.logfile), [self._single_file()]
+
+    def _single_file(self):
+        """
+        Return a SourceFile for a file, file object or buffer source.
+        """
+        source = self.source
+        name = self.name
+        m_time = self.m_time
+        if self.sourcetype == 'buffer':
+            reader = lambda: source
+            fullpath = name or '<buffer>'
+        elif hasattr(source, 'read'):
+            reader = source.read
+            fullpath = name or getattr(source, 'name', '<file>')
+        else:
+            reader = _file_reader(source)
+            fullpath = source
+            if m_time is None:
+                m_time = os.path.getmtime(source)
+                m_time = str(datetime.datetime.utcfromtimestamp(m_time)) + " [UTC]"
+                self.m_time = m_time
+        if name is None:
+            name = os.path.basename(str(fullpath))
+        return SourceFile(name, fullpath, m_time or 'Unknown', reader, raw_ok=True)
+
+    def __iter__(self):
+        """
+        Yield each parsed record as a dict keyed by COLUMNS.
+        """
+        for decoder, files in self.volumes():
+            self.decoders.append(decoder)
+            for src in files:
+                for record in decoder.decode(src):
+                    yield record
+
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yield lists of at most batch_size records.
+        """
+        batch = []
+        for record in self:
+            batch.append(record)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_columns(self, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yield dicts mapping each of COLUMNS to a list of at most
+        batch_size values.
+        """
+        for batch in self.iter_batches(batch_size):
+            yield dict((key, [record[key] for record in batch]) for key in COLUMNS)
+
+    def stats(self):
+        """
+        Return the statistic counters summed over all volumes read so far.
+        """
+        totals = {
+            'all_files_count': 0,
+            'parsed_file_count': 0,
+            'error_file_count': 0,
+            'all_records_count': 0
+        }
+        for decoder in self.decoders:
+            for key in totals:
+                totals[key] += getattr(decoder, key)
+        return totals
+
+
+def iter_records(source, sourcetype=None, mode='record', batch_size=DEFAULT_BATCH_SIZE,
+                 name=None, m_time=None, logfile=None):
+    """
+    Iterate over the decoded records of a source.
+    mode 'record' yields one dict per record, 'batch' yields lists of
+    records and 'columnar' yields dicts of column name to list of values.
+    See FSEventsReader for the accepted sources.
+    """
+    if mode not in MODES:
+        raise ValueError('Incorrect mode provided: "%s"' % (mode))
+
+    reader = FSEventsReader(source, sourcetype, name=name, m_time=m_time, logfile=logfile)
+
+    if mode == 'batch':
+        return reader.iter_batches(batch_size)
+    elif mode == 'columnar':
+        return reader.iter_columns(batch_size)
+    return iter(reader)
@@ -0,0 +1,488 @@
+#!/usr/bin/python
+
+# FSEvents Output Sinks Python Module
+# ------------------------------------------------------
+# Output sinks selected with --sinks. The sqlite, tsv and reports
+# sinks are built by FSEParser itself. The sinks here receive each
+# record as it is parsed, in file order, and need neither the
+# database nor the event id sort.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import json
+
+from fsevents_reader import (
+    COLUMNS,
+    EVENTMASK
+)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_IMPORT = True
+    PYARROW_IMPORT_ERROR = None
+except ImportError as exp:
+    PYARROW_IMPORT = False
+    PYARROW_IMPORT_ERROR = ("\n%s\n\
+        You have selected the parquet output but pyarrow \n\
+        is not installed and is required for parquet support. \n\
+        To install pyarrow run: pip install pyarrow" % (exp))
+
+# Sinks written from the database or the event id sort
+SORTED_SINKS = ['sqlite', 'tsv', 'reports', 'lifecycle']
+
+# Sinks used when --sinks is not given
+DEFAULT_SINKS = ['sqlite', 'tsv', 'reports']
+
+# Records per parquet row group
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# Parquet column compression
+PARQUET_COMPRESSION = 'zstd'
+
+# Parquet columns and the record field each is read from. The
+# hex id is left out as it is the same value as id.
+PARQUET_COLUMNS = [
+    'id',
+    'fullpath',
+    'filename',
+    'type',
+    'flags',
+    'approx_dates_plus_minus_one_day',
+    'mask',
+    'node_id',
+    'record_end_offset',
+    'source',
+    'source_modified_time'
+]
+
+# Parquet columns stored with dictionary encoding. They repeat
+# a small number of values across millions of records.
+PARQUET_DICTIONARY_COLUMNS = ['type', 'flags', 'source', 'source_modified_time']
+
+# Folder levels kept in the activity tree
+DEFAULT_ACTIVITY_DEPTH = 8
+
+# Folders kept in the activity tree before the quietest are pruned
+DEFAULT_ACTIVITY_NODES = 50000
+
+# Flags counted for each folder of the activity tree, in column order
+ACTIVITY_FLAGS = [(bit, name.rstrip(';')) for bit, name in sorted(EVENTMASK.items())
+                  if bit and not name.startswith('NOT_USED')]
+
+# Event mask bit of folder records
+FOLDER_EVENT = 0x00000001
+
+
+class RecordSink(object):
+    """
+    Base class of the sinks that are handed every parsed record.
+    """
+
+    # Name of the sink on the command line
+    name = None
+    # Output file name in the case folder
+    filename = None
+    # Error printed when a module the sink needs is missing
+    import_error = None
+
+    def __init__(self, out_dir, metrics=None):
+        """
+        out_dir: The case folder the output is written to.
+        metrics: Optional fsevents_metrics.Metrics of the run.
+        """
+        self.out_dir = out_dir
+        self.metrics = metrics
+        self.count = 0
+
+    @property
+    def path(self):
+        """
+        Full path of the output file.
+        """
+        return os.path.join(self.out_dir, self.filename)
+
+    def add(self, record):
+        """
+        Write a record dict with the fsevents table columns.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finish the output. Returns the number of records written.
+        """
+        return self.count
+
+
+class JsonLinesSink(RecordSink):
+    """
+    Writes one json object per record to All_FSEVENTS.jsonl.
+    Event ids, node ids and offsets are kept as integers.
+    """
+
+    name = 'jsonl'
+    filename = 'All_FSEVENTS.jsonl'
+
+    def __init__(self, out_dir, metrics=None):
+        """
+        """
+        super(JsonLinesSink, self).__init__(out_dir, metrics)
+        self.j_file = open(self.path, 'wb')
+
+    def add(self, record):
+        """
+        Write the record as a line of json.
+        """
+        values = {}
+        for key in COLUMNS:
+            values[key] = text(record[key])
+        self.j_file.write(json.dumps(values, sort_keys=True).encode('utf-8') + b'\n')
+        self.count += 1
+
+    def close(self):
+        """
+        """
+        self.j_file.close()
+        return self.count
+
+
+class ParquetSink(RecordSink):
+    """
+    Writes the records to All_FSEVENTS.parquet with typed columns.
+
+    Records are buffered per column and written as a row group every
+    PARQUET_ROW_GROUP_SIZE records so memory use does not grow with
+    the number of records. Event ids, masks and offsets are unsigned
+    or signed integers, node ids are null for DLS1 records and the
+    columns in PARQUET_DICTIONARY_COLUMNS are dictionary encoded.
+    """
+
+    name = 'parquet'
+    filename = 'All_FSEVENTS.parquet'
+    import_error = PYARROW_IMPORT_ERROR
+
+    def __init__(self, out_dir, metrics=None):
+        """
+        """
+        super(ParquetSink, self).__init__(out_dir, metrics)
+        self.writer = None
+        self.new_columns()
+
+    def new_columns(self):
+        """
+        Start empty column buffers for the next row group.
+        """
+        self.columns = dict((key, []) for key in PARQUET_COLUMNS)
+        self.buffered = 0
+
+    def add(self, record):
+        """
+        Buffer the record and write a row group when it is full.
+        """
+        columns = self.columns
+        columns['id'].append(record['id'])
+        columns['fullpath'].append(text(record['fullpath']))
+        columns['filename'].append(text(record['filename']))
+        columns['type'].append(text(record['type']))
+        columns['flags'].append(text(record['flags']))
+        columns['approx_dates_plus_minus_one_day'].append(text(record['approx_dates_plus_minus_one_day']))
+        columns['mask'].append(int(record['mask'], 16))
+        # DLS1 records have no node id
+        columns['node_id'].append(record['node_id'] if record['node_id'] != '' else None)
+        columns['record_end_offset'].append(record['record_end_offset'])
+        columns['source'].append(text(record['source']))
+        columns['source_modified_time'].append(text(record['source_modified_time']))
+        self.buffered += 1
+        self.count += 1
+        if self.buffered >= PARQUET_ROW_GROUP_SIZE:
+            self.write_row_group()
+
+    def write_row_group(self):
+        """
+        Write the buffered records as one row group.
+        """
+        if self.buffered == 0:
+            return
+        types = {
+            'id': pyarrow.uint64(),
+            'mask': pyarrow.uint32(),
+            'node_id': pyarrow.int64(),
+            'record_end_offset': pyarrow.int64()
+        }
+        arrays = []
+        for key in PARQUET_COLUMNS:
+            array = pyarrow.array(self.columns[key], type=types.get(key, pyarrow.string()))
+            if key in PARQUET_DICTIONARY_COLUMNS:
+                array = array.dictionary_encode()
+            arrays.append(array)
+        table = pyarrow.Table.from_arrays(arrays, names=PARQUET_COLUMNS)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(
+                self.path,
+                table.schema,
+                compression=PARQUET_COMPRESSION
+            )
+        self.writer.write_table(table)
+        self.new_columns()
+
+    def close(self):
+        """
+        Write the last row group and the file footer.
+        """
+        self.write_row_group()
+        if self.writer is not None:
+            self.writer.close()
+        return self.count
+
+
+class ActivityNode(object):
+    """
+    A folder of the activity tree. Counts include the records of
+    every folder below it.
+    """
+
+    __slots__ = ['name', 'parent', 'children', 'records', 'masks', 'days', 'closed', 'pruned']
+
+    def __init__(self, name, parent=None):
+        """
+        """
+        self.name = name
+        self.parent = parent
+        self.children = {}
+        self.records = 0
+        # Records by event mask, expanded to flags when written
+        self.masks = {}
+        # Records by day
+        self.days = {}
+        # Sub folders were pruned, so no new ones are added
+        self.closed = False
+        # Records of the pruned sub folders
+        self.pruned = 0
+
+
+class ActivitySink(RecordSink):
+    """
+    Builds a tree of the folders records were parsed for while
+    parsing and writes it to ACTIVITY_TREE.json, with the same folders
+    listed one per line in ACTIVITY_TREE.tsv.
+
+    Each folder holds its record count, the count of each flag and
+    the records per day. File records are counted for their folder.
+    A record is counted on the last day of its approximate date range,
+    or its first day when the last is Unknown.
+
+    Folders deeper than depth levels are counted for the folder above
+    them at that depth. When the tree holds more than max_nodes folders
+    the folders with the fewest records and no sub folders are pruned
+    until it holds three quarters of max_nodes. Their records stay
+    counted in the folder above, which lists them as pruned and adds
+    no new sub folders, so every count written is exact.
+    """
+
+    name = 'activity'
+    filename = 'ACTIVITY_TREE.json'
+    tsv_filename = 'ACTIVITY_TREE.tsv'
+
+    def __init__(self, out_dir, metrics=None, depth=DEFAULT_ACTIVITY_DEPTH, max_nodes=DEFAULT_ACTIVITY_NODES):
+        """
+        depth: Folder levels kept in the tree.
+        max_nodes: Folders kept before the quietest are pruned.
+        """
+        super(ActivitySink, self).__init__(out_dir, metrics)
+        self.depth = depth
+        self.max_nodes = max(2, max_nodes)
+        self.root = ActivityNode('')
+        self.nodes = 1
+        self.pruned_nodes = 0
+        self.day_cache = {}
+
+    def add(self, record):
+        """
+        Count the record for its folder and each folder above it.
+        """
+        mask = int(record['mask'], 16)
+        dates = record['approx_dates_plus_minus_one_day']
+        day = self.day_cache.get(dates)
+        if day is None:
+            parts = dates.split(' - ')
+            day = parts[-1] if parts[-1] != 'Unknown' else parts[0]
+            if len(self.day_cache) < 10000:
+                self.day_cache[dates] = day
+
+        names = record['fullpath'].split('/')
+        if not mask & FOLDER_EVENT:
+            # Counted for the folder holding the file
+            names.pop()
+        node = self.root
+        self.count_node(node, mask, day)
+        for name in names[:self.depth]:
+            if not name:
+                continue
+            child = node.children.get(name)
+            if child is None:
+                if node.closed:
+                    break
+                child = node.children[name] = ActivityNode(name, node)
+                self.nodes += 1
+            node = child
+            self.count_node(node, mask, day)
+        self.count += 1
+
+        if self.nodes > self.max_nodes:
+            self.prune()
+
+    @staticmethod
+    def count_node(node, mask, day):
+        """
+        """
+        node.records += 1
+        node.masks[mask] = node.masks.get(mask, 0) + 1
+        node.days[day] = node.days.get(day, 0) + 1
+
+    def prune(self):
+        """
+        Remove the folders with the fewest records and no sub folders
+        until the tree holds three quarters of max_nodes.
+        """
+        target = self.max_nodes * 3 // 4
+        while self.nodes > target:
+            leaves = []
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                if node.children:
+                    stack.extend(node.children.values())
+                elif node.parent is not None:
+                    leaves.append(node)
+            leaves.sort(key=lambda node: node.records)
+            for node in leaves[:self.nodes - target]:
+                parent = node.parent
+                del parent.children[node.name]
+                parent.closed = True
+                parent.pruned += node.records
+                self.nodes -= 1
+                self.pruned_nodes += 1
+
+    def flag_counts(self, node):
+        """
+        Return the count of each flag of a folder.
+        """
+        counts = {}
+        for mask, count in node.masks.items():
+            for bit, name in ACTIVITY_FLAGS:
+                if mask & bit:
+                    counts[name] = counts.get(name, 0) + count
+        return counts
+
+    def node_dict(self, node, path):
+        """
+        Return a folder and its sub folders, busiest first, as a dict.
+        """
+        children = sorted(node.children.values(), key=lambda child: (-child.records, child.name))
+        return {
+            'folder': text(path),
+            'records': node.records,
+            'flags': self.flag_counts(node),
+            'days': dict((text(day), count) for day, count in node.days.items()),
+            'pruned_records': node.pruned,
+            'children': [self.node_dict(child, path.rstrip('/') + '/' + child.name) for child in children]
+        }
+
+    def write_tsv(self, tree):
+        """
+        Write each folder of the tree as a line of ACTIVITY_TREE.tsv,
+        sub folders below their folder.
+        """
+        with open(os.path.join(self.out_dir, self.tsv_filename), 'wb') as t_file:
+            t_file.write('\t'.join(['folder', 'depth', 'records'] + [name for bit, name in ACTIVITY_FLAGS] +
+                                   ['first_day', 'last_day', 'busiest_day', 'pruned_records']) + '\n')
+            stack = [(tree, 0)]
+            while stack:
+                node, depth = stack.pop()
+                days = sorted(day for day in node['days'] if day != 'Unknown')
+                busiest = max(sorted(node['days']), key=lambda day: node['days'][day]) if node['days'] else ''
+                values = [node['folder'], depth, node['records']] + \
+                         [node['flags'].get(name, 0) for bit, name in ACTIVITY_FLAGS] + \
+                         [days[0] if days else 'Unknown', days[-1] if days else 'Unknown', busiest,
+                          node['pruned_records']]
+                t_file.write(u'\t'.join(unicode(value) for value in values).encode('utf-8') + b'\n')
+                stack.extend((child, depth + 1) for child in reversed(node['children']))
+
+    def close(self):
+        """
+        Write the tree.
+        """
+        tree = self.node_dict(self.root, '/')
+        with open(self.path, 'wb') as a_file:
+            json.dump({
+                'records': self.count,
+                'depth': self.depth,
+                'max_nodes': self.max_nodes,
+                'folders': self.nodes,
+                'pruned_folders': self.pruned_nodes,
+                'tree': tree
+            }, a_file, indent=1, sort_keys=True)
+        self.write_tsv(tree)
+        return self.count
+
+
+def text(value):
+    """
+    Return value as unicode. Paths are raw bytes
+    from the DLS page and may not be valid utf-8.
+    """
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+# Record sinks by their --sinks name
+RECORD_SINKS = {
+    ActivitySink.name: ActivitySink,
+    JsonLinesSink.name: JsonLinesSink,
+    ParquetSink.name: ParquetSink
+}
+
+
+def sink_names():
+    """
+    Return every name accepted by --sinks.
+    """
+    return SORTED_SINKS + sorted(RECORD_SINKS)
+
+
+def parse_sinks(value):
+    """
+    Split a comma separated --sinks value into a list of names.
+    Raises ValueError for unknown names.
+    """
+    names = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in sink_names():
+            raise ValueError('Unknown sink "{}". The following are valid options: {}'.format(
+                name, ', '.join(sink_names())))
+        if name in RECORD_SINKS and RECORD_SINKS[name].import_error:
+            raise ValueError(RECORD_SINKS[name].import_error)
+        if name not in names:
+            names.append(name)
+    if not names:
+        raise ValueError('No sinks selected.')
+    return names
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+# FSEvents External Sort Python Module
+# ------------------------------------------------------
+# Sorts parsed records by event id within a bounded memory budget.
+# Records are spilled to temporary run files while parsing and
+# merged back in event id order.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import heapq
+import marshal
+import shutil
+import tempfile
+
+from fsevents_metrics import NullMetrics
+
+DEFAULT_MEMORY_MB = 256
+
+# Approximate bytes used by a buffered row besides its string values
+ROW_OVERHEAD = 400
+
+# Most run files read at once by a merge. More runs are first
+# merged into larger intermediate runs.
+MAX_MERGE_RUNS = 128
+
+
+class RunFile(object):
+    """
+    A temporary file holding (key, seq, row) items in sorted order.
+    """
+
+    def __init__(self, filename):
+        """
+        """
+        self.filename = filename
+        self.count = 0
+        self.last_key = None
+        self.s_file = open(filename, 'wb')
+
+    def append(self, item):
+        """
+        Write the next item of the run.
+        """
+        marshal.dump(item, self.s_file)
+        self.count += 1
+        self.last_key = item[0]
+
+    def close(self):
+        """
+        Finish writing the run.
+        """
+        if self.s_file is not None:
+            self.s_file.close()
+            self.s_file = None
+
+    def __iter__(self):
+        """
+        Read back the items of the run in order.
+        """
+        self.close()
+        with open(self.filename, 'rb') as s_file:
+            for i in range(self.count):
+                yield marshal.load(s_file)
+
+
+class ExternalSorter(object):
+    """
+    ExternalSorter orders rows by an integer key using at most
+    about memory_mb of buffered rows.
+
+    fsevents files are mostly written in event id order, so rows whose
+    key is not lower than the last key of the presorted run are appended
+    straight to that run's file without being buffered or sorted. Only
+    rows that arrive out of order are buffered, sorted and spilled as
+    additional runs. Iterating the sorter does a k-way heap merge of all
+    runs. Rows with equal keys keep the order they were added in.
+    """
+
+    def __init__(self, memory_mb=DEFAULT_MEMORY_MB, tmpdir=None, metrics=None):
+        """
+        memory_mb: Budget for buffered out of order rows.
+        tmpdir: Folder for the temporary run files.
+        metrics: Optional fsevents_metrics.Metrics recording spills.
+        """
+        self.memory_limit = memory_mb * 1048576
+        self.tmpdir = tempfile.mkdtemp(prefix='fse_sort_', dir=tmpdir)
+        self.metrics = metrics if metrics is not None else NullMetrics()
+
+        self.run_count = 0
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.seq = 0
+
+        # The presorted run receiving in order rows
+        self.presorted = self.new_run()
+        # Runs spilled from the buffer
+        self.runs = []
+
+    def new_run(self):
+        """
+        Return a new empty run file.
+        """
+        self.run_count += 1
+        return RunFile(os.path.join(self.tmpdir, 'run_%05d' % (self.run_count)))
+
+    def __len__(self):
+        """
+        Number of rows added.
+        """
+        return self.seq
+
+    def add(self, key, row):
+        """
+        Add a row of string and int values.
+        """
+        item = (key, self.seq, row)
+        self.seq += 1
+
+        if self.presorted.last_key is None or key >= self.presorted.last_key:
+            self.presorted.append(item)
+            return
+
+        self.buffer.append(item)
+        self.buffer_bytes += ROW_OVERHEAD + sum(len(value) for value in row if isinstance(value, basestring))
+        if self.buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """
+        Sort the buffered rows and write them out as a run.
+        """
+        if not self.buffer:
+            return
+        with self.metrics.timer('external_sort_spill') as counts:
+            self.buffer.sort()
+            run = self.new_run()
+            for item in self.buffer:
+                run.append(item)
+            run.close()
+            self.runs.append(run)
+            counts['records'] = len(self.buffer)
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def reduce_runs(self):
+        """
+        Merge spilled runs into larger runs until few
+        enough are left to be read at once.
+        """
+        while len(self.runs) > MAX_MERGE_RUNS:
+            with self.metrics.timer('external_sort_premerge') as counts:
+                group = self.runs[:MAX_MERGE_RUNS]
+                run = self.new_run()
+                for item in heapq.merge(*[iter(g_run) for g_run in group]):
+                    run.append(item)
+                run.close()
+                for g_run in group:
+                    os.remove(g_run.filename)
+                self.runs = self.runs[MAX_MERGE_RUNS:] + [run]
+                counts['records'] = run.count
+
+    def __iter__(self):
+        """
+        Yield (key, row) for every row in key order.
+        """
+        self.presorted.close()
+        self.reduce_runs()
+        # Rows still buffered are merged from memory
+        self.buffer.sort()
+        streams = [iter(self.presorted), iter(self.buffer)] + [iter(run) for run in self.runs]
+        for key, seq, row in heapq.merge(*streams):
+            yield key, row
+
+    def close(self):
+        """
+        Remove the temporary run files.
+        """
+        self.presorted.close()
+        for run in self.runs:
+            run.close()
+        self.buffer = []
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
@@ -0,0 +1,500 @@
+#!/usr/bin/python
+
+# FSEvents Storage Python Module
+# ------------------------------------------------------
+# Holds the parsed records for the fsevents table, its copy sorted by
+# event id and the report views. The database behind them is picked
+# with --storage: SQLite, which the parser has always used, or DuckDB,
+# a columnar database that scans and filters the records faster when
+# running the report views over large volumes.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import hashlib
+import os
+import re
+import sqlite3
+
+from fsevents_metrics import TimedCursor
+from fsevents_reader import COLUMNS
+
+try:
+    import duckdb
+    DUCKDB_IMPORT = True
+    DUCKDB_IMPORT_ERROR = None
+    # The duckdb releases that install under Python 2 raise RuntimeError
+    DUCKDB_ERROR = getattr(duckdb, 'Error', RuntimeError)
+except ImportError as exp:
+    DUCKDB_IMPORT = False
+    DUCKDB_ERROR = RuntimeError
+    DUCKDB_IMPORT_ERROR = ("\n%s\n\
+        You have selected the duckdb storage but duckdb \n\
+        is not installed and is required for duckdb support. \n\
+        To install duckdb run: pip install duckdb" % (exp))
+
+# Storage used when --storage is not given
+DEFAULT_STORAGE = 'sqlite'
+
+# Records inserted into the fsevents table at a time
+STORAGE_BATCH = 500
+
+# Schema of the fsevents tables
+TABLE_SCHEMA = "CREATE TABLE [{}](\
+                  [id] [BLOB] NULL, \
+                  [id_hex] [TEXT] NULL, \
+                  [fullpath] [TEXT] NULL, \
+                  [filename] [TEXT] NULL, \
+                  [type] [TEXT] NULL, \
+                  [flags] [TEXT] NULL, \
+                  [approx_dates_plus_minus_one_day] [TEXT] NULL, \
+                  [mask] [TEXT] NULL, \
+                  [node_id] [TEXT] NULL, \
+                  [record_end_offset] [TEXT] NULL, \
+                  [source] [TEXT] NULL, \
+                  [source_modified_time] [TEXT] NULL)"
+
+# Schema of the fsevents tables in DuckDB, which has no bracket quoting
+DUCKDB_TABLE_SCHEMA = 'CREATE TABLE {} (' + ', '.join('"{}" VARCHAR'.format(c) for c in COLUMNS) + ')'
+
+# A quoted string, or a column compared to a quoted pattern by LIKE
+LIKE_REGEX = re.compile(r"""('(?:[^']|'')*')|"""
+                        r"""([A-Za-z_][\w.]*|"[^"]+")\s+(NOT\s+)?LIKE\s+('(?:[^']|'')*')""",
+                        re.IGNORECASE)
+
+# Values of a row of the sorted table as one tab separated text
+FINGERPRINT_ROW = " || '\t' || ".join("coalesce({}, '')".format(c) for c in COLUMNS)
+
+# Clauses of a query that order, group or combine its rows
+ORDER_REGEX = re.compile(r"('(?:[^']|'')*')|\b(ORDER|GROUP|UNION|INTERSECT|EXCEPT|LIMIT)\b", re.IGNORECASE)
+
+
+class Storage(object):
+    """
+    Storage is the database the parsed records are kept in. Rows are
+    appended to the fsevents table in batches, copied to the
+    fsevents_sorted_by_event_id table by sort() and read back in event
+    id order by scan() and through the report views.
+
+    Rows are lists of the values of COLUMNS as text. The rows read back
+    hold the values as the database returns them.
+    """
+
+    name = None
+    label = None
+    filename = None
+    import_error = None
+    # Report views can be exported by worker threads over their own connections
+    concurrent_exports = False
+
+    def __init__(self, db_filename, metrics):
+        """
+        db_filename: The database file, replaced if it exists.
+        metrics: The run metrics statement times are recorded in.
+        """
+        self.db_filename = db_filename
+        self.metrics = metrics
+        self.rows = []
+        self.con = None
+        self.cursor = None
+
+    def create(self, views):
+        """
+        Create the fsevents table and the report views, a list of
+        (view name, CREATE VIEW statement).
+        """
+        raise NotImplementedError
+
+    def append(self, values):
+        """
+        Add a row to the fsevents table.
+        """
+        self.rows.append(values)
+        if len(self.rows) >= STORAGE_BATCH:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert the buffered rows.
+        """
+        raise NotImplementedError
+
+    def sort(self):
+        """
+        Copy the fsevents table to fsevents_sorted_by_event_id
+        ordered by event id.
+        Returns
+            count: The number of rows in the table
+        """
+        raise NotImplementedError
+
+    def scan(self, columns, first_rowid=0):
+        """
+        Return an iterator over the columns of the rows of
+        fsevents_sorted_by_event_id after first_rowid, in event id order.
+        """
+        raise NotImplementedError
+
+    def view_names(self):
+        """
+        Return the names of the report views in the database.
+        """
+        raise NotImplementedError
+
+    def view_rows(self, view):
+        """
+        Return an iterator over the rows of a report view.
+        """
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """
+        Return a value that changes when the records
+        in the sorted table change.
+        """
+        return database_fingerprint(self.cursor)
+
+    def commit(self):
+        """
+        Insert the buffered rows and commit them.
+        """
+        self.flush()
+        self.con.commit()
+
+    def close(self):
+        """
+        """
+        self.con.close()
+
+
+class SQLiteStorage(Storage):
+    """
+    SQLiteStorage keeps the records in FSEvents.sqlite. Each batch of
+    rows is inserted with one INSERT statement.
+    """
+
+    name = 'sqlite'
+    label = 'SQLite'
+    filename = 'FSEvents.sqlite'
+    concurrent_exports = True
+
+    def __init__(self, db_filename, metrics):
+        """
+        """
+        super(SQLiteStorage, self).__init__(db_filename, metrics)
+        # Used by the pipeline writer thread while parsing, then by the main thread
+        self.con = sqlite3.connect(db_filename, check_same_thread=False)
+        # Statement execution times are recorded in the run metrics
+        self.cursor = TimedCursor(self.con.cursor(), metrics)
+
+    def create(self, views):
+        """
+        """
+        self.con.execute(TABLE_SCHEMA.format('fsevents'))
+        for name, statement in views:
+            self.con.execute(statement)
+
+    def flush(self):
+        """
+        Insert the buffered rows. When the batch fails its rows are
+        inserted one at a time so that only the bad rows are lost.
+        """
+        if not self.rows:
+            return
+        rows = [sqlite_row(values) for values in self.rows]
+        self.rows = []
+        try:
+            self.cursor.execute(SQLITE_INSERT + ', '.join(rows))
+        except Exception:
+            for row in rows:
+                try:
+                    self.cursor.execute(SQLITE_INSERT + row)
+                except Exception as exp:
+                    print("insert failed!: {}".format(exp))
+
+    def sort(self):
+        """
+        """
+        self.flush()
+        self.cursor.execute(TABLE_SCHEMA.format('fsevents_sorted_by_event_id'))
+        columns = ', '.join(COLUMNS)
+        self.cursor.execute('INSERT INTO fsevents_sorted_by_event_id ({0}) SELECT {0} '
+                            'FROM fsevents ORDER BY id_hex;'.format(columns))
+        return self.cursor.lastrowid
+
+    def append_sorted(self, first_rowid):
+        """
+        Append the rows of the fsevents table after first_rowid
+        to the sorted table, ordered by id.
+        Returns
+            count: The number of rows appended
+        """
+        self.flush()
+        columns = ', '.join(COLUMNS)
+        self.cursor.execute('INSERT INTO fsevents_sorted_by_event_id ({0}) SELECT {0} FROM fsevents '
+                            'WHERE rowid > ? ORDER BY id_hex'.format(columns), (first_rowid,))
+        return self.cursor.rowcount
+
+    def scan(self, columns, first_rowid=0):
+        """
+        """
+        query = 'SELECT {} FROM fsevents_sorted_by_event_id'.format(', '.join(columns))
+        if first_rowid:
+            query += ' WHERE rowid > %d' % (first_rowid)
+        self.cursor.execute(query)
+        return iter(self.cursor)
+
+    def view_names(self):
+        """
+        """
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='view'")
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def view_rows(self, view):
+        """
+        """
+        self.cursor.execute("SELECT * FROM %s" % (view))
+        return iter(self.cursor)
+
+
+class DuckDBStorage(Storage):
+    """
+    DuckDBStorage keeps the records in FSEvents.duckdb, stored by
+    column. Rows keep the order they were inserted in, so the sorted
+    table and the report views read back in event id order, with the
+    records of the same event id in the order they were parsed as in
+    SQLite.
+
+    LIKE is case insensitive for ASCII letters in SQLite but case
+    sensitive in DuckDB, so the report queries compare the lower case
+    of the column and the pattern. The lower case of other letters is
+    taken too, which only matters to patterns holding them. See
+    duckdb_query. DuckDB does not keep the order of the table in the
+    rows of a filter, so the views are ordered by rowid. See
+    duckdb_ordered.
+
+    Values that are not valid utf-8 are stored with the bad bytes
+    replaced, as DuckDB only stores utf-8 text.
+    """
+
+    name = 'duckdb'
+    label = 'DuckDB'
+    filename = 'FSEvents.duckdb'
+    import_error = DUCKDB_IMPORT_ERROR
+
+    def __init__(self, db_filename, metrics):
+        """
+        """
+        super(DuckDBStorage, self).__init__(db_filename, metrics)
+        # The write ahead log is left behind when a run is stopped
+        if os.path.isfile(db_filename + '.wal'):
+            os.remove(db_filename + '.wal')
+        self.con = duckdb.connect(db_filename)
+        self.cursor = TimedCursor(self.con, metrics)
+        self.views = []
+
+    def create(self, views):
+        """
+        The sorted table is created with the fsevents table
+        because DuckDB checks the tables of a view when it is created.
+        """
+        self.con.execute(DUCKDB_TABLE_SCHEMA.format('fsevents'))
+        self.con.execute(DUCKDB_TABLE_SCHEMA.format('fsevents_sorted_by_event_id'))
+        for name, statement in views:
+            query = duckdb_query(statement)
+            try:
+                self.con.execute(duckdb_ordered(query))
+            except DUCKDB_ERROR as exp:
+                # Such as a query that aggregates without grouping
+                print("  View {} can not be ordered by rowid. Its rows are exported in the "
+                      "order DuckDB returns them: {}".format(name, exp))
+                self.con.execute(query)
+            self.views.append(name)
+
+    def flush(self):
+        """
+        """
+        if not self.rows:
+            return
+        rows = self.rows
+        self.rows = []
+        params = []
+        for values in rows:
+            params.extend(duckdb_text(value) for value in values)
+        row = '(' + ', '.join('?' * len(COLUMNS)) + ')'
+        self.cursor.execute('INSERT INTO fsevents VALUES ' + ', '.join([row] * len(rows)), params)
+
+    def sort(self):
+        """
+        """
+        self.flush()
+        self.cursor.execute('INSERT INTO fsevents_sorted_by_event_id SELECT {} '
+                            'FROM fsevents ORDER BY id_hex, rowid'.format(', '.join(COLUMNS)))
+        return self.count()
+
+    def count(self):
+        """
+        Return the number of rows in the sorted table.
+        """
+        self.cursor.execute('SELECT count(*) FROM fsevents_sorted_by_event_id')
+        return self.cursor.fetchone()[0]
+
+    def scan(self, columns, first_rowid=0):
+        """
+        The rowid of a DuckDB table starts at 0, so first_rowid
+        counts the rows as in SQLite. The rows are read with one
+        query, as the duckdb releases that install under Python 2
+        return wrong rows for ranges of rowids over 2048 rows long.
+        """
+        query = 'SELECT {} FROM fsevents_sorted_by_event_id'.format(', '.join(columns))
+        if first_rowid:
+            query += ' WHERE rowid >= %d' % (first_rowid)
+        self.cursor.execute(query + ' ORDER BY rowid')
+        return fetch_rows(self.cursor)
+
+    def view_names(self):
+        """
+        """
+        return list(self.views)
+
+    def view_rows(self, view):
+        """
+        """
+        self.cursor.execute("SELECT * FROM %s" % (view))
+        return fetch_rows(self.cursor)
+
+
+STORAGE_BACKENDS = {
+    SQLiteStorage.name: SQLiteStorage,
+    DuckDBStorage.name: DuckDBStorage
+}
+
+SQLITE_INSERT = 'INSERT INTO fsevents ({}) VALUES '.format(', '.join('[{}]'.format(c) for c in COLUMNS))
+
+
+def parse_storage(name):
+    """
+    Return the Storage class of a --storage argument.
+    Raises ValueError when it is unknown or can not be used.
+    """
+    name = name.strip().lower()
+    if name not in STORAGE_BACKENDS:
+        raise ValueError('Unknown storage "{}". The following are valid options: {}'.format(
+            name, ', '.join(sorted(STORAGE_BACKENDS))))
+    storage = STORAGE_BACKENDS[name]
+    if storage.import_error:
+        raise ValueError(storage.import_error)
+    return storage
+
+
+def sqlite_row(values):
+    """
+    Return the values as the literal row of an SQLite INSERT.
+    Any quotes in the values are doubled.
+    """
+    return '("' + '","'.join([value.replace('"', '""') for value in values]) + '")'
+
+
+def duckdb_query(statement):
+    """
+    Return a report query with each column LIKE 'pattern' compared
+    in lower case, as SQLite compares ASCII letters. It is written as
+    NOT (... NOT LIKE ...), as LIKE fails with a regex_error in the
+    duckdb releases that install under Python 2 while NOT LIKE works.
+    LIKE between other expressions is left as it is.
+    """
+    def like(match):
+        if match.group(1):
+            return match.group(1)
+        column, not_like, pattern = match.group(2, 3, 4)
+        compare = 'lower({}) NOT LIKE lower({})'.format(column, pattern)
+        return compare if not_like else 'NOT (' + compare + ')'
+    return LIKE_REGEX.sub(like, statement)
+
+
+def duckdb_ordered(query):
+    """
+    Return a report query with ORDER BY rowid added when it does not
+    order, group or combine its rows itself, so a view of the sorted
+    table reads back in event id order as in SQLite. DuckDB returns
+    the rows matching each side of an OR apart otherwise.
+    """
+    for match in ORDER_REGEX.finditer(query):
+        if match.group(2):
+            return query
+    return query.rstrip().rstrip(';') + ' ORDER BY rowid'
+
+
+def duckdb_text(value):
+    """
+    Return a value as text DuckDB can store.
+    """
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        # Bytes the reader kept as surrogates under Python 3
+        return value.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace')
+    return value
+
+
+def fetch_rows(cursor, size=STORAGE_BATCH):
+    """
+    Yield the rows of the last statement of a cursor.
+    The duckdb releases that install under Python 2 have
+    no fetchmany, so all rows are fetched at once. Reading
+    them in pages of LIMIT and OFFSET or of rowids takes more
+    memory there, as each query keeps memory it does not
+    give back, and scans the whole table for each page.
+    """
+    fetchmany = getattr(cursor, 'fetchmany', None)
+    if fetchmany is None:
+        for row in cursor.fetchall():
+            yield row
+        return
+    while True:
+        rows = fetchmany(size)
+        if not rows:
+            return
+        for row in rows:
+            yield row
+
+
+def database_fingerprint(cursor):
+    """
+    Return a value that changes when the records
+    in a parsed SQLite database change.
+    """
+    cursor.execute("SELECT {} FROM fsevents_sorted_by_event_id ORDER BY rowid".format(FINGERPRINT_ROW))
+    return rows_fingerprint(fetch_rows(cursor))
+
+
+def rows_fingerprint(rows):
+    """
+    Return the row count and sha1 of the rows of the sorted table, each
+    read as one text value, so a database whose records were edited,
+    or another database with as many records, does not pass for the
+    one the reports came from.
+    """
+    digest = hashlib.sha1()
+    count = 0
+    for row in rows:
+        count += 1
+        value = row[0]
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8', 'replace')
+        digest.update(value + b'\n')
+    return 'fsevents_sorted_by_event_id:{}:{}'.format(count, digest.hexdigest())
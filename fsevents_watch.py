@@ -0,0 +1,217 @@
+#!/usr/bin/python
+
+# FSEvents Folder Watch Python Module
+# ------------------------------------------------------
+# Reports fsevents files as they finish landing in a folder, such as
+# a case folder an ongoing collection keeps syncing to. Uses inotify
+# on Linux and falls back to polling the folder elsewhere.
+
+# Copyright 2019 G-C Partners, LLC
+# Nicole Ibrahim
+#
+# G-C Partners licenses this file to you under the Apache License, Version
+# 2.0 (the "License"); you may not use this file except in compliance with the
+# License.  You may obtain a copy of the License at:
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.  See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+import time
+import errno
+import select
+import signal
+import struct
+
+try:
+    import ctypes
+    import ctypes.util
+    CTYPES_IMPORT = True
+except ImportError:
+    CTYPES_IMPORT = False
+
+# Seconds between polls, and the longest wait for inotify events
+DEFAULT_WATCH_INTERVAL = 1.0
+
+# inotify event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+
+# wd, mask, cookie and name length of an inotify event
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """
+    Return libc when it provides inotify, otherwise None.
+    """
+    if not CTYPES_IMPORT:
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def is_watched_name(name):
+    """
+    Return True for names that may be fsevents files. Sync tools
+    write to hidden temporary names and rename them when done.
+    """
+    return name != 'fseventsd-uuid' and not name.startswith('.')
+
+
+class FolderWatcher(object):
+    """
+    FolderWatcher returns the names of files that finished landing in
+    a folder since they were last asked for.
+
+    With inotify a file is finished when it is closed after writing or
+    renamed into the folder. When polling, a file is finished once its
+    size and mod time are the same in two polls in a row.
+    """
+
+    def __init__(self, path, interval=DEFAULT_WATCH_INTERVAL, poll=False):
+        """
+        path: The folder to watch.
+        interval: Seconds between polls.
+        poll: Poll even when inotify is available.
+        """
+        self.path = path
+        self.interval = interval
+        # Files already handed over or parsed
+        self.known = set()
+        # Size and mod time of unfinished files seen by the last poll
+        self.pending = {}
+        self.fd = None
+        self.backend = 'poll'
+        self.stopped = False
+
+        libc = None if poll else _load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init()
+            if fd >= 0 and libc.inotify_add_watch(fd, path.encode('utf-8') if isinstance(path, unicode) else path,
+                                                  IN_CLOSE_WRITE | IN_MOVED_TO) >= 0:
+                self.fd = fd
+                self.backend = 'inotify'
+            elif fd >= 0:
+                os.close(fd)
+
+    def add_known(self, names):
+        """
+        Names that are not reported, such as the files parsed
+        before watching started.
+        """
+        self.known.update(names)
+
+    def stop_on_signals(self):
+        """
+        Stop watching on Ctrl-C or SIGTERM once the files
+        being parsed are done, instead of interrupting them.
+        """
+        def stop(signum, frame):
+            self.stopped = True
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+    def wait(self):
+        """
+        Wait up to the interval and return a list of (name, time)
+        for each file that finished landing, in name order.
+        """
+        if self.stopped:
+            return []
+        if self.fd is not None:
+            found = self._read_events()
+        else:
+            found = self._poll()
+        found.sort()
+        return found
+
+    def drain(self):
+        """
+        Return the files that finished landing but were not asked
+        for yet, without waiting. Called once watching is stopped.
+        """
+        if self.fd is None:
+            return []
+        found = self._read_events(0)
+        found.sort()
+        return found
+
+    def _read_events(self, timeout=None):
+        """
+        Return the files closed or moved into the folder.
+        """
+        try:
+            ready = select.select([self.fd], [], [], self.interval if timeout is None else timeout)[0]
+        except select.error as exp:
+            if exp.args[0] == errno.EINTR:
+                return []
+            raise
+        if not ready:
+            return []
+        data = os.read(self.fd, 65536)
+        now = time.time()
+        found = []
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip('\x00')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost. Poll from now on.
+                os.close(self.fd)
+                self.fd = None
+                self.backend = 'poll'
+                return found + self._poll()
+            if name and name not in self.known and is_watched_name(name) and \
+                    os.path.isfile(os.path.join(self.path, name)):
+                self.known.add(name)
+                found.append((name, now))
+        return found
+
+    def _poll(self):
+        """
+        Return the files whose size and mod time did not change
+        since the last poll.
+        """
+        time.sleep(self.interval)
+        now = time.time()
+        found = []
+        pending = {}
+        for name in os.listdir(self.path):
+            if name in self.known or not is_watched_name(name):
+                continue
+            fullpath = os.path.join(self.path, name)
+            try:
+                stat = os.stat(fullpath)
+            except OSError:
+                continue
+            if not os.path.isfile(fullpath):
+                continue
+            state = (stat.st_size, stat.st_mtime)
+            if self.pending.get(name) == state:
+                self.known.add(name)
+                found.append((name, now))
+            else:
+                pending[name] = state
+        self.pending = pending
+        return found
+
+    def close(self):
+        """
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+
+# Builds fsevents files for the tests.
+
+import gzip
+import json
+import os
+import struct
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Mask of a created file
+CREATED_FILE = 0x01008000
+
+# The parser and its output modules run under Python 2 only
+PYTHON2_ONLY = unittest.skipIf(sys.version_info[0] > 2, 'The parser runs under Python 2')
+
+
+def dls2_page(records, mask=CREATED_FILE):
+    """
+    Return a DLS2 page holding the (path, event id) records.
+    """
+    raw = b''
+    for path, wd in records:
+        raw += path + b'\x00' + struct.pack('<Q', wd) + struct.pack('>I', mask) + struct.pack('<Q', 1)
+    return b'2SLD' + b'\x00' * 4 + struct.pack('<I', len(raw) + 12) + raw
+
+
+def write_fsevents(folder, name, pages):
+    """
+    Write an allocated fsevents file of the pages.
+    """
+    g_file = gzip.open(os.path.join(folder, name), 'wb')
+    g_file.write(b''.join(pages))
+    g_file.close()
+
+
+def write_volume(folder, paths, files=3, pages=2, records=500):
+    """
+    Write a folder of allocated fsevents files whose
+    records cycle through the paths.
+    """
+    wd = 0x1000
+    for name in range(files):
+        file_pages = []
+        for page in range(pages):
+            page_records = []
+            for i in range(records):
+                page_records.append((paths[(wd * 7) % len(paths)], wd))
+                wd += 1
+            file_pages.append(dls2_page(page_records))
+        write_fsevents(folder, '%016x' % (wd - 1), file_pages)
+
+
+def write_queries(filename, reports):
+    """
+    Write a report queries file of (report name, query).
+    """
+    with open(filename, 'w') as q_file:
+        json.dump({'process_list': [
+            {'report_name': name, 'description': '', 'query': query} for name, query in reports]}, q_file)
+
+
+def run_parser(*args):
+    """
+    Run FSEParser with the arguments and return what it printed.
+    """
+    return subprocess.check_output([sys.executable, os.path.join(ROOT, 'FSEParser_V4.0.py')] + list(args),
+                                   stderr=subprocess.STDOUT)
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+
+# Tests of --coalesce.
+# Run from the repository root with: python -m unittest discover tests
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fsevents_fixtures import PYTHON2_ONLY, run_parser, write_queries, write_volume
+
+from fsevents_coalesce import Coalescer
+
+REPORT_QUERY = "CREATE VIEW Everything AS SELECT * FROM fsevents_sorted_by_event_id " \
+               "WHERE fullpath LIKE '%';"
+
+# Records cycle through the paths by event id, taking app.log
+# three times then system.log once
+PATHS = [
+    b'Users/bob/Library/Logs/app.log',
+    b'Users/bob/Library/Logs/app.log',
+    b'Users/bob/Library/Logs/app.log',
+    b'private/var/log/system.log'
+]
+
+
+def row(wd, dates, path='Users/bob/Library/Logs/app.log', node_id='100', flags='Modified;'):
+    """
+    Return a row as handed to the Coalescer.
+    """
+    return ('%016x (%d)' % (wd, wd), node_id, path, 'FileEvent;', flags, dates,
+            'src/%016x' % (wd | 0xff), '2019-03-04 12:30:00.000000 [UTC]')
+
+
+class CoalescerTest(unittest.TestCase):
+    """
+    """
+
+    def test_run(self):
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.02 - 2019.03.04'),
+            row(2, '2019.03.01 - 2019.03.03'),
+            row(3, '2019.03.03 - 2019.03.05')
+        ]))
+        self.assertEqual(rows, [(
+            '0000000000000001 (1)', '0000000000000003 (3)', 3, '100', 'Users/bob/Library/Logs/app.log',
+            'FileEvent;', 'Modified;', '2019.03.01 - 2019.03.05', 'src/00000000000000ff',
+            '2019-03-04 12:30:00.000000 [UTC]')])
+
+    def test_node_id_ends_run(self):
+        coalescer = Coalescer()
+        rows = list(coalescer.coalesce([
+            row(1, '2019.03.01', node_id='100'),
+            row(2, '2019.03.01', node_id='100'),
+            row(3, '2019.03.01', node_id='200'),
+            row(4, '2019.03.01', node_id='200')
+        ]))
+        self.assertEqual([(r[0], r[1], r[2], r[3]) for r in rows], [
+            ('0000000000000001 (1)', '0000000000000002 (2)', 2, '100'),
+            ('0000000000000003 (3)', '0000000000000004 (4)', 2, '200')
+        ])
+        self.assertEqual(coalescer.stats(), {'records': 4, 'rows': 2})
+
+    def test_flags_end_run(self):
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.01'),
+            row(2, '2019.03.01', flags='Removed;'),
+            row(3, '2019.03.01')
+        ]))
+        self.assertEqual([r[2] for r in rows], [1, 1, 1])
+
+    def test_unknown_start(self):
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.02 - 2019.03.04'),
+            row(2, 'Unknown - 2019.03.03'),
+            row(3, '2019.03.01 - 2019.03.04')
+        ]))
+        # Unknown is kept once seen, however early a later start is
+        self.assertEqual(rows[0][7], 'Unknown - 2019.03.04')
+
+    def test_unknown_end(self):
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.02 - Unknown'),
+            row(2, '2019.03.01 - 2019.03.05')
+        ]))
+        self.assertEqual(rows[0][7], '2019.03.01 - Unknown')
+
+    def test_same_dates(self):
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.01'),
+            row(2, '2019.03.01')
+        ]))
+        self.assertEqual(rows[0][7], '2019.03.01')
+
+    def test_run_of_one(self):
+        # Kept as it was rather than rebuilt from its start and end
+        rows = list(Coalescer().coalesce([
+            row(1, '2019.03.01 - 2019.03.01'),
+            row(2, '2019.03.02', path='Users/bob/other.log')
+        ]))
+        self.assertEqual([(r[1], r[2], r[7]) for r in rows], [
+            ('0000000000000001 (1)', 1, '2019.03.01 - 2019.03.01'),
+            ('0000000000000002 (2)', 1, '2019.03.02')
+        ])
+
+    def test_run_across_chunks(self):
+        coalescer = Coalescer()
+        first = list(coalescer.coalesce([row(1, '2019.03.01'), row(2, '2019.03.01')], last=False))
+        self.assertEqual(first, [])
+        second = list(coalescer.coalesce([row(3, '2019.03.02'), row(4, '2019.03.02', path='b')], last=False))
+        self.assertEqual([(r[0], r[1], r[2], r[7]) for r in second], [
+            ('0000000000000001 (1)', '0000000000000003 (3)', 3, '2019.03.01 - 2019.03.02')])
+        last = list(coalescer.coalesce([]))
+        self.assertEqual([(r[0], r[2], r[4]) for r in last], [('0000000000000004 (4)', 1, 'b')])
+        self.assertEqual(coalescer.close(), None)
+        self.assertEqual(coalescer.stats(), {'records': 4, 'rows': 2})
+
+    def test_empty(self):
+        self.assertEqual(list(Coalescer().coalesce([])), [])
+
+
+@PYTHON2_ONLY
+class CoalesceParseTest(unittest.TestCase):
+    """
+    The reports streamed in chunks without the sqlite output
+    coalesce runs across the chunks as the SQLite export does.
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        source = os.path.join(self.folder, 'fseventsd')
+        os.mkdir(source)
+        # Over REPORT_CHUNK_SIZE records, with a run on each side of it
+        write_volume(source, PATHS, files=3, pages=2, records=2000)
+        self.queries = os.path.join(self.folder, 'report_queries.json')
+        write_queries(self.queries, [('Everything', REPORT_QUERY)])
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def parse(self, casename, *args):
+        """
+        Parse the volume and return the lines of its report.
+        """
+        run_parser('-s', os.path.join(self.folder, 'fseventsd'), '-t', 'folder', '-o', self.folder,
+                   '-c', casename, '-q', self.queries, '--coalesce', *args)
+        with open(os.path.join(self.folder, casename, 'Everything.tsv'), 'rb') as r_file:
+            return r_file.read().splitlines()
+
+    def test_streamed_report(self):
+        lines = self.parse('sqlite')
+        self.assertEqual(self.parse('streamed', '--sinks', 'tsv,reports'), lines)
+        counts = [int(line.split(b'\t')[2]) for line in lines[1:]]
+        self.assertEqual(sum(counts), 12000)
+        # Runs of app.log and system.log, the first run of app.log holding one record
+        self.assertEqual(len(counts), 6001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+
+# Tests of --dedup.
+# Run from the repository root with: python -m unittest discover tests
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from fsevents_fixtures import PYTHON2_ONLY, dls2_page, run_parser, write_fsevents
+
+from fsevents_dedup import BloomFilter, RecordDeduper, authoritative_order, record_key
+
+# Names of an allocated fsevents file and of a carved copy of it
+ALLOCATED = '0000000000003710'
+CARVED = '0000000000003710.gz'
+
+
+def record(wd, source, path='Users/bob/Documents/report.docx'):
+    """
+    Return a record as handed to the RecordDeduper.
+    """
+    return {'id': wd, 'fullpath': path, 'mask': '0x01008000', 'node_id': 1, 'source': source}
+
+
+class AuthoritativeOrderTest(unittest.TestCase):
+    """
+    """
+
+    def test_allocated_first(self):
+        names = ['carved_1.gz', '0000000000002000', CARVED, '0000000000001000']
+        self.assertEqual(authoritative_order(names, lambda name: name),
+                         ['0000000000002000', '0000000000001000', 'carved_1.gz', CARVED])
+
+
+class BloomFilterTest(unittest.TestCase):
+    """
+    """
+
+    def test_added_keys(self):
+        bloom = BloomFilter(1024)
+        keys = [struct.pack('<QQ', i, i * 0x9e3779b97f4a7c15 & 0xffffffffffffffff) for i in range(500)]
+        self.assertFalse(any(key in bloom for key in keys))
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+
+@PYTHON2_ONLY
+class RecordDeduperTest(unittest.TestCase):
+    """
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        # The smallest budget holds a few thousand keys in memory
+        self.deduper = RecordDeduper(1, self.folder)
+
+    def tearDown(self):
+        """
+        """
+        self.deduper.close()
+        shutil.rmtree(self.folder)
+
+    def test_duplicates_across_spill(self):
+        deduper = self.deduper
+        count = deduper.key_limit + 100
+        self.assertFalse(any(deduper.seen(record(wd, ALLOCATED)) for wd in range(count)))
+        self.assertEqual(deduper.spilled, deduper.key_limit)
+        self.assertEqual(len(deduper.keys), 100)
+        self.assertEqual(os.listdir(self.folder), [os.path.basename(deduper.db_filename)])
+
+        # Spilled keys are found on disk, the others in memory
+        self.assertTrue(all(deduper.seen(record(wd, CARVED)) for wd in range(count)))
+        self.assertEqual(deduper.disk_lookups, deduper.key_limit)
+        # Another path or event id is not a duplicate
+        self.assertFalse(deduper.seen(record(0, CARVED, 'Users/bob/Documents/other.docx')))
+        self.assertFalse(deduper.seen(record(count, CARVED)))
+
+        self.assertEqual(deduper.summary()['sources'], {CARVED: {'records': count + 2, 'duplicates': count}})
+        self.assertEqual(deduper.duplicates, count)
+        deduper.close()
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_record_key(self):
+        key = record_key(record(0x1234, ALLOCATED))
+        self.assertEqual(len(key), 16)
+        self.assertEqual(key[:8], struct.pack('<Q', 0x1234))
+        # The source is not part of the key
+        self.assertEqual(record_key(record(0x1234, CARVED)), key)
+
+
+@PYTHON2_ONLY
+class DedupParseTest(unittest.TestCase):
+    """
+    The records of an allocated file are kept over their copies in a
+    carved gzip, whichever is listed first, with the keys spilled to disk.
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'fseventsd')
+        os.mkdir(self.source)
+        pages = [dls2_page([(b'Users/bob/file%d' % (wd % 7), wd) for wd in range(start, start + 2000)])
+                 for start in range(0x1000, 0x1000 + 10000, 2000)]
+        write_fsevents(self.source, ALLOCATED, pages)
+        write_fsevents(self.source, CARVED, pages)
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def test_allocated_kept(self):
+        output = run_parser('-s', self.source, '-t', 'folder', '-o', self.folder, '-c', 'case',
+                            '--dedup', '--dedup-memory', '1')
+        self.assertIn(b'Duplicate Records Removed: 10000', output)
+        case = os.path.join(self.folder, 'case')
+        with open(os.path.join(case, 'All_FSEVENTS.tsv'), 'rb') as t_file:
+            lines = t_file.read().splitlines()
+        self.assertEqual(len(lines), 1 + 10000)
+        source = lines[0].split(b'\t').index(b'source')
+        self.assertEqual(set(line.split(b'\t')[source] for line in lines[1:]),
+                         set([os.path.join(self.source, ALLOCATED).encode('utf-8')]))
+        with open(os.path.join(case, 'METRICS.json'), 'rb') as m_file:
+            summary = json.loads(m_file.read().decode('utf-8'))['info']['dedup']
+        self.assertTrue(summary['keys_spilled'] > 0)
+        self.assertTrue(summary['disk_lookups'] > 0)
+        self.assertEqual(list(summary['sources']), [os.path.join(self.source, CARVED)])
+
+
+if __name__ == '__main__':
+    unittest.main()
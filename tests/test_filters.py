@@ -0,0 +1,81 @@
+#!/usr/bin/python
+
+# Tests of the event id filter of the decoder.
+# Run from the repository root with: python -m unittest discover tests
+
+import shutil
+import tempfile
+import unittest
+
+from fsevents_fixtures import dls2_page, write_fsevents
+
+from fsevents_filters import RecordFilter
+from fsevents_reader import FSEventDecoder, folder_files, page_event_ids
+
+
+class EventIdFilterTest(unittest.TestCase):
+    """
+    Records of a page are not always in event id order, so a page or
+    file must not be skipped going by its first and last records.
+    """
+
+    # The middle record is the only one in the range
+    RECORDS = [(b'a', 100), (b'b', 500), (b'c', 200)]
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def decode(self, first_id, last_id):
+        """
+        Return the event ids of the records kept by the filter.
+        """
+        decoder = FSEventDecoder(False)
+        decoder.record_filter = RecordFilter(first_id, last_id)
+        wds = []
+        for src in folder_files(self.folder):
+            for record in decoder.decode(src):
+                wds.append(record['id'])
+        return wds, decoder
+
+    def test_page_event_ids(self):
+        page = dls2_page(self.RECORDS)
+        self.assertEqual(page_event_ids(page, len(page), 2), (100, 500))
+
+    def test_page_event_ids_truncated(self):
+        page = dls2_page(self.RECORDS)
+        self.assertEqual(page_event_ids(page[:-4], len(page), 2), None)
+
+    def test_middle_record_kept(self):
+        # Named after a later event id, as the file is not skipped by name
+        write_fsevents(self.folder, '%016x' % 600, [dls2_page(self.RECORDS)])
+        wds, decoder = self.decode(501, 600)
+        self.assertEqual(wds, [])
+        self.assertEqual(decoder.skipped_file_count, 1)
+        wds, decoder = self.decode(400, 600)
+        self.assertEqual(wds, [500])
+        self.assertEqual(decoder.skipped_file_count, 0)
+
+    def test_file_named_before_range(self):
+        # The file name is below the range, but a record of it is in it
+        write_fsevents(self.folder, '%016x' % 200, [dls2_page(self.RECORDS)])
+        wds, decoder = self.decode(400, 600)
+        self.assertEqual(wds, [500])
+        self.assertEqual(decoder.skipped_file_count, 0)
+
+    def test_page_skipped(self):
+        pages = [dls2_page([(b'd', 10), (b'e', 30), (b'f', 20)]), dls2_page(self.RECORDS)]
+        write_fsevents(self.folder, '%016x' % 600, pages)
+        wds, decoder = self.decode(400, 600)
+        self.assertEqual(wds, [500])
+        self.assertEqual(decoder.skipped_page_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/python
+
+# Tests of the lifecycle sink.
+# Run from the repository root with: python -m unittest discover tests
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from fsevents_fixtures import PYTHON2_ONLY
+
+from fsevents_lifecycle import (
+    CREATED, FOLDER_EVENT, LIFECYCLE_HISTORY, LIFECYCLE_PATHS, REMOVED, RENAMED, LifecycleEngine)
+from fsevents_reader import COLUMNS
+
+MODIFIED = 0x10000000
+
+
+def row(wd, path, mask, node_id=''):
+    """
+    Return a row of COLUMNS for a record.
+    """
+    values = {
+        'id': str(wd),
+        'id_hex': '%016x (%d)' % (wd, wd),
+        'fullpath': path,
+        'filename': path.split('/')[-1],
+        'type': 'FolderEvent;' if mask & FOLDER_EVENT else 'FileEvent;',
+        'flags': '',
+        'approx_dates_plus_minus_one_day': '2019.03.01',
+        'mask': '0x%08x' % mask,
+        'node_id': node_id,
+        'record_end_offset': '0',
+        'source': 'src/0000000000000100',
+        'source_modified_time': ''
+    }
+    return [values[column] for column in COLUMNS]
+
+
+@PYTHON2_ONLY
+class LifecycleEngineTest(unittest.TestCase):
+    """
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def run_engine(self, records, max_paths=100):
+        """
+        Add the (event id, path, mask) records and return the rows of
+        LIFECYCLE_HISTORY.tsv, the rows of LIFECYCLE_PATHS.tsv by
+        lifecycle id and the counts of the run.
+        """
+        engine = LifecycleEngine(self.folder, COLUMNS, max_paths)
+        for record in records:
+            engine.add(row(*record))
+        stats = engine.close()
+        history = read_tsv(os.path.join(self.folder, LIFECYCLE_HISTORY))
+        paths = dict((life['lifecycle_id'], life) for life in read_tsv(os.path.join(self.folder, LIFECYCLE_PATHS)))
+        self.assertEqual(len(paths), stats['lifecycles'])
+        # Every lifecycle in the history is written out
+        self.assertEqual(set(entry['lifecycle_id'] for entry in history), set(paths))
+        return history, paths, stats
+
+    def test_rename_pair(self):
+        history, paths, stats = self.run_engine([
+            (1, 'Users/bob/a.txt', CREATED),
+            (2, 'Users/bob/a.txt', RENAMED),
+            (3, 'Users/bob/b.txt', RENAMED),
+            (4, 'Users/bob/b.txt', MODIFIED)
+        ])
+        self.assertEqual([entry['lifecycle_id'] for entry in history], ['1'] * 4)
+        self.assertEqual([entry['rename'] for entry in history], ['', 'from', 'to', ''])
+        self.assertEqual(history[1]['renamed_path'], 'Users/bob/b.txt')
+        life = paths['1']
+        self.assertEqual((life['first_path'], life['last_path'], life['state']),
+                         ('Users/bob/a.txt', 'Users/bob/b.txt', 'live'))
+        self.assertEqual((life['events'], life['renames'], life['changes']), ('4', '1', '1'))
+        self.assertEqual(stats['rename_pairs'], 1)
+
+    def test_unpaired_rename(self):
+        # The next record does not have the next event id
+        history, paths, stats = self.run_engine([
+            (1, 'Users/bob/a.txt', CREATED),
+            (2, 'Users/bob/a.txt', RENAMED),
+            (5, 'Users/bob/b.txt', RENAMED)
+        ])
+        self.assertEqual([entry['rename'] for entry in history], ['', 'unpaired', 'unpaired'])
+        self.assertEqual(paths['1']['last_path'], 'Users/bob/a.txt')
+        self.assertEqual(paths['2']['first_path'], 'Users/bob/b.txt')
+        self.assertEqual(stats['unpaired_renames'], 2)
+        self.assertEqual(stats['rename_pairs'], 0)
+
+    def test_node_id_mismatch(self):
+        history, paths, stats = self.run_engine([
+            (1, 'a', RENAMED, '10'),
+            (2, 'b', RENAMED, '11')
+        ])
+        self.assertEqual(stats['unpaired_renames'], 2)
+        self.assertEqual(len(paths), 2)
+
+    def test_folder_rename_moves_children(self):
+        history, paths, stats = self.run_engine([
+            (1, 'Users/bob/old', CREATED | FOLDER_EVENT),
+            (2, 'Users/bob/old/x.txt', CREATED),
+            (3, 'Users/bob/old', RENAMED | FOLDER_EVENT),
+            (4, 'Users/bob/new', RENAMED | FOLDER_EVENT),
+            (5, 'Users/bob/new/x.txt', MODIFIED)
+        ])
+        self.assertEqual(history[-1]['lifecycle_id'], '2')
+        self.assertEqual((paths['2']['first_path'], paths['2']['last_path'], paths['2']['events']),
+                         ('Users/bob/old/x.txt', 'Users/bob/new/x.txt', '2'))
+        self.assertEqual(paths['1']['last_path'], 'Users/bob/new')
+
+    def test_rename_over_live_path(self):
+        history, paths, stats = self.run_engine([
+            (1, 'a.txt', CREATED),
+            (2, 'b.txt', CREATED),
+            (3, 'a.txt', RENAMED),
+            (4, 'b.txt', RENAMED)
+        ])
+        self.assertEqual(paths['2']['state'], 'replaced')
+        self.assertEqual((paths['1']['last_path'], paths['1']['state']), ('b.txt', 'live'))
+
+    def test_folder_rename_over_live_child(self):
+        history, paths, stats = self.run_engine([
+            (1, 'A/x', CREATED),
+            (2, 'B/x', CREATED),
+            (3, 'A', RENAMED | FOLDER_EVENT),
+            (4, 'B', RENAMED | FOLDER_EVENT)
+        ])
+        self.assertEqual((paths['2']['last_path'], paths['2']['state']), ('B/x', 'replaced'))
+        self.assertEqual((paths['1']['last_path'], paths['1']['state']), ('B/x', 'live'))
+        self.assertEqual((paths['3']['first_path'], paths['3']['last_path']), ('A', 'B'))
+
+    def test_folder_renamed_below_itself(self):
+        history, paths, stats = self.run_engine([
+            (1, 'A/x', CREATED),
+            (2, 'A/B/x', CREATED),
+            (3, 'A', RENAMED | FOLDER_EVENT),
+            (4, 'A/B', RENAMED | FOLDER_EVENT)
+        ])
+        self.assertEqual(paths['1']['last_path'], 'A/B/x')
+        self.assertEqual(paths['2']['last_path'], 'A/B/B/x')
+        self.assertEqual(paths['2']['state'], 'live')
+
+    def test_removed(self):
+        history, paths, stats = self.run_engine([
+            (1, 'a.txt', CREATED),
+            (2, 'a.txt', REMOVED),
+            (3, 'a.txt', CREATED)
+        ])
+        self.assertEqual((paths['1']['state'], paths['1']['created_event_id'], paths['1']['removed_event_id']),
+                         ('removed', '0000000000000001 (1)', '0000000000000002 (2)'))
+        self.assertEqual(paths['2']['state'], 'live')
+
+    def test_eviction(self):
+        history, paths, stats = self.run_engine([
+            (1, 'a.txt', CREATED),
+            (2, 'b.txt', CREATED),
+            (3, 'a.txt', MODIFIED),
+            (4, 'c.txt', CREATED),
+            (5, 'b.txt', MODIFIED)
+        ], max_paths=2)
+        # b.txt was the least recently seen when c.txt was added
+        self.assertEqual(paths['2']['state'], 'evicted')
+        self.assertEqual((paths['4']['first_path'], paths['4']['state']), ('b.txt', 'live'))
+        self.assertEqual(paths['1']['events'], '2')
+        self.assertEqual(stats['evicted'], 2)
+
+
+def read_tsv(filename):
+    """
+    Return the rows of a TSV file as dicts.
+    """
+    with open(filename, 'rb') as t_file:
+        return list(csv.DictReader(t_file, delimiter='\t'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/python
+
+# Tests of the job queue.
+# Run from the repository root with: python -m unittest discover tests
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from fsevents_fixtures import PYTHON2_ONLY, ROOT, run_parser, write_volume
+
+from fsevents_batch import chain_units
+from fsevents_queue import MAX_ATTEMPTS, JobQueue, read_shard, work, write_shard
+from fsevents_reader import folder_files
+
+PATHS = [
+    b'Users/bob/Documents/report.docx',
+    b'Users/bob/Library/Caches/cache.db',
+    b'private/var/log/system.log'
+]
+
+
+class QueueTestCase(unittest.TestCase):
+    """
+    Adds the files of a volume to a job queue folder.
+    """
+
+    files = 3
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'fseventsd')
+        os.mkdir(self.source)
+        write_volume(self.source, PATHS, files=self.files, pages=1, records=200)
+        self.queue_dir = os.path.join(self.folder, 'queue')
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def expire(self, queue, unit_id):
+        """
+        End the lease of a unit as if its worker had stopped.
+        """
+        queue.con.execute("UPDATE units SET lease_expires = 0 WHERE id = ?", (unit_id,))
+
+    def state(self, queue, unit_id):
+        """
+        Return the state, worker, attempts and error of a unit.
+        """
+        return queue.con.execute("SELECT state, worker, attempts, error FROM units WHERE id = ?",
+                                 (unit_id,)).fetchone()
+
+
+class JobQueueTest(QueueTestCase):
+    """
+    """
+
+    def setUp(self):
+        """
+        """
+        super(JobQueueTest, self).setUp()
+        self.queue = JobQueue(self.queue_dir, create=True)
+        host = self.queue.add_host('case', self.source, 'folder')
+        files = sorted(folder_files(self.source), key=lambda src: src.name)
+        self.queue.add_units(chain_units(host, self.source, files, True, False))
+
+    def tearDown(self):
+        """
+        """
+        self.queue.close()
+        super(JobQueueTest, self).tearDown()
+
+    def test_claim_order(self):
+        claimed = [self.queue.claim('a') for i in range(self.files)]
+        self.assertEqual([unit['index'] for unit in claimed], list(range(self.files)))
+        self.assertEqual(self.queue.claim('a'), None)
+        self.assertEqual(self.queue.counts(), {'pending': 0, 'leased': self.files, 'done': 0, 'failed': 0})
+
+    def test_released_unit_guard(self):
+        first = self.queue.claim('a')
+        self.expire(self.queue, first['id'])
+        second = self.queue.claim('b')
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(second['attempts'], 1)
+
+        # The worker whose lease expired no longer owns the unit
+        self.queue.complete(first['id'], 'a')
+        self.assertEqual(self.state(self.queue, first['id']), ('leased', 'b', 2, None))
+        self.queue.fail(first['id'], 'a', 'IOError: stale')
+        self.assertEqual(self.state(self.queue, first['id']), ('leased', 'b', 2, None))
+
+        self.queue.complete(first['id'], 'b')
+        self.assertEqual(self.state(self.queue, first['id']), ('done', 'b', 2, None))
+
+    def test_fail_max_attempts(self):
+        unit_id = None
+        for attempt in range(MAX_ATTEMPTS):
+            unit = self.queue.claim('a')
+            if unit_id is None:
+                unit_id = unit['id']
+            self.assertEqual(unit['id'], unit_id)
+            self.queue.fail(unit_id, 'a', 'ValueError: bad page')
+            state = 'failed' if attempt == MAX_ATTEMPTS - 1 else 'pending'
+            self.assertEqual(self.state(self.queue, unit_id), (state, 'a', attempt + 1, 'ValueError: bad page'))
+        self.assertNotEqual(self.queue.claim('a')['id'], unit_id)
+
+    def test_lease_expired_max_attempts(self):
+        unit_id = None
+        for attempt in range(MAX_ATTEMPTS):
+            unit = self.queue.claim('a')
+            if unit_id is None:
+                unit_id = unit['id']
+            self.assertEqual(unit['id'], unit_id)
+            self.expire(self.queue, unit_id)
+        # Given up on instead of handed out again
+        self.assertNotEqual(self.queue.claim('b')['id'], unit_id)
+        self.assertEqual(self.state(self.queue, unit_id),
+                         ('failed', 'a', MAX_ATTEMPTS, 'Lease expired %d times' % (MAX_ATTEMPTS)))
+
+    def test_write_shard_replaces(self):
+        shard = self.queue.shard_path(1)
+        write_shard(shard, {'records': ['stale']})
+        write_shard(shard, {'records': ['current']})
+        self.assertEqual(read_shard(shard), {'records': ['current']})
+        self.assertEqual(os.listdir(self.queue.shard_dir), [os.path.basename(shard)])
+
+    def test_work(self):
+        self.assertEqual(work(self.queue_dir, 'a'), self.files)
+        self.assertEqual(self.queue.counts(), {'pending': 0, 'leased': 0, 'done': self.files, 'failed': 0})
+        for unit in self.queue.units(1):
+            self.assertEqual(len(read_shard(self.queue.shard_path(unit['id']))['records']), 200)
+
+
+@PYTHON2_ONLY
+class QueueWorkersTest(QueueTestCase):
+    """
+    Worker processes sharing a queue folder, one unit of which was
+    left by a worker that stopped, merge to the outputs of a single
+    process parse.
+    """
+
+    files = 12
+
+    def test_workers_merge(self):
+        run_parser('-s', self.source, '-t', 'folder', '-o', self.folder, '-c', 'single')
+        run_parser('--queue-submit', self.queue_dir, '-s', self.source, '-t', 'folder', '-c', 'queued')
+
+        # A worker stopped after writing part of a shard
+        queue = JobQueue(self.queue_dir)
+        stopped = queue.claim('stopped:1')
+        with open(queue.shard_path(stopped['id']), 'wb') as s_file:
+            s_file.write(b'partial')
+        self.expire(queue, stopped['id'])
+
+        workers = [subprocess.Popen([sys.executable, os.path.join(ROOT, 'FSEParser_V4.0.py'),
+                                     '--queue-work', self.queue_dir, '--workers', '1'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                   for i in range(2)]
+        for worker in workers:
+            worker.communicate()
+            self.assertEqual(worker.returncode, 0)
+
+        self.assertEqual(queue.counts(), {'pending': 0, 'leased': 0, 'done': self.files, 'failed': 0})
+        state, worker, attempts, error = self.state(queue, stopped['id'])
+        self.assertNotEqual(worker, 'stopped:1')
+        self.assertEqual(attempts, 2)
+        self.assertEqual(len(read_shard(queue.shard_path(stopped['id']))['records']), 200)
+        queue.close()
+
+        merged = os.path.join(self.folder, 'merged')
+        os.mkdir(merged)
+        output = run_parser('--queue-merge', self.queue_dir, '-o', merged)
+        with open(os.path.join(self.folder, 'single', 'All_FSEVENTS.tsv'), 'rb') as t_file:
+            expected = t_file.read()
+        with open(os.path.join(merged, 'queued', 'All_FSEVENTS.tsv'), 'rb') as t_file:
+            self.assertEqual(t_file.read(), expected)
+        self.assertEqual(expected.count(b'\n'), 1 + self.files * 200)
+        self.assertNotIn(b'Unable to read', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
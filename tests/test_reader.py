@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+# Tests of the record decoder.
+# Run from the repository root with: python -m unittest discover tests
+
+import os
+import unittest
+
+from fsevents_fixtures import ROOT
+
+from fsevents_reader import COLUMNS, FSEventDecoder, SourceFile
+
+DATA = os.path.join(ROOT, 'tests', 'data')
+
+# Modified times of the files in data/fseventsd, which a checkout does not keep
+M_TIMES = {
+    '0000000000001010': '2019-03-01 10:00:00.000000 [UTC]',
+    '0000000000002000': '2019-03-04 12:30:00.000000 [UTC]'
+}
+
+
+class DecodeTest(unittest.TestCase):
+    """
+    The records decoded from data/fseventsd are the rows of
+    data/decoded_records.tsv under both Python 2 and Python 3.
+    The files hold DLS1 and DLS2 pages, records of several masks,
+    paths that are not ascii, are not valid utf-8 or hold a newline,
+    and a record without a path.
+    """
+
+    def test_decoded_records(self):
+        with open(os.path.join(DATA, 'decoded_records.tsv'), 'rb') as t_file:
+            lines = t_file.read().splitlines()
+        self.assertEqual(lines[0].split(b'\t'), [column.encode('ascii') for column in COLUMNS])
+
+        folder = os.path.join(DATA, 'fseventsd')
+        decoder = FSEventDecoder(True)
+        rows = []
+        for name in sorted(os.listdir(folder)):
+            src = SourceFile(name, 'fseventsd/' + name, M_TIMES[name], file_reader(os.path.join(folder, name)))
+            for record in decoder.decode(src):
+                rows.append(b'\t'.join(value_bytes(record[column]) for column in COLUMNS))
+        self.assertEqual(rows, lines[1:])
+        self.assertEqual(decoder.error_file_count, 0)
+
+
+def file_reader(filename):
+    """
+    Return a callable reading the contents of a file.
+    """
+    def read():
+        with open(filename, 'rb') as f_file:
+            return f_file.read()
+    return read
+
+
+def value_bytes(value):
+    """
+    Return a value of a record as the bytes it was read from.
+    Paths that are not valid utf-8 hold surrogates under Python 3.
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, int):
+        return str(value).encode('ascii')
+    return value.encode('utf-8', 'surrogateescape')
+
+
+if __name__ == '__main__':
+    unittest.main()
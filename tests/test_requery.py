@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+# Tests of --requery.
+# Run from the repository root with: python -m unittest discover tests
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from fsevents_fixtures import PYTHON2_ONLY, run_parser, write_queries, write_volume
+
+REPORT_QUERY = "CREATE VIEW Documents AS SELECT * FROM fsevents_sorted_by_event_id " \
+               "WHERE fullpath LIKE 'Users/%/Documents/%';"
+
+PATHS = [
+    b'Users/bob/Documents/report.docx',
+    b'Users/bob/Documents/notes.txt',
+    b'private/var/log/system.log'
+]
+
+
+@PYTHON2_ONLY
+class RequeryTest(unittest.TestCase):
+    """
+    --requery exports a report again when the records of
+    the database change, even if their number does not.
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        source = os.path.join(self.folder, 'fseventsd')
+        os.mkdir(source)
+        write_volume(source, PATHS, files=1, pages=1, records=30)
+        self.queries = os.path.join(self.folder, 'report_queries.json')
+        write_queries(self.queries, [('Documents', REPORT_QUERY)])
+        run_parser('-s', source, '-t', 'folder', '-o', self.folder, '-c', 'parsed', '-q', self.queries)
+        # A copy, as the case folder of the parse holds its own report hashes
+        self.database = os.path.join(self.folder, 'FSEvents.sqlite')
+        shutil.copy(os.path.join(self.folder, 'parsed', 'FSEvents.sqlite'), self.database)
+        self.report = os.path.join(self.folder, 'requeried', 'Documents.tsv')
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def requery(self):
+        """
+        Return what --requery printed.
+        """
+        return run_parser('--requery', self.database, '-o', self.folder, '-c', 'requeried', '-q', self.queries)
+
+    def test_parse_hashes_match(self):
+        # The reports of the parse are current for the database it wrote
+        output = run_parser('--requery', os.path.join(self.folder, 'parsed', 'FSEvents.sqlite'),
+                            '-o', self.folder, '-c', 'parsed', '-q', self.queries)
+        self.assertIn(b'Report Documents is current', output)
+
+    def test_edited_row(self):
+        self.assertIn(b'Exporting 1 reports', self.requery())
+        self.assertIn(b'Report Documents is current', self.requery())
+
+        con = sqlite3.connect(self.database)
+        con.execute("UPDATE fsevents_sorted_by_event_id SET fullpath = 'Users/EVIL/Documents/x' "
+                    "WHERE rowid = 5")
+        con.commit()
+        con.close()
+
+        self.assertIn(b'Exporting 1 reports', self.requery())
+        with open(self.report, 'rb') as r_file:
+            self.assertIn(b'Users/EVIL/Documents/x', r_file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
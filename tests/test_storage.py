@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+# Tests of the storage backends.
+# Run from the repository root with: python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from fsevents_fixtures import PYTHON2_ONLY, run_parser, write_queries, write_volume
+
+from fsevents_metrics import Metrics
+from fsevents_reader import COLUMNS
+from fsevents_storage import DUCKDB_IMPORT, DuckDBStorage, duckdb_ordered, duckdb_query
+
+# Matches paths of either case, and with the OR DuckDB returns
+# the rows matching each side apart unless the view is ordered
+REPORT_QUERY = "CREATE VIEW Documents AS SELECT * FROM fsevents_sorted_by_event_id " \
+               "WHERE fullpath LIKE '%users/%/documents/%' OR (fullpath LIKE 'Volumes/%' " \
+               "AND fullpath NOT LIKE '%.TMP');"
+
+PATHS = [
+    b'Users/Bob/Documents/Report.DOCX',
+    b'users/bob/documents/notes.txt',
+    b'Volumes/USB/copy.tmp',
+    b'Volumes/USB/photo.jpg',
+    b'private/var/log/system.log'
+]
+
+
+class DuckDBQueryTest(unittest.TestCase):
+    """
+    """
+
+    def test_like(self):
+        self.assertEqual(
+            duckdb_query("SELECT * FROM t WHERE fullpath LIKE '%A%' AND flags not like 'x''s';"),
+            "SELECT * FROM t WHERE NOT (lower(fullpath) NOT LIKE lower('%A%')) "
+            "AND lower(flags) NOT LIKE lower('x''s');")
+
+    def test_quoted_like(self):
+        query = "SELECT * FROM t WHERE fullpath = 'a LIKE b'"
+        self.assertEqual(duckdb_query(query), query)
+
+    def test_ordered(self):
+        self.assertEqual(duckdb_ordered("SELECT * FROM t WHERE a = 'order';"),
+                         "SELECT * FROM t WHERE a = 'order' ORDER BY rowid")
+        query = "SELECT fullpath, count(*) FROM t GROUP BY fullpath"
+        self.assertEqual(duckdb_ordered(query), query)
+
+
+@unittest.skipIf(not DUCKDB_IMPORT, 'duckdb is not installed')
+class DuckDBStorageTest(unittest.TestCase):
+    """
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        self.storage = DuckDBStorage(os.path.join(self.folder, 'FSEvents.duckdb'), Metrics())
+
+    def tearDown(self):
+        """
+        """
+        self.storage.close()
+        shutil.rmtree(self.folder)
+
+    def test_unordered_view(self):
+        views = [
+            ('Documents', "CREATE VIEW Documents AS SELECT * FROM fsevents_sorted_by_event_id "
+                          "WHERE fullpath LIKE 'users/%'"),
+            # Aggregates without grouping, so it can not be ordered by rowid
+            ('Counts', "CREATE VIEW Counts AS SELECT count(fullpath) AS records "
+                       "FROM fsevents_sorted_by_event_id")
+        ]
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.storage.create(views)
+            printed = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertIn('View Counts can not be ordered by rowid', printed)
+        self.assertNotIn('View Documents', printed)
+        self.assertEqual(self.storage.view_names(), ['Documents', 'Counts'])
+
+        for path in ('Users/a', 'private/b', 'users/c'):
+            self.storage.append([path] * len(COLUMNS))
+        self.assertEqual(self.storage.sort(), 3)
+        self.assertEqual([row[2] for row in self.storage.view_rows('Documents')], ['Users/a', 'users/c'])
+        self.assertEqual(list(self.storage.view_rows('Counts')), [(3,)])
+
+
+@unittest.skipIf(not DUCKDB_IMPORT, 'duckdb is not installed')
+@PYTHON2_ONLY
+class DuckDBParseTest(unittest.TestCase):
+    """
+    A parse with --storage duckdb writes the same TSV files as SQLite.
+    """
+
+    def setUp(self):
+        """
+        """
+        self.folder = tempfile.mkdtemp()
+        source = os.path.join(self.folder, 'fseventsd')
+        os.mkdir(source)
+        # Over 2048 records, the rows DuckDB handles at a time
+        write_volume(source, PATHS)
+        self.queries = os.path.join(self.folder, 'report_queries.json')
+        write_queries(self.queries, [('Documents', REPORT_QUERY)])
+
+    def tearDown(self):
+        """
+        """
+        shutil.rmtree(self.folder)
+
+    def parse(self, storage):
+        """
+        Parse the volume and return the case folder.
+        """
+        outdir = os.path.join(self.folder, storage)
+        os.mkdir(outdir)
+        run_parser('-s', os.path.join(self.folder, 'fseventsd'), '-t', 'folder', '-o', outdir,
+                   '-c', 'case', '-q', self.queries, '--storage', storage)
+        return os.path.join(outdir, 'case')
+
+    def test_same_tsv_files(self):
+        sqlite_case = self.parse('sqlite')
+        duckdb_case = self.parse('duckdb')
+        self.assertTrue(os.path.isfile(os.path.join(duckdb_case, 'FSEvents.duckdb')))
+        for name in ('All_FSEVENTS.tsv', 'Documents.tsv'):
+            with open(os.path.join(sqlite_case, name), 'rb') as s_file:
+                expected = s_file.read()
+            with open(os.path.join(duckdb_case, name), 'rb') as d_file:
+                self.assertEqual(d_file.read(), expected)
+        # Both cases of the documents and the photo, but not the copy
+        self.assertEqual(expected.count(b'\n'), 1 + 3000 * 3 // 5)
+        self.assertIn(b'Users/Bob/Documents/Report.DOCX', expected)
+        self.assertNotIn(b'copy.tmp', expected)
+
+
+if __name__ == '__main__':
+    unittest.main()